@@ -0,0 +1,40 @@
+"""audit chain heads and chain sequence
+
+Revision ID: a8p9q0r1s234
+Revises: z7o8p9q0r123
+Create Date: 2026-10-18
+
+Chain head per organization for the background audit writer (locked while
+appending so the hash chain stays linear across workers) and a chain_seq
+column on audit_logs. Heads start empty: each one is seeded from the org's
+newest existing entry on its first write.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "a8p9q0r1s234"
+down_revision = "z7o8p9q0r123"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "audit_chain_heads",
+        sa.Column("organization_id", sa.String(50), primary_key=True),
+        sa.Column("last_hash", sa.String(64), nullable=False),
+        sa.Column("last_seq", sa.BigInteger, server_default="0", nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True),
+                  server_default=sa.text("now()"), nullable=False),
+    )
+    op.add_column("audit_logs", sa.Column("chain_seq", sa.BigInteger, nullable=True))
+    op.create_index(
+        "ix_audit_org_chain_seq", "audit_logs", ["organization_id", "chain_seq"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_audit_org_chain_seq", table_name="audit_logs")
+    op.drop_column("audit_logs", "chain_seq")
+    op.drop_table("audit_chain_heads")
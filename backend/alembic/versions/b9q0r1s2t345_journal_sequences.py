@@ -0,0 +1,40 @@
+"""gapless journal entry numbering
+
+Revision ID: b9q0r1s2t345
+Revises: a8p9q0r1s234
+Create Date: 2026-10-18
+
+Per-org counter row behind src.core.gl_posting.allocate_entry_numbers,
+seeded from the highest JE-nnnnnn number already issued.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+revision = "b9q0r1s2t345"
+down_revision = "a8p9q0r1s234"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "journal_sequences",
+        sa.Column("organization_id", UUID(as_uuid=True),
+                  sa.ForeignKey("organizations.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("last_number", sa.BigInteger, server_default="0", nullable=False),
+    )
+    op.execute(
+        """
+        INSERT INTO journal_sequences (organization_id, last_number)
+        SELECT organization_id, MAX(SUBSTRING(entry_number FROM 4)::bigint)
+        FROM journal_entries
+        WHERE entry_number ~ '^JE-[0-9]+$'
+        GROUP BY organization_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("journal_sequences")
@@ -0,0 +1,28 @@
+"""closed-period ledger snapshots
+
+Revision ID: c0r1s2t3u456
+Revises: b9q0r1s2t345
+Create Date: 2026-10-18
+
+fiscal_periods.snapshot_at marks periods whose account_balances rows are a
+frozen snapshot (see src.core.ledger_snapshots). Periods already closed are
+frozen by the freeze_ledger_snapshots task on its next run.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "c0r1s2t3u456"
+down_revision = "b9q0r1s2t345"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "fiscal_periods", sa.Column("snapshot_at", sa.DateTime(), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("fiscal_periods", "snapshot_at")
@@ -0,0 +1,50 @@
+"""columnar export jobs
+
+Revision ID: d1s2t3u4v567
+Revises: c0r1s2t3u456
+Create Date: 2026-10-18
+
+Background Arrow IPC / Parquet exports (see src.core.columnar_export);
+files live under settings.EXPORTS_DIR and are purged after expires_at.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+revision = "d1s2t3u4v567"
+down_revision = "c0r1s2t3u456"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "export_jobs",
+        sa.Column("id", UUID(as_uuid=True), primary_key=True),
+        sa.Column("organization_id", UUID(as_uuid=True),
+                  sa.ForeignKey("organizations.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("requested_by", UUID(as_uuid=True),
+                  sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("dataset", sa.String(50), nullable=False),
+        sa.Column("format", sa.String(20), nullable=False),
+        sa.Column("date_from", sa.Date, nullable=True),
+        sa.Column("date_to", sa.Date, nullable=True),
+        sa.Column("status", sa.String(20), nullable=False, server_default="pending"),
+        sa.Column("row_count", sa.BigInteger, nullable=True),
+        sa.Column("size_bytes", sa.BigInteger, nullable=True),
+        sa.Column("storage_key", sa.String(500), nullable=True),
+        sa.Column("error", sa.Text, nullable=True),
+        sa.Column("completed_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("created_at", sa.DateTime, server_default=sa.func.now(), nullable=False),
+        sa.Column("updated_at", sa.DateTime, server_default=sa.func.now(), nullable=False),
+    )
+    op.create_index("ix_export_jobs_organization_id", "export_jobs", ["organization_id"])
+    op.create_index("ix_export_jobs_status_expires", "export_jobs", ["status", "expires_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_export_jobs_status_expires", table_name="export_jobs")
+    op.drop_index("ix_export_jobs_organization_id", table_name="export_jobs")
+    op.drop_table("export_jobs")
@@ -0,0 +1,189 @@
+"""iot time-series: monthly partitions and rollups
+
+Revision ID: e2t3u4v5w678
+Revises: d1s2t3u4v567
+Create Date: 2026-10-18
+
+iot_readings becomes a table range-partitioned by month on timestamp
+(primary key (id, timestamp), plus a default partition), and iot_rollups
+holds the 1-minute / 1-hour / 1-day aggregates kept by
+src.core.iot_timeseries, backfilled here from the existing readings.
+Later months are created by the ensure_iot_partitions task.
+"""
+
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+revision = "e2t3u4v5w678"
+down_revision = "d1s2t3u4v567"
+branch_labels = None
+depends_on = None
+
+MONTHS_AHEAD = 3
+ROLLUP_SECONDS = (60, 3600, 86400)
+
+_RLS_POLICY = """
+    CREATE POLICY tenant_isolation_{table} ON {table}
+    USING (
+        organization_id = NULLIF(current_setting('app.current_org', true), '')::uuid
+    )
+    WITH CHECK (
+        organization_id = NULLIF(current_setting('app.current_org', true), '')::uuid
+    )
+"""
+
+
+def _add_months(day: date, months: int) -> date:
+    month = day.month - 1 + months
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+def _enable_rls(table: str) -> None:
+    op.execute(f"ALTER TABLE {table} ENABLE ROW LEVEL SECURITY")
+    op.execute(_RLS_POLICY.format(table=table))
+    op.execute(f"ALTER TABLE {table} FORCE ROW LEVEL SECURITY")
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+
+    # ── Partitioned iot_readings ──
+    op.execute("ALTER TABLE iot_readings RENAME TO iot_readings_legacy")
+    for index in (
+        "ix_iot_org_sensor_ts",
+        "ix_iot_readings_timestamp",
+        "ix_iot_readings_sensor_type",
+        "ix_iot_readings_organization_id",
+    ):
+        op.execute(f"DROP INDEX IF EXISTS {index}")
+    op.execute(
+        """
+        CREATE TABLE iot_readings (
+            id UUID NOT NULL,
+            organization_id UUID NOT NULL
+                REFERENCES organizations(id) ON DELETE CASCADE,
+            timestamp TIMESTAMPTZ NOT NULL,
+            sensor_type VARCHAR(100) NOT NULL,
+            value DOUBLE PRECISION NOT NULL,
+            unit VARCHAR(50) NOT NULL,
+            created_at TIMESTAMP NOT NULL DEFAULT now(),
+            updated_at TIMESTAMP NOT NULL DEFAULT now(),
+            PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE (timestamp)
+        """
+    )
+    op.execute("CREATE TABLE iot_readings_default PARTITION OF iot_readings DEFAULT")
+
+    oldest = conn.execute(sa.text("SELECT min(timestamp) FROM iot_readings_legacy")).scalar()
+    month = (oldest.date() if oldest else date.today()).replace(day=1)
+    last = _add_months(date.today().replace(day=1), MONTHS_AHEAD)
+    while month <= last:
+        nxt = _add_months(month, 1)
+        op.execute(
+            f"CREATE TABLE iot_readings_{month:%Y_%m} PARTITION OF iot_readings "
+            f"FOR VALUES FROM ('{month} 00:00:00+00') TO ('{nxt} 00:00:00+00')"
+        )
+        month = nxt
+
+    op.create_index("ix_iot_readings_organization_id", "iot_readings", ["organization_id"])
+    op.create_index("ix_iot_readings_timestamp", "iot_readings", ["timestamp"])
+    op.create_index("ix_iot_readings_sensor_type", "iot_readings", ["sensor_type"])
+    op.create_index(
+        "ix_iot_org_sensor_ts",
+        "iot_readings",
+        ["organization_id", "sensor_type", "timestamp"],
+    )
+    op.execute(
+        """
+        INSERT INTO iot_readings
+            (id, organization_id, timestamp, sensor_type, value, unit,
+             created_at, updated_at)
+        SELECT id, organization_id, timestamp, sensor_type, value, unit,
+               created_at, updated_at
+        FROM iot_readings_legacy
+        """
+    )
+    op.execute("DROP TABLE iot_readings_legacy")
+    _enable_rls("iot_readings")
+
+    # ── Rollups ──
+    op.create_table(
+        "iot_rollups",
+        sa.Column("organization_id", UUID(as_uuid=True),
+                  sa.ForeignKey("organizations.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("sensor_type", sa.String(100), nullable=False),
+        sa.Column("bucket_seconds", sa.Integer, nullable=False),
+        sa.Column("bucket_start", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("sample_count", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("value_sum", sa.Float, nullable=False, server_default="0"),
+        sa.Column("value_min", sa.Float, nullable=False),
+        sa.Column("value_max", sa.Float, nullable=False),
+        sa.Column("unit", sa.String(50), nullable=False),
+        sa.Column("updated_at", sa.DateTime, server_default=sa.func.now(), nullable=False),
+        sa.PrimaryKeyConstraint(
+            "organization_id", "sensor_type", "bucket_seconds", "bucket_start"
+        ),
+    )
+    for seconds in ROLLUP_SECONDS:
+        op.execute(
+            f"""
+            INSERT INTO iot_rollups
+                (organization_id, sensor_type, bucket_seconds, bucket_start,
+                 sample_count, value_sum, value_min, value_max, unit)
+            SELECT organization_id, sensor_type, {seconds},
+                   to_timestamp(floor(extract(epoch FROM timestamp) / {seconds}) * {seconds}),
+                   count(*), sum(value), min(value), max(value), max(unit)
+            FROM iot_readings
+            GROUP BY 1, 2, 4
+            """
+        )
+    _enable_rls("iot_rollups")
+
+
+def downgrade() -> None:
+    op.drop_table("iot_rollups")
+
+    op.execute("ALTER TABLE iot_readings RENAME TO iot_readings_partitioned")
+    for index in (
+        "ix_iot_org_sensor_ts",
+        "ix_iot_readings_timestamp",
+        "ix_iot_readings_sensor_type",
+        "ix_iot_readings_organization_id",
+    ):
+        op.execute(f"DROP INDEX IF EXISTS {index}")
+    op.execute(
+        """
+        CREATE TABLE iot_readings (
+            id UUID PRIMARY KEY,
+            organization_id UUID NOT NULL
+                REFERENCES organizations(id) ON DELETE CASCADE,
+            timestamp TIMESTAMPTZ NOT NULL,
+            sensor_type VARCHAR(100) NOT NULL,
+            value DOUBLE PRECISION NOT NULL,
+            unit VARCHAR(50) NOT NULL,
+            created_at TIMESTAMP NOT NULL DEFAULT now(),
+            updated_at TIMESTAMP NOT NULL DEFAULT now()
+        )
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO iot_readings
+        SELECT id, organization_id, timestamp, sensor_type, value, unit,
+               created_at, updated_at
+        FROM iot_readings_partitioned
+        """
+    )
+    op.execute("DROP TABLE iot_readings_partitioned CASCADE")
+    op.create_index("ix_iot_readings_organization_id", "iot_readings", ["organization_id"])
+    op.create_index("ix_iot_readings_timestamp", "iot_readings", ["timestamp"])
+    op.create_index("ix_iot_readings_sensor_type", "iot_readings", ["sensor_type"])
+    op.create_index(
+        "ix_iot_org_sensor_ts",
+        "iot_readings",
+        ["organization_id", "sensor_type", "timestamp"],
+    )
+    _enable_rls("iot_readings")
@@ -0,0 +1,42 @@
+"""platform stats snapshots
+
+Revision ID: f3u4v5w6x789
+Revises: e2t3u4v5w678
+Create Date: 2026-10-18
+
+Cross-tenant superadmin KPIs written by src.core.platform_stats (the
+refresh_platform_stats beat task). The table starts empty: the first
+dashboard read computes the first snapshot.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+
+revision = "f3u4v5w6x789"
+down_revision = "e2t3u4v5w678"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "platform_stats_snapshots",
+        sa.Column("id", UUID(as_uuid=True), primary_key=True),
+        sa.Column("computed_at", sa.DateTime, nullable=False),
+        sa.Column("stats", JSONB, nullable=False),
+        sa.Column("inventory", JSONB, nullable=False),
+    )
+    op.create_index(
+        "ix_platform_stats_snapshots_computed_at",
+        "platform_stats_snapshots",
+        ["computed_at"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_platform_stats_snapshots_computed_at",
+        table_name="platform_stats_snapshots",
+    )
+    op.drop_table("platform_stats_snapshots")
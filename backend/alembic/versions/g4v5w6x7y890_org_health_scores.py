@@ -0,0 +1,52 @@
+"""org health score history
+
+Revision ID: g4v5w6x7y890
+Revises: f3u4v5w6x789
+Create Date: 2026-10-18
+
+One row per organization per retention evaluation, written in bulk by
+src.core.crm.HealthTable.save.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+revision = "g4v5w6x7y890"
+down_revision = "f3u4v5w6x789"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "org_health_scores",
+        sa.Column("id", UUID(as_uuid=True), primary_key=True),
+        sa.Column("organization_id", UUID(as_uuid=True),
+                  sa.ForeignKey("organizations.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("computed_at", sa.DateTime, nullable=False),
+        sa.Column("score", sa.Integer, nullable=False),
+        sa.Column("risk", sa.String(20), nullable=False),
+        sa.Column("login_recency", sa.Integer, nullable=False),
+        sa.Column("production_activity", sa.Integer, nullable=False),
+        sa.Column("payment_health", sa.Integer, nullable=False),
+        sa.Column("engagement_depth", sa.Integer, nullable=False),
+        sa.Column("ticket_burden", sa.Integer, nullable=False),
+        sa.Column("last_activity", sa.DateTime, nullable=True),
+    )
+    op.create_index(
+        "ix_org_health_scores_organization_id",
+        "org_health_scores",
+        ["organization_id"],
+    )
+    op.create_index(
+        "ix_org_health_scores_computed_at", "org_health_scores", ["computed_at"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_org_health_scores_computed_at", table_name="org_health_scores")
+    op.drop_index(
+        "ix_org_health_scores_organization_id", table_name="org_health_scores"
+    )
+    op.drop_table("org_health_scores")
@@ -0,0 +1,51 @@
+"""webhook transactional outbox
+
+Revision ID: x5m6n7o8p901
+Revises: w4l5m6n7o890
+Create Date: 2026-10-18
+
+Outbox rows are written in the same transaction as the domain change and
+drained in batches by the webhook dispatcher (src.core.webhook_dispatcher).
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+revision = "x5m6n7o8p901"
+down_revision = "w4l5m6n7o890"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "webhook_outbox",
+        sa.Column("id", UUID(as_uuid=True), primary_key=True),
+        sa.Column("organization_id", UUID(as_uuid=True),
+                  sa.ForeignKey("organizations.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("webhook_id", UUID(as_uuid=True),
+                  sa.ForeignKey("webhooks.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("event_type", sa.String(100), nullable=False),
+        sa.Column("payload", sa.JSON, nullable=False),
+        sa.Column("status", sa.String(20), server_default="pending", nullable=False),
+        sa.Column("attempts", sa.Integer, server_default="0", nullable=False),
+        sa.Column("next_attempt_at", sa.DateTime(timezone=True),
+                  server_default=sa.func.now(), nullable=False),
+        sa.Column("last_error", sa.Text, nullable=True),
+        sa.Column("delivered_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("created_at", sa.DateTime, server_default=sa.func.now(), nullable=False),
+        sa.Column("updated_at", sa.DateTime, server_default=sa.func.now(), nullable=False),
+    )
+    op.create_index("ix_webhook_outbox_organization_id", "webhook_outbox", ["organization_id"])
+    op.create_index("ix_webhook_outbox_webhook_id", "webhook_outbox", ["webhook_id"])
+    op.create_index(
+        "ix_webhook_outbox_status_next", "webhook_outbox", ["status", "next_attempt_at"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_webhook_outbox_status_next", table_name="webhook_outbox")
+    op.drop_index("ix_webhook_outbox_webhook_id", table_name="webhook_outbox")
+    op.drop_index("ix_webhook_outbox_organization_id", table_name="webhook_outbox")
+    op.drop_table("webhook_outbox")
@@ -0,0 +1,67 @@
+"""incremental economics summary tables
+
+Revision ID: y6n7o8p9q012
+Revises: x5m6n7o8p901
+Create Date: 2026-10-18
+
+Per-flock and per-org running aggregates maintained by
+src.core.economics_summary. Tables start empty: each org is built on its
+first economics read (or by the nightly rebuild_economics_summaries task).
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+revision = "y6n7o8p9q012"
+down_revision = "x5m6n7o8p901"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "flock_economics_summary",
+        sa.Column("flock_id", UUID(as_uuid=True),
+                  sa.ForeignKey("flocks.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("organization_id", UUID(as_uuid=True),
+                  sa.ForeignKey("organizations.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("feed_kg", sa.Float, server_default="0", nullable=False),
+        sa.Column("feed_rows", sa.Integer, server_default="0", nullable=False),
+        sa.Column("vaccine_cost", sa.Float, server_default="0", nullable=False),
+        sa.Column("vaccine_rows", sa.Integer, server_default="0", nullable=False),
+        sa.Column("medication_cost", sa.Float, server_default="0", nullable=False),
+        sa.Column("medication_rows", sa.Integer, server_default="0", nullable=False),
+        sa.Column("expense_amount", sa.Float, server_default="0", nullable=False),
+        sa.Column("expense_rows", sa.Integer, server_default="0", nullable=False),
+        sa.Column("total_eggs", sa.BigInteger, server_default="0", nullable=False),
+        sa.Column("production_rows", sa.Integer, server_default="0", nullable=False),
+        sa.Column("updated_at", sa.DateTime, server_default=sa.func.now(), nullable=False),
+    )
+    op.create_index(
+        "ix_flock_economics_summary_organization_id",
+        "flock_economics_summary",
+        ["organization_id"],
+    )
+
+    op.create_table(
+        "org_economics_totals",
+        sa.Column("organization_id", UUID(as_uuid=True),
+                  sa.ForeignKey("organizations.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("feed_purchase_cost", sa.Float, server_default="0", nullable=False),
+        sa.Column("feed_purchase_kg", sa.Float, server_default="0", nullable=False),
+        sa.Column("feed_purchase_rows", sa.Integer, server_default="0", nullable=False),
+        sa.Column("income_total", sa.Float, server_default="0", nullable=False),
+        sa.Column("income_rows", sa.Integer, server_default="0", nullable=False),
+        sa.Column("rebuilt_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("updated_at", sa.DateTime, server_default=sa.func.now(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("org_economics_totals")
+    op.drop_index(
+        "ix_flock_economics_summary_organization_id",
+        table_name="flock_economics_summary",
+    )
+    op.drop_table("flock_economics_summary")
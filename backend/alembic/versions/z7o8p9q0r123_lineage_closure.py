@@ -0,0 +1,75 @@
+"""batch lineage transitive closure
+
+Revision ID: z7o8p9q0r123
+Revises: y6n7o8p9q012
+Create Date: 2026-10-18
+
+Closure rows (ancestor, descendant, shortest depth) maintained by
+src.core.lineage_closure. Backfilled here from batch_lineage with one
+recursive query; src.tasks.traceability.backfill_lineage_closure re-checks
+and repairs per organization.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+revision = "z7o8p9q0r123"
+down_revision = "y6n7o8p9q012"
+branch_labels = None
+depends_on = None
+
+MAX_CLOSURE_DEPTH = 50
+
+
+def upgrade() -> None:
+    op.create_table(
+        "batch_lineage_closure",
+        sa.Column("ancestor_id", UUID(as_uuid=True),
+                  sa.ForeignKey("traceability_batches.id", ondelete="CASCADE"),
+                  primary_key=True),
+        sa.Column("descendant_id", UUID(as_uuid=True),
+                  sa.ForeignKey("traceability_batches.id", ondelete="CASCADE"),
+                  primary_key=True),
+        sa.Column("organization_id", UUID(as_uuid=True),
+                  sa.ForeignKey("organizations.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("depth", sa.Integer, nullable=False),
+    )
+    op.create_index(
+        "ix_batch_lineage_closure_organization_id",
+        "batch_lineage_closure",
+        ["organization_id"],
+    )
+    op.create_index(
+        "ix_lineage_closure_descendant",
+        "batch_lineage_closure",
+        ["descendant_id", "depth"],
+    )
+
+    op.execute(
+        f"""
+        WITH RECURSIVE paths(ancestor_id, descendant_id, depth) AS (
+            SELECT parent_batch_id, child_batch_id, 1 FROM batch_lineage
+            UNION
+            SELECT p.ancestor_id, l.child_batch_id, p.depth + 1
+            FROM paths p
+            JOIN batch_lineage l ON l.parent_batch_id = p.descendant_id
+            WHERE p.depth < {MAX_CLOSURE_DEPTH}
+        )
+        INSERT INTO batch_lineage_closure
+            (ancestor_id, descendant_id, organization_id, depth)
+        SELECT p.ancestor_id, p.descendant_id, b.organization_id, MIN(p.depth)
+        FROM paths p
+        JOIN traceability_batches b ON b.id = p.ancestor_id
+        WHERE p.ancestor_id <> p.descendant_id
+        GROUP BY p.ancestor_id, p.descendant_id, b.organization_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_lineage_closure_descendant", table_name="batch_lineage_closure")
+    op.drop_index(
+        "ix_batch_lineage_closure_organization_id", table_name="batch_lineage_closure"
+    )
+    op.drop_table("batch_lineage_closure")
@@ -8,6 +8,7 @@ Endpoints:
 - /gl/trial-balance     — Trial Balance report
 - /gl/balance-sheet     — Balance Sheet report
 - /gl/income-statement  — Income Statement (EERR)
+- /gl/snapshots/verify  — Check closed-period snapshots against a full scan
 - /gl/seed-coa          — Seed default Chart of Accounts for org
 """
 
@@ -249,6 +250,16 @@ async def get_income_statement(
     )
 
 
+@router.get("/snapshots/verify")
+async def verify_ledger_snapshots(
+    as_of_date: date | None = None,
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """Snapshot + open-period delta vs. full ledger scan (read-only)."""
+    return await _svc(db, user).verify_ledger_snapshots(as_of_date)
+
+
 # ══════════════════════════════════════════════════════════════════════
 # SEED DEFAULT CHART OF ACCOUNTS
 # ══════════════════════════════════════════════════════════════════════
@@ -4,7 +4,7 @@ from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.api.deps import require_feature
+from src.api.deps import require_feature, require_role
 from src.database import get_db, get_read_db
 from src.models.auth import User
 from src.schemas.analytics import EconomicsResponse
@@ -23,6 +23,30 @@ async def get_economics(
     return await svc.get_economics(flock_id=flock_id)
 
 
+@router.get(
+    "/analytics/economics/verify", dependencies=[Depends(require_feature("finance"))]
+)
+async def verify_economics_summary(
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(require_role("owner")),
+):
+    """Comparar el resumen económico incremental con un recálculo completo."""
+    svc = AnalyticsService(db, user.organization_id, user.id)
+    return await svc.verify_economics_summary()
+
+
+@router.post(
+    "/analytics/economics/rebuild", dependencies=[Depends(require_feature("finance"))]
+)
+async def rebuild_economics_summary(
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(require_role("owner")),
+):
+    """Reconstruir el resumen económico desde las tablas fuente."""
+    svc = AnalyticsService(db, user.organization_id, user.id)
+    return await svc.rebuild_economics_summary()
+
+
 # ── CQRS Analytics (read from materialized views via read replica) ───
 
 
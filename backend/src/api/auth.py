@@ -7,7 +7,7 @@ from fastapi import APIRouter, Depends, Request, status
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.api.deps import get_current_user
+from src.api.deps import get_current_user, get_current_user_model
 from src.core.auth_security import (
     blacklist_all_user_tokens,
     blacklist_token,
@@ -867,7 +867,7 @@ async def refresh(
 
 
 @router.get("/me", response_model=UserRead)
-async def me(user: User = Depends(get_current_user)):
+async def me(user: User = Depends(get_current_user_model)):
     return user
 
 
@@ -875,7 +875,7 @@ async def me(user: User = Depends(get_current_user)):
 async def update_me(
     data: UserUpdate,
     request: Request,
-    user: User = Depends(get_current_user),
+    user: User = Depends(get_current_user_model),
     db: AsyncSession = Depends(get_db),
 ):
     if not await check_rate_limit(f"update_profile:{user.id}", 30, 3600):
@@ -946,7 +946,7 @@ async def reset_password(
 @router.post("/change-password", response_model=MessageResponse)
 async def change_password(
     data: ChangePasswordRequest,
-    user: User = Depends(get_current_user),
+    user: User = Depends(get_current_user_model),
     db: AsyncSession = Depends(get_db),
 ):
     if not user.hashed_password:
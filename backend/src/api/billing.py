@@ -500,12 +500,13 @@ async def delete_account(
     if body.confirm_text not in ("DELETE", "ELIMINAR"):
         raise ForbiddenError("Confirmation text must be 'DELETE' or 'ELIMINAR'")
 
-    if not user.hashed_password:
+    account = await db.get(User, user.id)
+    if not account.hashed_password:
         raise ForbiddenError(
             "Password verification required — OAuth-only accounts must set a password first"
         )
 
-    if not verify_password(body.password, user.hashed_password):
+    if not verify_password(body.password, account.hashed_password):
         raise ForbiddenError("Invalid password")
 
     # Cancel Stripe subscription if active
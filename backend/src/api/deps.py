@@ -11,6 +11,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.core.exceptions import ForbiddenError, UnauthorizedError
 from src.core.plans import check_feature_access
+from src.core.principal import Principal, get_principal, invalidate_org
 from src.core.security import decode_token
 from src.database import get_db, set_tenant_context
 from src.models.auth import Role, User
@@ -24,19 +25,23 @@ bearer_scheme = HTTPBearer(auto_error=False)
 SUPERUSER_EMAIL = "jadelsolara@pm.me"
 
 
-def is_superuser(user: User) -> bool:
+def is_superuser(user: User | Principal) -> bool:
     """True only for THE superuser (jadelsolara@pm.me)."""
     return user.email == SUPERUSER_EMAIL
 
 
-def is_superadmin(user: User) -> bool:
+def is_superadmin(user: User | Principal) -> bool:
     return user.role == Role.superadmin
 
 
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials | None = Depends(bearer_scheme),
     db: AsyncSession = Depends(get_db),
-) -> User:
+) -> Principal:
+    """Authenticated principal: a cached snapshot, not the ORM ``User``.
+
+    Warm requests run no query; see ``src.core.principal``.
+    """
     if credentials is None:
         raise UnauthorizedError()
     try:
@@ -57,6 +62,29 @@ async def get_current_user(
     user_id = payload.get("sub")
     if not user_id:
         raise UnauthorizedError()
+    try:
+        uuid.UUID(user_id)
+    except ValueError:
+        raise UnauthorizedError()
+
+    user = await get_principal(
+        user_id, payload.get("org"), jti, lambda: _load_principal(user_id, db)
+    )
+
+    # Set audit context for hash-chain audit trail
+    from src.core.audit import audit_user_id as _audit_uid, audit_org_id as _audit_oid
+
+    _audit_uid.set(str(user.id))
+    _audit_oid.set(str(user.organization_id))
+
+    # Set RLS tenant context for this transaction
+    await set_tenant_context(db, str(user.organization_id))
+
+    return user
+
+
+async def _load_principal(user_id: str, db: AsyncSession) -> Principal:
+    """Build the principal from the database (cache miss)."""
     result = await db.execute(select(User).where(User.id == uuid.UUID(user_id)))
     user = result.scalar_one_or_none()
     if not user or not user.is_active:
@@ -78,20 +106,41 @@ async def get_current_user(
             "BLOCKED unauthorized superadmin %s — downgraded to admin", user.email
         )
 
-    # Set audit context for hash-chain audit trail
-    from src.core.audit import audit_user_id as _audit_uid, audit_org_id as _audit_oid
-
-    _audit_uid.set(str(user.id))
-    _audit_oid.set(str(user.organization_id))
+    plan_until = None
+    if is_superadmin(user):
+        plan = "enterprise"
+    else:
+        sub = await get_subscription(user.organization_id, db)
+        plan = await _resolve_plan(sub, db)
+        if plan != "suspended" and sub.is_trial and sub.trial_end:
+            plan_until = _aware(sub.trial_end).timestamp()
+
+    return Principal(
+        id=user.id,
+        organization_id=user.organization_id,
+        email=user.email,
+        full_name=user.full_name,
+        role=user.role,
+        is_active=user.is_active,
+        email_verified=user.email_verified,
+        plan=plan,
+        plan_until=plan_until,
+    )
 
-    # Set RLS tenant context for this transaction
-    await set_tenant_context(db, str(user.organization_id))
 
+async def get_current_user_model(
+    principal: Principal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+) -> User:
+    """The full ``User`` row, for endpoints that update it or read private columns."""
+    user = await db.get(User, principal.id)
+    if user is None:
+        raise UnauthorizedError()
     return user
 
 
 def require_role(*roles: str) -> Callable:
-    async def role_checker(user: User = Depends(get_current_user)) -> User:
+    async def role_checker(user: Principal = Depends(get_current_user)) -> Principal:
         if is_superadmin(user):
             return user
         if user.role.value not in roles:
@@ -102,7 +151,9 @@ def require_role(*roles: str) -> Callable:
 
 
 def require_superadmin() -> Callable:
-    async def superadmin_checker(user: User = Depends(get_current_user)) -> User:
+    async def superadmin_checker(
+        user: Principal = Depends(get_current_user),
+    ) -> Principal:
         if not is_superadmin(user):
             raise ForbiddenError("Superadmin access required")
         return user
@@ -110,7 +161,7 @@ def require_superadmin() -> Callable:
     return superadmin_checker
 
 
-def get_org_filter(user: User):
+def get_org_filter(user: User | Principal):
     return user.organization_id
 
 
@@ -189,7 +240,10 @@ async def get_subscription(org_id: uuid.UUID, db: AsyncSession) -> Subscription
 
 
 async def invalidate_subscription_cache(org_id: uuid.UUID) -> None:
-    """Call this after Stripe webhook or plan change to bust cache."""
+    """Call this after Stripe webhook or plan change to bust cache.
+
+    Also drops the organization's cached principals, which carry the plan.
+    """
     from src.core.rate_limit import _redis
 
     if _redis:
@@ -197,16 +251,18 @@ async def invalidate_subscription_cache(org_id: uuid.UUID) -> None:
             await _redis.delete(f"sub:{org_id}")
         except Exception:
             pass
+    await invalidate_org(org_id)
+
+
+def _aware(ts: datetime) -> datetime:
+    return ts if ts.tzinfo is not None else ts.replace(tzinfo=timezone.utc)
 
 
 def _is_trial_expired(sub: Subscription) -> bool:
     """Check if a trial subscription has expired."""
     if not sub.is_trial or not sub.trial_end:
         return False
-    trial_end = sub.trial_end
-    if trial_end.tzinfo is None:
-        trial_end = trial_end.replace(tzinfo=timezone.utc)
-    return datetime.now(timezone.utc) > trial_end
+    return datetime.now(timezone.utc) > _aware(sub.trial_end)
 
 
 async def _resolve_plan(sub: Subscription | None, db: AsyncSession) -> str:
@@ -227,25 +283,15 @@ async def _resolve_plan(sub: Subscription | None, db: AsyncSession) -> str:
     return sub.plan.value
 
 
-async def get_org_plan(
-    user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
-) -> str:
-    if is_superadmin(user):
-        return "enterprise"
-    sub = await get_subscription(user.organization_id, db)
-    return await _resolve_plan(sub, db)
+async def get_org_plan(user: Principal = Depends(get_current_user)) -> str:
+    return user.plan
 
 
 def require_plan(*plans: str) -> Callable:
-    async def plan_checker(
-        user: User = Depends(get_current_user),
-        db: AsyncSession = Depends(get_db),
-    ) -> User:
+    async def plan_checker(user: Principal = Depends(get_current_user)) -> Principal:
         if is_superadmin(user):
             return user
-        sub = await get_subscription(user.organization_id, db)
-        current_plan = await _resolve_plan(sub, db)
+        current_plan = user.plan
         if current_plan == "suspended":
             raise ForbiddenError(
                 "Your trial has ended. Choose a plan to continue using EGGlogU."
@@ -261,14 +307,10 @@ def require_plan(*plans: str) -> Callable:
 
 
 def require_feature(feature: str) -> Callable:
-    async def feature_checker(
-        user: User = Depends(get_current_user),
-        db: AsyncSession = Depends(get_db),
-    ) -> User:
+    async def feature_checker(user: Principal = Depends(get_current_user)) -> Principal:
         if is_superadmin(user):
             return user
-        sub = await get_subscription(user.organization_id, db)
-        current_plan = await _resolve_plan(sub, db)
+        current_plan = user.plan
         if current_plan == "suspended":
             raise ForbiddenError(
                 "Your trial has ended. Choose a plan to continue using EGGlogU."
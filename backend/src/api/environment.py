@@ -1,17 +1,23 @@
 import uuid
+from datetime import datetime
 
-from fastapi import APIRouter, Depends, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.api.deps import get_current_user
+from src.core import iot_gateway
 from src.database import get_db
 from src.models.auth import User
 from src.schemas.environment import (
     EnvironmentReadingCreate,
     EnvironmentReadingRead,
     EnvironmentReadingUpdate,
+    IoTFrameAccepted,
+    IoTIngestResult,
+    IoTReadingBatch,
     IoTReadingCreate,
     IoTReadingRead,
+    IoTSeries,
     IoTReadingUpdate,
     WeatherCacheCreate,
     WeatherCacheRead,
@@ -94,6 +100,67 @@ async def list_iot(
     return await svc.list_iot(page=page, size=size)
 
 
+@router.get("/iot-readings/series", response_model=IoTSeries)
+async def iot_series(
+    sensor_type: str = Query(..., min_length=1, max_length=100),
+    start: datetime = Query(...),
+    end: datetime = Query(...),
+    step: str = Query("1h", pattern=r"^[1-9][0-9]{0,5}[smhd]$"),
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    svc = EnvironmentService(db, user.organization_id, user.id)
+    return await svc.iot_series(sensor_type, start, end, step)
+
+
+@router.post(
+    "/iot-readings/batch",
+    response_model=IoTIngestResult,
+    status_code=status.HTTP_201_CREATED,
+)
+async def ingest_iot(
+    data: IoTReadingBatch,
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    svc = EnvironmentService(db, user.organization_id, user.id)
+    return {"inserted": await svc.ingest_iot(data.readings)}
+
+
+@router.post(
+    "/iot-readings/ingest",
+    response_model=IoTFrameAccepted,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def ingest_iot_frame(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """Gateway frame: gzip/zstd-compressed NDJSON or msgpack readings."""
+    if int(request.headers.get("content-length") or 0) > iot_gateway.MAX_FRAME_BYTES:
+        raise HTTPException(status_code=413, detail="Frame too large")
+    try:
+        readings = iot_gateway.decode_frame(
+            await request.body(),
+            request.headers.get("content-encoding"),
+            request.headers.get("content-type"),
+        )
+    except iot_gateway.UnsupportedFrame as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except iot_gateway.FrameError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    svc = EnvironmentService(db, user.organization_id, user.id)
+    try:
+        return await svc.ingest_iot_frame(readings)
+    except iot_gateway.GatewayBusy as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+
 @router.get("/iot-readings/{item_id}", response_model=IoTReadingRead)
 async def get_iot(
     item_id: uuid.UUID,
@@ -5,7 +5,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.database import get_db
 from src.models.lead import Lead
-from src.core.email_archive import archive_lead
+from src.core.email_archive import archive_lead, archive_later
 
 router = APIRouter(prefix="/leads", tags=["leads"])
 
@@ -25,7 +25,7 @@ async def capture_lead(data: LeadCreate, db: AsyncSession = Depends(get_db)):
     db.add(lead)
     await db.flush()
     try:
-        archive_lead(data.email, data.model_dump())
+        archive_later(archive_lead, data.email, data.model_dump())
     except Exception:
         pass  # Lead saved to DB; archive is best-effort
     return {"ok": True}
@@ -1,12 +1,15 @@
 import uuid
 
 from fastapi import APIRouter, Depends, Query, status
+from fastapi.responses import FileResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.api.deps import require_feature
 from src.database import get_db
 from src.models.auth import User
 from src.schemas.report import (
+    ExportJobCreate,
+    ExportJobRead,
     ReportScheduleCreate,
     ReportScheduleRead,
     ReportScheduleUpdate,
@@ -117,3 +120,59 @@ async def generate_report(
 ):
     svc = ReportsService(db, user.organization_id, user.id)
     return await svc.generate_adhoc(data, user)
+
+
+# ── POST /reports/exports (Arrow / Parquet, background) ──
+@router.post(
+    "/exports",
+    response_model=ExportJobRead,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def create_export(
+    data: ExportJobCreate,
+    user: User = Depends(require_feature("reports")),
+    db: AsyncSession = Depends(get_db),
+):
+    svc = ReportsService(db, user.organization_id, user.id)
+    job = await svc.create_export(data)
+    # The worker reads the job row, so it must be committed before enqueueing
+    await db.commit()
+    from src.tasks.reports import run_export_job
+
+    run_export_job.delay(str(job.id))
+    return job
+
+
+# ── GET /reports/exports ──
+@router.get("/exports", response_model=list[ExportJobRead])
+async def list_exports(
+    page: int = Query(1, ge=1),
+    size: int = Query(50, ge=1, le=100),
+    user: User = Depends(require_feature("reports")),
+    db: AsyncSession = Depends(get_db),
+):
+    svc = ReportsService(db, user.organization_id, user.id)
+    return await svc.list_exports(page=page, size=size)
+
+
+# ── GET /reports/exports/{job_id} ──
+@router.get("/exports/{job_id}", response_model=ExportJobRead)
+async def get_export(
+    job_id: uuid.UUID,
+    user: User = Depends(require_feature("reports")),
+    db: AsyncSession = Depends(get_db),
+):
+    svc = ReportsService(db, user.organization_id, user.id)
+    return await svc.get_export(job_id)
+
+
+# ── GET /reports/exports/{job_id}/download ──
+@router.get("/exports/{job_id}/download")
+async def download_export(
+    job_id: uuid.UUID,
+    user: User = Depends(require_feature("reports")),
+    db: AsyncSession = Depends(get_db),
+):
+    svc = ReportsService(db, user.organization_id, user.id)
+    path, filename = await svc.export_file(job_id)
+    return FileResponse(path, media_type="application/octet-stream", filename=filename)
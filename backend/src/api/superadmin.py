@@ -5,21 +5,22 @@ from datetime import datetime, timedelta, timezone
 from typing import Optional
 
 from fastapi import APIRouter, Depends, Query, Request
-from sqlalchemy import delete, distinct, func, select
+from sqlalchemy import delete, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.api.deps import require_superadmin
+from src.core import platform_metrics
 from src.core.exceptions import ForbiddenError, NotFoundError
 from src.database import get_db
 from src.models.audit import AuditLog
 from src.models.auth import Organization, Role, User
 from src.models.farm import Farm
 from src.models.flock import Flock
-from src.models.inventory import EggStock, StockMovement
+from src.models.inventory import EggStock
 from src.models.market_intelligence import MarketIntelligence, PriceTrend
 from src.models.outbreak_alert import OutbreakAlert
 from src.models.subscription import Subscription, SubscriptionStatus
-from src.models.support import SupportRating, SupportTicket, TicketMessage, TicketStatus
+from src.models.support import SupportTicket, TicketStatus
 from src.schemas.superadmin import (
     BulkDeleteRequest,
     ChurnAnalysis,
@@ -77,212 +78,16 @@ async def _audit(
 
 @router.get("/platform-stats", response_model=PlatformStats)
 async def platform_stats(
+    fresh: bool = Query(False, description="Recompute instead of reading the snapshot"),
     user: User = SUPERADMIN,
     db: AsyncSession = Depends(get_db),
 ):
-    now = datetime.now(timezone.utc).replace(tzinfo=None)
-    d30 = now - timedelta(days=30)
-
-    # Organizations
-    total_orgs = (await db.execute(select(func.count(Organization.id)))).scalar() or 0
-    # Active = has active subscription
-    active_orgs = (
-        await db.execute(
-            select(func.count(distinct(Subscription.organization_id))).where(
-                Subscription.status == SubscriptionStatus.active
-            )
-        )
-    ).scalar() or 0
-
-    # Users
-    total_users = (
-        await db.execute(
-            select(func.count(User.id)).where(User.role != Role.superadmin)
-        )
-    ).scalar() or 0
-    active_users = (
-        await db.execute(
-            select(func.count(User.id)).where(
-                User.is_active.is_(True), User.role != Role.superadmin
-            )
-        )
-    ).scalar() or 0
-
-    # Farms + Flocks
-    total_farms = (await db.execute(select(func.count(Farm.id)))).scalar() or 0
-    total_flocks = (await db.execute(select(func.count(Flock.id)))).scalar() or 0
-
-    # Inventory
-    total_eggs = (
-        await db.execute(select(func.coalesce(func.sum(EggStock.quantity), 0)))
-    ).scalar() or 0
-
-    # Tickets — comprehensive
-    total_tickets = (
-        await db.execute(select(func.count(SupportTicket.id)))
-    ).scalar() or 0
-    open_tickets = (
-        await db.execute(
-            select(func.count(SupportTicket.id)).where(
-                SupportTicket.status.in_(
-                    [
-                        TicketStatus.open,
-                        TicketStatus.in_progress,
-                        TicketStatus.waiting_user,
-                    ]
-                )
-            )
-        )
-    ).scalar() or 0
-    resolved_30d = (
-        await db.execute(
-            select(func.count(SupportTicket.id)).where(SupportTicket.resolved_at >= d30)
-        )
-    ).scalar() or 0
-    bug_tickets = (
-        await db.execute(
-            select(func.count(SupportTicket.id)).where(SupportTicket.category == "bug")
-        )
-    ).scalar() or 0
-    feature_requests = (
-        await db.execute(
-            select(func.count(SupportTicket.id)).where(
-                SupportTicket.category == "feature_request"
-            )
-        )
-    ).scalar() or 0
-    critical_tickets = (
-        await db.execute(
-            select(func.count(SupportTicket.id)).where(
-                SupportTicket.priority == "critical",
-                SupportTicket.status.in_([TicketStatus.open, TicketStatus.in_progress]),
-            )
-        )
-    ).scalar() or 0
-
-    # Avg resolution time (hours) for tickets resolved in last 90d
-    res_times = (
-        await db.execute(
-            select(
-                func.avg(
-                    func.extract(
-                        "epoch",
-                        SupportTicket.resolved_at - SupportTicket.created_at,
-                    )
-                )
-            ).where(
-                SupportTicket.resolved_at.isnot(None),
-                SupportTicket.resolved_at >= now - timedelta(days=90),
-            )
-        )
-    ).scalar()
-    avg_resolution_hours = round(res_times / 3600, 1) if res_times else None
-
-    # Avg first-response time (hours) — time from ticket creation to first admin message
-    # Use subquery to get first admin response per ticket, then average
-    first_resp_sub = (
-        select(
-            SupportTicket.id.label("tid"),
-            func.min(TicketMessage.created_at).label("first_resp"),
-            SupportTicket.created_at.label("created"),
-        )
-        .join(TicketMessage, TicketMessage.ticket_id == SupportTicket.id)
-        .where(
-            TicketMessage.is_admin.is_(True),
-            SupportTicket.created_at >= now - timedelta(days=90),
-        )
-        .group_by(SupportTicket.id, SupportTicket.created_at)
-        .subquery()
-    )
-    first_responses = await db.execute(
-        select(
-            func.avg(
-                func.extract(
-                    "epoch", first_resp_sub.c.first_resp - first_resp_sub.c.created
-                )
-            )
-        )
-    )
-    first_resp_avg = first_responses.scalar()
-    ticket_response_avg_hours = (
-        round(first_resp_avg / 3600, 1) if first_resp_avg else None
-    )
-
-    # SLA compliance (% tickets resolved before sla_deadline)
-    sla_total_q = await db.execute(
-        select(func.count(SupportTicket.id)).where(
-            SupportTicket.sla_deadline.isnot(None),
-            SupportTicket.resolved_at.isnot(None),
-        )
-    )
-    sla_total = sla_total_q.scalar() or 0
-    sla_met_q = await db.execute(
-        select(func.count(SupportTicket.id)).where(
-            SupportTicket.sla_deadline.isnot(None),
-            SupportTicket.resolved_at.isnot(None),
-            SupportTicket.resolved_at <= SupportTicket.sla_deadline,
-        )
-    )
-    sla_met = sla_met_q.scalar() or 0
-    sla_compliance_pct = (
-        round((sla_met / sla_total) * 100, 1) if sla_total > 0 else None
-    )
-
-    # Avg support rating
-    avg_rating_q = await db.execute(select(func.avg(SupportRating.rating)))
-    avg_rating = avg_rating_q.scalar()
-    avg_support_rating = round(avg_rating, 2) if avg_rating else None
-
-    # MRR estimation
-    price_map = {"hobby": 9, "starter": 19, "pro": 49, "enterprise": 99}
-    subs_result = await db.execute(
-        select(Subscription.plan, func.count(Subscription.id))
-        .where(Subscription.status == SubscriptionStatus.active)
-        .group_by(Subscription.plan)
-    )
-    plan_dist = {}
-    mrr = 0.0
-    for plan, count in subs_result.all():
-        plan_dist[plan.value] = count
-        mrr += price_map.get(plan.value, 0) * count
-
-    # New in last 30 days
-    new_orgs_30d = (
-        await db.execute(
-            select(func.count(Organization.id)).where(Organization.created_at >= d30)
-        )
-    ).scalar() or 0
-    new_users_30d = (
-        await db.execute(
-            select(func.count(User.id)).where(
-                User.created_at >= d30, User.role != Role.superadmin
-            )
-        )
-    ).scalar() or 0
-
-    return PlatformStats(
-        total_organizations=total_orgs,
-        active_organizations=active_orgs,
-        total_users=total_users,
-        active_users=active_users,
-        total_farms=total_farms,
-        total_flocks=total_flocks,
-        total_eggs_in_stock=total_eggs,
-        open_tickets=open_tickets,
-        resolved_tickets_30d=resolved_30d,
-        avg_resolution_hours=avg_resolution_hours,
-        total_tickets=total_tickets,
-        bug_tickets=bug_tickets,
-        feature_requests=feature_requests,
-        critical_tickets=critical_tickets,
-        mrr_estimated=mrr,
-        plan_distribution=plan_dist,
-        new_orgs_30d=new_orgs_30d,
-        new_users_30d=new_users_30d,
-        ticket_response_avg_hours=ticket_response_avg_hours,
-        sla_compliance_pct=sla_compliance_pct,
-        avg_support_rating=avg_support_rating,
-    )
+    if fresh:
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        stats = await platform_metrics.compute_stats(db, now)
+        return PlatformStats(**stats, computed_at=now)
+    snapshot = await platform_metrics.current(db)
+    return PlatformStats(**snapshot.stats, computed_at=snapshot.computed_at)
 
 
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
@@ -292,49 +97,13 @@ async def platform_stats(
 
 @router.get("/inventory/overview", response_model=list[GlobalInventoryItem])
 async def inventory_overview(
+    fresh: bool = Query(False, description="Recompute instead of reading the snapshot"),
     user: User = SUPERADMIN,
     db: AsyncSession = Depends(get_db),
 ):
-    orgs = (await db.execute(select(Organization))).scalars().all()
-    result = []
-    for org in orgs:
-        stocks = (
-            (
-                await db.execute(
-                    select(EggStock).where(EggStock.organization_id == org.id)
-                )
-            )
-            .scalars()
-            .all()
-        )
-
-        total = sum(s.quantity for s in stocks)
-        by_size: dict[str, int] = {}
-        by_type: dict[str, int] = {}
-        for s in stocks:
-            by_size[s.egg_size] = by_size.get(s.egg_size, 0) + s.quantity
-            if s.egg_type:
-                by_type[s.egg_type] = by_type.get(s.egg_type, 0) + s.quantity
-
-        last_mov = (
-            await db.execute(
-                select(func.max(StockMovement.date)).where(
-                    StockMovement.organization_id == org.id
-                )
-            )
-        ).scalar()
-
-        result.append(
-            GlobalInventoryItem(
-                organization_id=org.id,
-                organization_name=org.name,
-                total_stock=total,
-                stock_by_size=by_size,
-                stock_by_type=by_type,
-                last_movement_date=last_mov,
-            )
-        )
-    return result
+    if fresh:
+        return await platform_metrics.compute_inventory(db)
+    return (await platform_metrics.current(db)).inventory
 
 
 @router.get("/inventory/by-organization", response_model=list[dict])
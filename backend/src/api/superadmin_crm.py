@@ -13,7 +13,12 @@ from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.api.deps import require_superadmin
-from src.core.crm import compute_health_score, compute_ltv, evaluate_retention_rules
+from src.core.crm import (
+    HealthTable,
+    compute_health_score,
+    compute_ltv,
+    evaluate_retention_rules,
+)
 from src.core.exceptions import NotFoundError
 from src.core.stripe import (
     change_subscription_plan,
@@ -847,21 +852,16 @@ async def crm_report(
         )
     ).scalar() or 0
 
-    # Health scores — compute for all orgs
-    orgs = (await db.execute(select(Organization.id))).scalars().all()
-    scores = []
+    # Health scores — computed for all orgs at once
+    health = await HealthTable.load(db)
     risk_dist = {"low": 0, "medium": 0, "high": 0, "critical": 0}
-    total_ltv = 0.0
-
-    for oid in orgs:
-        h = await compute_health_score(oid, db)
-        scores.append(h["score"])
-        risk_dist[h["risk"]] = risk_dist.get(h["risk"], 0) + 1
-        ltv_data = await compute_ltv(oid, db)
-        total_ltv += ltv_data["ltv"]
+    for risk in health.risk:
+        risk_dist[risk] = risk_dist.get(risk, 0) + 1
+    total_ltv = float(sum(health.ltv(i) for i in range(len(health))))
 
+    scores = health.score
     avg_health = round(sum(scores) / len(scores), 1) if scores else 0.0
-    avg_ltv = round(total_ltv / len(orgs), 2) if orgs else 0.0
+    avg_ltv = round(total_ltv / len(health), 2) if len(health) else 0.0
 
     active_discounts = (
         await db.execute(
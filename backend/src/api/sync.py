@@ -6,19 +6,37 @@ Strategy:
   3. Server returns all records modified since `last_synced_at` so the client
      can update its local IndexedDB.
   4. Conflict resolution: last-write-wins based on `updated_at`.
+
+Pagination:
+  Each entity keeps its own keyset cursor over `(updated_at, id)`. The client
+  echoes back `cursors` from the previous response and repeats the call while
+  `has_more` is true. `page_size` bounds the total rows per response; a
+  legacy client that sends no `cursors` gets `page_size` rows per entity and
+  follows `sync_cursor` instead.
+
+Streaming:
+  With `Accept: application/x-ndjson` the server changes are streamed as
+  NDJSON lines (`record`, `cursor`, then a final `end` line) read in keyset
+  chunks, so a device that was offline for months never needs one huge body.
 """
 
 from datetime import datetime
 from typing import Any
 
-from fastapi import APIRouter, Depends
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.api.deps import get_current_user
-from src.database import get_db
+from src.database import async_session, get_db, set_tenant_context
 from src.models.auth import User
-from src.services.sync_service import SyncService
+from src.services.sync_service import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    SyncService,
+    ndjson_line,
+)
 
 router = APIRouter(prefix="/sync", tags=["sync"])
 
@@ -26,6 +44,8 @@ router = APIRouter(prefix="/sync", tags=["sync"])
 class SyncPayload(BaseModel):
     last_synced_at: datetime | None = None
     data: dict[str, list[dict[str, Any]]] = {}
+    cursors: dict[str, str] = {}
+    page_size: int = Field(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
 
 
 class SyncResponse(BaseModel):
@@ -35,15 +55,52 @@ class SyncResponse(BaseModel):
     server_changes: dict[str, list[dict[str, Any]]]
     server_now: str
     sync_cursor: str | None = None
+    cursors: dict[str, str] = {}
+    has_more: bool = False
+
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
 
 
 @router.post("/", response_model=SyncResponse)
 async def sync_data(
     payload: SyncPayload,
+    request: Request,
     db: AsyncSession = Depends(get_db),
     user: User = Depends(get_current_user),
 ):
     """Sincronización delta bidireccional entre cliente y servidor."""
     svc = SyncService(db, user.organization_id, user.id)
-    result = await svc.sync(payload.data, payload.last_synced_at)
+    if NDJSON_MEDIA_TYPE in request.headers.get("accept", ""):
+        push = await svc.push_changes(payload.data, payload.last_synced_at)
+        # Client writes must be durable before the stream starts: the request
+        # session is released before the body is sent.
+        await db.commit()
+        return StreamingResponse(
+            _stream_sync(user, payload, push), media_type=NDJSON_MEDIA_TYPE
+        )
+    result = await svc.sync(
+        payload.data,
+        payload.last_synced_at,
+        cursors=payload.cursors,
+        page_size=payload.page_size,
+    )
     return SyncResponse(**result)
+
+
+async def _stream_sync(user: User, payload: SyncPayload, push: dict[str, Any]):
+    """Stream server changes from a session owned by the response body."""
+    yield ndjson_line({"type": "push", **push})
+    async with async_session() as db:
+        await set_tenant_context(db, str(user.organization_id))
+        svc = SyncService(db, user.organization_id, user.id)
+        # Streams are not held in memory, so default to the largest page
+        page_size = (
+            payload.page_size
+            if "page_size" in payload.model_fields_set
+            else MAX_PAGE_SIZE
+        )
+        async for line in svc.stream_changes(
+            payload.last_synced_at, payload.cursors, page_size
+        ):
+            yield line
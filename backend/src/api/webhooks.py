@@ -158,15 +158,7 @@ async def test_webhook(
 ):
     """Envía un evento de prueba al webhook."""
     svc = WebhookService(db, user.organization_id, user.id)
-    webhook = await svc.get_webhook_for_test(webhook_id)
-
-    from src.tasks.webhooks import deliver_webhook
-
-    deliver_webhook.delay(
-        str(webhook.id),
-        "webhook.test",
-        {"message": "This is a test event from EGGlogU", "webhook_id": str(webhook.id)},
-    )
+    await svc.queue_test_event(webhook_id)
     return {"status": "test_queued"}
 
 
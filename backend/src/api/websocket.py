@@ -2,22 +2,38 @@
 
 Clients connect to /ws/dashboard/{farm_id}?token=<jwt> and receive
 live events (production, health alerts, IoT readings, etc.) via
-Redis Pub/Sub → WebSocket push.
+Redis Pub/Sub → per-worker fan-out hub (src.core.ws_hub) → WebSocket push.
 
 Auth: JWT token passed as query parameter (WebSocket doesn't support custom headers).
 Heartbeat: server sends ping every 30s to detect stale connections.
+Resume: event frames carry an ``id``; reconnecting with ``?last_event_id=<id>``
+replays the events missed since then before switching to live, or sends
+``{"type": "resync"}`` when the gap is no longer in the event log.
 """
 
 import asyncio
 import json
 import logging
+import time
+import uuid
 from datetime import datetime, timezone
 
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Query
 from jose import jwt, JWTError
 
+from src.api.deps import _load_principal
 from src.config import settings
-from src.core.events import subscribe_chat, subscribe_farm, subscribe_org
+from src.core import iot_gateway, ws_hub
+from src.core import events
+from src.core.events import (
+    channel_for_chat,
+    channel_for_farm,
+    channel_for_org,
+    log_for_farm,
+    log_for_org,
+)
+from src.core.exceptions import UnauthorizedError
+from src.core.principal import Principal, get_principal
 
 logger = logging.getLogger("egglogu.websocket")
 
@@ -65,8 +81,6 @@ class ConnectionManager:
 
 manager = ConnectionManager()
 
-HEARTBEAT_INTERVAL = 30  # seconds
-
 
 # ─── Auth ────────────────────────────────────────────────────────────
 
@@ -84,12 +98,46 @@ def _verify_ws_token(token: str) -> dict | None:
         return None
 
 
+async def _authenticate_ws(token: str) -> tuple[Principal, float] | None:
+    """Full auth for sockets that write data, as ``deps.get_current_user``.
+
+    Checks the token type, the ``jti`` blacklist and that the user is still
+    active. Returns the principal and the token's ``exp`` (epoch seconds),
+    or None.
+    """
+    payload = _verify_ws_token(token)
+    if not payload or payload.get("type") != "access" or not payload.get("sub"):
+        return None
+    jti = payload.get("jti")
+    if jti:
+        from src.core.auth_security import is_token_blacklisted
+
+        if await is_token_blacklisted(jti):
+            return None
+
+    from src.database import async_session
+
+    user_id = payload["sub"]
+    try:
+        uuid.UUID(user_id)
+        async with async_session() as db:
+            principal = await get_principal(
+                user_id, payload.get("org"), jti, lambda: _load_principal(user_id, db)
+            )
+    except (ValueError, UnauthorizedError):
+        return None
+    return principal, float(payload["exp"])
+
+
 # ─── Farm Dashboard WebSocket ────────────────────────────────────────
 
 
 @router.websocket("/ws/dashboard/{farm_id}")
 async def ws_farm_dashboard(
-    websocket: WebSocket, farm_id: str, token: str = Query(...)
+    websocket: WebSocket,
+    farm_id: str,
+    token: str = Query(...),
+    last_event_id: str | None = Query(None),
 ):
     """WebSocket for live farm dashboard updates."""
     # Auth
@@ -109,48 +157,32 @@ async def ws_farm_dashboard(
         manager.total_connections,
     )
 
-    # Subscribe to Redis Pub/Sub for this farm
-    pubsub = await subscribe_farm(farm_id)
-
     try:
-        # Send initial connection confirmation
-        await websocket.send_json(
-            {
-                "type": "connected",
-                "farm_id": farm_id,
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-            }
+        await _serve_channel(
+            websocket,
+            channel_for_farm(farm_id),
+            {"type": "connected", "farm_id": farm_id},
+            log_for_farm(farm_id),
+            last_event_id,
         )
-
-        if pubsub:
-            await _relay_events(websocket, pubsub)
-        else:
-            # No Redis — keep connection alive with heartbeat only
-            while True:
-                await asyncio.sleep(HEARTBEAT_INTERVAL)
-                await websocket.send_json(
-                    {
-                        "type": "heartbeat",
-                        "timestamp": datetime.now(timezone.utc).isoformat(),
-                    }
-                )
-
     except WebSocketDisconnect:
         logger.info("WS disconnected: user=%s farm=%s", user_id, farm_id)
     except Exception as e:
         logger.warning("WS error for farm=%s: %s", farm_id, e)
     finally:
         manager.disconnect_farm(farm_id, websocket)
-        if pubsub:
-            await pubsub.unsubscribe()
-            await pubsub.aclose()
 
 
 # ─── Org-wide WebSocket ─────────────────────────────────────────────
 
 
 @router.websocket("/ws/org/{org_id}")
-async def ws_org_dashboard(websocket: WebSocket, org_id: str, token: str = Query(...)):
+async def ws_org_dashboard(
+    websocket: WebSocket,
+    org_id: str,
+    token: str = Query(...),
+    last_event_id: str | None = Query(None),
+):
     """WebSocket for org-wide live updates (all farms)."""
     payload = _verify_ws_token(token)
     if not payload:
@@ -168,38 +200,20 @@ async def ws_org_dashboard(websocket: WebSocket, org_id: str, token: str = Query
     manager.connect_org(org_id, websocket)
     logger.info("WS org connected: user=%s org=%s", user_id, org_id)
 
-    pubsub = await subscribe_org(org_id)
-
     try:
-        await websocket.send_json(
-            {
-                "type": "connected",
-                "org_id": org_id,
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-            }
+        await _serve_channel(
+            websocket,
+            channel_for_org(org_id),
+            {"type": "connected", "org_id": org_id},
+            log_for_org(org_id),
+            last_event_id,
         )
-
-        if pubsub:
-            await _relay_events(websocket, pubsub)
-        else:
-            while True:
-                await asyncio.sleep(HEARTBEAT_INTERVAL)
-                await websocket.send_json(
-                    {
-                        "type": "heartbeat",
-                        "timestamp": datetime.now(timezone.utc).isoformat(),
-                    }
-                )
-
     except WebSocketDisconnect:
         logger.info("WS org disconnected: user=%s org=%s", user_id, org_id)
     except Exception as e:
         logger.warning("WS error for org=%s: %s", org_id, e)
     finally:
         manager.disconnect_org(org_id, websocket)
-        if pubsub:
-            await pubsub.unsubscribe()
-            await pubsub.aclose()
 
 
 # ─── Chat Room WebSocket ────────────────────────────────────────────
@@ -247,69 +261,149 @@ async def ws_chat_room(websocket: WebSocket, room_id: str, token: str = Query(..
         chat_manager.online_count(room_id),
     )
 
-    pubsub = await subscribe_chat(room_id)
-
     try:
-        await websocket.send_json(
+        await _serve_channel(
+            websocket,
+            channel_for_chat(room_id),
             {
                 "type": "connected",
                 "room_id": room_id,
                 "online_count": chat_manager.online_count(room_id),
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-            }
+            },
         )
-
-        if pubsub:
-            await _relay_events(websocket, pubsub)
-        else:
-            while True:
-                await asyncio.sleep(HEARTBEAT_INTERVAL)
-                await websocket.send_json(
-                    {
-                        "type": "heartbeat",
-                        "timestamp": datetime.now(timezone.utc).isoformat(),
-                    }
-                )
-
     except WebSocketDisconnect:
         logger.info("WS chat disconnected: user=%s room=%s", user_id, room_id)
     except Exception as e:
         logger.warning("WS chat error for room=%s: %s", room_id, e)
     finally:
         chat_manager.disconnect(room_id, websocket)
-        if pubsub:
-            await pubsub.unsubscribe()
-            await pubsub.aclose()
 
 
-# ─── Event Relay ─────────────────────────────────────────────────────
+# ─── IoT Ingest WebSocket ────────────────────────────────────────────
 
+_FRAME_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "msgpack": "application/msgpack",
+}
 
-async def _relay_events(websocket: WebSocket, pubsub):
-    """Relay Redis Pub/Sub messages to WebSocket with heartbeat."""
-    last_heartbeat = asyncio.get_event_loop().time()
 
-    while True:
-        # Check for Redis messages (non-blocking with timeout)
-        message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+async def _ingest_ws_frame(org_id: str, user_id: str, readings: list[dict]) -> int:
+    if iot_gateway.running():
+        return iot_gateway.offer(org_id, readings)
+    from src.database import async_session, set_tenant_context
+    from src.services.environment_service import EnvironmentService
 
-        if message and message["type"] == "message":
+    async with async_session() as db:
+        await set_tenant_context(db, org_id)
+        svc = EnvironmentService(db, uuid.UUID(org_id), uuid.UUID(user_id))
+        result = await svc.ingest_iot_frame(readings)
+        await db.commit()
+    return result["accepted"]
+
+
+@router.websocket("/ws/iot/ingest")
+async def ws_iot_ingest(
+    websocket: WebSocket,
+    token: str = Query(...),
+    encoding: str = Query("identity"),
+    format: str = Query("ndjson"),
+):
+    """Streaming ingest for sensor gateways: one frame of readings per message.
+
+    Binary messages are frames in ``encoding`` (identity, gzip, zstd) and
+    ``format`` (ndjson, msgpack); text messages are plain NDJSON. Each frame
+    is answered with ``ack``, ``busy`` (retry after N seconds; the frame was
+    not kept) or ``error``. The socket is closed when the token expires.
+    """
+    auth = await _authenticate_ws(token)
+    if not auth or not auth[0].organization_id:
+        await websocket.close(code=4001, reason="Invalid or expired token")
+        return
+    if format not in _FRAME_FORMATS:
+        await websocket.close(code=4002, reason="Unsupported frame format")
+        return
+
+    principal, expires_at = auth
+    org_id, user_id = str(principal.organization_id), str(principal.id)
+    await websocket.accept()
+    logger.info("WS IoT ingest connected: user=%s org=%s", user_id, org_id)
+
+    try:
+        while True:
+            # The socket must not outlive the token it was opened with
             try:
-                data = json.loads(message["data"])
-                await websocket.send_json(data)
-            except (json.JSONDecodeError, Exception) as e:
-                logger.warning("Failed to relay event: %s", e)
-
-        # Heartbeat
-        now = asyncio.get_event_loop().time()
-        if now - last_heartbeat >= HEARTBEAT_INTERVAL:
-            await websocket.send_json(
-                {
-                    "type": "heartbeat",
-                    "timestamp": datetime.now(timezone.utc).isoformat(),
-                }
-            )
-            last_heartbeat = now
+                message = await asyncio.wait_for(
+                    websocket.receive(), timeout=max(expires_at - time.time(), 0)
+                )
+            except asyncio.TimeoutError:
+                await websocket.close(code=4001, reason="Token expired")
+                break
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("bytes") is not None:
+                body, frame_encoding = message["bytes"], encoding
+            else:
+                body, frame_encoding = (message.get("text") or "").encode(), None
+            try:
+                readings = iot_gateway.decode_frame(
+                    body, frame_encoding, _FRAME_FORMATS[format]
+                )
+                accepted = await _ingest_ws_frame(org_id, user_id, readings)
+            except iot_gateway.FrameError as e:
+                await websocket.send_json({"type": "error", "detail": str(e)})
+                continue
+            except iot_gateway.GatewayBusy as e:
+                await websocket.send_json(
+                    {
+                        "type": "busy",
+                        "status": e.status_code,
+                        "retry_after": e.retry_after,
+                    }
+                )
+                continue
+            await websocket.send_json({"type": "ack", "accepted": accepted})
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.warning("WS IoT ingest error for org=%s: %s", org_id, e)
+    logger.info("WS IoT ingest disconnected: user=%s org=%s", user_id, org_id)
 
-        # Small sleep to prevent tight loop
-        await asyncio.sleep(0.1)
+
+# ─── Event Relay ─────────────────────────────────────────────────────
+
+
+async def _serve_channel(
+    websocket: WebSocket,
+    channel: str,
+    hello: dict,
+    log_key: str | None = None,
+    last_event_id: str | None = None,
+) -> None:
+    """Confirm the connection, then relay ``channel`` through the worker's hub.
+
+    With ``last_event_id``, events logged after it in ``log_key`` are sent
+    first. The hub subscription starts before the log is read, so nothing
+    published in between is lost; live frames the replay already covered
+    are skipped.
+
+    Returns (or raises) when sending fails, i.e. the client went away.
+    """
+    sub = ws_hub.Subscriber(websocket)
+    await ws_hub.subscribe(channel, sub)
+    try:
+        now = datetime.now(timezone.utc).isoformat()
+        await websocket.send_json({**hello, "timestamp": now})
+        if log_key and last_event_id:
+            frames, complete = await events.replay(log_key, last_event_id)
+            if complete:
+                for raw in frames:
+                    await websocket.send_text(raw)
+                last = json.loads(frames[-1])["id"] if frames else last_event_id
+                sub.skip_through(last)
+            else:
+                await websocket.send_json(
+                    {"type": "resync", "last_event_id": last_event_id, "timestamp": now}
+                )
+        await sub.run()
+    finally:
+        await ws_hub.unsubscribe(channel, sub)
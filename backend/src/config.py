@@ -45,6 +45,8 @@ class Settings(BaseSettings):
     EMAIL_FROM_DOMAIN: str = "egglogu.com"
     FRONTEND_URL: str = "https://egglogu.com"
     CORREOS_DIR: str = "/app/correos"
+    # Columnar exports (local dir or a mounted object-storage bucket)
+    EXPORTS_DIR: str = "/app/exports"
     SENTRY_DSN: str = ""
     LOG_LEVEL: str = "INFO"
     ENVIRONMENT: str = "production"
@@ -7,21 +7,34 @@ Provides two mechanisms:
 
 The hash-chain ensures tamper evidence: each audit entry's SHA-256 hash
 includes the previous entry's hash, forming an immutable linked chain.
+
+Pipeline:
+- Capture: the flush only snapshots changed values into plain dicts kept on
+  the session (no hashing, no extra ORM rows in the request transaction).
+- Hand-off: on commit the snapshots move to an in-process queue; on rollback
+  they are dropped, so only committed changes are audited.
+- Write: one background writer per process drains the queue, groups entries
+  by organization and appends each group with a single bulk INSERT. The chain
+  head (last hash + sequence) lives in ``audit_chain_heads`` and is locked
+  while appending, so the chain stays linear across workers.
 """
 
+import asyncio
 import hashlib
 import json
 import logging
 import uuid
+from collections import defaultdict, deque
 from contextvars import ContextVar
 from datetime import datetime, timezone
-from typing import Any
+from typing import Any, Callable
 
-from sqlalchemy import event, inspect, select
+from sqlalchemy import event, func, insert, inspect, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from src.models.audit import AuditLog
+from src.core.bulk_upsert import dialect_insert
+from src.models.audit import AuditChainHead, AuditLog
 
 logger = logging.getLogger("egglogu.audit")
 
@@ -31,10 +44,22 @@ audit_org_id: ContextVar[str | None] = ContextVar("audit_org_id", default=None)
 audit_ip: ContextVar[str | None] = ContextVar("audit_ip", default=None)
 audit_user_agent: ContextVar[str | None] = ContextVar("audit_user_agent", default=None)
 
-# In-memory cache of the last hash for fast chain linking (per-org)
-_last_hash_cache: dict[str, str] = {}
 _GENESIS_HASH = "0" * 64
 
+# Writer tuning
+WRITER_BATCH_SIZE = 500
+WRITER_INTERVAL_SECONDS = 0.5
+QUEUE_WARN_DEPTH = 50_000
+
+# session.info key holding snapshots captured during the transaction
+_PENDING_KEY = "audit_pending"
+
+# Committed snapshots waiting for the writer
+_queue: deque[dict[str, Any]] = deque()
+_wakeup: asyncio.Event | None = None
+_writer_task: asyncio.Task | None = None
+_stats = {"queued": 0, "written": 0, "write_errors": 0}
+
 
 def _compute_hash(entry_data: dict, prev_hash: str) -> str:
     """Compute SHA-256 hash of audit entry data + previous hash."""
@@ -95,59 +120,38 @@ def _get_org_id(instance: Any) -> str | None:
     return audit_org_id.get()
 
 
-def _get_prev_hash(org_id: str) -> str:
-    """Get the last hash for this org's audit chain."""
-    return _last_hash_cache.get(org_id, _GENESIS_HASH)
-
-
-def _create_audit_entry(
+def _snapshot(
     action: str,
     table_name: str,
     record_id: str,
     org_id: str | None,
     old_values: dict | None,
     new_values: dict | None,
-) -> AuditLog:
-    """Create an AuditLog entry with hash-chain linking."""
-    user_id = audit_user_id.get() or "system"
-    org = org_id or audit_org_id.get() or "unknown"
-    ip = audit_ip.get()
-    ua = audit_user_agent.get()
-
-    prev_hash = _get_prev_hash(org)
-
-    entry_data = {
+) -> dict[str, Any]:
+    """Capture one audit entry as a plain dict (hashed later by the writer)."""
+    return {
         "action": action,
         "table_name": table_name,
         "record_id": record_id,
-        "user_id": user_id,
-        "organization_id": org,
+        "user_id": audit_user_id.get() or "system",
+        "organization_id": org_id or audit_org_id.get() or "unknown",
         "old_values": old_values,
         "new_values": new_values,
-        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "ip_address": audit_ip.get(),
+        "user_agent": audit_user_agent.get(),
+        "timestamp": datetime.now(timezone.utc),
     }
 
-    entry_hash = _compute_hash(entry_data, prev_hash)
-
-    # Update cache
-    _last_hash_cache[org] = entry_hash
-
-    return AuditLog(
-        user_id=user_id,
-        organization_id=org,
-        action=action,
-        table_name=table_name,
-        record_id=record_id,
-        old_values=old_values,
-        new_values=new_values,
-        ip_address=ip,
-        user_agent=ua,
-        resource=table_name,
-        resource_id=record_id,
-        changes=new_values,
-        hash=entry_hash,
-        prev_hash=prev_hash,
-    )
+
+def _stage(session: Session, entries: list[dict[str, Any]]) -> None:
+    """Keep snapshots on the session until the transaction commits."""
+    if entries:
+        session.info.setdefault(_PENDING_KEY, []).extend(entries)
+
+
+def pending_audit(db: AsyncSession) -> list[dict[str, Any]]:
+    """Snapshots captured in ``db``'s open transaction (not yet queued)."""
+    return list(db.sync_session.info.get(_PENDING_KEY, ()))
 
 
 # ── Tables to skip auditing ──
@@ -190,9 +194,7 @@ def _after_flush_handler(session: Session, flush_context: Any) -> None:
                     continue
                 new_values[key] = _serialize_value(getattr(instance, key))
 
-            entry = _create_audit_entry(
-                "CREATE", table, record_id, org_id, None, new_values
-            )
+            entry = _snapshot("CREATE", table, record_id, org_id, None, new_values)
             audit_entries.append(entry)
         except Exception as e:
             logger.warning("Audit CREATE failed for %s: %s", type(instance).__name__, e)
@@ -209,7 +211,7 @@ def _after_flush_handler(session: Session, flush_context: Any) -> None:
             old_values, new_values = _get_model_changes(instance)
             if not new_values:
                 continue
-            entry = _create_audit_entry(
+            entry = _snapshot(
                 "UPDATE", table, record_id, org_id, old_values, new_values
             )
             audit_entries.append(entry)
@@ -232,39 +234,231 @@ def _after_flush_handler(session: Session, flush_context: Any) -> None:
                     continue
                 old_values[key] = _serialize_value(getattr(instance, key))
 
-            entry = _create_audit_entry(
-                "DELETE", table, record_id, org_id, old_values, None
-            )
+            entry = _snapshot("DELETE", table, record_id, org_id, old_values, None)
             audit_entries.append(entry)
         except Exception as e:
             logger.warning("Audit DELETE failed for %s: %s", type(instance).__name__, e)
 
-    for entry in audit_entries:
-        session.add(entry)
+    _stage(session, audit_entries)
+
+
+def _after_commit_handler(session: Session) -> None:
+    """Hand the transaction's snapshots to the writer queue."""
+    entries = session.info.pop(_PENDING_KEY, None)
+    if entries:
+        enqueue(entries)
+
+
+def _after_rollback_handler(session: Session) -> None:
+    """Rolled-back changes are never audited."""
+    session.info.pop(_PENDING_KEY, None)
 
 
 def setup_audit_listeners() -> None:
-    """Register the after_flush event listener. Call once at startup."""
+    """Register the session event listeners. Call once at startup."""
     event.listen(Session, "after_flush", _after_flush_handler)
+    event.listen(Session, "after_commit", _after_commit_handler)
+    event.listen(Session, "after_rollback", _after_rollback_handler)
     logger.info("Audit trail listeners registered (hash-chain mode)")
 
 
-async def initialize_hash_cache(db: AsyncSession) -> None:
-    """Load the last hash per org from DB into memory. Call at startup."""
-    try:
-        stmt = (
-            select(AuditLog.organization_id, AuditLog.hash)
-            .distinct(AuditLog.organization_id)
-            .order_by(AuditLog.organization_id, AuditLog.timestamp.desc())
+# ── Writer ──
+
+
+def enqueue(entries: list[dict[str, Any]]) -> None:
+    """Queue committed snapshots for the background writer."""
+    _queue.extend(entries)
+    _stats["queued"] += len(entries)
+    if len(_queue) > QUEUE_WARN_DEPTH:
+        logger.warning("Audit queue depth %d — writer is falling behind", len(_queue))
+    if _wakeup is not None and len(_queue) >= WRITER_BATCH_SIZE:
+        _wakeup.set()
+
+
+async def _lock_head(db: AsyncSession, org_id: str) -> AuditChainHead:
+    """Return the org's chain head, locked until the transaction ends.
+
+    A missing head is seeded from the newest legacy entry, so chains written
+    before the head table existed keep linking.
+    """
+    stmt = (
+        select(AuditChainHead)
+        .where(AuditChainHead.organization_id == org_id)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
+    head = (await db.execute(stmt)).scalar_one_or_none()
+    if head is not None:
+        return head
+
+    last_hash = (
+        await db.execute(
+            select(AuditLog.hash)
+            .where(AuditLog.organization_id == org_id)
+            .order_by(
+                func.coalesce(AuditLog.chain_seq, 0).desc(), AuditLog.timestamp.desc()
+            )
+            .limit(1)
         )
-        result = await db.execute(stmt)
-        for org_id, last_hash in result.all():
-            _last_hash_cache[org_id] = last_hash
-        logger.info(
-            "Audit hash cache initialized for %d organizations", len(_last_hash_cache)
+    ).scalar_one_or_none()
+    last_seq = (
+        await db.execute(
+            select(func.coalesce(func.max(AuditLog.chain_seq), 0)).where(
+                AuditLog.organization_id == org_id
+            )
+        )
+    ).scalar_one()
+    await db.execute(
+        dialect_insert(db)(AuditChainHead)
+        .values(
+            organization_id=org_id,
+            last_hash=last_hash or _GENESIS_HASH,
+            last_seq=last_seq,
+        )
+        .on_conflict_do_nothing(index_elements=["organization_id"])
+    )
+    return (await db.execute(stmt)).scalar_one()
+
+
+async def append_chain(
+    db: AsyncSession, org_id: str, entries: list[dict[str, Any]]
+) -> None:
+    """Link ``entries`` onto the org chain and insert them in one statement.
+
+    Runs in the caller's transaction; the head row stays locked until it
+    commits, serializing concurrent writers for the same organization.
+    """
+    head = await _lock_head(db, org_id)
+    prev_hash, seq = head.last_hash, head.last_seq
+    rows = []
+    for e in entries:
+        entry_data = {
+            "action": e["action"],
+            "table_name": e["table_name"],
+            "record_id": e["record_id"],
+            "user_id": e["user_id"],
+            "organization_id": org_id,
+            "old_values": e["old_values"],
+            "new_values": e["new_values"],
+            "timestamp": e["timestamp"].isoformat(),
+        }
+        entry_hash = _compute_hash(entry_data, prev_hash)
+        seq += 1
+        rows.append(
+            {
+                "id": uuid.uuid4(),
+                "timestamp": e["timestamp"],
+                "user_id": e["user_id"],
+                "organization_id": org_id,
+                "action": e["action"],
+                "table_name": e["table_name"],
+                "record_id": e["record_id"],
+                "old_values": e["old_values"],
+                "new_values": e["new_values"],
+                "ip_address": e["ip_address"],
+                "user_agent": e["user_agent"],
+                "resource": e["table_name"],
+                "resource_id": e["record_id"],
+                "changes": e["new_values"],
+                "hash": entry_hash,
+                "prev_hash": prev_hash,
+                "chain_seq": seq,
+            }
         )
-    except Exception as e:
-        logger.warning("Failed to initialize audit hash cache: %s", e)
+        prev_hash = entry_hash
+
+    await db.execute(insert(AuditLog), rows)
+    await db.execute(
+        update(AuditChainHead)
+        .where(AuditChainHead.organization_id == org_id)
+        .values(last_hash=prev_hash, last_seq=seq)
+    )
+
+
+def _default_session_factory():
+    from src.database import async_session
+
+    return async_session()
+
+
+async def flush_audit_queue(
+    session_factory: Callable[[], Any] = _default_session_factory,
+) -> int:
+    """Write up to ``WRITER_BATCH_SIZE`` queued entries; returns how many.
+
+    Each organization is appended in its own short transaction. On failure
+    that organization's entries go back to the front of the queue.
+    """
+    batch: list[dict[str, Any]] = []
+    while _queue and len(batch) < WRITER_BATCH_SIZE:
+        batch.append(_queue.popleft())
+    if not batch:
+        return 0
+
+    by_org: dict[str, list[dict[str, Any]]] = defaultdict(list)
+    for entry in batch:
+        by_org[entry["organization_id"]].append(entry)
+
+    written = 0
+    for org_id, entries in by_org.items():
+        try:
+            async with session_factory() as db:
+                await append_chain(db, org_id, entries)
+                await db.commit()
+            written += len(entries)
+        except Exception as e:
+            _stats["write_errors"] += 1
+            logger.error("Audit write failed for org %s: %s", org_id, e)
+            _queue.extendleft(reversed(entries))
+    _stats["written"] += written
+    return written
+
+
+async def _run_writer() -> None:
+    while True:
+        try:
+            await asyncio.wait_for(_wakeup.wait(), WRITER_INTERVAL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        _wakeup.clear()
+        try:
+            while await flush_audit_queue():
+                pass
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("Audit writer error: %s", e)
+
+
+def start_audit_writer() -> None:
+    """Start this process's background audit writer. Call at startup."""
+    global _writer_task, _wakeup
+    if _writer_task is not None:
+        return
+    _wakeup = asyncio.Event()
+    _writer_task = asyncio.create_task(_run_writer())
+    logger.info("Audit writer started")
+
+
+async def stop_audit_writer() -> None:
+    """Stop the writer and drain whatever is still queued."""
+    global _writer_task, _wakeup
+    if _writer_task is None:
+        return
+    _writer_task.cancel()
+    try:
+        await _writer_task
+    except (asyncio.CancelledError, Exception):
+        pass
+    _writer_task = None
+    _wakeup = None
+    while _queue and await flush_audit_queue():
+        pass
+
+
+def audit_writer_stats() -> dict[str, int]:
+    """Queue depth and lifetime counters of this process's writer."""
+    return {"queue_depth": len(_queue), **_stats}
 
 
 async def verify_audit_chain(db: AsyncSession, organization_id: str) -> dict:
@@ -272,7 +466,7 @@ async def verify_audit_chain(db: AsyncSession, organization_id: str) -> dict:
     stmt = (
         select(AuditLog)
         .where(AuditLog.organization_id == organization_id)
-        .order_by(AuditLog.timestamp.asc())
+        .order_by(func.coalesce(AuditLog.chain_seq, 0), AuditLog.timestamp.asc())
     )
     result = await db.execute(stmt)
     entries = result.scalars().all()
@@ -317,39 +511,20 @@ async def log_audit(
     ip_address: str | None = None,
     user_agent: str | None = None,
 ) -> None:
-    """Manual audit log entry with hash-chain. Backward-compatible API."""
-    prev_hash = _get_prev_hash(organization_id)
-
-    entry_data = {
-        "action": action,
-        "table_name": resource,
-        "record_id": resource_id,
-        "user_id": user_id,
-        "organization_id": organization_id,
-        "old_values": None,
-        "new_values": changes,
-        "timestamp": datetime.now(timezone.utc).isoformat(),
-    }
-    entry_hash = _compute_hash(entry_data, prev_hash)
-    _last_hash_cache[organization_id] = entry_hash
-
-    entry = AuditLog(
-        user_id=user_id,
-        organization_id=organization_id,
-        action=action,
-        table_name=resource,
-        record_id=resource_id,
-        old_values=None,
-        new_values=changes,
-        resource=resource,
-        resource_id=resource_id,
-        changes=changes,
-        ip_address=ip_address,
-        user_agent=user_agent,
-        hash=entry_hash,
-        prev_hash=prev_hash,
-    )
-    db.add(entry)
+    """Manual audit log entry with hash-chain. Backward-compatible API.
+
+    Queued for the audit writer once ``db`` commits. Processes without a
+    running writer (Celery workers, scripts) append to the chain directly in
+    ``db``'s transaction.
+    """
+    entry = _snapshot(action, resource, resource_id, organization_id, None, changes)
+    entry["user_id"] = user_id
+    entry["ip_address"] = ip_address
+    entry["user_agent"] = user_agent
+    if _writer_task is None:
+        await append_chain(db, entry["organization_id"], [entry])
+    else:
+        _stage(db.sync_session, [entry])
     logger.info(
         "AUDIT: %s %s/%s by user=%s org=%s",
         action,
@@ -0,0 +1,191 @@
+"""Set-based upsert engine for PostgreSQL and SQLite.
+
+Writes a whole batch of rows with one ``INSERT ... ON CONFLICT (id) DO UPDATE``
+statement instead of loading ORM objects and mutating them one by one.
+Last-write-wins is enforced in SQL: an existing row is only overwritten when
+the incoming ``updated_at`` is newer, and ``RETURNING id`` tells the caller
+exactly which rows were written. Every id that is not returned lost the
+conflict (server newer, soft-deleted or owned by another tenant).
+
+On partitioned tables the primary key also holds the partition key (e.g.
+``(id, timestamp)`` on iot_readings), so an edit that changes it would not
+conflict and would insert a second row with the same ``id``. Those rows are
+resolved by ``id`` first: the stored row is deleted when the incoming one
+wins, and the incoming row is dropped when it loses.
+
+Usage:
+    from src.core.bulk_upsert import bulk_upsert
+    written = await bulk_upsert(db, DailyProduction, rows, org_id=org_id)
+"""
+
+import uuid
+from datetime import date, datetime, time, timezone
+from typing import Any
+
+from sqlalchemy import and_, delete, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Columns never overwritten by an upsert
+_IMMUTABLE_COLUMNS = frozenset({"id", "organization_id", "created_at"})
+
+
+def dialect_insert(db: AsyncSession):
+    """Return the dialect-specific ``insert`` construct for this session."""
+    name = db.get_bind().dialect.name
+    if name == "postgresql":
+        return pg_insert
+    if name == "sqlite":
+        return sqlite_insert
+    raise NotImplementedError(f"bulk upsert not supported on dialect {name!r}")
+
+
+def sql_uuid(db: AsyncSession):
+    """SQL expression generating a fresh UUID per row (``INSERT ... SELECT``)."""
+    name = db.get_bind().dialect.name
+    if name == "postgresql":
+        return func.gen_random_uuid()
+    if name == "sqlite":
+        # Uuid columns are stored as 32 hex chars on SQLite
+        return func.lower(func.hex(func.randomblob(16)))
+    raise NotImplementedError(f"uuid generation not supported on dialect {name!r}")
+
+
+def coerce_row(table: Any, row: dict[str, Any]) -> dict[str, Any]:
+    """Keep only real columns and parse ISO strings for temporal/UUID columns.
+
+    Core inserts do not go through ORM attribute coercion, and offline
+    clients send dates and ids as JSON strings.
+    """
+    out: dict[str, Any] = {}
+    for key, val in row.items():
+        col = table.columns.get(key)
+        if col is None:
+            continue
+        if isinstance(val, str):
+            try:
+                py_type = col.type.python_type
+            except NotImplementedError:
+                py_type = None
+            if py_type is datetime:
+                val = datetime.fromisoformat(val)
+            elif py_type is date:
+                val = date.fromisoformat(val[:10])
+            elif py_type is time:
+                val = time.fromisoformat(val)
+            elif py_type is uuid.UUID:
+                val = uuid.UUID(val)
+        out[key] = val
+    return out
+
+
+def _utc(value: Any) -> Any:
+    # SQLite hands back naive datetimes for timezone-aware columns
+    if isinstance(value, datetime) and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+async def _resolve_partition_moves(
+    db: AsyncSession,
+    table: Any,
+    by_id: dict[uuid.UUID, dict[str, Any]],
+    org_id: uuid.UUID,
+) -> None:
+    """Reconcile incoming rows with stored ones whose partition key differs.
+
+    Fills a missing partition key from the stored row, deletes stored rows
+    that the incoming version replaces, and removes from ``by_id`` the rows
+    that lose last-write-wins.
+    """
+    part_cols = [c for c in table.primary_key.columns if c.name != "id"]
+    cols = [table.c.id, table.c.organization_id, *part_cols]
+    if "updated_at" in table.c:
+        cols.append(table.c.updated_at)
+    if "deleted_at" in table.c:
+        cols.append(table.c.deleted_at)
+    result = await db.execute(select(*cols).where(table.c.id.in_(list(by_id))))
+
+    stale = []
+    for stored in result.mappings():
+        row = by_id.get(stored["id"])
+        if row is None:
+            continue  # already dropped
+        for col in part_cols:
+            row.setdefault(col.name, stored[col.name])
+        key = [stored[c.name] for c in part_cols]
+        if [_utc(v) for v in key] == [_utc(row[c.name]) for c in part_cols]:
+            continue  # same key: the ON CONFLICT path handles it
+        wins = (
+            stored["organization_id"] == org_id
+            and stored.get("deleted_at") is None
+            and (
+                "updated_at" not in stored
+                or "updated_at" not in row
+                or _utc(row["updated_at"]) > _utc(stored["updated_at"])
+            )
+        )
+        if wins:
+            stale.append(stored["id"])
+        else:
+            del by_id[stored["id"]]
+    if stale:
+        await db.execute(delete(table).where(table.c.id.in_(stale)))
+
+
+async def bulk_upsert(
+    db: AsyncSession,
+    model_cls: type,
+    rows: list[dict[str, Any]],
+    *,
+    org_id: uuid.UUID,
+) -> set[uuid.UUID]:
+    """Insert or update ``rows`` of ``model_cls`` for one organization.
+
+    Rows without ``id`` get a fresh UUID. Duplicate ids inside the batch keep
+    the last occurrence. Rows are grouped by column set so each group is a
+    single executemany statement (batched by SQLAlchemy's insertmanyvalues).
+    On partitioned tables rows whose partition key changed are resolved by
+    ``id`` first (see the module docstring).
+
+    Returns:
+        Set of ids that were inserted or updated.
+    """
+    table = model_cls.__table__
+    insert = dialect_insert(db)
+    immutable = _IMMUTABLE_COLUMNS | {c.name for c in table.primary_key.columns}
+
+    by_id: dict[uuid.UUID, dict[str, Any]] = {}
+    for raw in rows:
+        row = coerce_row(table, raw)
+        row["organization_id"] = org_id
+        row["id"] = row.get("id") or uuid.uuid4()
+        by_id[row["id"]] = row
+    if len(table.primary_key.columns) > 1 and by_id:
+        await _resolve_partition_moves(db, table, by_id, org_id)
+
+    groups: dict[frozenset[str], list[dict[str, Any]]] = {}
+    for row in by_id.values():
+        groups.setdefault(frozenset(row), []).append(row)
+
+    written: set[uuid.UUID] = set()
+    for keys, group in groups.items():
+        stmt = insert(table)
+        update_cols = {k: stmt.excluded[k] for k in keys if k not in immutable}
+        guard = [table.c.organization_id == stmt.excluded.organization_id]
+        if "updated_at" in table.c:
+            update_cols["updated_at"] = stmt.excluded.updated_at
+            guard.append(stmt.excluded.updated_at > table.c.updated_at)
+        if "deleted_at" in table.c:
+            guard.append(table.c.deleted_at.is_(None))
+        # Conflict target is the primary key: ``(id)`` for most tables, or
+        # ``(id, <partition key>)`` on partitioned ones such as iot_readings
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(table.primary_key.columns),
+            set_=update_cols,
+            where=and_(*guard),
+        ).returning(table.c.id)
+        result = await db.execute(stmt, group)
+        written.update(result.scalars().all())
+    return written
@@ -1,10 +1,103 @@
-"""Redis caching helpers for expensive queries (analytics, reports)."""
+"""Two-tier cache for expensive queries (analytics, reports).
 
+Tier 1 is a bounded, TTL-aware LRU inside each worker process: hits cost a
+dict lookup, no network round trip and no ``json.loads``. Tier 2 is the
+shared Redis. Invalidations evict both tiers and are broadcast on a Redis
+pub/sub channel, so every worker drops its local copies.
+Local copies never outlive ``LOCAL_MAX_TTL`` seconds, which bounds staleness
+even if an invalidation message is lost.
+
+``get_or_compute`` adds stampede protection on top:
+
+- single-flight: concurrent misses for the same key in one process share a
+  single computation;
+- probabilistic early refresh (XFetch): as an entry nears expiry, one caller
+  recomputes it before it expires, proportionally to how slow it is to build.
+
+Invalidation is tag-based: each entry registers under tag sets such as
+``org:{id}``, ``flock:{id}`` or ``org:{id}:entity:daily_production``, kept
+in Redis as ``cachetag:{tag}`` sets. ``invalidate_tags`` reads the members
+of each tag and deletes them in two pipelined round trips — O(members),
+independent of the keyspace size, and cluster-safe (every command names
+its keys).
+Services declare tags next to their cache keys with the helpers below.
+Hits, misses and invalidations are counted per tag family (ids replaced by
+``*``) and exposed by ``cache_stats``.
+
+Values are JSON-normalized on write, so both tiers return the same shape.
+Treat returned values as read-only — local hits share the cached object.
+"""
+
+import asyncio
 import json
 import logging
+import math
+import random
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+from typing import Any, Awaitable, Callable, Iterable
 
 logger = logging.getLogger("egglogu.cache")
 
+LOCAL_MAX_ENTRIES = 2048
+LOCAL_MAX_TTL = 30  # seconds
+EARLY_REFRESH_BETA = 1.0
+INVALIDATION_CHANNEL = "cache:invalidate"
+# Tag sets outlive every entry they index (entry TTLs are minutes)
+TAG_TTL = 3600
+
+# Marks the Redis envelope {"__c__": 1, "v": value, "d": delta, "e": expires, "t": tags}
+_ENVELOPE = "__c__"
+
+
+# ── Tag helpers ─────────────────────────────────────────────────────
+
+
+def org_tag(org_id: Any) -> str:
+    return f"org:{org_id}"
+
+
+def flock_tag(flock_id: Any) -> str:
+    return f"flock:{flock_id}"
+
+
+def entity_tag(org_id: Any, table: str) -> str:
+    """Tag for every cached value derived from ``table`` rows of one org."""
+    return f"org:{org_id}:entity:{table}"
+
+
+def _tag_family(tag: str) -> str:
+    """``org:<uuid>:entity:x`` → ``org:*:entity:x`` (bounded metric labels)."""
+    parts = []
+    for part in tag.split(":"):
+        try:
+            uuid.UUID(part)
+            part = "*"
+        except ValueError:
+            if part.isdigit():
+                part = "*"
+        parts.append(part)
+    return ":".join(parts)
+
+
+_tag_stats: dict[str, dict[str, int]] = defaultdict(
+    lambda: {"hits": 0, "misses": 0, "invalidations": 0}
+)
+
+
+def _count(tags: Iterable[str], field: str) -> None:
+    for family in {_tag_family(t) for t in tags}:
+        _tag_stats[family][field] += 1
+
+
+def cache_stats() -> dict[str, Any]:
+    """Per-tag-family counters plus local tier size (this worker only)."""
+    return {
+        "local_entries": len(_local),
+        "tags": {family: dict(c) for family, c in sorted(_tag_stats.items())},
+    }
+
 
 def _redis():
     """Access the shared Redis instance from rate_limit module."""
@@ -13,32 +106,241 @@ def _redis():
     return r
 
 
-async def get_cached(key: str):
-    """Get a cached value by key. Returns None on miss or Redis unavailable."""
+class _Entry:
+    __slots__ = ("value", "expires_at", "delta", "local_until", "tags")
+
+    def __init__(
+        self,
+        value: Any,
+        expires_at: float,
+        delta: float,
+        local_until: float,
+        tags: tuple[str, ...] = (),
+    ) -> None:
+        self.value = value
+        self.expires_at = expires_at  # logical expiry (wall clock)
+        self.delta = delta  # seconds it took to compute
+        self.local_until = local_until  # when the local copy must be dropped
+        self.tags = tags
+
+
+class _LocalLRU:
+    """Bounded per-process LRU with per-entry expiry."""
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._data: OrderedDict[str, _Entry] = OrderedDict()
+
+    def get(self, key: str) -> _Entry | None:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if time.time() >= entry.local_until:
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return entry
+
+    def set(self, key: str, entry: _Entry) -> None:
+        self._data[key] = entry
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def invalidate_prefix(self, prefix: str) -> int:
+        doomed = [k for k in self._data if k == prefix or k.startswith(f"{prefix}:")]
+        for k in doomed:
+            del self._data[k]
+        return len(doomed)
+
+    def invalidate_tags(self, tags: Iterable[str]) -> int:
+        wanted = set(tags)
+        doomed = [k for k, e in self._data.items() if wanted.intersection(e.tags)]
+        for k in doomed:
+            del self._data[k]
+        return len(doomed)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+_local = _LocalLRU(LOCAL_MAX_ENTRIES)
+_inflight: dict[str, asyncio.Future] = {}
+_listener_task: asyncio.Task | None = None
+
+
+def _store_local(
+    key: str, value: Any, expires_at: float, delta: float, tags: tuple[str, ...]
+) -> _Entry:
+    local_until = min(expires_at, time.time() + LOCAL_MAX_TTL)
+    entry = _Entry(value, expires_at, delta, local_until, tags)
+    _local.set(key, entry)
+    return entry
+
+
+async def _get_entry(key: str) -> _Entry | None:
+    entry = _local.get(key)
+    if entry is not None:
+        return entry
     r = _redis()
     if not r:
         return None
     try:
-        val = await r.get(f"cache:{key}")
-        return json.loads(val) if val else None
+        raw = await r.get(f"cache:{key}")
     except Exception as e:
         logger.warning("Cache GET failed (key=%s): %s", key, e)
         return None
+    if not raw:
+        return None
+    data = json.loads(raw)
+    if isinstance(data, dict) and data.get(_ENVELOPE) == 1:
+        return _store_local(
+            key, data["v"], data["e"], data["d"], tuple(data.get("t", ()))
+        )
+    # Entry written before the envelope format: no expiry metadata
+    return _Entry(data, time.time() + LOCAL_MAX_TTL, 0.0, time.time())
+
+
+async def _set_entry(
+    key: str, data: Any, ttl: int, delta: float, tags: tuple[str, ...]
+) -> Any:
+    """Write both tiers and register ``key`` under its tags.
+
+    Returns the JSON-normalized value.
+    """
+    payload = json.dumps(data, default=str)
+    value = json.loads(payload)
+    expires_at = time.time() + ttl
+    _store_local(key, value, expires_at, delta, tags)
+    r = _redis()
+    if r:
+        envelope = (
+            f'{{"{_ENVELOPE}":1,"d":{delta},"e":{expires_at},'
+            f'"t":{json.dumps(list(tags))},"v":{payload}}}'
+        )
+        try:
+            async with r.pipeline(transaction=False) as pipe:
+                pipe.set(f"cache:{key}", envelope, ex=ttl)
+                for tag in tags:
+                    pipe.sadd(f"cachetag:{tag}", f"cache:{key}")
+                    pipe.expire(f"cachetag:{tag}", max(ttl, TAG_TTL))
+                await pipe.execute()
+        except Exception as e:
+            logger.warning("Cache SET failed (key=%s): %s", key, e)
+    return value
+
 
+def _should_refresh_early(entry: _Entry) -> bool:
+    """XFetch: refresh with probability rising as expiry approaches."""
+    if entry.delta <= 0:
+        return False
+    jitter = -entry.delta * EARLY_REFRESH_BETA * math.log(1.0 - random.random())
+    return time.time() + jitter >= entry.expires_at
+
+
+async def get_cached(key: str):
+    """Get a cached value by key. Returns None on miss or Redis unavailable."""
+    entry = await _get_entry(key)
+    if entry is None:
+        return None
+    _count(entry.tags, "hits")
+    return entry.value
 
-async def set_cached(key: str, data, ttl: int = 300):
+
+async def set_cached(key: str, data, ttl: int = 300, tags: Iterable[str] = ()):
     """Cache a value with TTL (default 5 min). Silently fails if Redis unavailable."""
+    await _set_entry(key, data, ttl, 0.0, tuple(tags))
+
+
+async def get_or_compute(
+    key: str,
+    compute: Callable[[], Awaitable[Any]],
+    ttl: int = 300,
+    tags: Iterable[str] = (),
+) -> Any:
+    """Return the cached value for ``key`` or compute it once per process.
+
+    ``compute`` must return JSON-serializable data. While one caller is
+    recomputing, other callers get the still-valid cached value if there is
+    one, or await the same computation otherwise.
+    """
+    tags = tuple(tags)
+    entry = await _get_entry(key)
+    if entry is not None and not _should_refresh_early(entry):
+        _count(tags, "hits")
+        return entry.value
+    _count(tags, "misses")
+
+    pending = _inflight.get(key)
+    if pending is not None:
+        if entry is not None:
+            return entry.value
+        try:
+            return await asyncio.shield(pending)
+        except asyncio.CancelledError:
+            if not pending.cancelled():
+                raise
+            # Leader was cancelled (client went away) — compute ourselves
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    try:
+        t0 = time.monotonic()
+        data = await compute()
+        value = await _set_entry(key, data, ttl, time.monotonic() - t0, tags)
+        future.set_result(value)
+        return value
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        future.exception()  # mark retrieved when nobody else was waiting
+        raise
+    finally:
+        _inflight.pop(key, None)
+
+
+async def invalidate_tags(*tags: str) -> None:
+    """Delete every entry registered under any of ``tags`` in both tiers."""
+    if not tags:
+        return
+    _local.invalidate_tags(tags)
+    _count(tags, "invalidations")
     r = _redis()
     if not r:
         return
+    # Every command names its own key (no keys read inside a script), so
+    # this also works on Redis Cluster. SREM only the members read: keys
+    # tagged in the meantime stay registered for the next invalidation.
+    tag_keys = [f"cachetag:{t}" for t in tags]
     try:
-        await r.set(f"cache:{key}", json.dumps(data, default=str), ex=ttl)
+        async with r.pipeline(transaction=False) as pipe:
+            for tag_key in tag_keys:
+                pipe.smembers(tag_key)
+            members = await pipe.execute()
+        async with r.pipeline(transaction=False) as pipe:
+            for tag_key, keys in zip(tag_keys, members):
+                if not keys:
+                    continue
+                for key in keys:
+                    pipe.delete(key)
+                pipe.srem(tag_key, *keys)
+            await pipe.execute()
+        await r.publish(INVALIDATION_CHANNEL, json.dumps({"tags": list(tags)}))
     except Exception as e:
-        logger.warning("Cache SET failed (key=%s): %s", key, e)
+        logger.warning("Cache INVALIDATE failed (tags=%s): %s", tags, e)
 
 
 async def invalidate_prefix(prefix: str):
-    """Delete all cache keys matching prefix. Use after writes to cached entities."""
+    """Delete all cache keys matching prefix with SCAN — O(keyspace).
+
+    Legacy path for untagged keys; prefer ``invalidate_tags``.
+    """
+    _local.invalidate_prefix(prefix)
     r = _redis()
     if not r:
         return
@@ -50,5 +352,70 @@ async def invalidate_prefix(prefix: str):
                 await r.delete(*keys)
             if cursor == 0:
                 break
+        await r.publish(INVALIDATION_CHANNEL, json.dumps({"prefix": prefix}))
     except Exception as e:
         logger.warning("Cache INVALIDATE failed (prefix=%s): %s", prefix, e)
+
+
+# ── Cross-worker invalidation ───────────────────────────────────────
+
+
+def _apply_remote_invalidation(raw: str) -> None:
+    try:
+        message = json.loads(raw)
+    except ValueError:
+        message = None
+    if not isinstance(message, dict):
+        # Plain prefix string from a worker on the previous release
+        _local.invalidate_prefix(raw)
+        return
+    if message.get("tags"):
+        _local.invalidate_tags(message["tags"])
+    if message.get("prefix"):
+        _local.invalidate_prefix(message["prefix"])
+
+
+async def _listen_invalidations() -> None:
+    r = _redis()
+    pubsub = r.pubsub()
+    await pubsub.subscribe(INVALIDATION_CHANNEL)
+    try:
+        while True:
+            try:
+                msg = await pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=1.0
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Cache invalidation listener error: %s", e)
+                # Messages may have been lost — drop everything local
+                _local.clear()
+                await asyncio.sleep(1.0)
+                continue
+            if msg and msg.get("type") == "message":
+                _apply_remote_invalidation(msg["data"])
+    finally:
+        await pubsub.unsubscribe(INVALIDATION_CHANNEL)
+        await pubsub.aclose()
+
+
+def start_invalidation_listener() -> None:
+    """Subscribe this worker to cross-worker invalidations. Call at startup."""
+    global _listener_task
+    if _redis() is None or _listener_task is not None:
+        return
+    _listener_task = asyncio.create_task(_listen_invalidations())
+    logger.info("Cache invalidation listener started")
+
+
+async def stop_invalidation_listener() -> None:
+    global _listener_task
+    if _listener_task is None:
+        return
+    _listener_task.cancel()
+    try:
+        await _listener_task
+    except (asyncio.CancelledError, Exception):
+        pass
+    _listener_task = None
@@ -0,0 +1,218 @@
+"""Columnar exports (Arrow IPC / Parquet) of tenant datasets for BI pulls.
+
+Rows are streamed from a server-side cursor (``AsyncSession.stream`` with
+``yield_per``) in ``CHUNK_ROWS`` partitions; each partition becomes one
+Arrow record batch appended to the output file, so memory stays bounded by
+the chunk size whatever the date range. No ORM objects or Pydantic models
+are built: the select reads table columns directly.
+
+Files are written under ``settings.EXPORTS_DIR`` (a local directory or a
+mounted object-storage bucket) as ``{org_id}/{job_id}.{ext}``, first to a
+temporary name and renamed once complete, so a download never sees a
+partial file.
+
+``pyarrow`` is an optional dependency, imported only when a file is written.
+
+Usage:
+    from src.core.columnar_export import write_export
+    rows, size = await write_export(db, job)
+"""
+
+import json
+import os
+import uuid
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta, timezone
+from enum import Enum
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable
+
+from sqlalchemy import Column, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import sqltypes
+
+from src.config import settings
+from src.models.environment import IoTReading
+from src.models.feed import FeedConsumption
+from src.models.finance import Expense, Income
+from src.models.production import DailyProduction
+
+CHUNK_ROWS = 10_000
+EXPORT_TTL = timedelta(days=7)
+FORMATS = {"arrow": "arrow", "parquet": "parquet"}  # format -> file extension
+
+
+@dataclass(frozen=True)
+class Dataset:
+    model: type
+    date_column: str
+
+
+DATASETS: dict[str, Dataset] = {
+    "daily_production": Dataset(DailyProduction, "date"),
+    "feed_consumption": Dataset(FeedConsumption, "date"),
+    "income": Dataset(Income, "date"),
+    "expense": Dataset(Expense, "date"),
+    "iot_readings": Dataset(IoTReading, "timestamp"),
+}
+
+
+def storage_path(storage_key: str) -> Path:
+    return Path(settings.EXPORTS_DIR) / storage_key
+
+
+def _columns(dataset: Dataset) -> list[Column]:
+    return [c for c in dataset.model.__table__.columns if c.name != "deleted_at"]
+
+
+def _select(dataset: Dataset, org_id: uuid.UUID, date_from, date_to):
+    table = dataset.model.__table__
+    date_col = table.c[dataset.date_column]
+    stmt = select(*_columns(dataset)).where(table.c.organization_id == org_id)
+    if "deleted_at" in table.c:
+        stmt = stmt.where(table.c.deleted_at.is_(None))
+    if isinstance(date_col.type, sqltypes.DateTime):
+        # Whole days, inclusive, for timestamp columns
+        if date_from:
+            stmt = stmt.where(
+                date_col >= datetime.combine(date_from, time.min, timezone.utc)
+            )
+        if date_to:
+            stmt = stmt.where(
+                date_col
+                < datetime.combine(date_to + timedelta(days=1), time.min, timezone.utc)
+            )
+    else:
+        if date_from:
+            stmt = stmt.where(date_col >= date_from)
+        if date_to:
+            stmt = stmt.where(date_col <= date_to)
+    return stmt.order_by(date_col, table.c.id)
+
+
+def _converter(col: Column) -> Callable[[Any], Any]:
+    """Python value -> value accepted by the column's Arrow type."""
+    kind = col.type
+    if isinstance(kind, sqltypes.Uuid):
+        return lambda v: None if v is None else str(v)
+    if isinstance(kind, sqltypes.Enum):
+        return lambda v: v.value if isinstance(v, Enum) else v
+    if isinstance(kind, sqltypes.JSON):
+        return lambda v: None if v is None else json.dumps(v, default=str)
+    return lambda v: v
+
+
+async def iter_column_batches(
+    db: AsyncSession,
+    dataset: Dataset,
+    org_id: uuid.UUID,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    chunk_rows: int = CHUNK_ROWS,
+) -> AsyncIterator[dict[str, list]]:
+    """Yield ``{column: values}`` chunks of at most ``chunk_rows`` rows."""
+    columns = _columns(dataset)
+    converters = [_converter(c) for c in columns]
+    stmt = _select(dataset, org_id, date_from, date_to).execution_options(
+        yield_per=chunk_rows
+    )
+    result = await db.stream(stmt)
+    async for rows in result.partitions(chunk_rows):
+        yield {
+            col.name: [conv(row[i]) for row in rows]
+            for i, (col, conv) in enumerate(zip(columns, converters))
+        }
+
+
+def arrow_schema(dataset: Dataset):
+    """Arrow schema mirroring the dataset's table columns."""
+    import pyarrow as pa
+
+    fields = []
+    for col in _columns(dataset):
+        kind = col.type
+        if isinstance(kind, sqltypes.Boolean):
+            arrow_type = pa.bool_()
+        elif isinstance(kind, sqltypes.Integer):
+            arrow_type = pa.int64()
+        elif isinstance(kind, sqltypes.Float):
+            arrow_type = pa.float64()
+        elif isinstance(kind, sqltypes.Numeric):
+            arrow_type = pa.decimal128(kind.precision or 18, kind.scale or 2)
+        elif isinstance(kind, sqltypes.DateTime):
+            arrow_type = pa.timestamp("us", tz="UTC" if kind.timezone else None)
+        elif isinstance(kind, sqltypes.Date):
+            arrow_type = pa.date32()
+        elif isinstance(kind, sqltypes.Time):
+            arrow_type = pa.time64("us")
+        else:
+            # Strings, enums, UUIDs and JSON travel as UTF-8
+            arrow_type = pa.string()
+        fields.append(pa.field(col.name, arrow_type, nullable=col.nullable))
+    return pa.schema(fields)
+
+
+class _Writer:
+    """Append record batches to an Arrow IPC file or a Parquet file."""
+
+    def __init__(self, fmt: str, path: Path, schema):
+        import pyarrow as pa
+
+        self.schema = schema
+        if fmt == "parquet":
+            import pyarrow.parquet as pq
+
+            self._writer = pq.ParquetWriter(str(path), schema, compression="zstd")
+            self._sink = None
+        else:
+            self._sink = pa.OSFile(str(path), "wb")
+            self._writer = pa.ipc.new_file(self._sink, schema)
+
+    def write(self, columns: dict[str, list]) -> None:
+        import pyarrow as pa
+
+        self._writer.write_batch(
+            pa.RecordBatch.from_pydict(columns, schema=self.schema)
+        )
+
+    def close(self) -> None:
+        self._writer.close()
+        if self._sink is not None:
+            self._sink.close()
+
+
+async def write_export(db: AsyncSession, job: Any) -> tuple[int, int]:
+    """Stream ``job``'s dataset into its file; sets ``job.storage_key``.
+
+    Returns:
+        ``(row_count, size_bytes)``.
+    """
+    dataset = DATASETS[job.dataset]
+    storage_key = f"{job.organization_id}/{job.id}.{FORMATS[job.format]}"
+    path = storage_path(storage_key)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".part")
+
+    writer = _Writer(job.format, tmp, arrow_schema(dataset))
+    rows = 0
+    try:
+        async for columns in iter_column_batches(
+            db, dataset, job.organization_id, job.date_from, job.date_to
+        ):
+            writer.write(columns)
+            rows += len(next(iter(columns.values()), []))
+    except BaseException:
+        writer.close()
+        tmp.unlink(missing_ok=True)
+        raise
+    writer.close()
+    os.replace(tmp, path)
+
+    job.storage_key = storage_key
+    return rows, path.stat().st_size
+
+
+def remove_export(storage_key: str | None) -> None:
+    """Delete an export file if it is still there."""
+    if storage_key:
+        storage_path(storage_key).unlink(missing_ok=True)
@@ -1,12 +1,23 @@
-"""CRM business logic — health score, LTV, retention engine."""
-
+"""CRM business logic — health score, LTV, retention engine.
+
+Health scores are computed for many organizations at once: ``HealthTable``
+loads each input (last activity, production records, subscription, farm and
+flock counts, open tickets) with one grouped query per signal, then scores
+every component column by column. ``evaluate_retention_rules`` persists the
+table as ``OrgHealthScore`` history and matches each rule as a filter over
+it, inserting the resulting ``RetentionEvent`` rows in one statement.
+"""
+
+import uuid
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Iterable
 
-from sqlalchemy import func, select
+from sqlalchemy import func, insert, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.models.auth import Organization, User
-from src.models.crm import RetentionEvent, RetentionRule
+from src.models.crm import OrgHealthScore, RetentionEvent, RetentionRule
 from src.models.farm import Farm
 from src.models.flock import Flock
 from src.models.production import DailyProduction
@@ -21,141 +32,211 @@ PLAN_MONTHLY_PRICE = {
     "enterprise": 99,
 }
 
+# ── Health score points ───────────────────────────────────────────
+# (minimum value, points), first match wins
+PRODUCTION_STEPS = ((20, 25), (10, 20), (5, 15), (1, 10))
+DEPTH_STEPS = ((10, 15), (5, 12), (2, 8), (1, 5))
+RISK_STEPS = ((75, "low"), (50, "medium"), (25, "high"))
+# (maximum open tickets, points)
+TICKET_STEPS = ((0, 10), (2, 7), (5, 3))
+# Any other subscription status counts as healthy (25); no subscription is 0
+PAYMENT_POINTS = {
+    SubscriptionStatus.suspended: 0,
+    SubscriptionStatus.past_due: 5,
+    SubscriptionStatus.cancelled: 10,
+}
 
-async def compute_health_score(org_id, db: AsyncSession) -> dict:
-    """
-    Health score 0–100 based on:
-      - Login recency (last user activity)      → 25 pts
-      - Production records (last 30d)            → 25 pts
-      - Payment failures (past_due status)       → 25 pts
-      - Farm/flock count (engagement depth)      → 15 pts
-      - Open tickets (negative signal)           → 10 pts
+BREAKDOWN = (
+    "login_recency",
+    "production_activity",
+    "payment_health",
+    "engagement_depth",
+    "ticket_burden",
+)
+
+
+def _at_least(values: Iterable[int], steps, default=0) -> list:
+    return [next((v for floor, v in steps if x >= floor), default) for x in values]
+
+
+def _at_most(values: Iterable[int], steps, default=0) -> list:
+    return [next((v for ceil, v in steps if x <= ceil), default) for x in values]
+
+
+def _login_points(last_activity: Iterable[datetime | None], now: datetime) -> list:
+    d7, d30 = now - timedelta(days=7), now - timedelta(days=30)
+
+    def points(last: datetime | None) -> int:
+        if last is None:
+            return 0
+        if last >= d7:
+            return 25  # Active in last 7 days
+        if last >= d30:
+            return 15  # Active in last 30 days
+        return max(0, 25 - (now - last).days // 3)  # Decays
+
+    return [points(last) for last in last_activity]
+
+
+def _ltv(plan: Any, months: int) -> tuple[str, int, int]:
+    plan_name = plan.value if isinstance(plan, PlanTier) else plan
+    monthly_rate = PLAN_MONTHLY_PRICE.get(plan_name, 0)
+    months = max(months, 1)
+    return plan_name, monthly_rate, monthly_rate * months
+
+
+async def _counts(db: AsyncSession, column, org_ids, *where) -> dict:
+    stmt = select(column, func.count()).where(*where).group_by(column)
+    if org_ids is not None:
+        stmt = stmt.where(column.in_(org_ids))
+    return dict((await db.execute(stmt)).all())
+
+
+@dataclass
+class HealthTable:
+    """Health inputs and scores of many organizations, one list per column.
+
+    Row ``i`` of every column belongs to ``org_ids[i]``.
     """
-    now = datetime.now(timezone.utc).replace(tzinfo=None)
-    d30 = now - timedelta(days=30)
-    d7 = now - timedelta(days=7)
 
-    # 1) Login recency — last user updated_at
-    last_activity = (
-        await db.execute(
-            select(func.max(User.updated_at)).where(User.organization_id == org_id)
-        )
-    ).scalar()
-
-    if last_activity and last_activity >= d7:
-        login_score = 25  # Active in last 7 days
-    elif last_activity and last_activity >= d30:
-        login_score = 15  # Active in last 30 days
-    elif last_activity:
-        days_ago = (now - last_activity).days
-        login_score = max(0, 25 - days_ago // 3)  # Decays
-    else:
-        login_score = 0
-
-    # 2) Production records in last 30 days
-    prod_count = (
-        await db.execute(
-            select(func.count(DailyProduction.id)).where(
-                DailyProduction.organization_id == org_id,
-                DailyProduction.created_at >= d30,
-            )
+    now: datetime
+    org_ids: list[uuid.UUID]
+    names: list[str | None]
+    last_activity: list[datetime | None] = field(default_factory=list)
+    production_records: list[int] = field(default_factory=list)
+    depth: list[int] = field(default_factory=list)
+    open_tickets: list[int] = field(default_factory=list)
+    subscriptions: list[Any] = field(default_factory=list)  # row or None
+    # Scored columns
+    login_recency: list[int] = field(default_factory=list)
+    production_activity: list[int] = field(default_factory=list)
+    payment_health: list[int] = field(default_factory=list)
+    engagement_depth: list[int] = field(default_factory=list)
+    ticket_burden: list[int] = field(default_factory=list)
+    score: list[int] = field(default_factory=list)
+    risk: list[str] = field(default_factory=list)
+
+    @classmethod
+    async def load(
+        cls, db: AsyncSession, org_ids: Iterable[uuid.UUID] | None = None
+    ) -> "HealthTable":
+        """Score ``org_ids`` (every organization if None) with grouped queries."""
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        d30 = now - timedelta(days=30)
+        if org_ids is None:
+            orgs = (await db.execute(select(Organization.id, Organization.name))).all()
+            table = cls(now, [o for o, _ in orgs], [name for _, name in orgs])
+        else:
+            org_ids = list(org_ids)
+            table = cls(now, org_ids, [None] * len(org_ids))
+        ids = None if org_ids is None else table.org_ids
+
+        last_stmt = select(User.organization_id, func.max(User.updated_at)).group_by(
+            User.organization_id
         )
-    ).scalar() or 0
-
-    if prod_count >= 20:
-        prod_score = 25
-    elif prod_count >= 10:
-        prod_score = 20
-    elif prod_count >= 5:
-        prod_score = 15
-    elif prod_count >= 1:
-        prod_score = 10
-    else:
-        prod_score = 0
-
-    # 3) Payment status
-    sub = (
-        await db.execute(
-            select(Subscription).where(Subscription.organization_id == org_id)
+        sub_stmt = select(
+            Subscription.organization_id,
+            Subscription.status,
+            Subscription.plan,
+            Subscription.is_trial,
+            Subscription.trial_end,
+            Subscription.months_subscribed,
         )
-    ).scalar_one_or_none()
-
-    if not sub or sub.status == SubscriptionStatus.suspended:
-        payment_score = 0
-    elif sub.status == SubscriptionStatus.past_due:
-        payment_score = 5
-    elif sub.status == SubscriptionStatus.cancelled:
-        payment_score = 10
-    else:
-        payment_score = 25  # active
-
-    # 4) Farm + Flock depth
-    farm_count = (
-        await db.execute(
-            select(func.count(Farm.id)).where(Farm.organization_id == org_id)
+        if ids is not None:
+            last_stmt = last_stmt.where(User.organization_id.in_(ids))
+            sub_stmt = sub_stmt.where(Subscription.organization_id.in_(ids))
+        last = dict((await db.execute(last_stmt)).all())
+        subs = {row.organization_id: row for row in await db.execute(sub_stmt)}
+        production = await _counts(
+            db,
+            DailyProduction.organization_id,
+            ids,
+            DailyProduction.created_at >= d30,
         )
-    ).scalar() or 0
-    flock_count = (
-        await db.execute(
-            select(func.count(Flock.id)).where(Flock.organization_id == org_id)
+        farms = await _counts(db, Farm.organization_id, ids)
+        flocks = await _counts(db, Flock.organization_id, ids)
+        tickets = await _counts(
+            db,
+            SupportTicket.organization_id,
+            ids,
+            SupportTicket.status.in_([TicketStatus.open, TicketStatus.in_progress]),
         )
-    ).scalar() or 0
-
-    depth = farm_count + flock_count
-    if depth >= 10:
-        depth_score = 15
-    elif depth >= 5:
-        depth_score = 12
-    elif depth >= 2:
-        depth_score = 8
-    elif depth >= 1:
-        depth_score = 5
-    else:
-        depth_score = 0
-
-    # 5) Open tickets (negative signal)
-    open_tickets = (
+
+        table.last_activity = [last.get(o) for o in table.org_ids]
+        table.production_records = [production.get(o, 0) for o in table.org_ids]
+        table.depth = [farms.get(o, 0) + flocks.get(o, 0) for o in table.org_ids]
+        table.open_tickets = [tickets.get(o, 0) for o in table.org_ids]
+        table.subscriptions = [subs.get(o) for o in table.org_ids]
+        table.score_all()
+        return table
+
+    def score_all(self) -> None:
+        """Fill the scored columns from the input columns."""
+        self.login_recency = _login_points(self.last_activity, self.now)
+        self.production_activity = _at_least(self.production_records, PRODUCTION_STEPS)
+        self.payment_health = [
+            0 if sub is None else PAYMENT_POINTS.get(sub.status, 25)
+            for sub in self.subscriptions
+        ]
+        self.engagement_depth = _at_least(self.depth, DEPTH_STEPS)
+        self.ticket_burden = _at_most(self.open_tickets, TICKET_STEPS)
+        self.score = [
+            sum(points) for points in zip(*(getattr(self, name) for name in BREAKDOWN))
+        ]
+        self.risk = _at_least(self.score, RISK_STEPS, default="critical")
+
+    def __len__(self) -> int:
+        return len(self.org_ids)
+
+    def health(self, i: int) -> dict:
+        """Row ``i`` in the ``compute_health_score`` format."""
+        last = self.last_activity[i]
+        return {
+            "score": self.score[i],
+            "risk": self.risk[i],
+            "breakdown": {name: getattr(self, name)[i] for name in BREAKDOWN},
+            "last_activity": last.isoformat() if last else None,
+        }
+
+    def ltv(self, i: int) -> int:
+        sub = self.subscriptions[i]
+        return _ltv(sub.plan, sub.months_subscribed)[2] if sub is not None else 0
+
+    def where(self, predicate: Callable[[int], bool]) -> list[int]:
+        """Indexes of the rows matching ``predicate``."""
+        return [i for i in range(len(self)) if predicate(i)]
+
+    async def save(self, db: AsyncSession) -> None:
+        """Append this run to the ``org_health_scores`` history."""
+        if not self.org_ids:
+            return
         await db.execute(
-            select(func.count(SupportTicket.id)).where(
-                SupportTicket.organization_id == org_id,
-                SupportTicket.status.in_([TicketStatus.open, TicketStatus.in_progress]),
-            )
+            insert(OrgHealthScore),
+            [
+                {
+                    "id": uuid.uuid4(),
+                    "organization_id": org_id,
+                    "computed_at": self.now,
+                    "score": self.score[i],
+                    "risk": self.risk[i],
+                    "last_activity": self.last_activity[i],
+                    **{name: getattr(self, name)[i] for name in BREAKDOWN},
+                }
+                for i, org_id in enumerate(self.org_ids)
+            ],
         )
-    ).scalar() or 0
-
-    if open_tickets == 0:
-        ticket_score = 10
-    elif open_tickets <= 2:
-        ticket_score = 7
-    elif open_tickets <= 5:
-        ticket_score = 3
-    else:
-        ticket_score = 0
-
-    total = login_score + prod_score + payment_score + depth_score + ticket_score
-
-    # Risk classification
-    if total >= 75:
-        risk = "low"
-    elif total >= 50:
-        risk = "medium"
-    elif total >= 25:
-        risk = "high"
-    else:
-        risk = "critical"
 
-    return {
-        "score": total,
-        "risk": risk,
-        "breakdown": {
-            "login_recency": login_score,
-            "production_activity": prod_score,
-            "payment_health": payment_score,
-            "engagement_depth": depth_score,
-            "ticket_burden": ticket_score,
-        },
-        "last_activity": last_activity.isoformat() if last_activity else None,
-    }
+
+async def compute_health_score(org_id, db: AsyncSession) -> dict:
+    """
+    Health score 0–100 based on:
+      - Login recency (last user activity)      → 25 pts
+      - Production records (last 30d)            → 25 pts
+      - Payment failures (past_due status)       → 25 pts
+      - Farm/flock count (engagement depth)      → 15 pts
+      - Open tickets (negative signal)           → 10 pts
+    """
+    return (await HealthTable.load(db, [org_id])).health(0)
 
 
 async def compute_ltv(org_id, db: AsyncSession) -> dict:
@@ -169,23 +250,55 @@ async def compute_ltv(org_id, db: AsyncSession) -> dict:
     if not sub:
         return {"ltv": 0, "months": 0, "plan": None, "monthly_rate": 0}
 
-    plan_name = sub.plan.value if isinstance(sub.plan, PlanTier) else sub.plan
-    monthly_rate = PLAN_MONTHLY_PRICE.get(plan_name, 0)
-    months = max(sub.months_subscribed, 1)
-    ltv = monthly_rate * months
-
+    plan_name, monthly_rate, ltv = _ltv(sub.plan, sub.months_subscribed)
     return {
         "ltv": ltv,
-        "months": months,
+        "months": max(sub.months_subscribed, 1),
         "plan": plan_name,
         "monthly_rate": monthly_rate,
     }
 
 
+def _trial_ending(table: HealthTable, days_before: int) -> Callable[[int], bool]:
+    now = table.now.replace(tzinfo=timezone.utc)
+
+    def match(i: int) -> bool:
+        sub = table.subscriptions[i]
+        if sub is None or not sub.is_trial or not sub.trial_end:
+            return False
+        trial_end = sub.trial_end
+        if trial_end.tzinfo is None:
+            trial_end = trial_end.replace(tzinfo=timezone.utc)
+        return 0 < (trial_end - now).days <= days_before
+
+    return match
+
+
+def _rule_filter(rule: RetentionRule, table: HealthTable) -> Callable[[int], bool]:
+    conditions = rule.conditions or {}
+    trigger = rule.trigger_type.value
+
+    if trigger == "churn_risk":
+        threshold = conditions.get("health_below", 40)
+        return lambda i: table.score[i] < threshold
+    if trigger == "payment_failed":
+        return lambda i: (
+            table.subscriptions[i] is not None
+            and table.subscriptions[i].status == SubscriptionStatus.past_due
+        )
+    if trigger == "low_usage":
+        return lambda i: table.production_activity[i] <= 5
+    if trigger == "trial_ending":
+        return _trial_ending(table, conditions.get("days_before", 5))
+    # downgrade_request: manual trigger only — skip in auto-evaluation
+    return lambda i: False
+
+
 async def evaluate_retention_rules(db: AsyncSession) -> list[dict]:
     """Evaluate all active retention rules against all organizations.
 
-    Returns list of events triggered.
+    Scores every organization in bulk, records the scores as history and
+    returns list of events triggered.
     """
     rules = (
         (
@@ -200,67 +313,38 @@ async def evaluate_retention_rules(db: AsyncSession) -> list[dict]:
     if not rules:
         return []
 
-    orgs = (await db.execute(select(Organization))).scalars().all()
-    triggered = []
+    table = await HealthTable.load(db)
+    await table.save(db)
+    matches = {rule.id: set(table.where(_rule_filter(rule, table))) for rule in rules}
 
-    for org in orgs:
-        sub = (
-            await db.execute(
-                select(Subscription).where(Subscription.organization_id == org.id)
+    events = []
+    triggered = []
+    for i, org_id in enumerate(table.org_ids):
+        for rule in rules:
+            if i not in matches[rule.id]:
+                continue
+            events.append(
+                {
+                    "id": uuid.uuid4(),
+                    "organization_id": org_id,
+                    "rule_id": rule.id,
+                    "trigger_type": rule.trigger_type,
+                    "action_taken": rule.action_type.value,
+                    "result": f"score={table.score[i]}, risk={table.risk[i]}",
+                }
+            )
+            triggered.append(
+                {
+                    "organization_id": str(org_id),
+                    "organization_name": table.names[i],
+                    "rule": rule.name,
+                    "trigger": rule.trigger_type.value,
+                    "action": rule.action_type.value,
+                    "health_score": table.score[i],
+                }
             )
-        ).scalar_one_or_none()
-
-        health = await compute_health_score(org.id, db)
 
-        for rule in rules:
-            match = False
-            conditions = rule.conditions or {}
-
-            if rule.trigger_type.value == "churn_risk":
-                threshold = conditions.get("health_below", 40)
-                match = health["score"] < threshold
-
-            elif rule.trigger_type.value == "payment_failed":
-                match = sub is not None and sub.status == SubscriptionStatus.past_due
-
-            elif rule.trigger_type.value == "low_usage":
-                match = health["breakdown"]["production_activity"] <= 5
-
-            elif rule.trigger_type.value == "trial_ending":
-                if sub and sub.is_trial and sub.trial_end:
-                    now = datetime.now(timezone.utc)
-                    trial_end = sub.trial_end
-                    if trial_end.tzinfo is None:
-                        trial_end = trial_end.replace(tzinfo=timezone.utc)
-                    days_left = (trial_end - now).days
-                    threshold = conditions.get("days_before", 5)
-                    match = 0 < days_left <= threshold
-
-            elif rule.trigger_type.value == "downgrade_request":
-                # Manual trigger only — skip in auto-evaluation
-                match = False
-
-            if match:
-                event = RetentionEvent(
-                    organization_id=org.id,
-                    rule_id=rule.id,
-                    trigger_type=rule.trigger_type,
-                    action_taken=rule.action_type.value,
-                    result=f"score={health['score']}, risk={health['risk']}",
-                )
-                db.add(event)
-                triggered.append(
-                    {
-                        "organization_id": str(org.id),
-                        "organization_name": org.name,
-                        "rule": rule.name,
-                        "trigger": rule.trigger_type.value,
-                        "action": rule.action_type.value,
-                        "health_score": health["score"],
-                    }
-                )
-
-    if triggered:
-        await db.flush()
+    if events:
+        await db.execute(insert(RetentionEvent), events)
 
     return triggered
@@ -0,0 +1,372 @@
+"""Incrementally maintained economics aggregates.
+
+``AnalyticsService.get_economics`` used to run seven all-time aggregate scans
+(feed, vaccines, medications, expenses, eggs, feed purchases, income) on every
+cache miss. Instead, write paths push *deltas* into two summary tables:
+
+- ``flock_economics_summary`` — one row per flock (sums + row counters),
+- ``org_economics_totals`` — one row per organization.
+
+Deltas are applied with ``INSERT ... ON CONFLICT DO UPDATE SET col = col + x``,
+so concurrent writers never lose updates. ``rebuild`` recomputes everything
+from the source tables and ``verify`` reports drift without writing.
+
+On PostgreSQL a per-organization advisory lock keeps ``rebuild`` from racing
+with writers: ``apply`` takes it shared, ``rebuild`` exclusive, both until
+the transaction ends. A rebuild therefore waits for in-flight writers to
+commit (and sees their rows), and later deltas land on top of its result.
+
+Usage:
+    from src.core.economics_summary import EconomicsDelta
+    delta = EconomicsDelta(org_id).remove(old_vaccine)
+    vaccine = await svc._update(...)
+    await delta.add(vaccine).apply(db)
+"""
+
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Iterable
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.bulk_upsert import dialect_insert
+from src.models.analytics import FlockEconomicsSummary, OrgEconomicsTotals
+from src.models.feed import FeedConsumption, FeedPurchase
+from src.models.finance import Expense, Income
+from src.models.health import Medication, Vaccine
+from src.models.production import DailyProduction
+
+FLOCK_COLUMNS = (
+    "feed_kg",
+    "feed_rows",
+    "vaccine_cost",
+    "vaccine_rows",
+    "medication_cost",
+    "medication_rows",
+    "expense_amount",
+    "expense_rows",
+    "total_eggs",
+    "production_rows",
+)
+ORG_COLUMNS = (
+    "feed_purchase_cost",
+    "feed_purchase_kg",
+    "feed_purchase_rows",
+    "income_total",
+    "income_rows",
+)
+_INT_COLUMNS = frozenset(
+    {c for c in FLOCK_COLUMNS + ORG_COLUMNS if c.endswith("_rows")} | {"total_eggs"}
+)
+
+# Relative tolerance when comparing float sums in ``verify``
+DRIFT_TOLERANCE = 1e-6
+
+
+@dataclass(frozen=True)
+class _Source:
+    model: type
+    per_flock: bool
+    values: dict[str, str]  # source column → summary column
+    rows_column: str
+    required: tuple[str, ...] = ()  # rows only count when these are NOT NULL
+    soft_delete: bool = False
+
+
+SOURCES: dict[str, _Source] = {
+    "feed_consumption": _Source(
+        FeedConsumption, True, {"feed_kg": "feed_kg"}, "feed_rows"
+    ),
+    "vaccines": _Source(
+        Vaccine, True, {"cost": "vaccine_cost"}, "vaccine_rows", ("cost",)
+    ),
+    "medications": _Source(
+        Medication, True, {"cost": "medication_cost"}, "medication_rows", ("cost",)
+    ),
+    "expenses": _Source(
+        Expense, True, {"amount": "expense_amount"}, "expense_rows", ("flock_id",)
+    ),
+    "daily_production": _Source(
+        DailyProduction, True, {"total_eggs": "total_eggs"}, "production_rows"
+    ),
+    "feed_purchases": _Source(
+        FeedPurchase,
+        False,
+        {"total_cost": "feed_purchase_cost", "kg": "feed_purchase_kg"},
+        "feed_purchase_rows",
+        soft_delete=True,
+    ),
+    "incomes": _Source(Income, False, {"total": "income_total"}, "income_rows"),
+}
+
+# Scope key: a flock id, or None for the organization row
+_Scope = uuid.UUID | None
+
+
+def _contribution(source: _Source, row: Any) -> tuple[_Scope, dict[str, float]] | None:
+    """What one source row adds to the summaries, or None if it adds nothing."""
+    if any(getattr(row, col, None) is None for col in source.required):
+        return None
+    if source.soft_delete and getattr(row, "deleted_at", None) is not None:
+        return None
+    values = {dst: getattr(row, src) or 0 for src, dst in source.values.items()}
+    values[source.rows_column] = 1
+    return (row.flock_id if source.per_flock else None), values
+
+
+class EconomicsDelta:
+    """Accumulates summary changes for one organization, applied in one go.
+
+    ``add``/``remove`` read the row immediately, so ``remove`` must be called
+    before the ORM object is mutated.
+    """
+
+    def __init__(self, org_id: uuid.UUID) -> None:
+        self.org_id = org_id
+        self._deltas: dict[_Scope, dict[str, float]] = defaultdict(
+            lambda: defaultdict(float)
+        )
+
+    def _accumulate(self, row: Any, table: str | None, sign: int) -> "EconomicsDelta":
+        source = SOURCES.get(table or row.__tablename__)
+        if source is None:
+            return self
+        contribution = _contribution(source, row)
+        if contribution is not None:
+            scope, values = contribution
+            for col, val in values.items():
+                self._deltas[scope][col] += sign * val
+        return self
+
+    def add(self, row: Any, table: str | None = None) -> "EconomicsDelta":
+        return self._accumulate(row, table, 1)
+
+    def remove(self, row: Any, table: str | None = None) -> "EconomicsDelta":
+        return self._accumulate(row, table, -1)
+
+    def add_all(self, rows: Iterable[Any], table: str) -> "EconomicsDelta":
+        for row in rows:
+            self.add(row, table)
+        return self
+
+    def remove_all(self, rows: Iterable[Any], table: str) -> "EconomicsDelta":
+        for row in rows:
+            self.remove(row, table)
+        return self
+
+    async def apply(self, db: AsyncSession) -> None:
+        """Write the accumulated deltas (at most one statement per table)."""
+        flock_rows, org_values = [], None
+        for scope, values in self._deltas.items():
+            if not any(values.values()):
+                continue
+            if scope is None:
+                org_values = values
+            else:
+                flock_rows.append((scope, values))
+        self._deltas.clear()
+        if flock_rows or org_values is not None:
+            await _lock(db, self.org_id, shared=True)
+
+        if flock_rows:
+            await _upsert(
+                db,
+                FlockEconomicsSummary,
+                [
+                    {
+                        "flock_id": fid,
+                        "organization_id": self.org_id,
+                        **_full(v, FLOCK_COLUMNS),
+                    }
+                    for fid, v in flock_rows
+                ],
+                "flock_id",
+                FLOCK_COLUMNS,
+                increment=True,
+            )
+        if org_values is not None:
+            await _upsert(
+                db,
+                OrgEconomicsTotals,
+                [{"organization_id": self.org_id, **_full(org_values, ORG_COLUMNS)}],
+                "organization_id",
+                ORG_COLUMNS,
+                increment=True,
+            )
+
+
+async def _lock(db: AsyncSession, org_id: uuid.UUID, *, shared: bool) -> None:
+    """Transaction-scoped advisory lock on the organization's summaries."""
+    if db.get_bind().dialect.name != "postgresql":
+        return
+    lock = func.pg_advisory_xact_lock_shared if shared else func.pg_advisory_xact_lock
+    await db.execute(select(lock(func.hashtext(f"economics_summary:{org_id}"))))
+
+
+def _full(values: dict[str, float], columns: tuple[str, ...]) -> dict[str, Any]:
+    out = {}
+    for col in columns:
+        val = values.get(col, 0)
+        out[col] = int(round(val)) if col in _INT_COLUMNS else float(val)
+    return out
+
+
+async def _upsert(
+    db: AsyncSession,
+    model: type,
+    rows: list[dict[str, Any]],
+    key: str,
+    columns: tuple[str, ...],
+    *,
+    increment: bool,
+    extra: dict[str, Any] | None = None,
+) -> None:
+    """Multi-row upsert; ``increment`` adds to stored values instead of replacing."""
+    table = model.__table__
+    stmt = dialect_insert(db)(table).values(rows)
+    if increment:
+        set_ = {c: table.c[c] + stmt.excluded[c] for c in columns}
+    else:
+        set_ = {c: stmt.excluded[c] for c in columns}
+    set_["updated_at"] = func.now()
+    set_.update(extra or {})
+    await db.execute(stmt.on_conflict_do_update(index_elements=[key], set_=set_))
+
+
+async def load_rows(
+    db: AsyncSession, table: str, ids: Iterable[uuid.UUID]
+) -> list[Any]:
+    """Current state of ``ids`` in a source table (only the columns we need).
+
+    Lets set-based writers (sync) diff before/after without loading ORM
+    objects into the identity map.
+    """
+    source = SOURCES.get(table)
+    ids = list(ids)
+    if source is None or not ids:
+        return []
+    model = source.model
+    cols = {"id", *source.values, *source.required}
+    if source.per_flock:
+        cols.add("flock_id")
+    if source.soft_delete:
+        cols.add("deleted_at")
+    result = await db.execute(
+        select(*(model.__table__.c[c] for c in sorted(cols))).where(model.id.in_(ids))
+    )
+    return list(result.all())
+
+
+async def _recompute(
+    db: AsyncSession, org_id: uuid.UUID
+) -> tuple[dict[uuid.UUID, dict[str, Any]], dict[str, Any]]:
+    """Aggregate every source table from scratch (one GROUP BY per table)."""
+    flocks: dict[uuid.UUID, dict[str, Any]] = defaultdict(dict)
+    org: dict[str, Any] = {}
+    for source in SOURCES.values():
+        model = source.model
+        aggregates = [
+            func.sum(model.__table__.c[src]).label(dst)
+            for src, dst in source.values.items()
+        ]
+        stmt = select(*aggregates, func.count().label(source.rows_column)).where(
+            model.organization_id == org_id
+        )
+        for col in source.required:
+            stmt = stmt.where(model.__table__.c[col].isnot(None))
+        if source.soft_delete:
+            stmt = stmt.where(model.deleted_at.is_(None))
+        if source.per_flock:
+            stmt = stmt.add_columns(model.flock_id).group_by(model.flock_id)
+            for row in (await db.execute(stmt)).mappings():
+                flocks[row["flock_id"]].update(
+                    {k: v for k, v in row.items() if k != "flock_id"}
+                )
+        else:
+            org.update((await db.execute(stmt)).mappings().one())
+    return (
+        {fid: _full(_zeroed(vals), FLOCK_COLUMNS) for fid, vals in flocks.items()},
+        _full(_zeroed(org), ORG_COLUMNS),
+    )
+
+
+def _zeroed(values: dict[str, Any]) -> dict[str, Any]:
+    return {k: v or 0 for k, v in values.items()}
+
+
+async def rebuild(db: AsyncSession, org_id: uuid.UUID) -> dict[str, int]:
+    """Recompute both summaries for one organization, replacing stored values."""
+    await _lock(db, org_id, shared=False)
+    flocks, org = await _recompute(db, org_id)
+    stale = delete(FlockEconomicsSummary).where(
+        FlockEconomicsSummary.organization_id == org_id
+    )
+    if flocks:
+        stale = stale.where(FlockEconomicsSummary.flock_id.notin_(list(flocks)))
+    await db.execute(stale)
+    if flocks:
+        await _upsert(
+            db,
+            FlockEconomicsSummary,
+            [
+                {"flock_id": fid, "organization_id": org_id, **v}
+                for fid, v in flocks.items()
+            ],
+            "flock_id",
+            FLOCK_COLUMNS,
+            increment=False,
+        )
+    now = datetime.now(timezone.utc)
+    await _upsert(
+        db,
+        OrgEconomicsTotals,
+        [{"organization_id": org_id, "rebuilt_at": now, **org}],
+        "organization_id",
+        ORG_COLUMNS,
+        increment=False,
+        extra={"rebuilt_at": now},
+    )
+    return {"flocks": len(flocks)}
+
+
+def _drifted(stored: Any, expected: Any) -> bool:
+    stored, expected = stored or 0, expected or 0
+    return abs(stored - expected) > DRIFT_TOLERANCE * max(1.0, abs(expected))
+
+
+async def verify(db: AsyncSession, org_id: uuid.UUID) -> list[dict[str, Any]]:
+    """Compare stored summaries with a fresh recompute; returns drifted cells."""
+    flocks, org = await _recompute(db, org_id)
+    drift: list[dict[str, Any]] = []
+
+    result = await db.execute(
+        select(FlockEconomicsSummary)
+        .where(FlockEconomicsSummary.organization_id == org_id)
+        .execution_options(populate_existing=True)
+    )
+    stored_flocks = {s.flock_id: s for s in result.scalars().all()}
+    for fid in set(flocks) | set(stored_flocks):
+        stored, expected = stored_flocks.get(fid), flocks.get(fid, {})
+        for col in FLOCK_COLUMNS:
+            value = getattr(stored, col) if stored else None
+            if _drifted(value, expected.get(col)):
+                drift.append(
+                    {
+                        "flock_id": str(fid),
+                        "column": col,
+                        "stored": value,
+                        "expected": expected.get(col, 0),
+                    }
+                )
+
+    stored_org = await db.get(OrgEconomicsTotals, org_id, populate_existing=True)
+    for col in ORG_COLUMNS:
+        value = getattr(stored_org, col) if stored_org else None
+        if _drifted(value, org[col]):
+            drift.append(
+                {"flock_id": None, "column": col, "stored": value, "expected": org[col]}
+            )
+    return drift
@@ -1,14 +1,56 @@
+"""Outbound email through the Resend API.
+
+Messages are archived off the event loop (``email_archive.archive_later``)
+and handed to a bounded queue drained by ``SEND_CONCURRENCY`` workers that
+share one keep-alive ``httpx.AsyncClient``. Multi-recipient sends
+(``send_bulk``) go out as one batch API call per ``BATCH_SIZE`` messages;
+if Resend rejects a batch outright (one malformed address fails the whole
+call), its messages are resent one by one so only the bad ones fail.
+Rate-limited (429), 5xx and network failures are retried with exponential
+backoff, honouring ``Retry-After``.
+
+When the sender's queue is full, the caller sends inline through the same
+client. When the sender is not running (Celery tasks, scripts), each send
+uses a client scoped to the call, closed before the caller's event loop
+ends (one ``asyncio.run`` per task).
+"""
+
+import asyncio
 import logging
+import random
 import re
 import secrets
+from typing import Any, Iterable
 
 import httpx
 
 from src.config import settings
-from src.core.email_archive import archive_email
+from src.core.email_archive import archive_email, archive_later, flush_archive
 
 logger = logging.getLogger("egglogu.email")
 
+RESEND_URL = "https://api.resend.com"
+SEND_CONCURRENCY = 4
+SEND_QUEUE_SIZE = 500  # queued sends (a batch counts as one)
+BATCH_SIZE = 100  # Resend's batch API limit
+MAX_ATTEMPTS = 4
+RETRY_BASE_DELAY = 0.5  # seconds, doubled on each retry
+RETRY_MAX_DELAY = 30.0
+SEND_TIMEOUT = 10.0
+
+_client: httpx.AsyncClient | None = None
+_queue: asyncio.Queue | None = None
+_workers: list[asyncio.Task] = []
+_stats = {
+    "queued": 0,
+    "inline": 0,
+    "sent": 0,
+    "failed": 0,
+    "retries": 0,
+    "batches": 0,
+    "batch_fallbacks": 0,
+}
+
 
 def generate_token() -> str:
     return secrets.token_urlsafe(32)
@@ -18,30 +60,191 @@ def _strip_html(html: str) -> str:
     return re.sub(r"<[^>]+>", "", html).strip()
 
 
+def _new_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        base_url=RESEND_URL,
+        timeout=SEND_TIMEOUT,
+        limits=httpx.Limits(
+            max_connections=SEND_CONCURRENCY * 2,
+            max_keepalive_connections=SEND_CONCURRENCY,
+        ),
+    )
+
+
+def _http() -> httpx.AsyncClient:
+    """The sender's shared client; closed by ``stop_email_sender``."""
+    global _client
+    if _client is None:
+        _client = _new_client()
+    return _client
+
+
+def _message(to: str, subject: str, html: str) -> dict[str, Any]:
+    return {
+        "from": f"EGGlogU <noreply@{settings.EMAIL_FROM_DOMAIN}>",
+        "to": [to],
+        "subject": subject,
+        "html": html,
+    }
+
+
+def _retry_delay(attempt: int, retry_after: str | None) -> float:
+    try:
+        delay = float(retry_after) if retry_after else None
+    except ValueError:
+        delay = None
+    if delay is None:
+        delay = RETRY_BASE_DELAY * 2**attempt * random.uniform(1.0, 1.5)
+    return min(delay, RETRY_MAX_DELAY)
+
+
+async def _deliver(
+    client: httpx.AsyncClient,
+    path: str,
+    payload: Any,
+    count: int,
+    *,
+    fallback: bool = False,
+) -> str:
+    """POST to Resend with retries; ``count`` is the number of messages.
+
+    Returns ``"sent"``, ``"failed"`` or, when ``fallback`` is set and the
+    request was rejected outright (4xx other than 429), ``"rejected"``
+    without counting it as failed: the caller resends the messages.
+    """
+    headers = {"Authorization": f"Bearer {settings.RESEND_API_KEY}"}
+    error = ""
+    for attempt in range(MAX_ATTEMPTS):
+        retry_after = None
+        try:
+            resp = await client.post(path, json=payload, headers=headers)
+        except httpx.HTTPError as e:
+            error = str(e) or type(e).__name__
+        else:
+            if resp.status_code < 400:
+                _stats["sent"] += count
+                return "sent"
+            error = f"{resp.status_code}: {resp.text[:200]}"
+            if resp.status_code != 429 and resp.status_code < 500:
+                if fallback:
+                    logger.warning("Resend rejected a batch of %d: %s", count, error)
+                    return "rejected"
+                break  # rejected, retrying won't help
+            retry_after = resp.headers.get("retry-after")
+        if attempt + 1 < MAX_ATTEMPTS:
+            _stats["retries"] += 1
+            await asyncio.sleep(_retry_delay(attempt, retry_after))
+    _stats["failed"] += count
+    logger.error("Resend API error (%d emails): %s", count, error)
+    return "failed"
+
+
+async def _send_messages(
+    messages: list[dict[str, Any]], client: httpx.AsyncClient | None = None
+) -> None:
+    client = client or _http()
+    for i in range(0, len(messages), BATCH_SIZE):
+        chunk = messages[i : i + BATCH_SIZE]
+        if len(chunk) == 1:
+            await _deliver(client, "/emails", chunk[0], 1)
+            continue
+        _stats["batches"] += 1
+        outcome = await _deliver(
+            client, "/emails/batch", chunk, len(chunk), fallback=True
+        )
+        if outcome == "rejected":
+            # One bad address fails the whole batch: isolate it
+            _stats["batch_fallbacks"] += 1
+            for message in chunk:
+                await _deliver(client, "/emails", message, 1)
+
+
+async def _dispatch(messages: list[dict[str, Any]]) -> None:
+    if not messages or not settings.RESEND_API_KEY:
+        return
+    if _queue is not None:
+        try:
+            _queue.put_nowait(messages)
+            _stats["queued"] += len(messages)
+            return
+        except asyncio.QueueFull:
+            pass
+    _stats["inline"] += len(messages)
+    if _queue is None:
+        async with _new_client() as client:
+            await _send_messages(messages, client)
+    else:
+        await _send_messages(messages)
+
+
 async def _send_email(
     to: str, subject: str, html: str, tipo: str = "respuesta"
 ) -> None:
-    archive_email(tipo, to, subject, _strip_html(html))
-    if not settings.RESEND_API_KEY:
+    archive_later(archive_email, tipo, to, subject, _strip_html(html))
+    await _dispatch([_message(to, subject, html)])
+
+
+async def send_bulk(
+    recipients: Iterable[str], subject: str, html: str, tipo: str = "respuesta"
+) -> list[str]:
+    """Send the same email to each recipient as a separate message.
+
+    Blank and repeated addresses are skipped; returns the addresses used.
+    """
+    to = list(dict.fromkeys(r.strip() for r in recipients if r and r.strip()))
+    text = _strip_html(html)
+    for address in to:
+        archive_later(archive_email, tipo, address, subject, text)
+    await _dispatch([_message(address, subject, html) for address in to])
+    return to
+
+
+async def _run_worker() -> None:
+    while True:
+        messages = await _queue.get()
+        try:
+            await _send_messages(messages)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            _stats["failed"] += len(messages)
+            logger.error("Email worker error: %s", e)
+        finally:
+            _queue.task_done()
+
+
+def start_email_sender() -> None:
+    """Start this process's send queue and workers. Call at startup."""
+    global _queue
+    if _queue is not None:
         return
-    try:
-        async with httpx.AsyncClient(timeout=10) as client:
-            resp = await client.post(
-                "https://api.resend.com/emails",
-                headers={"Authorization": f"Bearer {settings.RESEND_API_KEY}"},
-                json={
-                    "from": f"EGGlogU <noreply@{settings.EMAIL_FROM_DOMAIN}>",
-                    "to": [to],
-                    "subject": subject,
-                    "html": html,
-                },
-            )
-            if resp.status_code >= 400:
-                logger.error(
-                    "Resend API error %s: %s", resp.status_code, resp.text[:200]
-                )
-    except Exception as e:
-        logger.error("Failed to send email to %s: %s", to, e)
+    _queue = asyncio.Queue(SEND_QUEUE_SIZE)
+    _workers.extend(asyncio.create_task(_run_worker()) for _ in range(SEND_CONCURRENCY))
+    logger.info("Email sender started")
+
+
+async def stop_email_sender(timeout: float = 10.0) -> None:
+    """Send what is queued (up to ``timeout`` seconds), then stop."""
+    global _queue, _client
+    if _queue is not None:
+        try:
+            await asyncio.wait_for(_queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Email sender stopped with %d sends queued", _queue.qsize())
+        for task in _workers:
+            task.cancel()
+        await asyncio.gather(*_workers, return_exceptions=True)
+        _workers.clear()
+        _queue = None
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+    await asyncio.to_thread(flush_archive)
+
+
+def email_stats() -> dict[str, int]:
+    """Queue depth and lifetime counters of this process's sender."""
+    return {"queue": _queue.qsize() if _queue is not None else 0, **_stats}
 
 
 async def send_verification_email(email: str, token: str) -> None:
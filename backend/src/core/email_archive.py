@@ -4,12 +4,17 @@ Archivado local de correos EGGlogU.
 Todo correo (contacto, ticket, verificación, bienvenida, recuperación,
 invitaciones, respuestas) se guarda en subcarpetas de CORREOS_DIR.
 Formato: {timestamp}_{email_sanitized}.txt
+
+Desde código async se archiva con ``archive_later``: la escritura corre en
+un hilo dedicado y nunca bloquea el event loop.
 """
 
 import logging
 import re
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from pathlib import Path
+from typing import Any, Callable
 
 from src.config import settings
 
@@ -26,16 +31,36 @@ SUBCARPETAS = {
 }
 
 
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="email-archive")
+_ready_dirs: set[Path] = set()
+
+
 def _sanitize(text: str) -> str:
     return re.sub(r"[^\w\-.]", "_", text)[:80]
 
 
 def _ensure_dir(subcarpeta: str) -> Path:
     path = Path(settings.CORREOS_DIR) / subcarpeta
-    path.mkdir(parents=True, exist_ok=True)
+    if path not in _ready_dirs:
+        path.mkdir(parents=True, exist_ok=True)
+        _ready_dirs.add(path)
     return path
 
 
+def archive_later(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> None:
+    """Encola ``fn(*args, **kwargs)`` (un ``archive_*``) en el hilo de archivo.
+
+    No espera la escritura: el archivado es best-effort y sus errores se
+    registran en el log.
+    """
+    _executor.submit(fn, *args, **kwargs)
+
+
+def flush_archive() -> None:
+    """Bloquea hasta que se escriban los archivos encolados (shutdown, tests)."""
+    _executor.submit(lambda: None).result()
+
+
 def archive_email(
     tipo: str,
     to: str,
@@ -70,6 +95,7 @@ def archive_email(
         filepath.write_text("\n".join(lines), encoding="utf-8")
         return str(filepath)
     except Exception:
+        _ready_dirs.clear()  # the folder may have been removed
         logger.exception("Failed to archive email tipo=%s to=%s", tipo, to)
         return None
 
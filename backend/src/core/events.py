@@ -1,18 +1,54 @@
 """Redis Pub/Sub event system for real-time notifications.
 
 Publishes domain events (production, health, alerts, IoT) to Redis channels.
-WebSocket manager subscribes and pushes to connected clients.
+The WebSocket hub (``src.core.ws_hub``) subscribes and pushes to connected
+clients.
+
+Every event is also appended to a Redis Stream per farm and per org
+(``eventlog:farm:{id}`` / ``eventlog:org:{id}``, capped at
+``FARM_LOG_MAXLEN`` / ``ORG_LOG_MAXLEN`` entries and dropped after
+``EVENT_LOG_TTL`` idle seconds). The append and the publish happen in one
+Lua call, and the published frame carries the stream entry ID as ``id``,
+so a reconnecting client can pass its last ``id`` and ``replay`` returns
+what it missed. IDs are per log: the same event has different IDs on its
+farm and org channels.
 """
 
 import json
 import logging
+import re
 from datetime import datetime, timezone
-from typing import Any
+from typing import Any, Callable
 
-from src.core.rate_limit import _redis
+from src.core import rate_limit
 
 logger = logging.getLogger("egglogu.events")
 
+FARM_LOG_MAXLEN = 1_000
+ORG_LOG_MAXLEN = 5_000
+EVENT_LOG_TTL = 86_400  # seconds
+REPLAY_MAX = 1_000
+
+_EVENT_ID = re.compile(r"^\d+-\d+$")
+
+# KEYS: event logs. ARGV: payload, TTL ms, then (maxlen, channel) per log.
+# Appends the payload to each log and publishes it with the new entry ID.
+_PUBLISH_LUA = """
+local payload = ARGV[1]
+local body = string.sub(payload, 2)
+local delivered = 0
+for i = 1, #KEYS do
+    local id = redis.call('XADD', KEYS[i], 'MAXLEN', '~', ARGV[1 + 2 * i], '*', 'e', payload)
+    redis.call('PEXPIRE', KEYS[i], ARGV[2])
+    delivered = delivered + redis.call('PUBLISH', ARGV[2 + 2 * i], '{"id":"' .. id .. '",' .. body)
+end
+return delivered
+"""
+_script = None
+
+# In-process listeners: called with (event_type, farm_id, org_id)
+_listeners: list[Callable[[str, str | None, str | None], None]] = []
+
 
 # ─── Event Types ─────────────────────────────────────────────────────
 
@@ -33,28 +69,79 @@ class EventType:
     OUTBREAK_ALERT = "outbreak.alert"
 
 
-def _channel_for_farm(farm_id: str) -> str:
+def channel_for_farm(farm_id: str) -> str:
     """Redis channel name for a farm's events."""
     return f"events:farm:{farm_id}"
 
 
-def _channel_for_org(org_id: str) -> str:
+def channel_for_org(org_id: str) -> str:
     """Redis channel name for org-wide events."""
     return f"events:org:{org_id}"
 
 
+def channel_for_chat(room_id: str) -> str:
+    """Redis channel name for a chat room's messages."""
+    return f"chat:{room_id}"
+
+
+def log_for_farm(farm_id: str) -> str:
+    """Redis Stream holding a farm's recent events."""
+    return f"eventlog:farm:{farm_id}"
+
+
+def log_for_org(org_id: str) -> str:
+    """Redis Stream holding an org's recent events."""
+    return f"eventlog:org:{org_id}"
+
+
+def event_id_key(event_id: str) -> tuple[int, int]:
+    """Sortable form of a stream entry ID (``"1718000000000-3"``)."""
+    ms, _, seq = event_id.partition("-")
+    return int(ms), int(seq or 0)
+
+
+def _with_id(event_id: str, payload: str) -> str:
+    return f'{{"id":"{event_id}",{payload[1:]}'
+
+
+def add_listener(listener: Callable[[str, str | None, str | None], None]) -> None:
+    """Call ``listener(event_type, farm_id, org_id)`` on every local publish."""
+    if listener not in _listeners:
+        _listeners.append(listener)
+
+
+def remove_listener(listener: Callable[[str, str | None, str | None], None]) -> None:
+    if listener in _listeners:
+        _listeners.remove(listener)
+
+
+def _publish_script(redis):
+    global _script
+    if _script is None or _script.registered_client is not redis:
+        _script = redis.register_script(_PUBLISH_LUA)
+    return _script
+
+
 async def publish_event(
     event_type: str,
     farm_id: str | None = None,
     org_id: str | None = None,
     data: dict[str, Any] | None = None,
 ) -> None:
-    """Publish a domain event to Redis Pub/Sub.
+    """Publish a domain event to Redis Pub/Sub and the event logs.
 
     Events are published to both farm-specific and org-wide channels
-    so WebSocket clients can subscribe at either granularity.
+    so WebSocket clients can subscribe at either granularity. In-process
+    listeners (``add_listener``) are called first, with or without Redis.
     """
-    if _redis is None:
+    for listener in _listeners:
+        try:
+            listener(event_type, farm_id, org_id)
+        except Exception as e:
+            logger.warning("Event listener failed for %s: %s", event_type, e)
+
+    redis = rate_limit._redis  # read at call time: set by init_redis() at startup
+    if redis is None:
         logger.debug("Event not published (Redis unavailable): %s", event_type)
         return
 
@@ -68,39 +155,48 @@ async def publish_event(
         }
     )
 
+    keys: list[str] = []
+    args: list[Any] = [payload, EVENT_LOG_TTL * 1000]
+    if farm_id:
+        keys.append(log_for_farm(farm_id))
+        args += [FARM_LOG_MAXLEN, channel_for_farm(farm_id)]
+    if org_id:
+        keys.append(log_for_org(org_id))
+        args += [ORG_LOG_MAXLEN, channel_for_org(org_id)]
+    if not keys:
+        return
+
     try:
-        published = 0
-        if farm_id:
-            published += await _redis.publish(_channel_for_farm(farm_id), payload)
-        if org_id:
-            published += await _redis.publish(_channel_for_org(org_id), payload)
+        published = await _publish_script(redis)(keys=keys, args=args)
         logger.debug("Event %s published to %d subscribers", event_type, published)
     except Exception as e:
         logger.warning("Failed to publish event %s: %s", event_type, e)
 
 
-async def subscribe_farm(farm_id: str):
-    """Return a Redis Pub/Sub subscription for a farm's event channel."""
-    if _redis is None:
-        return None
-    pubsub = _redis.pubsub()
-    await pubsub.subscribe(_channel_for_farm(farm_id))
-    return pubsub
+async def replay(log_key: str, last_event_id: str) -> tuple[list[str], bool]:
+    """Frames logged after ``last_event_id``, oldest first.
 
-
-async def subscribe_org(org_id: str):
-    """Return a Redis Pub/Sub subscription for an org's event channel."""
-    if _redis is None:
-        return None
-    pubsub = _redis.pubsub()
-    await pubsub.subscribe(_channel_for_org(org_id))
-    return pubsub
-
-
-async def subscribe_chat(room_id: str):
-    """Return a Redis Pub/Sub subscription for a chat room channel."""
-    if _redis is None:
-        return None
-    pubsub = _redis.pubsub()
-    await pubsub.subscribe(f"chat:{room_id}")
-    return pubsub
+    Returns:
+        ``(frames, complete)``. ``complete`` is False when the gap cannot be
+        filled (the log was trimmed or expired past ``last_event_id``, or it
+        holds more than ``REPLAY_MAX`` newer events); the client must then
+        refetch instead.
+    """
+    if not _EVENT_ID.match(last_event_id or ""):
+        return [], False
+    redis = rate_limit._redis
+    if redis is None:
+        return [], True
+    try:
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.xrange(log_key, "-", "+", count=1)
+            pipe.xrange(log_key, f"({last_event_id}", "+", count=REPLAY_MAX + 1)
+            oldest, entries = await pipe.execute()
+    except Exception as e:
+        logger.warning("Event replay failed (%s): %s", log_key, e)
+        return [], False
+    if not oldest or event_id_key(oldest[0][0]) > event_id_key(last_event_id):
+        return [], False
+    if len(entries) > REPLAY_MAX:
+        return [], False
+    return [_with_id(entry_id, fields["e"]) for entry_id, fields in entries], True
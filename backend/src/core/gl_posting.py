@@ -5,6 +5,22 @@ Every Income, Expense, Inventory movement, and Feed purchase gets a correspondin
 double-entry journal entry in the General Ledger. This is the bridge between
 operational modules and the accounting engine.
 
+Posting an entry costs a constant number of round trips, whatever its size:
+
+- Chart of accounts: per-org ``code → (id, normal balance)`` map held in the
+  shared cache and invalidated on CoA edits (``invalidate_chart_of_accounts``).
+- Entry numbers: ``allocate_entry_numbers`` bumps a per-org counter row with
+  ``UPDATE ... RETURNING``; the row lock serializes posters and a rollback
+  returns the numbers, so JE numbers stay gapless.
+- Balances: ``apply_balance_deltas`` aggregates every line per
+  (account, period) and applies them with one ``INSERT ... ON CONFLICT``.
+- ``post_many`` posts a whole backfill with one numbering call, one
+  executemany per table and one balance upsert.
+
+Entries dated inside a closed (snapshotted) period are re-dated to the
+first day after it, with the original date kept in ``memo``: the frozen
+balances of a closed period never change.
+
 Usage:
     from src.core.gl_posting import GLPostingService
     service = GLPostingService(db, org_id, user_id)
@@ -14,13 +30,18 @@ Usage:
 """
 
 import uuid
-from datetime import date, datetime
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
 from decimal import Decimal
-from typing import Optional
+from typing import Iterable, Optional
 
-from sqlalchemy import select
+from sqlalchemy import insert, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.core import ledger_snapshots
+from src.core.bulk_upsert import dialect_insert
+from src.core.cache import entity_tag, get_or_compute, invalidate_tags
 from src.models.accounting import (
     Account,
     AccountBalance,
@@ -29,10 +50,197 @@ from src.models.accounting import (
     JournalEntryLine,
     JournalEntrySource,
     JournalEntryStatus,
+    JournalSequence,
     NormalBalance,
     PeriodStatus,
 )
-from sqlalchemy import func
+
+COA_CACHE_TTL = 3600
+ENTRY_NUMBER_PREFIX = "JE-"
+_ZERO = Decimal("0.00")
+
+
+# ── Chart of accounts cache ─────────────────────────────────────────────
+
+
+def _coa_key(org_id: uuid.UUID) -> str:
+    return f"gl:coa:{org_id}"
+
+
+def _coa_tag(org_id: uuid.UUID) -> str:
+    return entity_tag(org_id, "gl_accounts")
+
+
+async def chart_of_accounts(
+    db: AsyncSession, org_id: uuid.UUID
+) -> dict[str, tuple[uuid.UUID, NormalBalance]]:
+    """Active accounts of the org as ``{code: (account_id, normal_balance)}``."""
+
+    async def _load() -> dict[str, list[str]]:
+        result = await db.execute(
+            select(Account.code, Account.id, Account.normal_balance).where(
+                Account.organization_id == org_id,
+                Account.is_active.is_(True),
+            )
+        )
+        return {code: [str(aid), normal.value] for code, aid, normal in result.all()}
+
+    cached = await get_or_compute(
+        _coa_key(org_id), _load, ttl=COA_CACHE_TTL, tags=[_coa_tag(org_id)]
+    )
+    return {
+        code: (uuid.UUID(aid), NormalBalance(normal))
+        for code, (aid, normal) in cached.items()
+    }
+
+
+async def invalidate_chart_of_accounts(org_id: uuid.UUID) -> None:
+    """Drop the cached CoA after accounts are created, edited or seeded."""
+    await invalidate_tags(_coa_tag(org_id))
+
+
+async def _normal_balances(
+    db: AsyncSession, org_id: uuid.UUID, account_ids: Iterable[uuid.UUID]
+) -> dict[uuid.UUID, NormalBalance]:
+    """Normal balance per account id — CoA cache first, one query for the rest."""
+    normals = {
+        aid: normal for aid, normal in (await chart_of_accounts(db, org_id)).values()
+    }
+    missing = set(account_ids) - normals.keys()
+    if missing:
+        result = await db.execute(
+            select(Account.id, Account.normal_balance).where(Account.id.in_(missing))
+        )
+        normals.update(dict(result.all()))
+    return normals
+
+
+# ── Entry numbering ─────────────────────────────────────────────────────
+
+
+async def _highest_entry_number(db: AsyncSession, org_id: uuid.UUID) -> int:
+    """Largest JE number already issued (seeds a new counter row)."""
+    result = await db.execute(
+        select(JournalEntry.entry_number).where(
+            JournalEntry.organization_id == org_id,
+            JournalEntry.entry_number.like(f"{ENTRY_NUMBER_PREFIX}%"),
+        )
+    )
+    highest = 0
+    for number in result.scalars():
+        suffix = number[len(ENTRY_NUMBER_PREFIX) :]
+        if suffix.isdigit():
+            highest = max(highest, int(suffix))
+    return highest
+
+
+async def allocate_entry_numbers(
+    db: AsyncSession, org_id: uuid.UUID, count: int = 1
+) -> list[str]:
+    """Reserve ``count`` consecutive entry numbers: JE-000001, JE-000002, ...
+
+    The counter row stays locked until the caller's transaction ends.
+    """
+    seq = JournalSequence.__table__
+    bump = (
+        update(seq)
+        .where(seq.c.organization_id == org_id)
+        .values(last_number=seq.c.last_number + count)
+        .returning(seq.c.last_number)
+    )
+    last = (await db.execute(bump)).scalar_one_or_none()
+    if last is None:
+        await db.execute(
+            dialect_insert(db)(seq)
+            .values(
+                organization_id=org_id,
+                last_number=await _highest_entry_number(db, org_id),
+            )
+            .on_conflict_do_nothing(index_elements=["organization_id"])
+        )
+        last = (await db.execute(bump)).scalar_one()
+    return [f"{ENTRY_NUMBER_PREFIX}{n:06d}" for n in range(last - count + 1, last + 1)]
+
+
+# ── Balances ────────────────────────────────────────────────────────────
+
+
+async def apply_balance_deltas(
+    db: AsyncSession,
+    org_id: uuid.UUID,
+    lines: Iterable[tuple[uuid.UUID, uuid.UUID, Decimal, Decimal]],
+) -> None:
+    """Add ``(account_id, period_id, debit, credit)`` lines to AccountBalance.
+
+    Lines are summed per (account, period) and written with a single
+    ``INSERT ... ON CONFLICT DO UPDATE`` that increments the totals.
+    Periods holding a frozen snapshot (see ``ledger_snapshots``) are left
+    untouched.
+    """
+    totals: dict[tuple[uuid.UUID, uuid.UUID], list[Decimal]] = defaultdict(
+        lambda: [_ZERO, _ZERO]
+    )
+    for account_id, period_id, debit, credit in lines:
+        if period_id is None:
+            continue
+        pair = totals[(account_id, period_id)]
+        pair[0] += debit
+        pair[1] += credit
+    if not totals:
+        return
+    frozen = set(
+        (
+            await db.execute(
+                select(FiscalPeriod.id).where(
+                    FiscalPeriod.id.in_({pid for _, pid in totals}),
+                    FiscalPeriod.snapshot_at.is_not(None),
+                )
+            )
+        ).scalars()
+    )
+    totals = {k: v for k, v in totals.items() if k[1] not in frozen}
+    if not totals:
+        return
+
+    normals = await _normal_balances(db, org_id, {aid for aid, _ in totals})
+    rows = []
+    for (account_id, period_id), (debit, credit) in totals.items():
+        net = debit - credit
+        rows.append(
+            {
+                "id": uuid.uuid4(),
+                "organization_id": org_id,
+                "account_id": account_id,
+                "period_id": period_id,
+                "debit_total": debit,
+                "credit_total": credit,
+                "balance": net if normals[account_id] == NormalBalance.DEBIT else -net,
+            }
+        )
+
+    table = AccountBalance.__table__
+    stmt = dialect_insert(db)(table).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["organization_id", "account_id", "period_id"],
+        set_={
+            "debit_total": table.c.debit_total + stmt.excluded.debit_total,
+            "credit_total": table.c.credit_total + stmt.excluded.credit_total,
+            "balance": table.c.balance + stmt.excluded.balance,
+            "updated_at": datetime.utcnow(),
+        },
+    )
+    await db.execute(stmt)
+
+
+@dataclass
+class PostingRequest:
+    """One entry for ``GLPostingService.post_many``."""
+
+    txn_date: date
+    description: str
+    source: JournalEntrySource
+    source_id: uuid.UUID
+    lines: list[tuple[str, Decimal, Decimal]]  # (account_code, debit, credit)
 
 
 class GLPostingService:
@@ -48,35 +256,37 @@ class GLPostingService:
         self.org_id = organization_id
         self.user_id = user_id
 
-    async def _next_entry_number(self) -> str:
-        result = await self.db.execute(
-            select(func.count(JournalEntry.id)).where(
-                JournalEntry.organization_id == self.org_id
-            )
-        )
-        count = result.scalar() or 0
-        return f"JE-{count + 1:06d}"
-
-    async def _find_account_by_code(self, code: str) -> Optional[Account]:
-        result = await self.db.execute(
-            select(Account).where(
-                Account.organization_id == self.org_id,
-                Account.code == code,
-                Account.is_active.is_(True),
-            )
-        )
-        return result.scalar_one_or_none()
-
-    async def _find_open_period(self, txn_date: date) -> Optional[uuid.UUID]:
+    async def _open_periods(self) -> list[tuple[uuid.UUID, date, date]]:
         result = await self.db.execute(
-            select(FiscalPeriod.id).where(
+            select(
+                FiscalPeriod.id, FiscalPeriod.start_date, FiscalPeriod.end_date
+            ).where(
                 FiscalPeriod.organization_id == self.org_id,
                 FiscalPeriod.status == PeriodStatus.OPEN,
-                FiscalPeriod.start_date <= txn_date,
-                FiscalPeriod.end_date >= txn_date,
             )
         )
-        return result.scalar_one_or_none()
+        return list(result.all())
+
+    @staticmethod
+    def _outside_frozen(frozen: list[tuple[date, date]], day: date) -> date:
+        """``day``, or the first day after the closed period(s) holding it.
+
+        ``frozen`` is sorted by start date, so back-to-back closed periods
+        push the date through all of them.
+        """
+        for start, end in frozen:
+            if start <= day <= end:
+                day = end + timedelta(days=1)
+        return day
+
+    @staticmethod
+    def _period_for(
+        periods: list[tuple[uuid.UUID, date, date]], txn_date: date
+    ) -> Optional[uuid.UUID]:
+        for period_id, start, end in periods:
+            if start <= txn_date <= end:
+                return period_id
+        return None
 
     async def _create_and_post(
         self,
@@ -93,91 +303,87 @@ class GLPostingService:
         Returns:
             The posted JournalEntry, or None if accounts not found.
         """
-        period_id = await self._find_open_period(txn_date)
-        entry_number = await self._next_entry_number()
-
-        total_debit = sum(d for _, d, _ in lines)
-        total_credit = sum(c for _, _, c in lines)
-
-        entry = JournalEntry(
-            organization_id=self.org_id,
-            entry_number=entry_number,
-            date=txn_date,
-            description=description,
-            source=source,
-            source_id=source_id,
-            period_id=period_id,
-            total_debit=total_debit,
-            total_credit=total_credit,
-            status=JournalEntryStatus.POSTED,
-            posted_at=datetime.utcnow(),
-            posted_by=self.user_id,
+        posted = await self.post_many(
+            [PostingRequest(txn_date, description, source, source_id, lines)]
         )
-        self.db.add(entry)
-        await self.db.flush()
+        return posted[0]
 
-        for code, debit, credit in lines:
-            account = await self._find_account_by_code(code)
-            if not account:
-                # Account not in CoA — skip this entry silently
-                # (org hasn't seeded CoA yet)
-                return None
+    async def post_many(
+        self, requests: list[PostingRequest]
+    ) -> list[Optional[JournalEntry]]:
+        """Post many entries with a fixed number of statements (backfills).
 
-            line = JournalEntryLine(
-                organization_id=self.org_id,
-                journal_entry_id=entry.id,
-                account_id=account.id,
-                debit=debit,
-                credit=credit,
-            )
-            self.db.add(line)
-
-            # Update materialized balances
-            if period_id:
-                await self._update_balance(account.id, period_id, debit, credit)
-
-        await self.db.flush()
-        return entry
-
-    async def _update_balance(
-        self,
-        account_id: uuid.UUID,
-        period_id: uuid.UUID,
-        debit: Decimal,
-        credit: Decimal,
-    ):
-        result = await self.db.execute(
-            select(AccountBalance).where(
-                AccountBalance.organization_id == self.org_id,
-                AccountBalance.account_id == account_id,
-                AccountBalance.period_id == period_id,
+        Entries referencing an account code missing from the CoA are skipped
+        (org hasn't seeded its CoA yet) and come back as None; the rest get
+        consecutive entry numbers in request order.
+        """
+        coa = await chart_of_accounts(self.db, self.org_id)
+        postable = [all(code in coa for code, _, _ in r.lines) for r in requests]
+        if not any(postable):
+            return [None] * len(requests)
+
+        periods = await self._open_periods()
+        frozen = sorted(
+            (start, end)
+            for _, start, end in await ledger_snapshots.frozen_periods(
+                self.db, self.org_id, None, date.max
             )
         )
-        balance = result.scalar_one_or_none()
-
-        if not balance:
-            balance = AccountBalance(
+        numbers = iter(
+            await allocate_entry_numbers(self.db, self.org_id, sum(postable))
+        )
+        now = datetime.utcnow()
+
+        out: list[Optional[JournalEntry]] = []
+        line_rows: list[dict] = []
+        deltas: list[tuple[uuid.UUID, uuid.UUID, Decimal, Decimal]] = []
+        for request, ok in zip(requests, postable):
+            if not ok:
+                out.append(None)
+                continue
+            txn_date = self._outside_frozen(frozen, request.txn_date)
+            period_id = self._period_for(periods, txn_date)
+            entry = JournalEntry(
+                id=uuid.uuid4(),
                 organization_id=self.org_id,
-                account_id=account_id,
+                entry_number=next(numbers),
+                date=txn_date,
+                description=request.description,
+                memo=(
+                    f"Originally dated {request.txn_date.isoformat()} (closed period)"
+                    if txn_date != request.txn_date
+                    else None
+                ),
+                source=request.source,
+                source_id=request.source_id,
                 period_id=period_id,
-                debit_total=Decimal("0.00"),
-                credit_total=Decimal("0.00"),
-                balance=Decimal("0.00"),
+                total_debit=sum(d for _, d, _ in request.lines),
+                total_credit=sum(c for _, _, c in request.lines),
+                status=JournalEntryStatus.POSTED,
+                posted_at=now,
+                posted_by=self.user_id,
             )
-            self.db.add(balance)
+            self.db.add(entry)
+            out.append(entry)
+            for code, debit, credit in request.lines:
+                account_id = coa[code][0]
+                line_rows.append(
+                    {
+                        "id": uuid.uuid4(),
+                        "organization_id": self.org_id,
+                        "journal_entry_id": entry.id,
+                        "account_id": account_id,
+                        "debit": debit,
+                        "credit": credit,
+                    }
+                )
+                deltas.append((account_id, period_id, debit, credit))
 
-        balance.debit_total += debit
-        balance.credit_total += credit
-
-        # Get normal balance
-        acct = await self.db.execute(
-            select(Account.normal_balance).where(Account.id == account_id)
-        )
-        normal = acct.scalar_one()
-        if normal == NormalBalance.DEBIT:
-            balance.balance = balance.debit_total - balance.credit_total
-        else:
-            balance.balance = balance.credit_total - balance.debit_total
+        await self.db.flush()
+        await self.db.execute(insert(JournalEntryLine), line_rows)
+        await apply_balance_deltas(self.db, self.org_id, deltas)
+        await invalidate_tags(entity_tag(self.org_id, "general_ledger"))
+        return out
 
     # ══════════════════════════════════════════════════════════════════════
     # CORE BUSINESS EVENT HANDLERS (product-agnostic)
@@ -0,0 +1,328 @@
+"""Buffered ingest gateway for high-rate IoT sensor frames.
+
+Gateways post compressed frames of many readings (HTTP or WebSocket)
+instead of one request per reading. Each frame is decoded, validated and
+appended to a bounded in-process buffer; a background flusher writes the
+buffer through ``iot_timeseries.ingest`` in batches of up to ``FLUSH_SIZE``
+readings or every ``FLUSH_INTERVAL_SECONDS``, one short transaction per
+organization, and publishes a single ``EventType.IOT_READING`` per
+organization per flush.
+
+Backpressure: a frame that would push an organization past
+``MAX_BUFFERED_PER_ORG`` is refused with 429, and one that would push the
+whole buffer past ``MAX_BUFFERED`` with 503; both carry a ``retry_after``
+estimated from the flush rate. Frames are accepted or refused whole.
+
+A failed write puts the organization's readings back at the tail of the
+buffer; after ``MAX_WRITE_ATTEMPTS`` failures they are dropped (logged and
+counted in ``dropped``) so one poisoned batch cannot block every tenant.
+
+Frame encodings: ``identity``, ``gzip`` and ``zstd`` (needs the optional
+``zstandard`` package). Payloads: NDJSON or msgpack (optional ``msgpack``
+package), one reading object per record or a single array of readings.
+
+Usage:
+    from src.core import iot_gateway
+    readings = iot_gateway.decode_frame(body, "gzip", "application/x-ndjson")
+    iot_gateway.offer(org_id, readings)
+"""
+
+import asyncio
+import io
+import json
+import logging
+import math
+import uuid
+import zlib
+from collections import Counter, defaultdict, deque
+from typing import Any, Callable
+
+from pydantic import ValidationError
+
+from src.core import iot_timeseries
+from src.core.events import EventType, publish_event
+from src.schemas.environment import IoTReadingCreate
+
+logger = logging.getLogger("egglogu.iot_gateway")
+
+FLUSH_SIZE = 2_000
+FLUSH_INTERVAL_SECONDS = 1.0
+MAX_BUFFERED = 100_000
+MAX_BUFFERED_PER_ORG = 20_000
+MAX_FRAME_BYTES = 8 * 1024 * 1024  # after decompression
+MAX_FRAME_READINGS = 20_000
+MAX_WRITE_ATTEMPTS = 5
+
+NDJSON_TYPES = frozenset(
+    {"application/x-ndjson", "application/ndjson", "application/jsonl"}
+)
+MSGPACK_TYPES = frozenset({"application/msgpack", "application/x-msgpack"})
+
+
+class FrameError(ValueError):
+    """Malformed frame (400)."""
+
+
+class UnsupportedFrame(FrameError):
+    """Unknown or unavailable encoding / payload format (415)."""
+
+
+class GatewayBusy(Exception):
+    """Buffer saturated: 429 (organization share) or 503 (whole buffer)."""
+
+    def __init__(self, status_code: int, retry_after: int):
+        super().__init__(f"ingest buffer saturated, retry in {retry_after}s")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+# ── Decoding ─────────────────────────────────────────────────────────
+
+
+def _decompress(body: bytes, encoding: str | None) -> bytes:
+    encoding = (encoding or "identity").strip().lower()
+    if encoding in ("identity", ""):
+        data = body
+    elif encoding in ("gzip", "x-gzip"):
+        inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        try:
+            data = inflater.decompress(body, MAX_FRAME_BYTES + 1)
+        except zlib.error as e:
+            raise FrameError(f"invalid gzip frame: {e}")
+    elif encoding == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise UnsupportedFrame("zstd frames are not supported on this server")
+        try:
+            reader = zstandard.ZstdDecompressor().stream_reader(io.BytesIO(body))
+            data = reader.read(MAX_FRAME_BYTES + 1)
+        except zstandard.ZstdError as e:
+            raise FrameError(f"invalid zstd frame: {e}")
+    else:
+        raise UnsupportedFrame(f"unsupported content encoding {encoding!r}")
+    if len(data) > MAX_FRAME_BYTES:
+        raise FrameError(f"frame exceeds {MAX_FRAME_BYTES} bytes uncompressed")
+    return data
+
+
+def _records(data: bytes, content_type: str | None) -> list[Any]:
+    media = (content_type or "application/x-ndjson").split(";")[0].strip().lower()
+    if media in MSGPACK_TYPES:
+        try:
+            import msgpack
+        except ImportError:
+            raise UnsupportedFrame("msgpack frames are not supported on this server")
+        try:
+            records = list(msgpack.Unpacker(io.BytesIO(data), raw=False))
+        except Exception as e:
+            raise FrameError(f"invalid msgpack frame: {e}")
+    elif media in NDJSON_TYPES or media == "application/json":
+        try:
+            records = [json.loads(line) for line in data.splitlines() if line.strip()]
+        except ValueError as e:
+            raise FrameError(f"invalid NDJSON frame: {e}")
+    else:
+        raise UnsupportedFrame(f"unsupported content type {media!r}")
+    if len(records) == 1 and isinstance(records[0], list):
+        records = records[0]
+    return records
+
+
+def decode_frame(
+    body: bytes, encoding: str | None, content_type: str | None
+) -> list[dict[str, Any]]:
+    """Decompress, parse and validate a frame into reading dicts.
+
+    Raises:
+        FrameError: malformed frame or invalid reading (whole frame refused).
+        UnsupportedFrame: unknown encoding or payload format.
+    """
+    records = _records(_decompress(body, encoding), content_type)
+    if not records:
+        raise FrameError("empty frame")
+    if len(records) > MAX_FRAME_READINGS:
+        raise FrameError(f"frame has more than {MAX_FRAME_READINGS} readings")
+    readings = []
+    for index, record in enumerate(records):
+        try:
+            readings.append(IoTReadingCreate.model_validate(record).model_dump())
+        except ValidationError as e:
+            raise FrameError(f"reading {index}: {e.errors()[0]['msg']}")
+    return readings
+
+
+# ── Buffer ───────────────────────────────────────────────────────────
+
+# (org_id, reading, failed write attempts)
+_queue: deque[tuple[str, dict[str, Any], int]] = deque()
+_per_org: Counter[str] = Counter()
+_wakeup: asyncio.Event | None = None
+_flusher_task: asyncio.Task | None = None
+_stats = {
+    "accepted": 0,
+    "written": 0,
+    "rejected": 0,
+    "flushes": 0,
+    "write_errors": 0,
+    "dropped": 0,
+}
+
+
+def running() -> bool:
+    """Whether this process buffers frames (else callers write inline)."""
+    return _flusher_task is not None
+
+
+def _retry_after(depth: int) -> int:
+    return max(1, math.ceil(depth / FLUSH_SIZE * FLUSH_INTERVAL_SECONDS))
+
+
+def offer(org_id: str, readings: list[dict[str, Any]]) -> int:
+    """Buffer a decoded frame for ``org_id``; returns the readings accepted.
+
+    Raises:
+        GatewayBusy: the frame does not fit; nothing was buffered.
+    """
+    count = len(readings)
+    if _per_org[org_id] + count > MAX_BUFFERED_PER_ORG:
+        _stats["rejected"] += count
+        raise GatewayBusy(429, _retry_after(_per_org[org_id]))
+    if len(_queue) + count > MAX_BUFFERED:
+        _stats["rejected"] += count
+        raise GatewayBusy(503, _retry_after(len(_queue)))
+    _queue.extend((org_id, reading, 0) for reading in readings)
+    _per_org[org_id] += count
+    _stats["accepted"] += count
+    if _wakeup is not None and len(_queue) >= FLUSH_SIZE:
+        _wakeup.set()
+    return count
+
+
+def _default_session_factory():
+    from src.database import async_session
+
+    return async_session()
+
+
+async def _write(
+    session_factory: Callable[[], Any], org_id: str, readings: list
+) -> None:
+    from src.database import set_tenant_context
+
+    async with session_factory() as db:
+        await set_tenant_context(db, org_id)
+        await iot_timeseries.ingest(db, uuid.UUID(org_id), readings)
+        await db.commit()
+
+
+def _release(org_id: str, count: int) -> None:
+    _per_org[org_id] -= count
+    if _per_org[org_id] <= 0:
+        del _per_org[org_id]
+
+
+async def flush_ingest_buffer(
+    session_factory: Callable[[], Any] = _default_session_factory,
+) -> int:
+    """Write up to ``FLUSH_SIZE`` buffered readings; returns how many.
+
+    On a failed write the organization's readings go back to the tail of
+    the buffer; those that already failed ``MAX_WRITE_ATTEMPTS`` times are
+    dropped.
+    """
+    batch: list[tuple[str, dict[str, Any], int]] = []
+    while _queue and len(batch) < FLUSH_SIZE:
+        batch.append(_queue.popleft())
+    if not batch:
+        return 0
+
+    by_org: dict[str, list[tuple[dict[str, Any], int]]] = defaultdict(list)
+    for org_id, reading, attempts in batch:
+        by_org[org_id].append((reading, attempts))
+
+    written = 0
+    for org_id, entries in by_org.items():
+        readings = [reading for reading, _ in entries]
+        try:
+            await _write(session_factory, org_id, readings)
+        except Exception as e:
+            _stats["write_errors"] += 1
+            logger.error("IoT ingest flush failed for org %s: %s", org_id, e)
+            retry = [(r, n + 1) for r, n in entries if n + 1 < MAX_WRITE_ATTEMPTS]
+            _queue.extend((org_id, r, n) for r, n in retry)
+            dropped = len(entries) - len(retry)
+            if dropped:
+                _stats["dropped"] += dropped
+                _release(org_id, dropped)
+                logger.error(
+                    "IoT ingest dropped %d readings for org %s after %d attempts",
+                    dropped,
+                    org_id,
+                    MAX_WRITE_ATTEMPTS,
+                )
+            continue
+        _release(org_id, len(readings))
+        written += len(readings)
+        stamps = [r["timestamp"] for r in readings]
+        await publish_event(
+            EventType.IOT_READING,
+            org_id=org_id,
+            data={
+                "count": len(readings),
+                "sensor_types": sorted({r["sensor_type"] for r in readings}),
+                "from": min(stamps).isoformat(),
+                "to": max(stamps).isoformat(),
+            },
+        )
+    _stats["written"] += written
+    _stats["flushes"] += 1
+    return written
+
+
+async def _run_flusher() -> None:
+    while True:
+        try:
+            await asyncio.wait_for(_wakeup.wait(), FLUSH_INTERVAL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        _wakeup.clear()
+        try:
+            while await flush_ingest_buffer():
+                if len(_queue) < FLUSH_SIZE:
+                    break
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("IoT ingest flusher error: %s", e)
+
+
+def start_ingest_gateway() -> None:
+    """Start this process's background flusher. Call at startup."""
+    global _flusher_task, _wakeup
+    if _flusher_task is not None:
+        return
+    _wakeup = asyncio.Event()
+    _flusher_task = asyncio.create_task(_run_flusher())
+    logger.info("IoT ingest gateway started")
+
+
+async def stop_ingest_gateway() -> None:
+    """Stop the flusher and write whatever is still buffered."""
+    global _flusher_task, _wakeup
+    if _flusher_task is None:
+        return
+    _flusher_task.cancel()
+    try:
+        await _flusher_task
+    except (asyncio.CancelledError, Exception):
+        pass
+    _flusher_task = None
+    _wakeup = None
+    while _queue and await flush_ingest_buffer():
+        pass
+
+
+def ingest_gateway_stats() -> dict[str, int]:
+    """Buffer depth and lifetime counters of this process's gateway."""
+    return {"buffered": len(_queue), "orgs_buffered": len(_per_org), **_stats}
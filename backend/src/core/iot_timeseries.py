@@ -0,0 +1,421 @@
+"""Time-series storage for IoT sensor readings.
+
+Sensor gateways send a reading every few seconds per sensor, which makes
+``iot_readings`` the largest table by far. This module keeps it cheap:
+
+- ``ingest`` writes a batch with one multi-row INSERT and folds it into
+  1-minute, 1-hour and 1-day rollups (``iot_rollups``) with one
+  ``INSERT ... ON CONFLICT DO UPDATE`` that adds counts/sums and keeps the
+  min/max, so the rollups are current as soon as the batch commits.
+- ``refresh_rollups`` recomputes the buckets holding edited or deleted
+  readings from the raw rows (a min/max cannot be decremented).
+- ``query_series`` answers a range query at a requested step from the
+  coarsest rollup whose bucket divides the step, and only reads raw rows
+  for sub-minute steps.
+- ``ensure_partitions`` creates the upcoming monthly partitions of
+  ``iot_readings`` (PostgreSQL range partitioning on ``timestamp``).
+
+Buckets are aligned to the Unix epoch in UTC.
+
+Usage:
+    from src.core import iot_timeseries
+    await iot_timeseries.ingest(db, org_id, readings)
+    series = await iot_timeseries.query_series(db, org_id, "temp", start, end, 300)
+"""
+
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Iterable, Mapping
+
+from sqlalchemy import (
+    BigInteger,
+    and_,
+    cast,
+    delete,
+    extract,
+    func,
+    insert,
+    or_,
+    select,
+    text,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.bulk_upsert import dialect_insert
+from src.models.environment import IoTReading, IoTRollup
+
+ROLLUP_SECONDS = (60, 3600, 86400)
+ROLLUP_LABELS = {60: "1m", 3600: "1h", 86400: "1d"}
+MAX_POINTS = 5000
+PARTITION_MONTHS_AHEAD = 3
+_RANGES_PER_QUERY = 200  # bound the OR list (and bind params) per statement
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def as_utc(ts: datetime) -> datetime:
+    """Aware UTC datetime; naive values are taken to be UTC already."""
+    if ts.tzinfo is None:
+        return ts.replace(tzinfo=timezone.utc)
+    return ts.astimezone(timezone.utc)
+
+
+def bucket_floor(ts: datetime, seconds: int) -> datetime:
+    step = timedelta(seconds=seconds)
+    return _EPOCH + ((as_utc(ts) - _EPOCH) // step) * step
+
+
+def _epoch_bucket(db: AsyncSession, column: Any, seconds: int) -> Any:
+    """SQL expression: index of the ``seconds``-wide bucket holding ``column``."""
+    if db.get_bind().dialect.name == "postgresql":
+        epoch = cast(func.floor(extract("epoch", column)), BigInteger)
+    else:
+        epoch = cast(func.strftime("%s", column), BigInteger)
+    return epoch // seconds
+
+
+def _bucket_start(index: int, seconds: int) -> datetime:
+    return _EPOCH + timedelta(seconds=int(index) * seconds)
+
+
+@dataclass
+class _Agg:
+    count: int = 0
+    total: float = 0.0
+    low: float | None = None
+    high: float | None = None
+    unit: str = ""
+
+    def add(self, value: float, unit: str) -> None:
+        self.count += 1
+        self.total += value
+        self.low = value if self.low is None else min(self.low, value)
+        self.high = value if self.high is None else max(self.high, value)
+        self.unit = unit
+
+
+_Key = tuple[str, int, datetime]  # sensor_type, bucket_seconds, bucket_start
+
+
+def _fold(rows: Iterable[Mapping[str, Any]]) -> dict[_Key, _Agg]:
+    aggs: dict[_Key, _Agg] = defaultdict(_Agg)
+    for row in rows:
+        for seconds in ROLLUP_SECONDS:
+            key = (row["sensor_type"], seconds, bucket_floor(row["timestamp"], seconds))
+            aggs[key].add(row["value"], row["unit"])
+    return aggs
+
+
+async def _write_rollups(
+    db: AsyncSession, org_id: uuid.UUID, aggs: dict[_Key, _Agg], *, merge: bool
+) -> None:
+    if not aggs:
+        return
+    table = IoTRollup.__table__
+    rows = [
+        {
+            "organization_id": org_id,
+            "sensor_type": sensor_type,
+            "bucket_seconds": seconds,
+            "bucket_start": start,
+            "sample_count": agg.count,
+            "value_sum": agg.total,
+            "value_min": agg.low,
+            "value_max": agg.high,
+            "unit": agg.unit,
+        }
+        for (sensor_type, seconds, start), agg in aggs.items()
+    ]
+    if not merge:
+        await db.execute(insert(table), rows)
+        return
+
+    stmt = dialect_insert(db)(table)
+    postgres = db.get_bind().dialect.name == "postgresql"
+    least = func.least if postgres else func.min
+    greatest = func.greatest if postgres else func.max
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(table.primary_key.columns),
+        set_={
+            "sample_count": table.c.sample_count + stmt.excluded.sample_count,
+            "value_sum": table.c.value_sum + stmt.excluded.value_sum,
+            "value_min": least(table.c.value_min, stmt.excluded.value_min),
+            "value_max": greatest(table.c.value_max, stmt.excluded.value_max),
+            "unit": stmt.excluded.unit,
+            "updated_at": func.now(),
+        },
+    )
+    await db.execute(stmt, rows)
+
+
+async def ingest(
+    db: AsyncSession, org_id: uuid.UUID, readings: Iterable[Mapping[str, Any]]
+) -> int:
+    """Insert readings (``timestamp, sensor_type, value, unit``) and roll them up.
+
+    Returns:
+        Number of readings written.
+    """
+    rows = [
+        {
+            "id": uuid.uuid4(),
+            "organization_id": org_id,
+            "timestamp": as_utc(r["timestamp"]),
+            "sensor_type": r["sensor_type"],
+            "value": float(r["value"]),
+            "unit": r["unit"],
+        }
+        for r in readings
+    ]
+    if not rows:
+        return 0
+    await db.execute(insert(IoTReading.__table__), rows)
+    await add_to_rollups(db, org_id, rows)
+    return len(rows)
+
+
+async def add_to_rollups(
+    db: AsyncSession, org_id: uuid.UUID, readings: Iterable[Mapping[str, Any]]
+) -> None:
+    """Fold newly inserted readings into their rollup buckets."""
+    await _write_rollups(db, org_id, _fold(readings), merge=True)
+
+
+async def refresh_rollups(
+    db: AsyncSession, org_id: uuid.UUID, points: Iterable[tuple[str, datetime]]
+) -> None:
+    """Recompute the rollup buckets covering ``(sensor_type, timestamp)`` points.
+
+    Only the buckets that hold a point are rebuilt; adjacent buckets are
+    merged into one range so a dense batch stays a handful of ranges.
+    """
+    by_sensor: dict[str, set[datetime]] = defaultdict(set)
+    for sensor_type, ts in points:
+        by_sensor[sensor_type].add(as_utc(ts))
+
+    for sensor_type, stamps in by_sensor.items():
+        for seconds in ROLLUP_SECONDS:
+            ranges = _bucket_ranges(stamps, seconds)
+            for start in range(0, len(ranges), _RANGES_PER_QUERY):
+                await _rebuild_buckets(
+                    db,
+                    org_id,
+                    sensor_type,
+                    seconds,
+                    ranges[start : start + _RANGES_PER_QUERY],
+                )
+
+
+def _bucket_ranges(
+    stamps: Iterable[datetime], seconds: int
+) -> list[tuple[datetime, datetime]]:
+    """Half-open ``[lo, hi)`` ranges covering the buckets that hold ``stamps``."""
+    step = timedelta(seconds=seconds)
+    ranges: list[tuple[datetime, datetime]] = []
+    for lo in sorted({bucket_floor(ts, seconds) for ts in stamps}):
+        if ranges and ranges[-1][1] == lo:
+            ranges[-1] = (ranges[-1][0], lo + step)
+        else:
+            ranges.append((lo, lo + step))
+    return ranges
+
+
+async def _rebuild_buckets(
+    db: AsyncSession,
+    org_id: uuid.UUID,
+    sensor_type: str,
+    seconds: int,
+    ranges: list[tuple[datetime, datetime]],
+) -> None:
+    def within(column: Any) -> Any:
+        return or_(*(and_(column >= lo, column < hi) for lo, hi in ranges))
+
+    await db.execute(
+        delete(IoTRollup).where(
+            IoTRollup.organization_id == org_id,
+            IoTRollup.sensor_type == sensor_type,
+            IoTRollup.bucket_seconds == seconds,
+            within(IoTRollup.bucket_start),
+        )
+    )
+    bucket = _epoch_bucket(db, IoTReading.timestamp, seconds).label("bucket")
+    result = await db.execute(
+        select(
+            bucket,
+            func.count(),
+            func.sum(IoTReading.value),
+            func.min(IoTReading.value),
+            func.max(IoTReading.value),
+            func.max(IoTReading.unit),
+        )
+        .where(
+            IoTReading.organization_id == org_id,
+            IoTReading.sensor_type == sensor_type,
+            within(IoTReading.timestamp),
+        )
+        .group_by(bucket)
+    )
+    aggs = {
+        (sensor_type, seconds, _bucket_start(idx, seconds)): _Agg(
+            count, total, low, high, unit
+        )
+        for idx, count, total, low, high, unit in result.all()
+    }
+    await _write_rollups(db, org_id, aggs, merge=False)
+
+
+def pick_source(step_seconds: int) -> int | None:
+    """Coarsest rollup bucket that divides ``step_seconds`` (None: raw rows)."""
+    for seconds in reversed(ROLLUP_SECONDS):
+        if step_seconds % seconds == 0:
+            return seconds
+    return None
+
+
+async def query_series(
+    db: AsyncSession,
+    org_id: uuid.UUID,
+    sensor_type: str,
+    start: datetime,
+    end: datetime,
+    step_seconds: int,
+) -> dict[str, Any]:
+    """Aggregated points of one sensor type over ``[start, end)``.
+
+    The range is widened to whole steps. Each point carries the bucket
+    start, sample count, mean, min and max.
+
+    Raises:
+        ValueError: empty range or more than ``MAX_POINTS`` buckets.
+    """
+    if step_seconds <= 0:
+        raise ValueError("step must be positive")
+    start = bucket_floor(start, step_seconds)
+    end = as_utc(end)
+    if end <= start:
+        raise ValueError("end must be after start")
+    points = -(-(end - start).total_seconds() // step_seconds)
+    if points > MAX_POINTS:
+        raise ValueError(
+            f"{int(points)} points requested; use a coarser step (max {MAX_POINTS})"
+        )
+    end = start + timedelta(seconds=int(points) * step_seconds)
+
+    source = pick_source(step_seconds)
+    if source is None:
+        ts_col = IoTReading.timestamp
+        bucket = _epoch_bucket(db, ts_col, step_seconds).label("bucket")
+        stmt = select(
+            bucket,
+            func.count(),
+            func.sum(IoTReading.value),
+            func.min(IoTReading.value),
+            func.max(IoTReading.value),
+        ).where(
+            IoTReading.organization_id == org_id,
+            IoTReading.sensor_type == sensor_type,
+        )
+    else:
+        ts_col = IoTRollup.bucket_start
+        bucket = _epoch_bucket(db, ts_col, step_seconds).label("bucket")
+        stmt = select(
+            bucket,
+            func.sum(IoTRollup.sample_count),
+            func.sum(IoTRollup.value_sum),
+            func.min(IoTRollup.value_min),
+            func.max(IoTRollup.value_max),
+        ).where(
+            IoTRollup.organization_id == org_id,
+            IoTRollup.sensor_type == sensor_type,
+            IoTRollup.bucket_seconds == source,
+        )
+    stmt = stmt.where(ts_col >= start, ts_col < end).group_by(bucket).order_by(bucket)
+
+    result = await db.execute(stmt)
+    return {
+        "sensor_type": sensor_type,
+        "start": start,
+        "end": end,
+        "step_seconds": step_seconds,
+        "source": ROLLUP_LABELS.get(source, "raw"),
+        "points": [
+            {
+                "bucket_start": _bucket_start(idx, step_seconds),
+                "count": int(count),
+                "mean": total / count,
+                "min": low,
+                "max": high,
+            }
+            for idx, count, total, low, high in result.all()
+        ],
+    }
+
+
+def _add_months(day: date, months: int) -> date:
+    month = day.month - 1 + months
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+async def ensure_partitions(
+    db: AsyncSession, months_ahead: int = PARTITION_MONTHS_AHEAD
+) -> list[str]:
+    """Create monthly ``iot_readings`` partitions up to ``months_ahead``.
+
+    Readings outside every monthly partition land in ``iot_readings_default``.
+    If it already holds rows for a new month (a sensor with a skewed clock),
+    the partition is built, those rows are moved into it and it is attached:
+    ``CREATE TABLE ... PARTITION OF`` would fail on them.
+    No-op on databases without declarative partitioning (SQLite in tests).
+
+    Returns:
+        Names of the partitions created.
+    """
+    if db.get_bind().dialect.name != "postgresql":
+        return []
+    first = date.today().replace(day=1)
+    created = []
+    for offset in range(months_ahead + 1):
+        lo, hi = _add_months(first, offset), _add_months(first, offset + 1)
+        name = f"iot_readings_{lo:%Y_%m}"
+        exists = await db.execute(text("SELECT to_regclass(:name)"), {"name": name})
+        if exists.scalar() is not None:
+            continue
+        bounds = f"FROM ('{lo} 00:00:00+00') TO ('{hi} 00:00:00+00')"
+        span = {
+            "lo": datetime.combine(lo, datetime.min.time(), timezone.utc),
+            "hi": datetime.combine(hi, datetime.min.time(), timezone.utc),
+        }
+        stray = await db.execute(
+            text(
+                "SELECT EXISTS (SELECT 1 FROM iot_readings_default "
+                "WHERE timestamp >= :lo AND timestamp < :hi)"
+            ),
+            span,
+        )
+        if stray.scalar():
+            await db.execute(
+                text(f"CREATE TABLE {name} (LIKE iot_readings INCLUDING DEFAULTS)")
+            )
+            await db.execute(
+                text(
+                    "WITH moved AS (DELETE FROM iot_readings_default "
+                    "WHERE timestamp >= :lo AND timestamp < :hi RETURNING *) "
+                    f"INSERT INTO {name} SELECT * FROM moved"
+                ),
+                span,
+            )
+            await db.execute(
+                text(
+                    f"ALTER TABLE iot_readings ATTACH PARTITION {name} FOR VALUES {bounds}"
+                )
+            )
+        else:
+            await db.execute(
+                text(
+                    f"CREATE TABLE {name} PARTITION OF iot_readings FOR VALUES {bounds}"
+                )
+            )
+        created.append(name)
+    return created
@@ -0,0 +1,242 @@
+"""Closed-period ledger snapshots for financial statements.
+
+Closing a fiscal period freezes its per-account debit/credit totals into
+``account_balances`` (posted entries dated inside the period) and stamps
+``fiscal_periods.snapshot_at``. Statements then aggregate:
+
+- the frozen ``AccountBalance`` rows of every snapshotted period inside the
+  report range, plus
+- the journal lines of posted entries in the range whose date is not
+  covered by one of those periods (the open-period delta),
+
+so report cost follows the number of accounts and the open-period volume
+instead of the age of the ledger. ``verify`` recomputes the same figures
+with a full scan and lists any account where they differ.
+
+Usage:
+    from src.core import ledger_snapshots
+    await ledger_snapshots.freeze(db, org_id, period)
+    rows = await ledger_snapshots.account_totals(db, org_id, end=date.today())
+"""
+
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Iterable
+
+from sqlalchemy import case, delete, func, insert, literal, not_, or_, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.bulk_upsert import sql_uuid
+from src.models.accounting import (
+    Account,
+    AccountBalance,
+    AccountType,
+    FiscalPeriod,
+    JournalEntry,
+    JournalEntryLine,
+    JournalEntryStatus,
+    NormalBalance,
+)
+
+
+def _posted_lines(org_id: uuid.UUID, start: date | None, end: date):
+    """Journal lines of posted entries dated in ``[start, end]``."""
+    stmt = (
+        select(
+            JournalEntryLine.account_id,
+            JournalEntryLine.debit,
+            JournalEntryLine.credit,
+        )
+        .join(JournalEntry, JournalEntryLine.journal_entry_id == JournalEntry.id)
+        .where(
+            JournalEntry.organization_id == org_id,
+            JournalEntry.status == JournalEntryStatus.POSTED,
+            JournalEntry.date <= end,
+        )
+    )
+    if start is not None:
+        stmt = stmt.where(JournalEntry.date >= start)
+    return stmt
+
+
+async def freeze(db: AsyncSession, org_id: uuid.UUID, period: FiscalPeriod) -> int:
+    """Replace the period's balances with a snapshot of its posted entries.
+
+    Returns:
+        Number of account rows written.
+    """
+    lines = _posted_lines(org_id, period.start_date, period.end_date).subquery()
+    debit = func.coalesce(func.sum(lines.c.debit), 0)
+    credit = func.coalesce(func.sum(lines.c.credit), 0)
+    balance = case(
+        (Account.normal_balance == NormalBalance.DEBIT, debit - credit),
+        else_=credit - debit,
+    )
+
+    await db.execute(
+        delete(AccountBalance).where(
+            AccountBalance.organization_id == org_id,
+            AccountBalance.period_id == period.id,
+        )
+    )
+    await db.execute(
+        insert(AccountBalance.__table__).from_select(
+            [
+                "id",
+                "organization_id",
+                "account_id",
+                "period_id",
+                "debit_total",
+                "credit_total",
+                "balance",
+            ],
+            select(
+                sql_uuid(db),
+                literal(org_id, AccountBalance.organization_id.type),
+                lines.c.account_id,
+                literal(period.id, AccountBalance.period_id.type),
+                debit,
+                credit,
+                balance,
+            )
+            .join(Account, Account.id == lines.c.account_id)
+            .group_by(lines.c.account_id, Account.normal_balance),
+        )
+    )
+
+    period.snapshot_at = datetime.utcnow()
+    await db.flush()
+    return (
+        await db.execute(
+            select(func.count()).where(
+                AccountBalance.organization_id == org_id,
+                AccountBalance.period_id == period.id,
+            )
+        )
+    ).scalar_one()
+
+
+async def frozen_periods(
+    db: AsyncSession, org_id: uuid.UUID, start: date | None, end: date
+) -> list[tuple[uuid.UUID, date, date]]:
+    """Snapshotted periods lying entirely inside ``[start, end]``."""
+    stmt = select(
+        FiscalPeriod.id, FiscalPeriod.start_date, FiscalPeriod.end_date
+    ).where(
+        FiscalPeriod.organization_id == org_id,
+        FiscalPeriod.snapshot_at.is_not(None),
+        FiscalPeriod.end_date <= end,
+    )
+    if start is not None:
+        stmt = stmt.where(FiscalPeriod.start_date >= start)
+    return list((await db.execute(stmt)).all())
+
+
+async def is_frozen(db: AsyncSession, org_id: uuid.UUID, day: date) -> bool:
+    """Whether ``day`` falls inside a snapshotted (closed) period."""
+    result = await db.execute(
+        select(FiscalPeriod.id)
+        .where(
+            FiscalPeriod.organization_id == org_id,
+            FiscalPeriod.snapshot_at.is_not(None),
+            FiscalPeriod.start_date <= day,
+            FiscalPeriod.end_date >= day,
+        )
+        .limit(1)
+    )
+    return result.first() is not None
+
+
+async def account_totals(
+    db: AsyncSession,
+    org_id: uuid.UUID,
+    *,
+    end: date,
+    start: date | None = None,
+    account_types: Iterable[AccountType] | None = None,
+    use_snapshots: bool = True,
+) -> list[Any]:
+    """Debit/credit totals per account for posted entries in ``[start, end]``.
+
+    Rows expose ``account_id, code, name, account_type, normal_balance,
+    total_debit, total_credit`` ordered by code. With ``use_snapshots=False``
+    every journal line in the range is scanned (reference path).
+    """
+    frozen = await frozen_periods(db, org_id, start, end) if use_snapshots else []
+
+    delta = _posted_lines(org_id, start, end)
+    if frozen:
+        delta = delta.where(
+            not_(or_(*(JournalEntry.date.between(s, e) for _, s, e in frozen)))
+        )
+    parts = [delta]
+    if frozen:
+        parts.append(
+            select(
+                AccountBalance.account_id,
+                AccountBalance.debit_total,
+                AccountBalance.credit_total,
+            ).where(
+                AccountBalance.organization_id == org_id,
+                AccountBalance.period_id.in_([pid for pid, _, _ in frozen]),
+            )
+        )
+    lines = union_all(*parts).subquery("lines")
+
+    stmt = (
+        select(
+            Account.id.label("account_id"),
+            Account.code,
+            Account.name,
+            Account.account_type,
+            Account.normal_balance,
+            func.coalesce(func.sum(lines.c.debit), 0).label("total_debit"),
+            func.coalesce(func.sum(lines.c.credit), 0).label("total_credit"),
+        )
+        .join(lines, lines.c.account_id == Account.id)
+        .group_by(
+            Account.id,
+            Account.code,
+            Account.name,
+            Account.account_type,
+            Account.normal_balance,
+        )
+        .order_by(Account.code)
+    )
+    if account_types is not None:
+        stmt = stmt.where(Account.account_type.in_(list(account_types)))
+    return list((await db.execute(stmt)).all())
+
+
+def _totals(row: Any) -> tuple[Decimal, Decimal]:
+    if row is None:
+        return Decimal("0"), Decimal("0")
+    return Decimal(str(row.total_debit)), Decimal(str(row.total_credit))
+
+
+async def verify(db: AsyncSession, org_id: uuid.UUID, as_of: date) -> dict[str, Any]:
+    """Compare snapshot + delta totals with a full scan up to ``as_of``."""
+    fast = {r.account_id: r for r in await account_totals(db, org_id, end=as_of)}
+    full = {
+        r.account_id: r
+        for r in await account_totals(db, org_id, end=as_of, use_snapshots=False)
+    }
+    mismatches = []
+    for account_id in sorted(fast.keys() | full.keys(), key=str):
+        got, want = _totals(fast.get(account_id)), _totals(full.get(account_id))
+        if got != want:
+            mismatches.append(
+                {
+                    "account_id": str(account_id),
+                    "code": (fast.get(account_id) or full.get(account_id)).code,
+                    "snapshot": [str(v) for v in got],
+                    "full_scan": [str(v) for v in want],
+                }
+            )
+    return {
+        "ok": not mismatches,
+        "as_of_date": as_of.isoformat(),
+        "frozen_periods": len(await frozen_periods(db, org_id, None, as_of)),
+        "mismatches": mismatches,
+    }
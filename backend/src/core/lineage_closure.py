@@ -0,0 +1,188 @@
+"""Maintained transitive closure of the batch lineage graph.
+
+``batch_lineage_closure`` stores every (ancestor, descendant, depth) pair so
+recall scoping is one indexed lookup instead of a graph traversal:
+
+- ``add_edge`` runs on each new lineage edge: one set-based
+  ``INSERT ... SELECT ... ON CONFLICT`` that links every ancestor of the
+  parent to every descendant of the child, keeping the shortest depth.
+- ``rebuild`` recomputes an organization's closure from the raw edges with a
+  recursive CTE (backfill / repair).
+- ``check`` compares stored rows with that recomputation and reports
+  missing, extra and wrong-depth pairs without writing.
+
+Usage:
+    from src.core.lineage_closure import add_edge
+    await add_edge(db, org_id, parent_batch_id, child_batch_id)
+"""
+
+import uuid
+from typing import Any
+
+from sqlalchemy import and_, case, delete, func, insert, literal, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.bulk_upsert import dialect_insert
+from src.core.trace_graph import MAX_TRACE_DEPTH
+from src.models.trace_events import BatchLineage, BatchLineageClosure
+from src.models.traceability import TraceabilityBatch
+
+# Pairs further apart than this are not stored (same cap as live traces)
+MAX_CLOSURE_DEPTH = MAX_TRACE_DEPTH
+# Example rows returned per category by ``check``
+CHECK_SAMPLE_SIZE = 20
+
+_closure = BatchLineageClosure.__table__
+_ID_TYPE = BatchLineageClosure.ancestor_id.type
+
+
+async def add_edge(
+    db: AsyncSession,
+    org_id: uuid.UUID,
+    parent_id: uuid.UUID,
+    child_id: uuid.UUID,
+) -> None:
+    """Extend the closure with the edge ``parent → child``.
+
+    New distance ``ancestor → descendant`` is
+    ``d(ancestor, parent) + 1 + d(child, descendant)``; existing pairs keep
+    the smaller depth. Self-pairs created by cycles are skipped.
+    """
+    C = BatchLineageClosure
+    up = union_all(
+        select(C.ancestor_id.label("node_id"), C.depth).where(
+            C.descendant_id == parent_id
+        ),
+        select(
+            literal(parent_id, _ID_TYPE).label("node_id"), literal(0).label("depth")
+        ),
+    ).subquery("up")
+    down = union_all(
+        select(C.descendant_id.label("node_id"), C.depth).where(
+            C.ancestor_id == child_id
+        ),
+        select(literal(child_id, _ID_TYPE).label("node_id"), literal(0).label("depth")),
+    ).subquery("down")
+    depth = up.c.depth + down.c.depth + 1
+
+    pairs = select(
+        literal(org_id, _ID_TYPE),
+        up.c.node_id,
+        down.c.node_id,
+        depth,
+    ).where(up.c.node_id != down.c.node_id, depth <= MAX_CLOSURE_DEPTH)
+
+    stmt = dialect_insert(db)(_closure).from_select(
+        ["organization_id", "ancestor_id", "descendant_id", "depth"], pairs
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["ancestor_id", "descendant_id"],
+        set_={
+            "depth": case(
+                (stmt.excluded.depth < _closure.c.depth, stmt.excluded.depth),
+                else_=_closure.c.depth,
+            )
+        },
+    )
+    await db.execute(stmt)
+
+
+def expected_closure(org_id: uuid.UUID):
+    """Closure of the org's raw lineage edges as a subquery.
+
+    Columns: ``ancestor_id``, ``descendant_id``, ``depth`` (shortest).
+    """
+    edges = (
+        select(BatchLineage.parent_batch_id, BatchLineage.child_batch_id)
+        .join(TraceabilityBatch, TraceabilityBatch.id == BatchLineage.parent_batch_id)
+        .where(TraceabilityBatch.organization_id == org_id)
+        .cte("org_edges")
+    )
+    paths = select(
+        edges.c.parent_batch_id.label("ancestor_id"),
+        edges.c.child_batch_id.label("descendant_id"),
+        literal(1).label("depth"),
+    ).cte("paths", recursive=True)
+    paths = paths.union(
+        select(paths.c.ancestor_id, edges.c.child_batch_id, paths.c.depth + 1)
+        .join(edges, edges.c.parent_batch_id == paths.c.descendant_id)
+        .where(paths.c.depth < MAX_CLOSURE_DEPTH)
+    )
+    return (
+        select(
+            paths.c.ancestor_id,
+            paths.c.descendant_id,
+            func.min(paths.c.depth).label("depth"),
+        )
+        .where(paths.c.ancestor_id != paths.c.descendant_id)
+        .group_by(paths.c.ancestor_id, paths.c.descendant_id)
+        .subquery("expected")
+    )
+
+
+async def rebuild(db: AsyncSession, org_id: uuid.UUID) -> int:
+    """Replace the org's closure with one recomputed from the raw edges.
+
+    Returns:
+        Number of closure rows written.
+    """
+    await db.execute(delete(_closure).where(_closure.c.organization_id == org_id))
+    expected = expected_closure(org_id)
+    await db.execute(
+        insert(_closure).from_select(
+            ["organization_id", "ancestor_id", "descendant_id", "depth"],
+            select(
+                literal(org_id, _ID_TYPE),
+                expected.c.ancestor_id,
+                expected.c.descendant_id,
+                expected.c.depth,
+            ),
+        )
+    )
+    result = await db.execute(
+        select(func.count()).where(_closure.c.organization_id == org_id)
+    )
+    return result.scalar_one()
+
+
+async def check(db: AsyncSession, org_id: uuid.UUID) -> dict[str, Any]:
+    """Compare the stored closure with the raw edges (read-only).
+
+    Returns:
+        ``{"ok", "missing", "extra", "wrong_depth", "samples"}`` where the
+        counts are pairs and ``samples`` holds a few examples of each.
+    """
+    expected = expected_closure(org_id)
+    stored = (
+        select(_closure.c.ancestor_id, _closure.c.descendant_id, _closure.c.depth)
+        .where(_closure.c.organization_id == org_id)
+        .subquery("stored")
+    )
+    same_pair = and_(
+        expected.c.ancestor_id == stored.c.ancestor_id,
+        expected.c.descendant_id == stored.c.descendant_id,
+    )
+    queries = {
+        "missing": select(expected.c.ancestor_id, expected.c.descendant_id)
+        .select_from(expected.outerjoin(stored, same_pair))
+        .where(stored.c.ancestor_id.is_(None)),
+        "extra": select(stored.c.ancestor_id, stored.c.descendant_id)
+        .select_from(stored.outerjoin(expected, same_pair))
+        .where(expected.c.ancestor_id.is_(None)),
+        "wrong_depth": select(expected.c.ancestor_id, expected.c.descendant_id)
+        .select_from(expected.join(stored, same_pair))
+        .where(expected.c.depth != stored.c.depth),
+    }
+
+    report: dict[str, Any] = {"samples": {}}
+    for name, query in queries.items():
+        sub = query.subquery()
+        report[name] = (
+            await db.execute(select(func.count()).select_from(sub))
+        ).scalar_one()
+        rows = (await db.execute(query.limit(CHECK_SAMPLE_SIZE))).all()
+        report["samples"][name] = [
+            {"ancestor_id": str(a), "descendant_id": str(d)} for a, d in rows
+        ]
+    report["ok"] = not (report["missing"] or report["extra"] or report["wrong_depth"])
+    return report
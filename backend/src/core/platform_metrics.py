@@ -0,0 +1,291 @@
+"""Platform-wide superadmin KPIs, computed in bulk and snapshotted.
+
+The superadmin dashboard used to issue ~20 sequential ``count``/``avg``
+queries per load, and the global inventory view two queries per
+organization. Here:
+
+- ``compute_stats`` answers every ``PlatformStats`` field with one SELECT:
+  one single-row aggregate subquery per source table, using
+  ``FILTER (WHERE ...)`` for the conditional counts.
+- ``compute_inventory`` builds the per-organization stock overview with
+  three grouped queries, whatever the number of tenants.
+- ``refresh`` stores both as a ``PlatformStatsSnapshot`` (the Celery beat
+  task ``refresh_platform_stats`` calls it every 15 minutes) and prunes
+  old snapshots; ``current`` returns the latest one, refreshing it first
+  when it is missing or older than ``SNAPSHOT_MAX_AGE``.
+
+Usage:
+    from src.core import platform_metrics
+    snapshot = await platform_metrics.current(db)
+    stats = await platform_metrics.compute_stats(db)  # ?fresh=1
+"""
+
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from sqlalchemy import delete, distinct, func, select, true
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.analytics import PlatformStatsSnapshot
+from src.models.auth import Organization, Role, User
+from src.models.farm import Farm
+from src.models.flock import Flock
+from src.models.inventory import EggStock, StockMovement
+from src.models.subscription import PlanTier, Subscription, SubscriptionStatus
+from src.models.support import SupportRating, SupportTicket, TicketMessage, TicketStatus
+
+SNAPSHOT_MAX_AGE = timedelta(hours=1)  # beat refreshes every 15 min
+SNAPSHOT_RETENTION = timedelta(days=7)
+
+# Estimated monthly price per plan (USD)
+PLAN_PRICES = {"hobby": 9, "starter": 19, "pro": 49, "enterprise": 99}
+
+_OPEN_STATUSES = (
+    TicketStatus.open,
+    TicketStatus.in_progress,
+    TicketStatus.waiting_user,
+)
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _seconds(later, earlier):
+    return func.extract("epoch", later - earlier)
+
+
+def _hours(seconds) -> float | None:
+    return round(float(seconds) / 3600, 1) if seconds else None
+
+
+def _stats_query(now: datetime):
+    d30 = now - timedelta(days=30)
+    d90 = now - timedelta(days=90)
+    count = func.count
+
+    orgs = (
+        select(
+            count().label("total_orgs"),
+            count().filter(Organization.created_at >= d30).label("new_orgs_30d"),
+        )
+        .select_from(Organization)
+        .subquery("orgs")
+    )
+    users = (
+        select(
+            count().label("total_users"),
+            count().filter(User.is_active.is_(True)).label("active_users"),
+            count().filter(User.created_at >= d30).label("new_users_30d"),
+        )
+        .select_from(User)
+        .where(User.role != Role.superadmin)
+        .subquery("users")
+    )
+    subs = (
+        select(
+            count(distinct(Subscription.organization_id)).label("active_orgs"),
+            *(
+                count().filter(Subscription.plan == tier).label(f"plan_{tier.value}")
+                for tier in PlanTier
+            ),
+        )
+        .select_from(Subscription)
+        .where(Subscription.status == SubscriptionStatus.active)
+        .subquery("subs")
+    )
+    farms = select(count().label("total_farms")).select_from(Farm).subquery("farms")
+    flocks = select(count().label("total_flocks")).select_from(Flock).subquery("flocks")
+    stock = select(
+        func.coalesce(func.sum(EggStock.quantity), 0).label("total_eggs")
+    ).subquery("stock")
+
+    sla_closed = (
+        SupportTicket.sla_deadline.isnot(None),
+        SupportTicket.resolved_at.isnot(None),
+    )
+    tickets = (
+        select(
+            count().label("total_tickets"),
+            count()
+            .filter(SupportTicket.status.in_(_OPEN_STATUSES))
+            .label("open_tickets"),
+            count().filter(SupportTicket.resolved_at >= d30).label("resolved_30d"),
+            count().filter(SupportTicket.category == "bug").label("bug_tickets"),
+            count()
+            .filter(SupportTicket.category == "feature_request")
+            .label("feature_requests"),
+            count()
+            .filter(
+                SupportTicket.priority == "critical",
+                SupportTicket.status.in_([TicketStatus.open, TicketStatus.in_progress]),
+            )
+            .label("critical_tickets"),
+            func.avg(_seconds(SupportTicket.resolved_at, SupportTicket.created_at))
+            .filter(
+                SupportTicket.resolved_at.isnot(None), SupportTicket.resolved_at >= d90
+            )
+            .label("resolution_seconds"),
+            count().filter(*sla_closed).label("sla_total"),
+            count()
+            .filter(
+                *sla_closed, SupportTicket.resolved_at <= SupportTicket.sla_deadline
+            )
+            .label("sla_met"),
+        )
+        .select_from(SupportTicket)
+        .subquery("tickets")
+    )
+
+    # First admin reply per ticket opened in the last 90 days
+    first_reply = (
+        select(
+            func.min(TicketMessage.created_at).label("first_resp"),
+            SupportTicket.created_at.label("created"),
+        )
+        .join(TicketMessage, TicketMessage.ticket_id == SupportTicket.id)
+        .where(TicketMessage.is_admin.is_(True), SupportTicket.created_at >= d90)
+        .group_by(SupportTicket.id, SupportTicket.created_at)
+        .subquery()
+    )
+    replies = select(
+        func.avg(_seconds(first_reply.c.first_resp, first_reply.c.created)).label(
+            "first_response_seconds"
+        )
+    ).subquery("replies")
+    ratings = select(func.avg(SupportRating.rating).label("avg_rating")).subquery(
+        "ratings"
+    )
+
+    parts = [orgs, users, subs, farms, flocks, stock, tickets, replies, ratings]
+    joined = parts[0]
+    for part in parts[1:]:
+        joined = joined.join(part, true())
+    return select(*(c for part in parts for c in part.c)).select_from(joined)
+
+
+async def compute_stats(
+    db: AsyncSession, now: datetime | None = None
+) -> dict[str, Any]:
+    """Every ``PlatformStats`` field, in a single round trip."""
+    row = (await db.execute(_stats_query(now or _utcnow()))).one()._mapping
+
+    plan_distribution = {}
+    mrr = 0.0
+    for tier in PlanTier:
+        subscribed = row[f"plan_{tier.value}"]
+        if subscribed:
+            plan_distribution[tier.value] = subscribed
+            mrr += PLAN_PRICES.get(tier.value, 0) * subscribed
+
+    sla_total = row["sla_total"] or 0
+    avg_rating = row["avg_rating"]
+    return {
+        "total_organizations": row["total_orgs"] or 0,
+        "active_organizations": row["active_orgs"] or 0,
+        "total_users": row["total_users"] or 0,
+        "active_users": row["active_users"] or 0,
+        "total_farms": row["total_farms"] or 0,
+        "total_flocks": row["total_flocks"] or 0,
+        "total_eggs_in_stock": int(row["total_eggs"] or 0),
+        "open_tickets": row["open_tickets"] or 0,
+        "resolved_tickets_30d": row["resolved_30d"] or 0,
+        "avg_resolution_hours": _hours(row["resolution_seconds"]),
+        "total_tickets": row["total_tickets"] or 0,
+        "bug_tickets": row["bug_tickets"] or 0,
+        "feature_requests": row["feature_requests"] or 0,
+        "critical_tickets": row["critical_tickets"] or 0,
+        "mrr_estimated": mrr,
+        "plan_distribution": plan_distribution,
+        "new_orgs_30d": row["new_orgs_30d"] or 0,
+        "new_users_30d": row["new_users_30d"] or 0,
+        "ticket_response_avg_hours": _hours(row["first_response_seconds"]),
+        "sla_compliance_pct": (
+            round(row["sla_met"] / sla_total * 100, 1) if sla_total > 0 else None
+        ),
+        "avg_support_rating": round(float(avg_rating), 2) if avg_rating else None,
+    }
+
+
+async def compute_inventory(db: AsyncSession) -> list[dict[str, Any]]:
+    """Stock per organization (``GlobalInventoryItem`` fields, JSON-safe)."""
+    by_size: dict[Any, dict[str, int]] = defaultdict(dict)
+    by_type: dict[Any, dict[str, int]] = defaultdict(dict)
+    totals: dict[Any, int] = defaultdict(int)
+    stock = await db.execute(
+        select(
+            EggStock.organization_id,
+            EggStock.egg_size,
+            EggStock.egg_type,
+            func.sum(EggStock.quantity),
+        ).group_by(EggStock.organization_id, EggStock.egg_size, EggStock.egg_type)
+    )
+    for org_id, size, egg_type, quantity in stock:
+        quantity = int(quantity or 0)
+        totals[org_id] += quantity
+        by_size[org_id][size] = by_size[org_id].get(size, 0) + quantity
+        if egg_type:
+            by_type[org_id][egg_type] = by_type[org_id].get(egg_type, 0) + quantity
+
+    last_movement = dict(
+        (
+            await db.execute(
+                select(
+                    StockMovement.organization_id, func.max(StockMovement.date)
+                ).group_by(StockMovement.organization_id)
+            )
+        ).all()
+    )
+    orgs = await db.execute(
+        select(Organization.id, Organization.name).order_by(Organization.name)
+    )
+    return [
+        {
+            "organization_id": str(org_id),
+            "organization_name": name,
+            "total_stock": totals[org_id],
+            "stock_by_size": by_size[org_id],
+            "stock_by_type": by_type[org_id],
+            "last_movement_date": (
+                last_movement[org_id].isoformat() if last_movement.get(org_id) else None
+            ),
+        }
+        for org_id, name in orgs
+    ]
+
+
+async def refresh(db: AsyncSession) -> PlatformStatsSnapshot:
+    """Compute and store a new snapshot; drop those past ``SNAPSHOT_RETENTION``."""
+    now = _utcnow()
+    snapshot = PlatformStatsSnapshot(
+        computed_at=now,
+        stats=await compute_stats(db, now),
+        inventory=await compute_inventory(db),
+    )
+    db.add(snapshot)
+    await db.execute(
+        delete(PlatformStatsSnapshot).where(
+            PlatformStatsSnapshot.computed_at < now - SNAPSHOT_RETENTION
+        )
+    )
+    await db.flush()
+    return snapshot
+
+
+async def latest(db: AsyncSession) -> PlatformStatsSnapshot | None:
+    return (
+        await db.execute(
+            select(PlatformStatsSnapshot)
+            .order_by(PlatformStatsSnapshot.computed_at.desc())
+            .limit(1)
+        )
+    ).scalar_one_or_none()
+
+
+async def current(db: AsyncSession) -> PlatformStatsSnapshot:
+    """The latest snapshot, refreshed first if missing or stale."""
+    snapshot = await latest(db)
+    if snapshot is None or _utcnow() - snapshot.computed_at > SNAPSHOT_MAX_AGE:
+        snapshot = await refresh(db)
+    return snapshot
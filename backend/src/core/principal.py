@@ -0,0 +1,202 @@
+"""Cached snapshot of the authenticated user for request authentication.
+
+``get_current_user`` used to load the ``users`` row (and, for plan-gated
+routes, the subscription) on every request. Instead it now resolves a
+``Principal``: a small frozen snapshot of the user, its organization and the
+effective plan, cached in both tiers of ``src.core.cache`` under
+``auth:principal:{user_id}:{jti}``. A warm request authenticates with no
+database query.
+
+Each token gets its own entry, so an entry never outlives the token it
+was built for. Entries are tagged per user and per organization and are
+dropped explicitly (on every worker, through the cache's pub/sub
+broadcast) when the user changes password, role, profile or active flag,
+and when the subscription changes (Stripe webhooks, plan changes).
+
+User changes are picked up by session listeners (``setup_principal_listeners``)
+rather than by each endpoint: a flush that touches a watched ``User``
+column, or deletes a user, stages the id, and the invalidation runs only
+after the transaction commits. Invalidating earlier would let a concurrent
+request re-cache the old row before the commit lands.
+``LOCAL_MAX_TTL`` bounds staleness if a broadcast is lost. A trial plan is
+cached only until the trial ends.
+
+The snapshot carries the ``User`` attributes endpoints read (``id``,
+``organization_id``, ``email``, ``full_name``, ``role``...) plus ``plan``.
+Endpoints that write the user or read private columns load the row with
+``deps.get_current_user_model``.
+
+Usage:
+    from src.core import principal
+    await principal.invalidate_user(user.id)
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from typing import Any, Awaitable, Callable
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from src.core.cache import get_or_compute, invalidate_tags
+from src.models.auth import Role, User
+
+logger = logging.getLogger("egglogu.principal")
+
+PRINCIPAL_TTL = 300  # seconds
+
+# ``User`` columns whose change must drop the cached principals
+WATCHED_COLUMNS = (
+    "email",
+    "full_name",
+    "role",
+    "is_active",
+    "email_verified",
+    "organization_id",
+    "hashed_password",
+)
+_PENDING_KEY = "principal_invalidate"
+_tasks: set[asyncio.Task] = set()
+
+
+@dataclass(frozen=True, slots=True)
+class Principal:
+    id: uuid.UUID
+    organization_id: uuid.UUID | None
+    email: str
+    full_name: str
+    role: Role
+    is_active: bool
+    email_verified: bool
+    plan: str  # effective plan: a PlanTier value, "enterprise" or "suspended"
+    plan_until: float | None = None  # epoch seconds the plan is valid until
+
+    def to_cache(self) -> dict[str, Any]:
+        data = asdict(self)
+        data["id"] = str(self.id)
+        data["organization_id"] = (
+            str(self.organization_id) if self.organization_id else None
+        )
+        data["role"] = self.role.value
+        return data
+
+    @classmethod
+    def from_cache(cls, data: dict[str, Any]) -> "Principal":
+        return cls(
+            id=uuid.UUID(data["id"]),
+            organization_id=(
+                uuid.UUID(data["organization_id"]) if data["organization_id"] else None
+            ),
+            email=data["email"],
+            full_name=data["full_name"],
+            role=Role(data["role"]),
+            is_active=data["is_active"],
+            email_verified=data["email_verified"],
+            plan=data["plan"],
+            plan_until=data.get("plan_until"),
+        )
+
+    @property
+    def plan_expired(self) -> bool:
+        return self.plan_until is not None and time.time() >= self.plan_until
+
+
+def user_tag(user_id: Any) -> str:
+    return f"user:{user_id}:principals"
+
+
+def org_principals_tag(org_id: Any) -> str:
+    return f"org:{org_id}:principals"
+
+
+async def get_principal(
+    user_id: str,
+    org_id: str | None,
+    jti: str | None,
+    load: Callable[[], Awaitable[Principal]],
+) -> Principal:
+    """Cached principal for a token; ``load`` builds it from the database.
+
+    ``org_id`` is the token's ``org`` claim. Errors raised by ``load``
+    (unknown or inactive user) are not cached.
+    """
+    key = f"auth:principal:{user_id}:{jti or 'legacy'}"
+    tags = [user_tag(user_id)]
+    if org_id:
+        tags.append(org_principals_tag(org_id))
+
+    async def compute() -> dict[str, Any]:
+        return (await load()).to_cache()
+
+    principal = Principal.from_cache(
+        await get_or_compute(key, compute, PRINCIPAL_TTL, tags=tags)
+    )
+    if principal.plan_expired:
+        await invalidate_user(user_id)
+        principal = Principal.from_cache(
+            await get_or_compute(key, compute, PRINCIPAL_TTL, tags=tags)
+        )
+    return principal
+
+
+async def invalidate_user(user_id: Any) -> None:
+    """Drop every cached principal of a user (password, role, profile, active)."""
+    await invalidate_tags(user_tag(user_id))
+
+
+async def invalidate_org(org_id: Any) -> None:
+    """Drop every cached principal of an organization (subscription change)."""
+    await invalidate_tags(org_principals_tag(org_id))
+
+
+# ── Session listeners ────────────────────────────────────────────────
+
+
+def _after_flush_handler(session: Session, flush_context: Any) -> None:
+    """Stage the ids of users whose cached snapshot the flush made stale."""
+    ids = {obj.id for obj in session.deleted if isinstance(obj, User)}
+    for obj in session.dirty:
+        if not isinstance(obj, User):
+            continue
+        attrs = inspect(obj).attrs
+        if any(attrs[name].history.has_changes() for name in WATCHED_COLUMNS):
+            ids.add(obj.id)
+    if ids:
+        session.info.setdefault(_PENDING_KEY, set()).update(ids)
+
+
+async def _invalidate_users(user_ids: set[Any]) -> None:
+    for user_id in user_ids:
+        try:
+            await invalidate_user(user_id)
+        except Exception as e:
+            logger.warning("Principal invalidation failed for %s: %s", user_id, e)
+
+
+def _after_commit_handler(session: Session) -> None:
+    """Drop the staged principals now that the change is visible."""
+    ids = session.info.pop(_PENDING_KEY, None)
+    if not ids:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        logger.warning("No event loop to invalidate principals of %s", ids)
+        return
+    task = loop.create_task(_invalidate_users(ids))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+
+def _after_rollback_handler(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+def setup_principal_listeners() -> None:
+    """Register the session event listeners. Call once at startup."""
+    event.listen(Session, "after_flush", _after_flush_handler)
+    event.listen(Session, "after_commit", _after_commit_handler)
+    event.listen(Session, "after_rollback", _after_rollback_handler)
@@ -1,9 +1,33 @@
-"""Redis-based rate limiting for auth endpoints.
+"""Redis-based rate limiting.
 
 Supports both direct Redis connection and Redis Sentinel for HA failover.
+
+Limits are token buckets evaluated with GCRA (generic cell rate
+algorithm): each bucket is one Redis string holding its "theoretical
+arrival time", so a bucket of ``limit`` requests per ``window_seconds``
+allows a burst of ``burst`` (default ``limit``) and then refills smoothly —
+no fixed-window edge where twice the limit gets through in a moment.
+``check_limits`` checks several buckets (IP, user, API key...) in a single
+Lua call: one round trip, all-or-nothing, with Redis' clock.
+
+An in-process pre-limiter runs the same algorithm per worker before Redis
+is asked: a client already over a limit in this worker, or refused by
+Redis within its ``retry_after``, is rejected without a network call. When
+Redis is unavailable the pre-limiter alone enforces the limits (per
+worker) instead of letting everything through.
+
+Usage:
+    from src.core.rate_limit import Limit, check_limits
+    result = await check_limits([Limit(f"ip:{ip}", 120, 60)])
+    if not result.allowed: ...  # result.headers() for RateLimit-* headers
 """
 
 import logging
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
 import redis.asyncio as aioredis
 from redis.asyncio.sentinel import Sentinel
 
@@ -61,24 +85,210 @@ async def close_redis() -> None:
         _redis = None
 
 
-async def check_rate_limit(key: str, max_requests: int, window_seconds: int) -> bool:
-    """Return True if request is allowed, False if rate limited.
+LOCAL_MAX_BUCKETS = 50_000
+
+# KEYS: bucket keys. ARGV: cost, then (emission interval ms, burst) per key.
+# Returns {retry_after_ms, remaining_1, reset_ms_1, retry_ms_1, remaining_2,
+# ...}: retry_ms_i > 0 marks the buckets that ran out. The buckets are only
+# charged when every one of them allows the request.
+_GCRA_LUA = """
+if redis.replicate_commands then redis.replicate_commands() end
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local cost = tonumber(ARGV[1])
+local tats = {}
+local waits = {}
+local retry = 0
+for i = 1, #KEYS do
+    local interval = tonumber(ARGV[2 * i])
+    local burst = tonumber(ARGV[2 * i + 1])
+    local tat = tonumber(redis.call('GET', KEYS[i])) or now
+    if tat < now then tat = now end
+    tats[i] = tat
+    waits[i] = math.max(0, tat + interval * cost - interval * burst - now)
+    retry = math.max(retry, waits[i])
+end
+local out = {math.ceil(retry)}
+for i = 1, #KEYS do
+    local interval = tonumber(ARGV[2 * i])
+    local burst = tonumber(ARGV[2 * i + 1])
+    local tat = tats[i]
+    if retry == 0 then
+        tat = tat + interval * cost
+        redis.call('SET', KEYS[i], tostring(tat), 'PX', math.ceil(tat - now))
+    end
+    out[#out + 1] = math.max(0, math.floor((now + interval * burst - tat) / interval))
+    out[#out + 1] = math.ceil(tat - now)
+    out[#out + 1] = math.ceil(waits[i])
+end
+return out
+"""
+
+
+@dataclass(frozen=True)
+class Limit:
+    """``limit`` requests per ``window_seconds`` for one bucket key."""
+
+    key: str
+    limit: int
+    window_seconds: int
+    burst: int | None = None
+
+    @property
+    def interval_ms(self) -> float:
+        return self.window_seconds * 1000 / self.limit
+
+    @property
+    def capacity(self) -> int:
+        return self.burst or self.limit
+
+
+@dataclass(frozen=True)
+class RateLimitResult:
+    """Outcome for the tightest of the checked buckets."""
+
+    allowed: bool
+    limit: int
+    window_seconds: int
+    remaining: int
+    reset: int  # seconds until the bucket is full again
+    retry_after: int = 0  # seconds; 0 when allowed
+
+    def headers(self) -> dict[str, str]:
+        """``RateLimit-*`` response headers (plus ``Retry-After`` if refused)."""
+        headers = {
+            "RateLimit-Limit": str(self.limit),
+            "RateLimit-Remaining": str(self.remaining),
+            "RateLimit-Reset": str(self.reset),
+            "RateLimit-Policy": f"{self.limit};w={self.window_seconds}",
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(self.retry_after)
+        return headers
+
+
+def _result(
+    limits: list[Limit], retry_ms: float, buckets: list[tuple[int, float]]
+) -> RateLimitResult:
+    # Tightest bucket: fewest requests left, then longest to refill
+    index = min(range(len(limits)), key=lambda i: (buckets[i][0], -buckets[i][1]))
+    limit, (remaining, reset_ms) = limits[index], buckets[index]
+    return RateLimitResult(
+        allowed=retry_ms <= 0,
+        limit=limit.limit,
+        window_seconds=limit.window_seconds,
+        remaining=remaining,
+        reset=math.ceil(reset_ms / 1000),
+        retry_after=math.ceil(retry_ms / 1000),
+    )
+
 
-    Fail-open when Redis is unavailable: allows requests through but logs warnings.
-    Rate limiting is enforced normally when Redis is up.
+class _LocalBuckets:
+    """Per-process GCRA buckets (bounded LRU) plus Redis refusals to honour."""
+
+    def __init__(self, max_buckets: int) -> None:
+        self.max_buckets = max_buckets
+        # key -> [theoretical arrival time ms, refused until ms]
+        self._data: OrderedDict[str, list[float]] = OrderedDict()
+
+    def _slot(self, key: str) -> list[float]:
+        slot = self._data.get(key)
+        if slot is None:
+            slot = self._data[key] = [0.0, 0.0]
+            while len(self._data) > self.max_buckets:
+                self._data.popitem(last=False)
+        else:
+            self._data.move_to_end(key)
+        return slot
+
+    def check(self, limits: list[Limit], cost: int, now: float) -> RateLimitResult:
+        slots = [self._slot(limit.key) for limit in limits]
+        retry = 0.0
+        for limit, slot in zip(limits, slots):
+            tat = max(slot[0], now)
+            allow_at = tat + limit.interval_ms * (cost - limit.capacity)
+            retry = max(retry, allow_at - now, slot[1] - now)
+        buckets = []
+        for limit, slot in zip(limits, slots):
+            tat = max(slot[0], now)
+            if retry <= 0:
+                tat += limit.interval_ms * cost
+                slot[0] = tat
+            remaining = (
+                now + limit.interval_ms * limit.capacity - tat
+            ) // limit.interval_ms
+            buckets.append((max(0, int(remaining)), tat - now))
+        return _result(limits, retry, buckets)
+
+    def refuse(self, key: str, until: float) -> None:
+        slot = self._slot(key)
+        slot[1] = max(slot[1], until)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+_local = _LocalBuckets(LOCAL_MAX_BUCKETS)
+_script = None
+_stats = {"checks": 0, "local_rejections": 0, "redis_rejections": 0, "redis_errors": 0}
+
+
+def _gcra_script():
+    global _script
+    if _script is None or _script.registered_client is not _redis:
+        _script = _redis.register_script(_GCRA_LUA)
+    return _script
+
+
+async def check_limits(limits: list[Limit], cost: int = 1) -> RateLimitResult:
+    """Charge ``cost`` to every bucket in ``limits`` if all of them allow it.
+
+    One Redis round trip whatever the number of buckets; none when the
+    in-process pre-limiter already refuses. Without Redis (down or
+    erroring) the pre-limiter's per-worker decision stands.
     """
+    _stats["checks"] += 1
+    now = time.time() * 1000
+    local = _local.check(limits, cost, now)
+    if not local.allowed:
+        _stats["local_rejections"] += 1
+        return local
     if not _redis:
-        logger.warning("Rate limit BYPASSED — Redis unavailable (key=%s)", key)
-        return True  # Fail-open: allow requests when Redis is unavailable
+        return local
+    args: list[float] = [cost]
+    for limit in limits:
+        args += [limit.interval_ms, limit.capacity]
     try:
-        full_key = f"rl:{key}"
-        current = await _redis.incr(full_key)
-        if current == 1:
-            await _redis.expire(full_key, window_seconds)
-        return current <= max_requests
+        reply = await _gcra_script()(
+            keys=[f"rl:{lim.key}" for lim in limits], args=args
+        )
     except Exception as e:
-        logger.warning("Rate limit BYPASSED — check failed: %s", e)
-        return True  # Fail-open on errors to avoid blocking all traffic
+        _stats["redis_errors"] += 1
+        logger.warning("Rate limit check failed, enforcing locally: %s", e)
+        return local
+    retry_ms = float(reply[0])
+    per_key = [reply[i : i + 3] for i in range(1, len(reply), 3)]
+    buckets = [(int(remaining), float(reset)) for remaining, reset, _ in per_key]
+    result = _result(limits, retry_ms, buckets)
+    if not result.allowed:
+        _stats["redis_rejections"] += 1
+        # Only the buckets that ran out: a shared ``global:{ip}`` bucket must
+        # not be blocked because one user behind it is over their own limit
+        for limit, (_, _, wait_ms) in zip(limits, per_key):
+            if float(wait_ms) > 0:
+                _local.refuse(limit.key, now + float(wait_ms))
+    return result
+
+
+async def check_rate_limit(key: str, max_requests: int, window_seconds: int) -> bool:
+    """Return True if request is allowed, False if rate limited."""
+    result = await check_limits([Limit(key, max_requests, window_seconds)])
+    return result.allowed
+
+
+def rate_limit_stats() -> dict[str, int]:
+    """Lifetime counters and pre-limiter size of this worker."""
+    return {"local_buckets": len(_local._data), **_stats}
 
 
 # ─── Plan-based API key rate limits ──────────────────────────────────
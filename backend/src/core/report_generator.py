@@ -186,15 +186,15 @@ async def execute_report(
     # Send email if recipients configured
     recipients_sent = None
     if schedule.recipients:
-        from src.core.email import _send_email
+        from src.core.email import send_bulk
 
         html = _build_email_html(schedule.template.value, summary)
-        for email in schedule.recipients.split(","):
-            email = email.strip()
-            if email:
-                await _send_email(
-                    email, f"EGGlogU Report: {schedule.name}", html, tipo="reporte"
-                )
+        await send_bulk(
+            schedule.recipients.split(","),
+            f"EGGlogU Report: {schedule.name}",
+            html,
+            tipo="reporte",
+        )
         recipients_sent = schedule.recipients
 
     # Update schedule
@@ -229,18 +229,15 @@ async def generate_adhoc_report(
 
     recipients_sent = None
     if data.send_email and data.recipients:
-        from src.core.email import _send_email
+        from src.core.email import send_bulk
 
         html = _build_email_html(data.template, summary)
-        for email in data.recipients.split(","):
-            email = email.strip()
-            if email:
-                await _send_email(
-                    email,
-                    f"EGGlogU Report: {data.template.title()}",
-                    html,
-                    tipo="reporte",
-                )
+        await send_bulk(
+            data.recipients.split(","),
+            f"EGGlogU Report: {data.template.title()}",
+            html,
+            tipo="reporte",
+        )
         recipients_sent = data.recipients
 
     execution = ReportExecution(
@@ -0,0 +1,135 @@
+"""Batch lineage graph traversal in a single recursive query.
+
+Resolves the backward (inputs) and forward (products) closure of a batch
+over ``batch_lineage`` with two ``WITH RECURSIVE`` CTEs in one statement,
+joined to the batch rows (and farm) so the whole trace is one round trip on
+both PostgreSQL and SQLite.
+
+Cycle handling: each CTE row is ``(batch_id, depth)`` and the recursive term
+uses ``UNION`` (not ``UNION ALL``), so revisiting a node at a depth already
+seen is discarded, and ``depth < max_depth`` bounds every cycle. Diamonds in
+mixing/packing graphs cost one row per (node, depth) instead of one per
+path. The final select keeps the shortest distance per batch.
+
+Usage:
+    from src.core.trace_graph import trace_closure
+    closure = await trace_closure(db, batch_id, org_id=org_id, max_depth=20)
+    closure.origin, closure.backward, closure.forward
+"""
+
+import uuid
+from dataclasses import dataclass, field
+
+from sqlalchemy import func, literal, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, lazyload
+
+from src.models.trace_events import BatchLineage
+from src.models.traceability import TraceabilityBatch
+
+# Hard ceiling regardless of what the caller asks for
+MAX_TRACE_DEPTH = 50
+
+BACKWARD = "backward"
+FORWARD = "forward"
+
+
+@dataclass
+class TraceClosure:
+    """Origin batch plus reachable batches with their shortest distance."""
+
+    origin: TraceabilityBatch | None = None
+    backward: list[tuple[TraceabilityBatch, int]] = field(default_factory=list)
+    forward: list[tuple[TraceabilityBatch, int]] = field(default_factory=list)
+
+    @property
+    def batch_ids(self) -> set[uuid.UUID]:
+        ids = {b.id for b, _ in self.backward} | {b.id for b, _ in self.forward}
+        if self.origin is not None:
+            ids.add(self.origin.id)
+        return ids
+
+
+def _closure_cte(batch_id: uuid.UUID, direction: str, max_depth: int):
+    """Recursive CTE of ``(batch_id, depth)`` reachable in one direction."""
+    if direction == BACKWARD:
+        near, far = BatchLineage.child_batch_id, BatchLineage.parent_batch_id
+    else:
+        near, far = BatchLineage.parent_batch_id, BatchLineage.child_batch_id
+
+    anchor = select(
+        literal(batch_id, type_=BatchLineage.child_batch_id.type).label("batch_id"),
+        literal(0).label("depth"),
+    )
+    cte = anchor.cte(f"trace_{direction}", recursive=True)
+    step = (
+        select(far.label("batch_id"), (cte.c.depth + 1).label("depth"))
+        .select_from(cte)
+        .join(BatchLineage, near == cte.c.batch_id)
+        .where(cte.c.depth < max_depth)
+    )
+    return cte.union(step)
+
+
+async def trace_closure(
+    db: AsyncSession,
+    batch_id: uuid.UUID,
+    *,
+    org_id: uuid.UUID,
+    max_depth: int = 10,
+    directions: tuple[str, ...] = (BACKWARD, FORWARD),
+) -> TraceClosure:
+    """Load the origin batch and its lineage closure in one query.
+
+    Args:
+        max_depth: Maximum number of lineage hops in each direction
+            (clamped to ``MAX_TRACE_DEPTH``).
+        directions: Subset of ``("backward", "forward")`` to resolve.
+
+    Returns:
+        A ``TraceClosure``; ``origin`` is None when the batch does not exist
+        in this organization. Nodes are ordered by distance, then code.
+    """
+    max_depth = max(0, min(max_depth, MAX_TRACE_DEPTH))
+    parts = [
+        select(
+            cte.c.batch_id,
+            literal(direction).label("direction"),
+            cte.c.depth,
+        )
+        for direction in directions
+        for cte in [_closure_cte(batch_id, direction, max_depth)]
+    ]
+    reached = union_all(*parts).subquery("reached")
+    closure = (
+        select(
+            reached.c.batch_id,
+            reached.c.direction,
+            func.min(reached.c.depth).label("depth"),
+        )
+        .group_by(reached.c.batch_id, reached.c.direction)
+        .subquery("closure")
+    )
+
+    stmt = (
+        select(TraceabilityBatch, closure.c.direction, closure.c.depth)
+        .join(closure, closure.c.batch_id == TraceabilityBatch.id)
+        .where(TraceabilityBatch.organization_id == org_id)
+        .options(
+            joinedload(TraceabilityBatch.farm),
+            lazyload(TraceabilityBatch.client),
+        )
+        .order_by(closure.c.depth, TraceabilityBatch.batch_code)
+    )
+    result = await db.execute(stmt)
+
+    out = TraceClosure()
+    for batch, direction, depth in result.unique().all():
+        if batch.id == batch_id:
+            # The origin is reached at depth 0 (and again via any cycle)
+            out.origin = batch
+        elif direction == BACKWARD:
+            out.backward.append((batch, depth))
+        else:
+            out.forward.append((batch, depth))
+    return out
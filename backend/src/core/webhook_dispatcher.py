@@ -0,0 +1,327 @@
+"""Webhook outbox and batched dispatcher.
+
+Domain code never talks HTTP: it calls ``enqueue_webhook_event`` inside its
+own transaction, which writes one ``WebhookOutbox`` row per matching webhook.
+If the transaction rolls back, the event is never delivered; if it commits,
+the event is guaranteed to be picked up.
+
+A Celery beat task drains the outbox in batches through ``WebhookDispatcher``:
+
+- one shared ``httpx.AsyncClient`` (connection pool + keep-alive) per run,
+- per-endpoint concurrency limits, so one slow receiver cannot take the pool,
+- exponential backoff on failure, up to ``MAX_ATTEMPTS`` then ``dead``,
+- a per-endpoint circuit breaker that parks deliveries while a receiver is down.
+  Breakers live at module level, so they survive across beat runs in the
+  same worker process.
+
+Claimed rows are leased (``next_attempt_at`` pushed ``CLAIM_LEASE_SECONDS``
+ahead) and committed before any HTTP call, so no row lock is held while
+waiting on receivers; a crashed worker's rows become due again when the
+lease expires. Each request has a hard ``REQUEST_TIMEOUT_SECONDS`` deadline
+and the lease covers a whole batch sent to one endpoint at that pace, so a
+live batch never outlasts its lease and is never claimed twice.
+
+Usage:
+    from src.core.webhook_dispatcher import enqueue_webhook_event
+    await enqueue_webhook_event(db, org_id, EventType.PRODUCTION_NEW, data)
+"""
+
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import math
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+import httpx
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.webhook import Webhook, WebhookDelivery, WebhookOutbox
+
+logger = logging.getLogger("egglogu.webhooks")
+
+BATCH_SIZE = 200
+MAX_ATTEMPTS = 6
+BACKOFF_BASE_SECONDS = 30  # 30s, 60s, 120s, 240s, 480s
+PER_ENDPOINT_CONCURRENCY = 4
+REQUEST_TIMEOUT_SECONDS = 10.0
+# Circuit breaker: open after N consecutive failures, probe again after cooldown
+BREAKER_FAILURE_THRESHOLD = 5
+BREAKER_COOLDOWN_SECONDS = 60
+# Worst case for a claimed batch: every row goes to one endpoint and each
+# request runs until its deadline; plus a margin for the final commit
+CLAIM_LEASE_SECONDS = (
+    math.ceil(BATCH_SIZE / PER_ENDPOINT_CONCURRENCY) * REQUEST_TIMEOUT_SECONDS + 60
+)
+
+
+def sign_payload(secret: str, body: str) -> str:
+    """HMAC-SHA256 signature sent in ``X-EGGlogU-Signature``."""
+    return hmac.new(secret.encode(), body.encode(), hashlib.sha256).hexdigest()
+
+
+def backoff_delay(attempts: int) -> timedelta:
+    """Exponential backoff after ``attempts`` failed deliveries."""
+    return timedelta(seconds=BACKOFF_BASE_SECONDS * (2 ** max(attempts - 1, 0)))
+
+
+async def enqueue_webhook_event(
+    db: AsyncSession,
+    org_id: uuid.UUID,
+    event_type: str,
+    data: dict[str, Any],
+) -> int:
+    """Write outbox rows for every active webhook subscribed to ``event_type``.
+
+    Does not flush or commit — the rows ride on the caller's transaction.
+
+    Returns:
+        Number of outbox rows added.
+    """
+    result = await db.execute(
+        select(Webhook.id, Webhook.events).where(
+            Webhook.organization_id == org_id, Webhook.is_active.is_(True)
+        )
+    )
+    rows = [
+        WebhookOutbox(
+            organization_id=org_id,
+            webhook_id=webhook_id,
+            event_type=event_type,
+            payload=data,
+        )
+        for webhook_id, events in result.all()
+        if event_type in (events or []) or "*" in (events or [])
+    ]
+    db.add_all(rows)
+    return len(rows)
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker for one endpoint (process-local)."""
+
+    def __init__(self) -> None:
+        self.failures = 0
+        self.open_until = 0.0
+
+    def allow(self) -> bool:
+        return time.monotonic() >= self.open_until
+
+    def record(self, success: bool) -> None:
+        if success:
+            self.failures = 0
+            self.open_until = 0.0
+            return
+        self.failures += 1
+        if self.failures >= BREAKER_FAILURE_THRESHOLD:
+            self.open_until = time.monotonic() + BREAKER_COOLDOWN_SECONDS
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+
+
+class WebhookDispatcher:
+    """Drains ``webhook_outbox`` in batches over a shared HTTP client."""
+
+    def __init__(self, client: httpx.AsyncClient) -> None:
+        self.client = client
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+
+    def _endpoint_key(self, url: str) -> str:
+        parsed = httpx.URL(url)
+        return f"{parsed.scheme}://{parsed.host}:{parsed.port or ''}"
+
+    def _semaphore(self, key: str) -> asyncio.Semaphore:
+        if key not in self._semaphores:
+            self._semaphores[key] = asyncio.Semaphore(PER_ENDPOINT_CONCURRENCY)
+        return self._semaphores[key]
+
+    def _breaker(self, key: str) -> CircuitBreaker:
+        if key not in _breakers:
+            _breakers[key] = CircuitBreaker()
+        return _breakers[key]
+
+    async def drain_once(self, db: AsyncSession) -> int:
+        """Claim and deliver one batch of due outbox rows, then commit.
+
+        Uses ``FOR UPDATE SKIP LOCKED`` so several workers can drain in
+        parallel without double delivery (ignored on SQLite). The claim is
+        committed as a lease before delivering, releasing the row locks.
+
+        Returns:
+            Number of outbox rows processed.
+        """
+        now = datetime.now(timezone.utc)
+        result = await db.execute(
+            select(WebhookOutbox)
+            .where(
+                WebhookOutbox.status == "pending",
+                WebhookOutbox.next_attempt_at <= now,
+            )
+            .order_by(WebhookOutbox.next_attempt_at)
+            .limit(BATCH_SIZE)
+            .with_for_update(skip_locked=True)
+        )
+        batch = list(result.scalars().all())
+        if not batch:
+            return 0
+
+        hooks_result = await db.execute(
+            select(Webhook).where(Webhook.id.in_({row.webhook_id for row in batch}))
+        )
+        hooks = {w.id: w for w in hooks_result.scalars().all()}
+        for row in batch:
+            row.next_attempt_at = now + timedelta(seconds=CLAIM_LEASE_SECONDS)
+        await db.commit()
+
+        outcomes = await asyncio.gather(
+            *[self._deliver(row, hooks.get(row.webhook_id)) for row in batch]
+        )
+        for row, outcome in zip(batch, outcomes):
+            self._apply_outcome(db, row, hooks.get(row.webhook_id), outcome, now)
+
+        await db.commit()
+        return len(batch)
+
+    async def _deliver(
+        self, row: WebhookOutbox, webhook: Webhook | None
+    ) -> dict[str, Any] | None:
+        """POST one outbox row. Returns None when the breaker parked it."""
+        if webhook is None or not webhook.is_active:
+            return {
+                "success": False,
+                "error": "webhook inactive or deleted",
+                "final": True,
+            }
+
+        key = self._endpoint_key(webhook.url)
+        breaker = self._breaker(key)
+        body = json.dumps(row.payload, separators=(",", ":"), sort_keys=True)
+        headers = {
+            "Content-Type": "application/json",
+            "X-EGGlogU-Signature": f"sha256={sign_payload(webhook.secret, body)}",
+            "X-EGGlogU-Event": row.event_type,
+            "X-EGGlogU-Delivery": str(row.id),
+            "User-Agent": "EGGlogU-Webhook/3.0",
+        }
+
+        async with self._semaphore(key):
+            # Checked once a slot is free, so failures earlier in the batch count
+            if not breaker.allow():
+                return None
+            t0 = time.monotonic()
+            try:
+                # httpx's timeout applies per phase; this bounds the whole call
+                resp = await asyncio.wait_for(
+                    self.client.post(webhook.url, content=body, headers=headers),
+                    REQUEST_TIMEOUT_SECONDS,
+                )
+                outcome = {
+                    "success": 200 <= resp.status_code < 300,
+                    "status": resp.status_code,
+                    "body": resp.text[:1000],
+                    "error": None,
+                }
+            except httpx.HTTPError as e:
+                outcome = {
+                    "success": False,
+                    "status": None,
+                    "body": None,
+                    "error": str(e)[:500],
+                }
+            except asyncio.TimeoutError:
+                outcome = {
+                    "success": False,
+                    "status": None,
+                    "body": None,
+                    "error": f"timed out after {REQUEST_TIMEOUT_SECONDS:g}s",
+                }
+            outcome["latency_ms"] = int((time.monotonic() - t0) * 1000)
+
+        breaker.record(outcome["success"])
+        return outcome
+
+    def _apply_outcome(
+        self,
+        db: AsyncSession,
+        row: WebhookOutbox,
+        webhook: Webhook | None,
+        outcome: dict[str, Any] | None,
+        now: datetime,
+    ) -> None:
+        if outcome is None:
+            # Circuit open: park without spending an attempt
+            row.next_attempt_at = now + timedelta(seconds=BREAKER_COOLDOWN_SECONDS)
+            return
+        if outcome.get("final"):
+            row.status = "dead"
+            row.last_error = outcome["error"]
+            return
+
+        row.attempts += 1
+        db.add(
+            WebhookDelivery(
+                organization_id=row.organization_id,
+                webhook_id=row.webhook_id,
+                event_type=row.event_type,
+                payload=row.payload,
+                response_status=outcome["status"],
+                response_body=outcome["body"],
+                latency_ms=outcome["latency_ms"],
+                success=outcome["success"],
+                attempt=row.attempts,
+                error=outcome["error"],
+            )
+        )
+        webhook.total_deliveries += 1
+        webhook.last_delivery_at = now
+
+        if outcome["success"]:
+            row.status = "delivered"
+            row.delivered_at = now
+            row.last_error = None
+            return
+
+        webhook.total_failures += 1
+        webhook.last_failure_at = now
+        row.last_error = outcome["error"] or f"HTTP {outcome['status']}"
+        if row.attempts >= MAX_ATTEMPTS:
+            row.status = "dead"
+            logger.error(
+                "Webhook %s gave up on outbox %s after %d attempts: %s",
+                row.webhook_id,
+                row.id,
+                row.attempts,
+                row.last_error,
+            )
+        else:
+            row.next_attempt_at = now + backoff_delay(row.attempts)
+
+
+async def drain_outbox(session_factory, *, time_budget_s: float = 50.0) -> int:
+    """Drain due outbox rows until empty or ``time_budget_s`` elapses.
+
+    One HTTP client (and its keep-alive pool) is shared by every batch.
+
+    Returns:
+        Total rows processed.
+    """
+    deadline = time.monotonic() + time_budget_s
+    total = 0
+    limits = httpx.Limits(max_connections=100, max_keepalive_connections=20)
+    async with httpx.AsyncClient(
+        limits=limits, timeout=REQUEST_TIMEOUT_SECONDS
+    ) as client:
+        dispatcher = WebhookDispatcher(client)
+        while time.monotonic() < deadline:
+            async with session_factory() as db:
+                processed = await dispatcher.drain_once(db)
+            total += processed
+            if processed < BATCH_SIZE:
+                break
+    return total
@@ -1,11 +1,28 @@
-"""Server-side workflow rule evaluator and action executor."""
+"""Server-side workflow rule evaluator and action executor.
+
+Rules are evaluated in batches: ``evaluate_rules`` loads one ``MetricsFrame``
+for every farm the rules point at (deaths in window, hen-day averages, feed
+stock, active outbreaks, overdue receivables), with one grouped query per
+metric and distinct rule parameter, and then checks each rule's conditions
+against it in memory. Evaluating N rules over M farms costs a handful of
+queries instead of a few per rule.
+
+Farm-level metrics follow ``Flock.farm_id``; feed purchases and receivables
+are not tied to a farm, so feed stock and overdue payments are measured per
+organization. Hen-day % of a record is ``total_eggs / current_count * 100``
+of its flock.
+"""
 
 import logging
+import uuid
+from collections import defaultdict
 from datetime import datetime, timedelta, timezone, date
+from typing import Any, Callable, Iterable
 
-from sqlalchemy import select, func
+from sqlalchemy import Float, cast, select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.models.flock import Flock
 from src.models.production import DailyProduction
 from src.models.health import Outbreak
 from src.models.feed import FeedPurchase, FeedConsumption
@@ -14,47 +31,218 @@ from src.models.workflow import WorkflowRule, WorkflowExecution
 
 logger = logging.getLogger("egglogu.workflows")
 
+FRAME_CHUNK = 500  # farms per grouped query
+
+_HEN_DAY = (
+    cast(DailyProduction.total_eggs, Float)
+    / func.nullif(cast(Flock.current_count, Float), 0)
+    * 100
+)
+
+
+def _chunks(items: list, size: int = FRAME_CHUNK) -> Iterable[list]:
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
+class MetricsFrame:
+    """Aggregates for a set of farms, shared by all the rules that use them.
+
+    ``load`` runs only the queries the given rules need: one per metric and
+    distinct parameter value (e.g. one per ``period_hours`` in use), each
+    grouped by farm or organization.
+    """
+
+    def __init__(self, today: date, now: datetime) -> None:
+        self.today = today
+        self.now = now
+        self.deaths: dict[int, dict[uuid.UUID, int]] = {}  # hours → farm → deaths
+        self.hen_day_avg: dict[int, dict[uuid.UUID, float]] = {}  # days → farm
+        self.hen_day_today: dict[uuid.UUID, float] = {}
+        self.hen_day_days: dict[uuid.UUID, list[tuple[date, float]]] = {}
+        self.feed_stock: dict[uuid.UUID, float] = {}  # org → kg
+        self.feed_daily: dict[uuid.UUID, float] = {}  # org → avg kg per record
+        self.outbreaks: dict[uuid.UUID, int] = {}  # farm → active outbreaks
+        self.overdue: dict[int, dict[uuid.UUID, int]] = {}  # days → org → count
+
+    async def load(self, db: AsyncSession, rules: list[WorkflowRule]) -> None:
+        needs: dict[str, set] = defaultdict(set)
+        for rule in rules:
+            cond = rule.conditions
+            cond_type = cond.get("type")
+            if cond_type == "mortality_spike":
+                needs["deaths"].add(cond.get("period_hours", 24))
+            elif cond_type == "production_drop":
+                needs["hen_day_avg"].add(cond.get("vs_period_days", 7))
+            elif cond_type == "below_target":
+                needs["hen_day_days"].add(cond.get("consecutive_days", 3))
+            elif cond_type == "payment_overdue":
+                needs["overdue"].add(cond.get("days_overdue", 1))
+            else:
+                needs[cond_type].add(None)
+
+        farms = sorted({r.farm_id for r in rules})
+        orgs = sorted({r.organization_id for r in rules})
+        for farm_ids in _chunks(farms):
+            org_ids = sorted(
+                {r.organization_id for r in rules if r.farm_id in farm_ids}
+            )
+            for hours in needs["deaths"]:
+                self.deaths.setdefault(hours, {}).update(
+                    await self._deaths(db, org_ids, farm_ids, hours)
+                )
+            for days in needs["hen_day_avg"]:
+                since = self.today - timedelta(days=days)
+                self.hen_day_avg.setdefault(days, {}).update(
+                    await self._hen_day_avg(
+                        db,
+                        org_ids,
+                        farm_ids,
+                        (DailyProduction.date >= since)
+                        & (DailyProduction.date < self.today),
+                    )
+                )
+            if needs["hen_day_avg"]:
+                self.hen_day_today.update(
+                    await self._hen_day_avg(
+                        db, org_ids, farm_ids, DailyProduction.date == self.today
+                    )
+                )
+            if needs["hen_day_days"]:
+                await self._hen_day_days(
+                    db, org_ids, farm_ids, max(needs["hen_day_days"])
+                )
+            if needs["outbreak_active"]:
+                await self._outbreaks(db, org_ids, farm_ids)
+        for org_ids in _chunks(orgs):
+            if needs["feed_stock_low"]:
+                await self._feed(db, org_ids)
+            for days in needs["overdue"]:
+                self.overdue.setdefault(days, {}).update(
+                    await self._overdue(db, org_ids, days)
+                )
+
+    async def _deaths(self, db, org_ids, farm_ids, hours) -> dict:
+        since = self.now - timedelta(hours=hours)
+        stmt = (
+            select(Flock.farm_id, func.sum(DailyProduction.deaths))
+            .join(Flock, Flock.id == DailyProduction.flock_id)
+            .where(
+                DailyProduction.organization_id.in_(org_ids),
+                Flock.farm_id.in_(farm_ids),
+                DailyProduction.created_at >= since,
+            )
+            .group_by(Flock.farm_id)
+        )
+        return {farm: total for farm, total in (await db.execute(stmt)).all()}
+
+    async def _hen_day_avg(self, db, org_ids, farm_ids, period) -> dict:
+        stmt = (
+            select(Flock.farm_id, func.avg(_HEN_DAY))
+            .join(Flock, Flock.id == DailyProduction.flock_id)
+            .where(
+                DailyProduction.organization_id.in_(org_ids),
+                Flock.farm_id.in_(farm_ids),
+                period,
+            )
+            .group_by(Flock.farm_id)
+        )
+        return {farm: avg for farm, avg in (await db.execute(stmt)).all()}
+
+    async def _hen_day_days(self, db, org_ids, farm_ids, days) -> None:
+        stmt = (
+            select(Flock.farm_id, DailyProduction.date, _HEN_DAY)
+            .join(Flock, Flock.id == DailyProduction.flock_id)
+            .where(
+                DailyProduction.organization_id.in_(org_ids),
+                Flock.farm_id.in_(farm_ids),
+                DailyProduction.date >= self.today - timedelta(days=days),
+                Flock.current_count > 0,
+            )
+            .order_by(Flock.farm_id, DailyProduction.date.desc())
+        )
+        for farm, day, pct in (await db.execute(stmt)).all():
+            self.hen_day_days.setdefault(farm, []).append((day, pct))
+
+    async def _outbreaks(self, db, org_ids, farm_ids) -> None:
+        stmt = (
+            select(Flock.farm_id, func.count())
+            .select_from(Outbreak)
+            .join(Flock, Flock.id == Outbreak.flock_id)
+            .where(
+                Outbreak.organization_id.in_(org_ids),
+                Flock.farm_id.in_(farm_ids),
+                Outbreak.resolved == False,  # noqa: E712
+            )
+            .group_by(Flock.farm_id)
+        )
+        self.outbreaks.update((await db.execute(stmt)).all())
+
+    async def _feed(self, db, org_ids) -> None:
+        purchased = dict(
+            (
+                await db.execute(
+                    select(FeedPurchase.organization_id, func.sum(FeedPurchase.kg))
+                    .where(
+                        FeedPurchase.organization_id.in_(org_ids),
+                        FeedPurchase.deleted_at.is_(None),
+                    )
+                    .group_by(FeedPurchase.organization_id)
+                )
+            ).all()
+        )
+        consumed = (
+            await db.execute(
+                select(
+                    FeedConsumption.organization_id,
+                    func.sum(FeedConsumption.feed_kg),
+                    func.avg(FeedConsumption.feed_kg).filter(
+                        FeedConsumption.date >= self.today - timedelta(days=30)
+                    ),
+                )
+                .where(FeedConsumption.organization_id.in_(org_ids))
+                .group_by(FeedConsumption.organization_id)
+            )
+        ).all()
+        used = {org: (total, avg) for org, total, avg in consumed}
+        for org in org_ids:
+            total, avg = used.get(org, (0, 0))
+            self.feed_stock[org] = float(purchased.get(org) or 0) - float(total or 0)
+            self.feed_daily[org] = float(avg or 0)
+
+    async def _overdue(self, db, org_ids, days) -> dict:
+        stmt = (
+            select(Receivable.organization_id, func.count())
+            .where(
+                Receivable.organization_id.in_(org_ids),
+                Receivable.due_date <= self.today - timedelta(days=days),
+                Receivable.paid == False,  # noqa: E712
+            )
+            .group_by(Receivable.organization_id)
+        )
+        return dict((await db.execute(stmt)).all())
+
 
-async def _check_mortality_spike(db: AsyncSession, rule: WorkflowRule) -> dict:
+def _check_mortality_spike(rule: WorkflowRule, frame: MetricsFrame) -> dict:
     """Check if deaths exceed threshold in the period."""
     cond = rule.conditions
     threshold = cond.get("threshold", 5)
     hours = cond.get("period_hours", 24)
-    since = datetime.now(timezone.utc) - timedelta(hours=hours)
-
-    stmt = select(func.sum(DailyProduction.deaths)).where(
-        DailyProduction.organization_id == rule.organization_id,
-        DailyProduction.farm_id == rule.farm_id,
-        DailyProduction.created_at >= since,
-    )
-    total = (await db.execute(stmt)).scalar() or 0
+    total = frame.deaths[hours].get(rule.farm_id) or 0
     matched = total >= threshold
     return {"matched": matched, "value": total, "threshold": threshold}
 
 
-async def _check_production_drop(db: AsyncSession, rule: WorkflowRule) -> dict:
+def _check_production_drop(rule: WorkflowRule, frame: MetricsFrame) -> dict:
     """Check if hen-day% dropped vs recent average."""
     cond = rule.conditions
     drop_pct = cond.get("drop_pct", 10)
     vs_days = cond.get("vs_period_days", 7)
-    today = date.today()
 
-    avg_stmt = select(func.avg(DailyProduction.hen_day_pct)).where(
-        DailyProduction.organization_id == rule.organization_id,
-        DailyProduction.farm_id == rule.farm_id,
-        DailyProduction.date >= today - timedelta(days=vs_days),
-        DailyProduction.date < today,
-    )
-    avg = (await db.execute(avg_stmt)).scalar()
+    avg = frame.hen_day_avg[vs_days].get(rule.farm_id)
     if not avg:
         return {"matched": False, "reason": "no data"}
-
-    today_stmt = select(func.avg(DailyProduction.hen_day_pct)).where(
-        DailyProduction.organization_id == rule.organization_id,
-        DailyProduction.farm_id == rule.farm_id,
-        DailyProduction.date == today,
-    )
-    current = (await db.execute(today_stmt)).scalar()
+    current = frame.hen_day_today.get(rule.farm_id)
     if not current:
         return {"matched": False, "reason": "no today data"}
 
@@ -67,48 +255,20 @@ async def _check_production_drop(db: AsyncSession, rule: WorkflowRule) -> dict:
     }
 
 
-async def _check_feed_stock(db: AsyncSession, rule: WorkflowRule) -> dict:
+def _check_feed_stock(rule: WorkflowRule, frame: MetricsFrame) -> dict:
     """Check if feed stock is critically low."""
     cond = rule.conditions
     days_threshold = cond.get("days_remaining", 3)
 
-    # Get total purchased vs consumed
-    purchased = (
-        await db.execute(
-            select(func.sum(FeedPurchase.quantity_kg)).where(
-                FeedPurchase.organization_id == rule.organization_id,
-                FeedPurchase.farm_id == rule.farm_id,
-            )
-        )
-    ).scalar() or 0
-    consumed = (
-        await db.execute(
-            select(func.sum(FeedConsumption.quantity_kg)).where(
-                FeedConsumption.organization_id == rule.organization_id,
-                FeedConsumption.farm_id == rule.farm_id,
-            )
-        )
-    ).scalar() or 0
-
-    stock = float(purchased) - float(consumed)
+    stock = frame.feed_stock[rule.organization_id]
     if stock <= 0:
         return {"matched": True, "stock_kg": 0, "days_remaining": 0}
 
-    # Avg daily consumption last 30 days
-    avg_daily = (
-        await db.execute(
-            select(func.avg(FeedConsumption.quantity_kg)).where(
-                FeedConsumption.organization_id == rule.organization_id,
-                FeedConsumption.farm_id == rule.farm_id,
-                FeedConsumption.date >= date.today() - timedelta(days=30),
-            )
-        )
-    ).scalar() or 0
-
-    if float(avg_daily) <= 0:
+    avg_daily = frame.feed_daily[rule.organization_id]
+    if avg_daily <= 0:
         return {"matched": False, "reason": "no consumption data"}
 
-    days_left = stock / float(avg_daily)
+    days_left = stock / avg_daily
     matched = days_left <= days_threshold
     return {
         "matched": matched,
@@ -117,51 +277,29 @@ async def _check_feed_stock(db: AsyncSession, rule: WorkflowRule) -> dict:
     }
 
 
-async def _check_outbreak(db: AsyncSession, rule: WorkflowRule) -> dict:
+def _check_outbreak(rule: WorkflowRule, frame: MetricsFrame) -> dict:
     """Check for active outbreaks."""
-    stmt = select(func.count()).where(
-        Outbreak.organization_id == rule.organization_id,
-        Outbreak.farm_id == rule.farm_id,
-        Outbreak.status == "active",
-    )
-    count = (await db.execute(stmt)).scalar() or 0
+    count = frame.outbreaks.get(rule.farm_id, 0)
     return {"matched": count > 0, "active_outbreaks": count}
 
 
-async def _check_payment_overdue(db: AsyncSession, rule: WorkflowRule) -> dict:
+def _check_payment_overdue(rule: WorkflowRule, frame: MetricsFrame) -> dict:
     """Check for overdue receivables."""
-    cond = rule.conditions
-    days = cond.get("days_overdue", 1)
-    cutoff = date.today() - timedelta(days=days)
-
-    stmt = select(func.count()).where(
-        Receivable.organization_id == rule.organization_id,
-        Receivable.farm_id == rule.farm_id,
-        Receivable.due_date <= cutoff,
-        Receivable.paid == False,  # noqa: E712
-    )
-    count = (await db.execute(stmt)).scalar() or 0
+    days = rule.conditions.get("days_overdue", 1)
+    count = frame.overdue[days].get(rule.organization_id, 0)
     return {"matched": count > 0, "overdue_count": count}
 
 
-async def _check_below_target(db: AsyncSession, rule: WorkflowRule) -> dict:
+def _check_below_target(rule: WorkflowRule, frame: MetricsFrame) -> dict:
     """Check if production has been below target for consecutive days."""
     cond = rule.conditions
     consec = cond.get("consecutive_days", 3)
-    today = date.today()
-
-    # Check last N days — simplified: look at hen_day_pct vs 80% default target
-    stmt = (
-        select(DailyProduction.hen_day_pct)
-        .where(
-            DailyProduction.organization_id == rule.organization_id,
-            DailyProduction.farm_id == rule.farm_id,
-            DailyProduction.date >= today - timedelta(days=consec),
-        )
-        .order_by(DailyProduction.date.desc())
-        .limit(consec)
-    )
-    rows = (await db.execute(stmt)).scalars().all()
+    since = frame.today - timedelta(days=consec)
+
+    # Latest N records — simplified: hen_day_pct vs 80% default target
+    rows = [
+        pct for day, pct in frame.hen_day_days.get(rule.farm_id, []) if day >= since
+    ][:consec]
     if len(rows) < consec:
         return {"matched": False, "reason": "insufficient data"}
 
@@ -171,7 +309,7 @@ async def _check_below_target(db: AsyncSession, rule: WorkflowRule) -> dict:
 
 
 # Map condition types to evaluator functions
-CONDITION_EVALUATORS = {
+CONDITION_EVALUATORS: dict[str, Callable[[WorkflowRule, MetricsFrame], dict]] = {
     "mortality_spike": _check_mortality_spike,
     "production_drop": _check_production_drop,
     "feed_stock_low": _check_feed_stock,
@@ -182,6 +320,64 @@ CONDITION_EVALUATORS = {
 }
 
 
+async def evaluate_rules(
+    db: AsyncSession, rules: list[WorkflowRule], dry_run: bool = False
+) -> list[dict]:
+    """Evaluate many workflow rules against one shared metrics frame.
+
+    Args:
+        db: Database session
+        rules: Rules to evaluate, of any organizations and farms
+        dry_run: If True, don't execute actions or log execution
+
+    Returns:
+        One dict with matched status and details per rule, in order
+    """
+    now = datetime.now(timezone.utc)
+    results: list[dict | None] = [None] * len(rules)
+    pending: list[int] = []
+    for i, rule in enumerate(rules):
+        cond_type = rule.conditions.get("type")
+        if cond_type not in CONDITION_EVALUATORS:
+            results[i] = {
+                "matched": False,
+                "error": f"Unknown condition type: {cond_type}",
+            }
+            continue
+
+        # Check cooldown
+        if not dry_run and rule.last_triggered_at:
+            last = rule.last_triggered_at
+            if last.tzinfo is None:
+                last = last.replace(tzinfo=timezone.utc)
+            cooldown_until = last + timedelta(minutes=rule.cooldown_minutes)
+            if now < cooldown_until:
+                results[i] = {
+                    "matched": False,
+                    "reason": "cooldown",
+                    "cooldown_until": cooldown_until.isoformat(),
+                }
+                continue
+        pending.append(i)
+
+    if not pending:
+        return results
+
+    frame = MetricsFrame(date.today(), now)
+    await frame.load(db, [rules[i] for i in pending])
+    triggered = False
+    for i in pending:
+        rule = rules[i]
+        result = CONDITION_EVALUATORS[rule.conditions["type"]](rule, frame)
+        results[i] = result
+        if result["matched"] and not dry_run:
+            _execute_actions(db, rule, result)
+            triggered = True
+    if triggered:
+        await db.flush()
+    return results
+
+
 async def evaluate_rule(
     db: AsyncSession, rule: WorkflowRule, dry_run: bool = False
 ) -> dict:
@@ -195,35 +391,44 @@ async def evaluate_rule(
     Returns:
         dict with matched status and details
     """
-    cond_type = rule.conditions.get("type")
-    evaluator = CONDITION_EVALUATORS.get(cond_type)
+    return (await evaluate_rules(db, [rule], dry_run))[0]
 
-    if not evaluator:
-        return {"matched": False, "error": f"Unknown condition type: {cond_type}"}
 
-    # Check cooldown
-    if not dry_run and rule.last_triggered_at:
-        cooldown_until = rule.last_triggered_at + timedelta(
-            minutes=rule.cooldown_minutes
-        )
-        if datetime.now(timezone.utc) < cooldown_until:
-            return {
-                "matched": False,
-                "reason": "cooldown",
-                "cooldown_until": cooldown_until.isoformat(),
-            }
-
-    result = await evaluator(db, rule)
-
-    if result["matched"] and not dry_run:
-        await _execute_actions(db, rule, result)
-
-    return result
+async def evaluate_active_rules(
+    db: AsyncSession,
+    organization_id: uuid.UUID | None = None,
+    rule_types: Iterable[str] | None = None,
+) -> dict[str, Any]:
+    """Evaluate every active rule (of one organization, or all of them),
+    optionally only those whose condition type is in ``rule_types``.
 
-
-async def _execute_actions(
-    db: AsyncSession, rule: WorkflowRule, eval_result: dict
-) -> None:
+    Rules are processed ``FRAME_CHUNK`` farms at a time, so memory stays
+    bounded however many farms there are.
+    """
+    stmt = select(WorkflowRule).where(WorkflowRule.is_active == True)  # noqa: E712
+    if organization_id is not None:
+        stmt = stmt.where(WorkflowRule.organization_id == organization_id)
+    rules = (
+        (await db.execute(stmt.order_by(WorkflowRule.farm_id, WorkflowRule.id)))
+        .scalars()
+        .all()
+    )
+    if rule_types is not None:
+        wanted = set(rule_types)
+        rules = [r for r in rules if (r.conditions or {}).get("type") in wanted]
+
+    by_farm: dict[uuid.UUID, list[WorkflowRule]] = defaultdict(list)
+    for rule in rules:
+        by_farm[rule.farm_id].append(rule)
+    triggered = 0
+    for farm_ids in _chunks(list(by_farm)):
+        batch = [rule for farm_id in farm_ids for rule in by_farm[farm_id]]
+        results = await evaluate_rules(db, batch)
+        triggered += sum(1 for r in results if r["matched"])
+    return {"evaluated": len(rules), "farms": len(by_farm), "triggered": triggered}
+
+
+def _execute_actions(db: AsyncSession, rule: WorkflowRule, eval_result: dict) -> None:
     """Execute the actions defined in a workflow rule."""
     actions = rule.actions
     actions_executed = {}
@@ -255,7 +460,7 @@ async def _execute_actions(
     rule.last_triggered_at = datetime.now(timezone.utc)
     rule.execution_count = (rule.execution_count or 0) + 1
 
-    # Log execution
+    # Log execution (flushed once per batch by evaluate_rules)
     execution = WorkflowExecution(
         organization_id=rule.organization_id,
         rule_id=rule.id,
@@ -266,6 +471,5 @@ async def _execute_actions(
         status="completed",
     )
     db.add(execution)
-    await db.flush()
 
     logger.info("Workflow triggered: %s (rule=%s)", rule.name, str(rule.id)[:8])
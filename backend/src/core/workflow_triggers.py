@@ -0,0 +1,299 @@
+"""Event-driven workflow evaluation.
+
+Instead of re-checking every rule on a schedule, writes mark what they may
+have changed: service write paths call ``mark_records`` or
+``mark_after_commit``, the sync upsert calls ``mark_rows`` and
+``publish_event`` notifies ``on_event``. Marks made through a session are
+staged in ``session.info`` and published by an ``after_commit`` listener
+(``setup_workflow_listeners``), so the flush never reads data that is not
+committed yet and rolled-back writes evaluate nothing. Each mark adds
+``(org, farm, rule_type)`` to a dirty set (``farm`` is None for organization-wide data such as feed
+purchases and receivables). A background task waits ``DEBOUNCE_SECONDS``
+after the first mark, so a burst of writes is evaluated once, then loads
+only the active rules matching the dirty set and runs them through
+``workflow_evaluator.evaluate_rules``: one transaction per organization,
+one metrics frame per batch, and the resulting ``WorkflowExecution`` rows
+inserted in a single flush.
+
+Marks made while the task is not running (tests, scripts) are ignored;
+``evaluate_active_rules`` still sweeps everything on demand. Rule types
+that change with the passage of time rather than with writes
+(``TIME_RULE_TYPES``) are swept by the ``sweep_time_rules`` beat task.
+
+Usage:
+    from src.core import workflow_triggers
+    workflow_triggers.mark(org_id, farm_id, "production")
+"""
+
+import asyncio
+import logging
+import uuid
+from collections import defaultdict
+from typing import Any, Callable, Iterable
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from src.core import events
+from src.core.events import EventType
+
+logger = logging.getLogger("egglogu.workflows")
+
+DEBOUNCE_SECONDS = 5.0
+MAX_DIRTY = 50_000
+
+_PRODUCTION_RULES = ("mortality_spike", "production_drop", "below_target")
+
+# Rule types that may change when rows of a table change
+TABLE_RULE_TYPES: dict[str, tuple[str, ...]] = {
+    "daily_production": _PRODUCTION_RULES,
+    "flocks": _PRODUCTION_RULES,  # current_count feeds hen-day %
+    "outbreaks": ("outbreak_active",),
+    "feed_purchases": ("feed_stock_low",),
+    "feed_consumption": ("feed_stock_low",),
+    "receivables": ("payment_overdue",),
+}
+EVENT_TABLES: dict[str, str] = {
+    EventType.PRODUCTION_NEW: "daily_production",
+    EventType.PRODUCTION_UPDATE: "daily_production",
+    EventType.FLOCK_UPDATE: "flocks",
+    EventType.OUTBREAK_ALERT: "outbreaks",
+    EventType.FEED_PURCHASE: "feed_purchases",
+}
+# Rules that can start matching without any write (overdue dates, stock
+# running down at the recent consumption rate)
+TIME_RULE_TYPES = ("payment_overdue", "feed_stock_low")
+# Tables whose rules look at the whole organization, not one farm
+ORG_WIDE_TABLES = frozenset({"feed_purchases", "feed_consumption", "receivables"})
+
+DirtyKey = tuple[str, str | None, str]  # (org_id, farm_id or None, rule_type)
+
+_PENDING_KEY = "workflow_marks"
+
+_dirty: set[DirtyKey] = set()
+_wakeup: asyncio.Event | None = None
+_task: asyncio.Task | None = None
+_stats = {
+    "marked": 0,
+    "dropped": 0,
+    "batches": 0,
+    "evaluated": 0,
+    "triggered": 0,
+    "errors": 0,
+}
+
+
+def running() -> bool:
+    """Whether this process evaluates rules on writes."""
+    return _task is not None
+
+
+def mark(org_id: Any, farm_id: Any, table: str) -> None:
+    """Flag the rules that rows of ``table`` in ``farm_id`` may affect."""
+    rule_types = TABLE_RULE_TYPES.get(table)
+    if not rule_types or _task is None or not org_id:
+        return
+    farm = None if table in ORG_WIDE_TABLES or not farm_id else str(farm_id)
+    for rule_type in rule_types:
+        key = (str(org_id), farm, rule_type)
+        if key in _dirty:
+            continue
+        if len(_dirty) >= MAX_DIRTY:
+            _stats["dropped"] += 1
+            continue
+        _dirty.add(key)
+        _stats["marked"] += 1
+    _wakeup.set()
+
+
+def mark_after_commit(db, org_id: Any, farm_id: Any, table: str) -> None:
+    """``mark`` once the transaction of ``db`` commits; dropped on rollback."""
+    if table not in TABLE_RULE_TYPES or _task is None:
+        return
+    session = getattr(db, "sync_session", db)
+    session.info.setdefault(_PENDING_KEY, set()).add((org_id, farm_id, table))
+
+
+def on_event(event_type: str, farm_id: str | None, org_id: str | None) -> None:
+    """``events`` listener: mark the rules a published event may affect."""
+    table = EVENT_TABLES.get(event_type)
+    if table:
+        mark(org_id, farm_id, table)
+
+
+async def mark_rows(db, org_id: Any, table: str, rows: Iterable[dict]) -> None:
+    """Mark the farms touched by upserted ``rows`` of ``table``.
+
+    Rows carry ``farm_id`` (flocks) or ``flock_id``; the flocks' farms are
+    resolved with one query. The marks apply when ``db`` commits.
+    """
+    if table not in TABLE_RULE_TYPES or _task is None:
+        return
+    if table in ORG_WIDE_TABLES:
+        mark_after_commit(db, org_id, None, table)
+        return
+    from src.models.flock import Flock
+
+    rows = list(rows)
+    farms = {r["farm_id"] for r in rows if r.get("farm_id")}
+    flock_ids = {uuid.UUID(str(r["flock_id"])) for r in rows if r.get("flock_id")}
+    if flock_ids:
+        farms.update(
+            (
+                await db.execute(
+                    select(Flock.farm_id).where(Flock.id.in_(flock_ids)).distinct()
+                )
+            ).scalars()
+        )
+    for farm_id in farms:
+        mark_after_commit(db, org_id, farm_id, table)
+
+
+async def mark_records(db, org_id: Any, table: str, *records) -> None:
+    """``mark_rows`` for ORM objects written by a service (created, updated
+    or about to be deleted)."""
+    if table not in TABLE_RULE_TYPES or _task is None:
+        return
+    await mark_rows(
+        db,
+        org_id,
+        table,
+        (
+            {
+                "farm_id": getattr(r, "farm_id", None),
+                "flock_id": getattr(r, "flock_id", None),
+            }
+            for r in records
+        ),
+    )
+
+
+# ── Session listeners ────────────────────────────────────────────────
+
+
+def _after_commit_handler(session: Session) -> None:
+    """Publish the marks staged by the committed transaction."""
+    for org_id, farm_id, table in session.info.pop(_PENDING_KEY, ()):
+        mark(org_id, farm_id, table)
+
+
+def _after_rollback_handler(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+def setup_workflow_listeners() -> None:
+    """Register the session event listeners. Call once at startup."""
+    event.listen(Session, "after_commit", _after_commit_handler)
+    event.listen(Session, "after_rollback", _after_rollback_handler)
+
+
+def _default_session_factory():
+    from src.database import async_session
+
+    return async_session()
+
+
+def _matches(rule, keys: set[DirtyKey]) -> bool:
+    rule_type = rule.conditions.get("type")
+    org = str(rule.organization_id)
+    return (org, str(rule.farm_id), rule_type) in keys or (org, None, rule_type) in keys
+
+
+async def _evaluate_org(
+    session_factory: Callable[[], Any], org_id: str, keys: set[DirtyKey]
+) -> None:
+    from src.core.workflow_evaluator import evaluate_rules
+    from src.database import set_tenant_context
+    from src.models.workflow import WorkflowRule
+
+    farm_ids = {uuid.UUID(farm) for _, farm, _ in keys if farm is not None}
+    stmt = select(WorkflowRule).where(
+        WorkflowRule.organization_id == uuid.UUID(org_id),
+        WorkflowRule.is_active == True,  # noqa: E712
+    )
+    if all(farm is not None for _, farm, _ in keys):
+        stmt = stmt.where(WorkflowRule.farm_id.in_(farm_ids))
+
+    async with session_factory() as db:
+        await set_tenant_context(db, org_id)
+        rules = [r for r in (await db.execute(stmt)).scalars() if _matches(r, keys)]
+        if not rules:
+            return
+        results = await evaluate_rules(db, rules)
+        await db.commit()
+    _stats["evaluated"] += len(rules)
+    _stats["triggered"] += sum(1 for r in results if r["matched"])
+
+
+async def flush_dirty(
+    session_factory: Callable[[], Any] = _default_session_factory,
+) -> int:
+    """Evaluate the rules marked so far; returns how many marks were consumed.
+
+    On a failed organization its marks go back into the dirty set and are
+    retried after the next debounce.
+    """
+    if not _dirty:
+        return 0
+    batch = set(_dirty)
+    _dirty.clear()
+    by_org: dict[str, set[DirtyKey]] = defaultdict(set)
+    for key in batch:
+        by_org[key[0]].add(key)
+
+    for org_id, keys in by_org.items():
+        try:
+            await _evaluate_org(session_factory, org_id, keys)
+        except Exception as e:
+            _stats["errors"] += 1
+            logger.error("Workflow evaluation failed for org %s: %s", org_id, e)
+            _dirty.update(keys)
+            if _wakeup is not None:
+                _wakeup.set()
+    _stats["batches"] += 1
+    return len(batch)
+
+
+async def _run() -> None:
+    while True:
+        await _wakeup.wait()
+        await asyncio.sleep(DEBOUNCE_SECONDS)
+        _wakeup.clear()
+        try:
+            await flush_dirty()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("Workflow trigger error: %s", e)
+
+
+def start_workflow_triggers() -> None:
+    """Start evaluating rules on writes in this process. Call at startup."""
+    global _task, _wakeup
+    if _task is not None:
+        return
+    _wakeup = asyncio.Event()
+    _task = asyncio.create_task(_run())
+    events.add_listener(on_event)
+    logger.info("Workflow triggers started")
+
+
+async def stop_workflow_triggers() -> None:
+    """Stop the task and evaluate whatever is still marked."""
+    global _task, _wakeup
+    if _task is None:
+        return
+    events.remove_listener(on_event)
+    _task.cancel()
+    try:
+        await _task
+    except (asyncio.CancelledError, Exception):
+        pass
+    _task = None
+    _wakeup = None
+    await flush_dirty()
+
+
+def workflow_trigger_stats() -> dict[str, int]:
+    """Pending marks and lifetime counters of this process."""
+    return {"dirty": len(_dirty), **_stats}
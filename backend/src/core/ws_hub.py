@@ -0,0 +1,376 @@
+"""Per-process fan-out hub between Redis Pub/Sub and WebSocket clients.
+
+Each worker holds a single Redis Pub/Sub connection. Channels
+(``events:farm:{id}``, ``events:org:{id}``, ``chat:{room}``) are subscribed
+on it when their first local socket connects and unsubscribed when the last
+one leaves (reference counting by channel), instead of one Redis connection
+per socket. A catch-all pattern subscription is deliberately avoided: it
+would deliver every organization's events to every worker.
+
+A message is routed to the channel's local subscribers as the raw JSON text
+received from Redis: it is decoded at most once per worker (to read its
+type) and never re-serialized per socket. Each socket has a bounded send queue drained by its own task;
+when a slow client lets it fill up, the oldest messages are dropped and the
+client is told how many with an ``overflow`` frame, so it can refetch.
+
+Bursty event types are coalesced per channel before the fan-out: events
+of a type listed in ``COALESCE_WINDOWS`` are held for that window, merged
+per entity (later fields win, ``coalesced`` counts the merged events) and
+pushed as one ``{"type": "batch", "events": [...]}`` frame, so a dashboard
+gets the latest state of each entity that changed instead of every
+intermediate update. Events whose data names no entity (e.g. the gateway's
+per-flush ``iot.reading`` summaries) are batched but never merged, since
+their fields describe that event alone. Types not listed, and alerts in any case
+(``NEVER_COALESCE``), are pushed as they arrive. Frames are compressed by
+the server's permessage-deflate extension (uvicorn's default).
+
+Events carry the ID of their entry in the channel's event log
+(``src.core.events``); a batch frame carries the ID of its newest event.
+After replaying the log to a reconnecting client, ``Subscriber.skip_through``
+drops live frames the replay already covered.
+
+Usage:
+    from src.core import ws_hub
+    sub = ws_hub.Subscriber(websocket)
+    await ws_hub.subscribe(channel, sub)
+    try:
+        await sub.run()
+    finally:
+        await ws_hub.unsubscribe(channel, sub)
+"""
+
+import asyncio
+import json
+import logging
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any
+
+from src.core import rate_limit
+from src.core.events import EventType, event_id_key
+
+logger = logging.getLogger("egglogu.ws_hub")
+
+SEND_QUEUE_SIZE = 256
+HEARTBEAT_INTERVAL = 30  # seconds
+RECONNECT_DELAY = 1.0  # seconds
+
+# Seconds events of each type are held and merged before being pushed
+COALESCE_WINDOWS: dict[str, float] = {
+    EventType.IOT_READING: 0.25,
+    EventType.ENVIRONMENT_READING: 0.25,
+    EventType.PRODUCTION_NEW: 0.5,
+    EventType.PRODUCTION_UPDATE: 0.5,
+    EventType.FLOCK_UPDATE: 0.5,
+    EventType.FEED_PURCHASE: 1.0,
+    EventType.FINANCE_INCOME: 1.0,
+    EventType.FINANCE_EXPENSE: 1.0,
+}
+NEVER_COALESCE = frozenset(
+    {
+        EventType.HEALTH_ALERT,
+        EventType.BIOSECURITY_ALERT,
+        EventType.SYSTEM_ALERT,
+        EventType.OUTBREAK_ALERT,
+    }
+)
+# First field of an event's data identifying the entity it updates
+ENTITY_FIELDS = ("id", "entity_id", "flock_id", "sensor_type")
+
+_ID_PREFIX = '{"id":'  # an event frame's ID leads it
+
+_stats = {
+    "messages": 0,
+    "deliveries": 0,
+    "dropped": 0,
+    "reconnects": 0,
+    "batches": 0,
+    "coalesced": 0,
+}
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class Subscriber:
+    """One WebSocket's bounded send queue and the task draining it."""
+
+    def __init__(self, websocket: Any, max_queue: int = SEND_QUEUE_SIZE) -> None:
+        self.websocket = websocket
+        self._queue: deque[str] = deque()
+        self._max_queue = max_queue
+        self._ready = asyncio.Event()
+        self._skip: tuple[int, int] | None = None
+        self.dropped = 0
+
+    def offer(self, raw: str) -> None:
+        """Queue a serialized frame; never blocks the hub."""
+        if len(self._queue) >= self._max_queue:
+            self._queue.popleft()
+            self.dropped += 1
+            _stats["dropped"] += 1
+        self._queue.append(raw)
+        self._ready.set()
+
+    def skip_through(self, event_id: str) -> None:
+        """Drop frames up to ``event_id`` (already replayed) until a newer one."""
+        self._skip = event_id_key(event_id)
+
+    def _replayed(self, raw: str) -> bool:
+        if self._skip is None or not raw.startswith(_ID_PREFIX):
+            return False
+        start = raw.index('"', len(_ID_PREFIX)) + 1
+        end = raw.index('"', start)
+        if event_id_key(raw[start:end]) <= self._skip:
+            return True
+        self._skip = None
+        return False
+
+    async def _next_batch(self) -> list[str]:
+        try:
+            await asyncio.wait_for(self._ready.wait(), HEARTBEAT_INTERVAL)
+        except asyncio.TimeoutError:
+            return []
+        self._ready.clear()
+        batch = list(self._queue)
+        self._queue.clear()
+        return batch
+
+    async def run(self) -> None:
+        """Send queued frames (and heartbeats) until the socket fails."""
+        while True:
+            batch = await self._next_batch()
+            if not batch:
+                await self.websocket.send_text(
+                    json.dumps({"type": "heartbeat", "timestamp": _now()})
+                )
+                continue
+            if self.dropped:
+                notice = {
+                    "type": "overflow",
+                    "dropped": self.dropped,
+                    "timestamp": _now(),
+                }
+                self.dropped = 0
+                await self.websocket.send_text(json.dumps(notice))
+            for raw in batch:
+                if not self._replayed(raw):
+                    await self.websocket.send_text(raw)
+
+
+def coalesce_window(event_type: str | None) -> float:
+    if event_type in NEVER_COALESCE:
+        return 0.0
+    return COALESCE_WINDOWS.get(event_type, 0.0)
+
+
+def _entity_key(event: dict) -> tuple | None:
+    data = event.get("data") or {}
+    entity = next((data[f] for f in ENTITY_FIELDS if data.get(f) is not None), None)
+    if entity is None:
+        return None
+    return (event.get("type"), event.get("farm_id"), str(entity))
+
+
+class _Batch:
+    """Events of one channel waiting for their coalescing window to close."""
+
+    def __init__(self) -> None:
+        self.entries: dict[tuple, dict] = {}
+        self.first_raw: str | None = None
+        self.last_id: str | None = None
+        self.deadline = float("inf")
+        self.handle: asyncio.TimerHandle | None = None
+
+    def add(self, event: dict, raw: str) -> None:
+        self.last_id = event.get("id", self.last_id)
+        key = _entity_key(event)
+        if key is None:
+            key = ("unkeyed", len(self.entries))  # never merged
+        entry = self.entries.get(key)
+        if entry is None:
+            self.entries[key] = {**event, "data": dict(event.get("data") or {})}
+            self.entries[key]["coalesced"] = 1
+            if self.first_raw is None:
+                self.first_raw = raw
+            return
+        entry["data"].update(event.get("data") or {})
+        entry["timestamp"] = event.get("timestamp", entry.get("timestamp"))
+        if "id" in event:
+            entry["id"] = event["id"]
+        entry["coalesced"] += 1
+        _stats["coalesced"] += 1
+
+    def frame(self) -> str:
+        entries = list(self.entries.values())
+        if len(entries) == 1 and entries[0]["coalesced"] == 1:
+            return self.first_raw  # a lone event goes out exactly as published
+        frame = {"type": "batch", "events": entries, "timestamp": _now()}
+        if self.last_id is not None:
+            frame = {"id": self.last_id, **frame}  # first: read by _replayed()
+        return json.dumps(frame)
+
+
+class _Hub:
+    def __init__(self) -> None:
+        self.routes: dict[str, set[Subscriber]] = {}
+        self._batches: dict[str, _Batch] = {}
+        self._pubsub = None
+        self._reader: asyncio.Task | None = None
+        self._lock = asyncio.Lock()
+
+    def _redis(self):
+        return rate_limit._redis  # read at call time: set by init_redis()
+
+    async def subscribe(self, channel: str, sub: Subscriber) -> None:
+        async with self._lock:
+            subs = self.routes.setdefault(channel, set())
+            subs.add(sub)
+            if len(subs) > 1 or self._redis() is None:
+                return
+            try:
+                if self._pubsub is None:
+                    self._pubsub = self._redis().pubsub()
+                await self._pubsub.subscribe(channel)
+            except Exception as e:
+                # The reader resubscribes every routed channel on reconnect
+                logger.warning("WS hub subscribe failed (%s): %s", channel, e)
+            if self._reader is None or self._reader.done():
+                self._reader = asyncio.create_task(self._read())
+
+    async def unsubscribe(self, channel: str, sub: Subscriber) -> None:
+        async with self._lock:
+            subs = self.routes.get(channel)
+            if not subs:
+                return
+            subs.discard(sub)
+            if subs:
+                return
+            del self.routes[channel]
+            batch = self._batches.pop(channel, None)
+            if batch is not None and batch.handle is not None:
+                batch.handle.cancel()
+            if self._pubsub is not None:
+                try:
+                    await self._pubsub.unsubscribe(channel)
+                except Exception as e:
+                    logger.warning("WS hub unsubscribe failed (%s): %s", channel, e)
+
+    def dispatch(self, channel: str, raw: str) -> None:
+        """Push ``raw`` to ``channel``'s sockets, now or in its batch."""
+        _stats["messages"] += 1
+        if channel not in self.routes:
+            return
+        try:
+            event = json.loads(raw)
+        except ValueError:
+            event = None
+        window = coalesce_window(event.get("type")) if isinstance(event, dict) else 0
+        if window <= 0:
+            self._fan_out(channel, raw)
+            return
+
+        loop = asyncio.get_running_loop()
+        batch = self._batches.setdefault(channel, _Batch())
+        batch.add(event, raw)
+        deadline = loop.time() + window
+        if deadline < batch.deadline:
+            if batch.handle is not None:
+                batch.handle.cancel()
+            batch.deadline = deadline
+            batch.handle = loop.call_at(deadline, self._flush, channel)
+
+    def _flush(self, channel: str) -> None:
+        batch = self._batches.pop(channel, None)
+        if batch is not None and batch.entries:
+            _stats["batches"] += 1
+            self._fan_out(channel, batch.frame())
+
+    def _fan_out(self, channel: str, raw: str) -> None:
+        subs = self.routes.get(channel, ())
+        for sub in subs:
+            sub.offer(raw)
+        _stats["deliveries"] += len(subs)
+
+    async def _reconnect(self) -> None:
+        async with self._lock:
+            old, self._pubsub = self._pubsub, None
+            if old is not None:
+                try:
+                    await old.aclose()
+                except Exception:
+                    pass
+            if self.routes and self._redis() is not None:
+                self._pubsub = self._redis().pubsub()
+                await self._pubsub.subscribe(*self.routes)
+            _stats["reconnects"] += 1
+
+    async def _read(self) -> None:
+        while self.routes:
+            try:
+                if self._pubsub is None or not self._pubsub.subscribed:
+                    await self._reconnect()
+                    if self._pubsub is None:
+                        return
+                msg = await self._pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=1.0
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("WS hub reader error: %s", e)
+                await asyncio.sleep(RECONNECT_DELAY)
+                try:
+                    await self._reconnect()
+                except Exception as e:
+                    logger.warning("WS hub reconnect failed: %s", e)
+                continue
+            if msg and msg.get("type") == "message":
+                self.dispatch(msg["channel"], msg["data"])
+
+    async def close(self) -> None:
+        for batch in self._batches.values():
+            if batch.handle is not None:
+                batch.handle.cancel()
+        self._batches.clear()
+        if self._reader is not None:
+            self._reader.cancel()
+            try:
+                await self._reader
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._reader = None
+        if self._pubsub is not None:
+            try:
+                await self._pubsub.aclose()
+            except Exception:
+                pass
+            self._pubsub = None
+
+
+_hub = _Hub()
+
+
+async def subscribe(channel: str, sub: Subscriber) -> None:
+    """Route ``channel`` to ``sub``; subscribes in Redis for the first one."""
+    await _hub.subscribe(channel, sub)
+
+
+async def unsubscribe(channel: str, sub: Subscriber) -> None:
+    """Stop routing to ``sub``; unsubscribes in Redis after the last one."""
+    await _hub.unsubscribe(channel, sub)
+
+
+async def stop_ws_hub() -> None:
+    """Stop the reader and close the Pub/Sub connection. Call at shutdown."""
+    await _hub.close()
+
+
+def ws_hub_stats() -> dict[str, int]:
+    """Routed channels, local sockets and lifetime counters of this worker."""
+    return {
+        "channels": len(_hub.routes),
+        "sockets": sum(len(s) for s in _hub.routes.values()),
+        **_stats,
+    }
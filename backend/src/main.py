@@ -36,7 +36,7 @@ if settings.SENTRY_DSN:
         send_default_pii=False,
     )
 from src.core.rate_limit import init_redis, close_redis
-from src.database import engine, async_session
+from src.database import engine
 from src.api import (
     analytics,
     auth,
@@ -265,15 +265,34 @@ class SecurityHeadersMiddleware:
 
 
 class GlobalRateLimitMiddleware:
-    """Pure ASGI: blanket 120-req/min per IP. Uses CF-Connecting-IP for real client IP."""
+    """Pure ASGI: per-IP and per-user token buckets, one Redis call per request.
+
+    120 req/min per IP (CF-Connecting-IP for the real client IP) and, for
+    requests with a valid access token, 300 req/min per user. Responses
+    carry ``RateLimit-*`` headers for the tightest bucket.
+    """
 
     MAX_REQUESTS = 120
     WINDOW_SECONDS = 60
+    USER_MAX_REQUESTS = 300
     EXEMPT_PATHS = {b"/health", b"/healthcheck", b"/api/healthcheck"}
 
     def __init__(self, app: ASGIApp) -> None:
         self.app = app
 
+    @staticmethod
+    def _token_subject(headers: dict[bytes, bytes]) -> str | None:
+        auth = headers.get(b"authorization", b"").decode()
+        if not auth.startswith("Bearer "):
+            return None
+        from src.core.security import decode_token
+
+        try:
+            payload = decode_token(auth[7:])
+        except ValueError:
+            return None
+        return payload.get("sub") if payload.get("type") == "access" else None
+
     async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         if scope["type"] != "http":
             await self.app(scope, receive, send)
@@ -284,7 +303,7 @@ class GlobalRateLimitMiddleware:
             await self.app(scope, receive, send)
             return
 
-        from src.core.rate_limit import check_rate_limit
+        from src.core.rate_limit import Limit, check_limits
 
         headers = dict(scope.get("headers", []))
         # Priority: CF-Connecting-IP (Cloudflare real IP) > X-Forwarded-For > X-Real-IP > client
@@ -303,19 +322,33 @@ class GlobalRateLimitMiddleware:
                     client = scope.get("client")
                     client_ip = client[0] if client else "unknown"
 
-        allowed = await check_rate_limit(
-            f"global:{client_ip}", self.MAX_REQUESTS, self.WINDOW_SECONDS
-        )
-        if not allowed:
+        limits = [Limit(f"global:{client_ip}", self.MAX_REQUESTS, self.WINDOW_SECONDS)]
+        user_id = self._token_subject(headers)
+        if user_id:
+            limits.append(
+                Limit(f"user:{user_id}", self.USER_MAX_REQUESTS, self.WINDOW_SECONDS)
+            )
+
+        result = await check_limits(limits)
+        rl_headers = result.headers()
+        if not result.allowed:
             response = Response(
                 content='{"detail":"Too many requests. Slow down."}',
                 status_code=429,
                 media_type="application/json",
+                headers=rl_headers,
             )
             await response(scope, receive, send)
             return
 
-        await self.app(scope, receive, send)
+        extra = [(k.lower().encode(), v.encode()) for k, v in rl_headers.items()]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), *extra]}
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
 
 
 @asynccontextmanager
@@ -332,14 +365,55 @@ async def lifespan(app: FastAPI):
     )
     await init_redis()
 
-    # Initialize audit trail (hash-chain listeners + cache)
-    from src.core.audit import setup_audit_listeners, initialize_hash_cache
+    # Cross-worker invalidation for the in-process cache tier
+    from src.core.cache import start_invalidation_listener, stop_invalidation_listener
+
+    start_invalidation_listener()
+
+    # Audit trail: capture listeners + background hash-chain writer
+    from src.core.audit import (
+        setup_audit_listeners,
+        start_audit_writer,
+        stop_audit_writer,
+    )
 
     setup_audit_listeners()
-    async with async_session() as db:
-        await initialize_hash_cache(db)
+    start_audit_writer()
+
+    # Cached principals dropped after commits that change a user
+    from src.core.principal import setup_principal_listeners
+
+    setup_principal_listeners()
+
+    # Buffered IoT gateway ingest (size/time-triggered batch flushes)
+    from src.core.iot_gateway import start_ingest_gateway, stop_ingest_gateway
+
+    start_ingest_gateway()
+
+    # Workflow rules re-evaluated on writes (debounced dirty set)
+    from src.core.workflow_triggers import (
+        setup_workflow_listeners,
+        start_workflow_triggers,
+        stop_workflow_triggers,
+    )
+
+    setup_workflow_listeners()
+    start_workflow_triggers()
+
+    # Outbound email: shared keep-alive client + bounded send queue
+    from src.core.email import start_email_sender, stop_email_sender
+
+    start_email_sender()
 
     yield
+    from src.core.ws_hub import stop_ws_hub
+
+    await stop_ws_hub()
+    await stop_ingest_gateway()
+    await stop_workflow_triggers()
+    await stop_email_sender()
+    await stop_audit_writer()
+    await stop_invalidation_listener()
     await close_redis()
     await engine.dispose()
 
@@ -484,6 +558,14 @@ async def health_check():
 @app.get("/metrics", include_in_schema=False)
 async def metrics(request: Request):
     """Internal metrics endpoint — requires Bearer token or localhost access."""
+    from src.core.audit import audit_writer_stats
+    from src.core.cache import cache_stats
+    from src.core.email import email_stats
+    from src.core.iot_gateway import ingest_gateway_stats
+    from src.core.rate_limit import rate_limit_stats
+    from src.core.workflow_triggers import workflow_trigger_stats
+    from src.core.ws_hub import ws_hub_stats
+
     # Only allow from localhost or with valid auth token
     client = request.client
     client_ip = client.host if client else "unknown"
@@ -517,6 +599,13 @@ async def metrics(request: Request):
             "latency_ms": {"p50": p50, "p95": p95, "p99": p99, "avg": avg},
             "status_codes": dict(_metrics["status_codes"]),
             "workers": int(os.environ.get("WEB_CONCURRENCY", 4)),
+            "cache": cache_stats(),
+            "audit": audit_writer_stats(),
+            "iot_ingest": ingest_gateway_stats(),
+            "rate_limit": rate_limit_stats(),
+            "websocket": ws_hub_stats(),
+            "workflows": workflow_trigger_stats(),
+            "email": email_stats(),
         },
         headers={"Cache-Control": "no-cache, no-store"},
     )
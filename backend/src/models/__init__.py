@@ -7,9 +7,20 @@ from src.models.health import Vaccine, Medication, Outbreak, StressEvent  # noqa
 from src.models.feed import FeedPurchase, FeedConsumption  # noqa: F401
 from src.models.client import Client  # noqa: F401
 from src.models.finance import Income, Expense, Receivable  # noqa: F401
-from src.models.environment import EnvironmentReading, IoTReading, WeatherCache  # noqa: F401
+from src.models.environment import (  # noqa: F401
+    EnvironmentReading,
+    IoTReading,
+    IoTRollup,
+    WeatherCache,
+)
 from src.models.operations import ChecklistItem, LogbookEntry, Personnel  # noqa: F401
-from src.models.analytics import KPISnapshot, Prediction  # noqa: F401
+from src.models.analytics import (  # noqa: F401
+    FlockEconomicsSummary,
+    KPISnapshot,
+    OrgEconomicsTotals,
+    PlatformStatsSnapshot,
+    Prediction,
+)
 from src.models.biosecurity import (  # noqa: F401
     BiosecurityVisitor,
     BiosecurityZone,
@@ -22,6 +33,7 @@ from src.models.trace_events import (  # noqa: F401
     TraceEvent,
     TraceEventItem,
     BatchLineage,
+    BatchLineageClosure,
     TraceRecall,
     RecallBatch,
 )
@@ -44,7 +56,7 @@ from src.models.inventory import (  # noqa: F401
 )
 from src.models.grading import GradingSession  # noqa: F401
 from src.models.purchase_order import Supplier, PurchaseOrder, PurchaseOrderItem  # noqa: F401
-from src.models.audit import AuditLog  # noqa: F401
+from src.models.audit import AuditChainHead, AuditLog  # noqa: F401
 from src.models.compliance import (  # noqa: F401
     ComplianceCertification,
     ComplianceInspection,
@@ -57,6 +69,7 @@ from src.models.crm import (  # noqa: F401
     ManualDiscount,
     RetentionRule,
     RetentionEvent,
+    OrgHealthScore,
     CreditNote,
 )
 from src.models.security import (  # noqa: F401
@@ -65,9 +78,9 @@ from src.models.security import (  # noqa: F401
     UserTOTP,
     KnownDevice,
 )
-from src.models.report import ReportSchedule, ReportExecution  # noqa: F401
+from src.models.report import ExportJob, ReportSchedule, ReportExecution  # noqa: F401
 from src.models.workflow import WorkflowRule, WorkflowExecution  # noqa: F401
-from src.models.webhook import Webhook, WebhookDelivery  # noqa: F401
+from src.models.webhook import Webhook, WebhookDelivery, WebhookOutbox  # noqa: F401
 from src.models.api_key import APIKey  # noqa: F401
 from src.models.plugin import Plugin, PluginInstall  # noqa: F401
 from src.models.animal_welfare import WelfareAssessment  # noqa: F401
@@ -78,6 +91,7 @@ from src.models.accounting import (  # noqa: F401
     JournalEntry,
     JournalEntryLine,
     AccountBalance,
+    JournalSequence,
 )
 from src.models.community import (  # noqa: F401
     ForumCategory,
@@ -6,6 +6,7 @@ Core models for the FarmLogU accounting system:
 - FiscalPeriod: Accounting periods with open/closed state
 - JournalEntry + JournalEntryLine: Double-entry transactions
 - AccountBalance: Materialized running balances per account/period
+- JournalSequence: Gapless per-org entry number counter
 
 Every financial transaction (income, expense, inventory movement, depreciation)
 generates JournalEntry records. The General Ledger is the journal_entry_lines table.
@@ -19,6 +20,7 @@ from decimal import Decimal
 from typing import Optional
 
 from sqlalchemy import (
+    BigInteger,
     String,
     Text,
     Date,
@@ -187,6 +189,8 @@ class FiscalPeriod(TimestampMixin, TenantMixin, Base):
         ForeignKey("users.id", ondelete="SET NULL"), default=None
     )
     closed_at: Mapped[Optional[datetime]] = mapped_column(DateTime, default=None)
+    # Set when account_balances holds a frozen snapshot of this period
+    snapshot_at: Mapped[Optional[datetime]] = mapped_column(DateTime, default=None)
 
     # Relationships
     journal_entries: Mapped[list["JournalEntry"]] = relationship(
@@ -329,3 +333,22 @@ class AccountBalance(TimestampMixin, TenantMixin, Base):
             name="uq_balance_account_period",
         ),
     )
+
+
+# ── Entry Numbering ─────────────────────────────────────────────────────
+
+
+class JournalSequence(Base):
+    """Last journal entry number issued per organization.
+
+    Incremented with ``UPDATE ... RETURNING`` inside the posting
+    transaction: the row lock serializes concurrent posters and a rollback
+    returns the numbers, so JE numbers stay gapless.
+    """
+
+    __tablename__ = "journal_sequences"
+
+    organization_id: Mapped[uuid.UUID] = mapped_column(
+        ForeignKey("organizations.id", ondelete="CASCADE"), primary_key=True
+    )
+    last_number: Mapped[int] = mapped_column(BigInteger, default=0)
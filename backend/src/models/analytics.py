@@ -1,8 +1,8 @@
 import uuid
-from datetime import date
+from datetime import date, datetime
 from typing import Optional
 
-from sqlalchemy import String, Float, Date, ForeignKey, JSON
+from sqlalchemy import BigInteger, String, Float, Date, ForeignKey, Integer, JSON, func
 from sqlalchemy.orm import Mapped, mapped_column
 
 from src.database import Base
@@ -33,3 +33,57 @@ class Prediction(TimestampMixin, TenantMixin, Base):
     date: Mapped[date] = mapped_column(Date)
     type: Mapped[str] = mapped_column(String(100))
     value_json: Mapped[Optional[dict]] = mapped_column(JSON, default=None)
+
+
+class FlockEconomicsSummary(TenantMixin, Base):
+    """Running per-flock aggregates behind ``AnalyticsService.get_economics``.
+
+    Maintained incrementally by ``src.core.economics_summary``; each ``*_rows``
+    counter tells an empty aggregate (NULL) apart from a zero sum.
+    """
+
+    __tablename__ = "flock_economics_summary"
+
+    flock_id: Mapped[uuid.UUID] = mapped_column(
+        ForeignKey("flocks.id", ondelete="CASCADE"), primary_key=True
+    )
+    feed_kg: Mapped[float] = mapped_column(Float, default=0.0)
+    feed_rows: Mapped[int] = mapped_column(Integer, default=0)
+    vaccine_cost: Mapped[float] = mapped_column(Float, default=0.0)
+    vaccine_rows: Mapped[int] = mapped_column(Integer, default=0)
+    medication_cost: Mapped[float] = mapped_column(Float, default=0.0)
+    medication_rows: Mapped[int] = mapped_column(Integer, default=0)
+    expense_amount: Mapped[float] = mapped_column(Float, default=0.0)
+    expense_rows: Mapped[int] = mapped_column(Integer, default=0)
+    total_eggs: Mapped[int] = mapped_column(BigInteger, default=0)
+    production_rows: Mapped[int] = mapped_column(Integer, default=0)
+    updated_at: Mapped[datetime] = mapped_column(server_default=func.now())
+
+
+class OrgEconomicsTotals(Base):
+    """Organization-wide running totals (feed purchases and income)."""
+
+    __tablename__ = "org_economics_totals"
+
+    organization_id: Mapped[uuid.UUID] = mapped_column(
+        ForeignKey("organizations.id", ondelete="CASCADE"), primary_key=True
+    )
+    feed_purchase_cost: Mapped[float] = mapped_column(Float, default=0.0)
+    feed_purchase_kg: Mapped[float] = mapped_column(Float, default=0.0)
+    feed_purchase_rows: Mapped[int] = mapped_column(Integer, default=0)
+    income_total: Mapped[float] = mapped_column(Float, default=0.0)
+    income_rows: Mapped[int] = mapped_column(Integer, default=0)
+    # NULL until the first full rebuild: readers rebuild lazily
+    rebuilt_at: Mapped[Optional[datetime]] = mapped_column(default=None)
+    updated_at: Mapped[datetime] = mapped_column(server_default=func.now())
+
+
+class PlatformStatsSnapshot(Base):
+    """Cross-tenant superadmin KPIs, written by ``src.core.platform_stats``."""
+
+    __tablename__ = "platform_stats_snapshots"
+
+    id: Mapped[uuid.UUID] = mapped_column(primary_key=True, default=uuid.uuid4)
+    computed_at: Mapped[datetime] = mapped_column(index=True)  # naive UTC
+    stats: Mapped[dict] = mapped_column(JSON)  # PlatformStats fields
+    inventory: Mapped[list] = mapped_column(JSON)  # GlobalInventoryItem rows
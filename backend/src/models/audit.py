@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import DateTime, Index, String, func, JSON
+from sqlalchemy import BigInteger, DateTime, Index, String, func, JSON
 from sqlalchemy.orm import Mapped, mapped_column
 
 from src.database import Base
@@ -43,5 +43,27 @@ class AuditLog(Base):
     prev_hash: Mapped[str] = mapped_column(
         String(64), default="0" * 64
     )  # genesis = all zeros
+    # Position in the org chain, assigned by the audit writer (NULL = legacy)
+    chain_seq: Mapped[int | None] = mapped_column(BigInteger, default=None)
 
-    __table_args__ = (Index("ix_audit_org_timestamp", "organization_id", "timestamp"),)
+    __table_args__ = (
+        Index("ix_audit_org_timestamp", "organization_id", "timestamp"),
+        Index("ix_audit_org_chain_seq", "organization_id", "chain_seq"),
+    )
+
+
+class AuditChainHead(Base):
+    """Last link of each organization's audit chain.
+
+    Writers lock this row while appending, so the chain stays linear even
+    with several API workers writing for the same organization.
+    """
+
+    __tablename__ = "audit_chain_heads"
+
+    organization_id: Mapped[str] = mapped_column(String(50), primary_key=True)
+    last_hash: Mapped[str] = mapped_column(String(64))
+    last_seq: Mapped[int] = mapped_column(BigInteger, default=0)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
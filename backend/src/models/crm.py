@@ -118,6 +118,26 @@ class RetentionEvent(TimestampMixin, Base):
     result: Mapped[Optional[str]] = mapped_column(String(500), default=None)
 
 
+class OrgHealthScore(Base):
+    """Health score history: one row per organization per scoring run."""
+
+    __tablename__ = "org_health_scores"
+
+    id: Mapped[uuid.UUID] = mapped_column(primary_key=True, default=uuid.uuid4)
+    organization_id: Mapped[uuid.UUID] = mapped_column(
+        ForeignKey("organizations.id", ondelete="CASCADE"), index=True
+    )
+    computed_at: Mapped[datetime] = mapped_column(index=True)
+    score: Mapped[int] = mapped_column(Integer)
+    risk: Mapped[str] = mapped_column(String(20))
+    login_recency: Mapped[int] = mapped_column(Integer)
+    production_activity: Mapped[int] = mapped_column(Integer)
+    payment_health: Mapped[int] = mapped_column(Integer)
+    engagement_depth: Mapped[int] = mapped_column(Integer)
+    ticket_burden: Mapped[int] = mapped_column(Integer)
+    last_activity: Mapped[Optional[datetime]] = mapped_column(DateTime, default=None)
+
+
 class CreditNote(TimestampMixin, Base):
     """Credit notes issued to organizations (linked to Stripe)."""
 
@@ -2,7 +2,19 @@ import uuid
 from datetime import date, time, datetime
 from typing import Optional
 
-from sqlalchemy import Index, String, Float, Date, Time, DateTime, Text, JSON
+from sqlalchemy import (
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Float,
+    Date,
+    Time,
+    DateTime,
+    Text,
+    JSON,
+    func,
+)
 from sqlalchemy.orm import Mapped, mapped_column
 
 from src.database import Base
@@ -27,10 +39,18 @@ class EnvironmentReading(TimestampMixin, TenantMixin, Base):
 
 
 class IoTReading(TimestampMixin, TenantMixin, Base):
+    """Raw sensor reading; range-partitioned by month on ``timestamp`` in
+    PostgreSQL, hence the partition key in the primary key."""
+
     __tablename__ = "iot_readings"
 
-    id: Mapped[uuid.UUID] = mapped_column(primary_key=True, default=uuid.uuid4)
-    timestamp: Mapped[datetime] = mapped_column(DateTime(timezone=True), index=True)
+    # ``id`` alone identifies the rows of a bulk INSERT ... RETURNING
+    id: Mapped[uuid.UUID] = mapped_column(
+        primary_key=True, default=uuid.uuid4, insert_sentinel=True
+    )
+    timestamp: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), primary_key=True, index=True
+    )
     sensor_type: Mapped[str] = mapped_column(String(100), index=True)
     value: Mapped[float] = mapped_column(Float)
     unit: Mapped[str] = mapped_column(String(50))
@@ -40,6 +60,33 @@ class IoTReading(TimestampMixin, TenantMixin, Base):
     )
 
 
+class IoTRollup(Base):
+    """Per-sensor aggregate of ``IoTReading`` over a fixed time bucket.
+
+    Maintained by ``src.core.iot_timeseries`` for 1-minute, 1-hour and 1-day
+    buckets (``bucket_seconds``); the mean is ``value_sum / sample_count``.
+    """
+
+    __tablename__ = "iot_rollups"
+
+    organization_id: Mapped[uuid.UUID] = mapped_column(
+        ForeignKey("organizations.id", ondelete="CASCADE"), primary_key=True
+    )
+    sensor_type: Mapped[str] = mapped_column(String(100), primary_key=True)
+    bucket_seconds: Mapped[int] = mapped_column(Integer, primary_key=True)
+    bucket_start: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), primary_key=True
+    )
+    sample_count: Mapped[int] = mapped_column(Integer, default=0)
+    value_sum: Mapped[float] = mapped_column(Float, default=0.0)
+    value_min: Mapped[float] = mapped_column(Float)
+    value_max: Mapped[float] = mapped_column(Float)
+    unit: Mapped[str] = mapped_column(String(50))
+    updated_at: Mapped[datetime] = mapped_column(
+        server_default=func.now(), onupdate=func.now()
+    )
+
+
 class WeatherCache(TimestampMixin, TenantMixin, Base):
     __tablename__ = "weather_cache"
 
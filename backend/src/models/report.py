@@ -1,8 +1,18 @@
 import uuid
-from datetime import datetime
+from datetime import date, datetime
 from typing import Optional
 
-from sqlalchemy import String, Boolean, ForeignKey, Text, DateTime, Enum as SAEnum
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    Date,
+    DateTime,
+    Enum as SAEnum,
+    ForeignKey,
+    Index,
+    String,
+    Text,
+)
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -70,3 +80,30 @@ class ReportExecution(TimestampMixin, TenantMixin, Base):
     recipients_sent: Mapped[Optional[str]] = mapped_column(Text, default=None)
     error: Mapped[Optional[str]] = mapped_column(Text, default=None)
     result_summary: Mapped[Optional[dict]] = mapped_column(JSONB, default=None)
+
+
+class ExportJob(TimestampMixin, TenantMixin, Base):
+    """Columnar (Arrow IPC / Parquet) export of one dataset for BI pulls."""
+
+    __tablename__ = "export_jobs"
+    __table_args__ = (Index("ix_export_jobs_status_expires", "status", "expires_at"),)
+
+    id: Mapped[uuid.UUID] = mapped_column(primary_key=True, default=uuid.uuid4)
+    requested_by: Mapped[uuid.UUID] = mapped_column(
+        ForeignKey("users.id", ondelete="CASCADE")
+    )
+    dataset: Mapped[str] = mapped_column(String(50))
+    format: Mapped[str] = mapped_column(String(20))  # arrow | parquet
+    date_from: Mapped[Optional[date]] = mapped_column(Date, default=None)
+    date_to: Mapped[Optional[date]] = mapped_column(Date, default=None)
+    status: Mapped[str] = mapped_column(String(20), default="pending")
+    row_count: Mapped[Optional[int]] = mapped_column(BigInteger, default=None)
+    size_bytes: Mapped[Optional[int]] = mapped_column(BigInteger, default=None)
+    storage_key: Mapped[Optional[str]] = mapped_column(String(500), default=None)
+    error: Mapped[Optional[str]] = mapped_column(Text, default=None)
+    completed_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), default=None
+    )
+    expires_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), default=None
+    )
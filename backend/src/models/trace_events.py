@@ -386,6 +386,27 @@ class BatchLineage(TimestampMixin, Base):
     )
 
 
+class BatchLineageClosure(TenantMixin, Base):
+    """Transitive closure of ``batch_lineage``: one row per reachable pair.
+
+    ``depth`` is the shortest number of lineage hops from ancestor to
+    descendant. Maintained on every new edge by ``src.core.lineage_closure``
+    so recall scoping is a single indexed lookup on ``ancestor_id``.
+    """
+
+    __tablename__ = "batch_lineage_closure"
+
+    ancestor_id: Mapped[uuid.UUID] = mapped_column(
+        ForeignKey("traceability_batches.id", ondelete="CASCADE"), primary_key=True
+    )
+    descendant_id: Mapped[uuid.UUID] = mapped_column(
+        ForeignKey("traceability_batches.id", ondelete="CASCADE"), primary_key=True
+    )
+    depth: Mapped[int] = mapped_column(Integer)
+
+    __table_args__ = (Index("ix_lineage_closure_descendant", "descendant_id", "depth"),)
+
+
 # ═══════════════════════════════════════════════════════════════════
 # Recall Management — Mock recall + real recall execution
 # ═══════════════════════════════════════════════════════════════════
@@ -4,7 +4,17 @@ import uuid
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import DateTime, ForeignKey, String, Boolean, Integer, JSON, Text
+from sqlalchemy import (
+    DateTime,
+    ForeignKey,
+    Index,
+    String,
+    Boolean,
+    Integer,
+    JSON,
+    Text,
+    func,
+)
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from src.database import Base
@@ -63,3 +73,34 @@ class WebhookDelivery(TimestampMixin, TenantMixin, Base):
     error: Mapped[Optional[str]] = mapped_column(Text, default=None)
 
     webhook: Mapped["Webhook"] = relationship(back_populates="deliveries")
+
+
+class WebhookOutbox(TimestampMixin, TenantMixin, Base):
+    """Transactional outbox — one pending delivery per (event, webhook).
+
+    Rows are written in the same transaction as the domain change and drained
+    in batches by ``src.core.webhook_dispatcher``.
+    """
+
+    __tablename__ = "webhook_outbox"
+
+    id: Mapped[uuid.UUID] = mapped_column(primary_key=True, default=uuid.uuid4)
+    webhook_id: Mapped[uuid.UUID] = mapped_column(
+        ForeignKey("webhooks.id", ondelete="CASCADE"), index=True
+    )
+    event_type: Mapped[str] = mapped_column(String(100))
+    payload: Mapped[dict] = mapped_column(JSON)
+    # pending | delivered | dead
+    status: Mapped[str] = mapped_column(String(20), default="pending")
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    next_attempt_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+    last_error: Mapped[Optional[str]] = mapped_column(Text, default=None)
+    delivered_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), default=None
+    )
+
+    __table_args__ = (
+        Index("ix_webhook_outbox_status_next", "status", "next_attempt_at"),
+    )
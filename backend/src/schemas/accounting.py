@@ -86,6 +86,7 @@ class FiscalPeriodRead(BaseModel):
     status: PeriodStatus
     closed_by: Optional[uuid.UUID]
     closed_at: Optional[datetime]
+    snapshot_at: Optional[datetime] = None
     created_at: datetime
     updated_at: datetime
 
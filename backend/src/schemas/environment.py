@@ -69,6 +69,36 @@ class IoTReadingRead(BaseModel):
     model_config = {"from_attributes": True}
 
 
+class IoTReadingBatch(BaseModel):
+    readings: list[IoTReadingCreate] = Field(min_length=1, max_length=5000)
+
+
+class IoTIngestResult(BaseModel):
+    inserted: int
+
+
+class IoTFrameAccepted(BaseModel):
+    accepted: int
+    buffered: bool  # False: written before the response
+
+
+class IoTSeriesPoint(BaseModel):
+    bucket_start: datetime
+    count: int
+    mean: float
+    min: float
+    max: float
+
+
+class IoTSeries(BaseModel):
+    sensor_type: str
+    start: datetime
+    end: datetime
+    step_seconds: int
+    source: str  # raw | 1m | 1h | 1d
+    points: list[IoTSeriesPoint]
+
+
 class WeatherCacheCreate(BaseModel):
     timestamp: datetime
     temp_c: Optional[float] = Field(default=None, ge=-90, le=60)
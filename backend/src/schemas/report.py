@@ -1,5 +1,5 @@
 import uuid
-from datetime import datetime
+from datetime import date, datetime
 from typing import Optional
 
 from pydantic import BaseModel, Field
@@ -65,3 +65,30 @@ class ReportGenerateRequest(BaseModel):
     template: str = Field(pattern=r"^(production|financial|health|feed|kpi)$")
     send_email: bool = False
     recipients: Optional[str] = Field(default=None, max_length=2000)
+
+
+class ExportJobCreate(BaseModel):
+    dataset: str = Field(
+        pattern=r"^(daily_production|feed_consumption|income|expense|iot_readings)$"
+    )
+    format: str = Field(default="parquet", pattern=r"^(arrow|parquet)$")
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+
+
+class ExportJobRead(BaseModel):
+    id: uuid.UUID
+    dataset: str
+    format: str
+    date_from: Optional[date]
+    date_to: Optional[date]
+    status: str
+    row_count: Optional[int]
+    size_bytes: Optional[int]
+    error: Optional[str]
+    requested_by: uuid.UUID
+    completed_at: Optional[datetime]
+    expires_at: Optional[datetime]
+    created_at: datetime
+
+    model_config = {"from_attributes": True}
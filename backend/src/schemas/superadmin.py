@@ -153,6 +153,7 @@ class PlatformStats(BaseModel):
     ticket_response_avg_hours: Optional[float] = None
     sla_compliance_pct: Optional[float] = None
     avg_support_rating: Optional[float] = None
+    computed_at: Optional[datetime] = None  # snapshot time (UTC)
 
 
 # ── Tickets (cross-tenant) ───────────────────────────────────────
@@ -22,6 +22,7 @@ from datetime import date, timedelta
 import bcrypt
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.core import economics_summary
 from src.models.auth import Organization, User, Role
 from src.models.farm import Farm
 from src.models.flock import Flock
@@ -348,5 +349,9 @@ async def seed_demo_data(db: AsyncSession) -> dict:
     db.add_all(env_readings)
     counts["environment_readings"] = 5
 
+    # Source rows were added directly: build the economics summary from them
+    await db.flush()
+    await economics_summary.rebuild(db, ORG_ID)
+
     await db.commit()
     return counts
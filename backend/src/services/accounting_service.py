@@ -12,10 +12,15 @@ from fastapi import HTTPException
 from sqlalchemy import select, func
 from sqlalchemy.orm import selectinload
 
-from src.core.cache import invalidate_prefix
+from src.core import ledger_snapshots
+from src.core.cache import entity_tag, invalidate_tags
+from src.core.gl_posting import (
+    allocate_entry_numbers,
+    apply_balance_deltas,
+    invalidate_chart_of_accounts,
+)
 from src.models.accounting import (
     Account,
-    AccountBalance,
     AccountSubType,
     AccountType,
     FiscalPeriod,
@@ -66,7 +71,8 @@ class AccountingService(BaseService):
 
     async def create_account(self, data) -> Account:
         item = await self._create(Account, data)
-        await invalidate_prefix(f"gl:{self.org_id}")
+        await invalidate_chart_of_accounts(self.org_id)
+        await invalidate_tags(entity_tag(self.org_id, "general_ledger"))
         return item
 
     async def update_account(self, account_id: uuid.UUID, data) -> Account:
@@ -76,7 +82,8 @@ class AccountingService(BaseService):
         for key, value in data.model_dump(exclude_unset=True).items():
             setattr(item, key, value)
         await self.db.flush()
-        await invalidate_prefix(f"gl:{self.org_id}")
+        await invalidate_chart_of_accounts(self.org_id)
+        await invalidate_tags(entity_tag(self.org_id, "general_ledger"))
         return item
 
     # ══════════════════════════════════════════════════════════════════
@@ -101,14 +108,24 @@ class AccountingService(BaseService):
         for key, value in data.model_dump(exclude_unset=True).items():
             setattr(item, key, value)
 
-        # If closing, record who and when
+        # If closing, record who and when and freeze the period's balances
         if data.status in (PeriodStatus.CLOSED, PeriodStatus.LOCKED):
             item.closed_by = self.user_id
             item.closed_at = datetime.utcnow()
+            await ledger_snapshots.freeze(self.db, self.org_id, item)
+            await invalidate_tags(entity_tag(self.org_id, "general_ledger"))
+        elif data.status == PeriodStatus.OPEN:
+            item.snapshot_at = None
 
         await self.db.flush()
         return item
 
+    async def verify_ledger_snapshots(self, as_of_date: date | None = None) -> dict:
+        """Check that snapshot + open-period delta equals a full ledger scan."""
+        return await ledger_snapshots.verify(
+            self.db, self.org_id, as_of_date or date.today()
+        )
+
     # ══════════════════════════════════════════════════════════════════
     # JOURNAL ENTRIES
     # ══════════════════════════════════════════════════════════════════
@@ -191,7 +208,7 @@ class AccountingService(BaseService):
             self.db.add(line)
 
         await self.db.flush()
-        await invalidate_prefix(f"gl:{self.org_id}")
+        await invalidate_tags(entity_tag(self.org_id, "general_ledger"))
 
         # Re-fetch with lines
         result = await self.db.execute(
@@ -223,40 +240,46 @@ class AccountingService(BaseService):
     ) -> TrialBalanceResponse:
         report_date = as_of_date or date.today()
 
-        stmt = (
-            select(
-                JournalEntryLine.account_id,
-                Account.code,
-                Account.name,
-                Account.account_type,
-                Account.normal_balance,
-                func.coalesce(func.sum(JournalEntryLine.debit), 0).label("total_debit"),
-                func.coalesce(func.sum(JournalEntryLine.credit), 0).label(
-                    "total_credit"
-                ),
-            )
-            .join(Account, JournalEntryLine.account_id == Account.id)
-            .join(JournalEntry, JournalEntryLine.journal_entry_id == JournalEntry.id)
-            .where(
-                JournalEntry.organization_id == self.org_id,
-                JournalEntry.status == JournalEntryStatus.POSTED,
-                JournalEntry.date <= report_date,
+        if period_id:
+            # One period's entries: bounded, read straight from the lines
+            stmt = (
+                select(
+                    JournalEntryLine.account_id,
+                    Account.code,
+                    Account.name,
+                    Account.account_type,
+                    Account.normal_balance,
+                    func.coalesce(func.sum(JournalEntryLine.debit), 0).label(
+                        "total_debit"
+                    ),
+                    func.coalesce(func.sum(JournalEntryLine.credit), 0).label(
+                        "total_credit"
+                    ),
+                )
+                .join(Account, JournalEntryLine.account_id == Account.id)
+                .join(
+                    JournalEntry, JournalEntryLine.journal_entry_id == JournalEntry.id
+                )
+                .where(
+                    JournalEntry.organization_id == self.org_id,
+                    JournalEntry.status == JournalEntryStatus.POSTED,
+                    JournalEntry.date <= report_date,
+                    JournalEntry.period_id == period_id,
+                )
+                .group_by(
+                    JournalEntryLine.account_id,
+                    Account.code,
+                    Account.name,
+                    Account.account_type,
+                    Account.normal_balance,
+                )
+                .order_by(Account.code)
             )
-            .group_by(
-                JournalEntryLine.account_id,
-                Account.code,
-                Account.name,
-                Account.account_type,
-                Account.normal_balance,
+            rows_raw = (await self.db.execute(stmt)).all()
+        else:
+            rows_raw = await ledger_snapshots.account_totals(
+                self.db, self.org_id, end=report_date
             )
-            .order_by(Account.code)
-        )
-
-        if period_id:
-            stmt = stmt.where(JournalEntry.period_id == period_id)
-
-        result = await self.db.execute(stmt)
-        rows_raw = result.all()
 
         rows = []
         grand_debit = Decimal("0.00")
@@ -297,38 +320,11 @@ class AccountingService(BaseService):
     ) -> BalanceSheetResponse:
         report_date = as_of_date or date.today()
 
-        stmt = (
-            select(
-                JournalEntryLine.account_id,
-                Account.code,
-                Account.name,
-                Account.account_type,
-                Account.normal_balance,
-                func.coalesce(func.sum(JournalEntryLine.debit), 0).label("total_debit"),
-                func.coalesce(func.sum(JournalEntryLine.credit), 0).label(
-                    "total_credit"
-                ),
-            )
-            .join(Account, JournalEntryLine.account_id == Account.id)
-            .join(JournalEntry, JournalEntryLine.journal_entry_id == JournalEntry.id)
-            .where(
-                JournalEntry.organization_id == self.org_id,
-                JournalEntry.status == JournalEntryStatus.POSTED,
-                JournalEntry.date <= report_date,
-                Account.account_type.in_(
-                    [AccountType.ASSET, AccountType.LIABILITY, AccountType.EQUITY]
-                ),
-            )
-            .group_by(
-                JournalEntryLine.account_id,
-                Account.code,
-                Account.name,
-                Account.account_type,
-                Account.normal_balance,
-            )
-            .order_by(Account.code)
+        # One pass over snapshots + open-period lines for every account type;
+        # revenue/expense rows feed net income
+        totals = await ledger_snapshots.account_totals(
+            self.db, self.org_id, end=report_date
         )
-        result = await self.db.execute(stmt)
 
         sections: dict[AccountType, list[TrialBalanceRow]] = {
             AccountType.ASSET: [],
@@ -336,9 +332,14 @@ class AccountingService(BaseService):
             AccountType.EQUITY: [],
         }
 
-        for r in result.all():
+        net_income = Decimal("0.00")
+        for r in totals:
             debit = Decimal(str(r.total_debit))
             credit = Decimal(str(r.total_credit))
+            if r.account_type not in sections:
+                # Net income = Revenue credits - Expense debits
+                net_income += credit - debit
+                continue
             balance = (
                 debit - credit
                 if r.normal_balance == NormalBalance.DEBIT
@@ -357,25 +358,6 @@ class AccountingService(BaseService):
                 )
             )
 
-        # Net income = Revenue credits - Expense debits
-        net_income_stmt = (
-            select(
-                func.coalesce(func.sum(JournalEntryLine.credit), 0).label("rev_credit"),
-                func.coalesce(func.sum(JournalEntryLine.debit), 0).label("rev_debit"),
-            )
-            .join(Account, JournalEntryLine.account_id == Account.id)
-            .join(JournalEntry, JournalEntryLine.journal_entry_id == JournalEntry.id)
-            .where(
-                JournalEntry.organization_id == self.org_id,
-                JournalEntry.status == JournalEntryStatus.POSTED,
-                JournalEntry.date <= report_date,
-                Account.account_type.in_([AccountType.REVENUE, AccountType.EXPENSE]),
-            )
-        )
-        ni_result = await self.db.execute(net_income_stmt)
-        ni_row = ni_result.one()
-        net_income = Decimal(str(ni_row.rev_credit)) - Decimal(str(ni_row.rev_debit))
-
         if net_income != 0:
             sections[AccountType.EQUITY].append(
                 TrialBalanceRow(
@@ -437,42 +419,18 @@ class AccountingService(BaseService):
             end = period_end or date.today()
             start = period_start or date(end.year, end.month, 1)
 
-        stmt = (
-            select(
-                JournalEntryLine.account_id,
-                Account.code,
-                Account.name,
-                Account.account_type,
-                Account.normal_balance,
-                func.coalesce(func.sum(JournalEntryLine.debit), 0).label("total_debit"),
-                func.coalesce(func.sum(JournalEntryLine.credit), 0).label(
-                    "total_credit"
-                ),
-            )
-            .join(Account, JournalEntryLine.account_id == Account.id)
-            .join(JournalEntry, JournalEntryLine.journal_entry_id == JournalEntry.id)
-            .where(
-                JournalEntry.organization_id == self.org_id,
-                JournalEntry.status == JournalEntryStatus.POSTED,
-                JournalEntry.date >= start,
-                JournalEntry.date <= end,
-                Account.account_type.in_([AccountType.REVENUE, AccountType.EXPENSE]),
-            )
-            .group_by(
-                JournalEntryLine.account_id,
-                Account.code,
-                Account.name,
-                Account.account_type,
-                Account.normal_balance,
-            )
-            .order_by(Account.code)
+        totals = await ledger_snapshots.account_totals(
+            self.db,
+            self.org_id,
+            start=start,
+            end=end,
+            account_types=[AccountType.REVENUE, AccountType.EXPENSE],
         )
-        result = await self.db.execute(stmt)
 
         revenue_rows: list[TrialBalanceRow] = []
         expense_rows: list[TrialBalanceRow] = []
 
-        for r in result.all():
+        for r in totals:
             debit = Decimal(str(r.total_debit))
             credit = Decimal(str(r.total_credit))
             balance = (
@@ -545,7 +503,8 @@ class AccountingService(BaseService):
             created.append(account)
 
         await self.db.flush()
-        await invalidate_prefix(f"gl:{self.org_id}")
+        await invalidate_chart_of_accounts(self.org_id)
+        await invalidate_tags(entity_tag(self.org_id, "general_ledger"))
         return created
 
     # ══════════════════════════════════════════════════════════════════
@@ -553,52 +512,21 @@ class AccountingService(BaseService):
     # ══════════════════════════════════════════════════════════════════
 
     async def _next_entry_number(self) -> str:
-        """Generate sequential entry number: JE-000001, JE-000002, ..."""
-        result = await self.db.execute(
-            select(func.count(JournalEntry.id)).where(
-                JournalEntry.organization_id == self.org_id
-            )
-        )
-        count = result.scalar() or 0
-        return f"JE-{count + 1:06d}"
+        """Next gapless entry number: JE-000001, JE-000002, ..."""
+        return (await allocate_entry_numbers(self.db, self.org_id))[0]
 
     async def _update_account_balances(self, entry: JournalEntry) -> None:
         """Update materialized AccountBalance rows when an entry is posted."""
         if not entry.period_id:
             return
-
-        for line in entry.lines:
-            result = await self.db.execute(
-                select(AccountBalance).where(
-                    AccountBalance.organization_id == self.org_id,
-                    AccountBalance.account_id == line.account_id,
-                    AccountBalance.period_id == entry.period_id,
-                )
-            )
-            balance = result.scalar_one_or_none()
-
-            if not balance:
-                balance = AccountBalance(
-                    organization_id=self.org_id,
-                    account_id=line.account_id,
-                    period_id=entry.period_id,
-                    debit_total=Decimal("0.00"),
-                    credit_total=Decimal("0.00"),
-                    balance=Decimal("0.00"),
-                )
-                self.db.add(balance)
-
-            balance.debit_total += line.debit
-            balance.credit_total += line.credit
-
-            acct_result = await self.db.execute(
-                select(Account.normal_balance).where(Account.id == line.account_id)
-            )
-            normal = acct_result.scalar_one()
-            if normal == NormalBalance.DEBIT:
-                balance.balance = balance.debit_total - balance.credit_total
-            else:
-                balance.balance = balance.credit_total - balance.debit_total
+        await apply_balance_deltas(
+            self.db,
+            self.org_id,
+            [
+                (line.account_id, entry.period_id, line.debit, line.credit)
+                for line in entry.lines
+            ],
+        )
 
     async def _post_entry(self, entry: JournalEntry) -> JournalEntry:
         """Post a draft journal entry — validates period, updates balances."""
@@ -618,36 +546,68 @@ class AccountingService(BaseService):
                     detail=f"Cannot post to {period.status.value} period",
                 )
 
+        if await ledger_snapshots.is_frozen(self.db, self.org_id, entry.date):
+            raise HTTPException(
+                status_code=400,
+                detail="Cannot post into a closed period (snapshot frozen)",
+            )
+
         entry.status = JournalEntryStatus.POSTED
         entry.posted_at = datetime.utcnow()
         entry.posted_by = self.user_id
 
         await self._update_account_balances(entry)
         await self.db.flush()
-        await invalidate_prefix(f"gl:{self.org_id}")
+        await invalidate_tags(entity_tag(self.org_id, "general_ledger"))
         return entry
 
     async def _reverse_entry(
         self, original: JournalEntry, description: str | None = None
     ) -> JournalEntry:
-        """Reverse a posted entry by creating a mirror entry."""
+        """Reverse a posted entry by creating a mirror entry dated today.
+
+        Entries inside a closed (snapshotted) period cannot be reversed:
+        marking them REVERSED would change the period's frozen balances.
+        """
         if original.status != JournalEntryStatus.POSTED:
             raise HTTPException(
                 status_code=400, detail="Only posted entries can be reversed"
             )
 
+        today = date.today()
+        if await ledger_snapshots.is_frozen(self.db, self.org_id, original.date):
+            raise HTTPException(
+                status_code=400,
+                detail="Cannot reverse an entry in a closed period (snapshot frozen)",
+            )
+        if await ledger_snapshots.is_frozen(self.db, self.org_id, today):
+            raise HTTPException(
+                status_code=400,
+                detail="Cannot post into a closed period (snapshot frozen)",
+            )
+
+        period_result = await self.db.execute(
+            select(FiscalPeriod.id).where(
+                FiscalPeriod.organization_id == self.org_id,
+                FiscalPeriod.status == PeriodStatus.OPEN,
+                FiscalPeriod.start_date <= today,
+                FiscalPeriod.end_date >= today,
+            )
+        )
+        period_id = period_result.scalars().first() or original.period_id
+
         rev_number = await self._next_entry_number()
         desc = description or f"Reversal of {original.entry_number}"
 
         reversal = JournalEntry(
             organization_id=self.org_id,
             entry_number=rev_number,
-            date=date.today(),
+            date=today,
             description=desc,
             memo=f"Auto-reversal of {original.entry_number}",
             source=original.source,
             source_id=original.source_id,
-            period_id=original.period_id,
+            period_id=period_id,
             total_debit=original.total_credit,
             total_credit=original.total_debit,
             status=JournalEntryStatus.POSTED,
@@ -683,7 +643,7 @@ class AccountingService(BaseService):
         await self._update_account_balances(reversal)
 
         await self.db.flush()
-        await invalidate_prefix(f"gl:{self.org_id}")
+        await invalidate_tags(entity_tag(self.org_id, "general_ledger"))
         return reversal
 
     # ══════════════════════════════════════════════════════════════════
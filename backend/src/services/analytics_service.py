@@ -4,15 +4,19 @@ import uuid
 from datetime import date, timedelta
 from typing import Optional
 
-from sqlalchemy import select, func, text
+from sqlalchemy import select, text
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.core.cache import get_cached, set_cached
-from src.models.feed import FeedConsumption, FeedPurchase
-from src.models.finance import Expense, Income
+from src.core import economics_summary
+from src.core.cache import (
+    entity_tag,
+    flock_tag,
+    get_or_compute,
+    invalidate_tags,
+    org_tag,
+)
+from src.models.analytics import FlockEconomicsSummary, OrgEconomicsTotals
 from src.models.flock import Flock
-from src.models.health import Medication, Vaccine
-from src.models.production import DailyProduction
 from src.schemas.analytics import (
     CostBreakdown,
     DataCompleteness,
@@ -24,6 +28,19 @@ from src.schemas.analytics import (
 from src.services.base import BaseService
 
 
+# Tablas de las que deriva get_economics (tags de invalidación)
+ECONOMICS_SOURCES = (
+    "flocks",
+    "daily_production",
+    "feed_purchases",
+    "feed_consumption",
+    "vaccines",
+    "medications",
+    "expenses",
+    "incomes",
+)
+
+
 class AnalyticsService(BaseService):
     """Servicio de analítica: económica, producción, costos y KPIs."""
 
@@ -32,69 +49,76 @@ class AnalyticsService(BaseService):
     async def get_economics(
         self, flock_id: Optional[uuid.UUID] = None
     ) -> EconomicsResponse:
-        """Calcular métricas económicas por lote y resumen organizacional."""
-        org_id = self.org_id
+        """Calcular métricas económicas por lote y resumen organizacional.
+
+        Cache de dos niveles (TTL 5 min) con single-flight: ante un miss
+        concurrente sólo un request recalcula.
+        """
+        cache_key = f"economics:{self.org_id}:{flock_id or 'all'}"
+        tags = [org_tag(self.org_id)]
+        tags += [entity_tag(self.org_id, t) for t in ECONOMICS_SOURCES]
+        if flock_id:
+            tags.append(flock_tag(flock_id))
+        data = await get_or_compute(
+            cache_key, lambda: self._compute_economics(flock_id), ttl=300, tags=tags
+        )
+        return EconomicsResponse(**data)
 
-        # Cache (TTL 5 min)
-        cache_key = f"economics:{org_id}:{flock_id or 'all'}"
-        cached = await get_cached(cache_key)
-        if cached:
-            return EconomicsResponse(**cached)
+    async def _compute_economics(self, flock_id: Optional[uuid.UUID]) -> dict:
+        """Economics desde los resúmenes incrementales (sin caché).
 
-        # Lotes activos
-        flock_q = select(Flock).where(
-            Flock.organization_id == org_id, Flock.is_active.is_(True)
-        )
-        if flock_id:
-            flock_q = flock_q.where(Flock.id == flock_id)
-        result = await self.db.execute(flock_q)
-        flocks = result.scalars().all()
+        Dos lecturas indexadas: totales de la organización y lotes activos
+        con su fila de ``flock_economics_summary``. Si la organización aún no
+        tiene resumen, se reconstruye una vez desde las tablas fuente.
+        """
+        org_id = self.org_id
+
+        totals = await self._load_org_totals()
+        if totals is None or totals.rebuilt_at is None:
+            await economics_summary.rebuild(self.db, org_id)
+            totals = await self._load_org_totals()
 
         # Precio promedio ponderado de alimento
-        feed_price_result = await self.db.execute(
-            select(
-                func.sum(FeedPurchase.total_cost),
-                func.sum(FeedPurchase.kg),
-            ).where(
-                FeedPurchase.organization_id == org_id,
-                FeedPurchase.deleted_at.is_(None),
-            )
-        )
-        row = feed_price_result.one()
-        total_feed_cost_global, total_feed_kg_global = row[0], row[1]
-        avg_feed_price = (
-            total_feed_cost_global / total_feed_kg_global
-            if total_feed_cost_global
-            and total_feed_kg_global
-            and total_feed_kg_global > 0
-            else None
-        )
+        avg_feed_price = None
+        if totals.feed_purchase_rows and totals.feed_purchase_cost:
+            if totals.feed_purchase_kg and totals.feed_purchase_kg > 0:
+                avg_feed_price = totals.feed_purchase_cost / totals.feed_purchase_kg
 
         # Ingreso total de la organización
-        rev_result = await self.db.execute(
-            select(func.sum(Income.total)).where(Income.organization_id == org_id)
-        )
-        total_revenue = rev_result.scalar()
+        total_revenue = totals.income_total if totals.income_rows else None
 
-        # Pre-agregar datos de costos en 5 consultas bulk (evita N+1)
-        flock_ids = [f.id for f in flocks]
+        # Lotes activos + agregados precalculados
+        flock_q = (
+            select(Flock, FlockEconomicsSummary)
+            .outerjoin(
+                FlockEconomicsSummary, FlockEconomicsSummary.flock_id == Flock.id
+            )
+            .where(Flock.organization_id == org_id, Flock.is_active.is_(True))
+            .execution_options(populate_existing=True)
+        )
+        if flock_id:
+            flock_q = flock_q.where(Flock.id == flock_id)
+        result = await self.db.execute(flock_q)
+        rows = result.all()
+        flocks = [flock for flock, _ in rows]
 
-        feed_by_flock = await self._aggregate_feed(flock_ids)
-        vax_by_flock = await self._aggregate_vaccines(flock_ids)
-        med_by_flock = await self._aggregate_medications(flock_ids)
-        exp_by_flock = await self._aggregate_expenses(flock_ids)
-        eggs_by_flock = await self._aggregate_eggs(flock_ids)
+        def column(name: str, rows_column: str) -> dict:
+            return {
+                flock.id: getattr(summary, name)
+                for flock, summary in rows
+                if summary is not None and getattr(summary, rows_column)
+            }
 
         # Construir resultados por lote
         flock_results, org_totals = self._build_flock_economics(
             flocks,
             avg_feed_price,
             total_revenue,
-            feed_by_flock,
-            vax_by_flock,
-            med_by_flock,
-            exp_by_flock,
-            eggs_by_flock,
+            column("feed_kg", "feed_rows"),
+            column("vaccine_cost", "vaccine_rows"),
+            column("medication_cost", "medication_rows"),
+            column("expense_amount", "expense_rows"),
+            column("total_eggs", "production_rows"),
         )
 
         # Segunda pasada para ROI
@@ -104,88 +128,29 @@ class AnalyticsService(BaseService):
         org_summary = self._build_org_summary(org_totals, total_revenue)
 
         response = EconomicsResponse(flocks=flock_results, org_summary=org_summary)
-        await set_cached(cache_key, response.model_dump(), ttl=300)
-        return response
-
-    # ── Agregaciones bulk (privadas) ──────────────────────────────────
+        return response.model_dump()
 
-    async def _aggregate_feed(self, flock_ids: list[uuid.UUID]) -> dict:
-        """Kg de alimento consumido por lote."""
+    async def _load_org_totals(self) -> Optional[OrgEconomicsTotals]:
         result = await self.db.execute(
-            select(
-                FeedConsumption.flock_id,
-                func.sum(FeedConsumption.feed_kg).label("total_kg"),
-            )
-            .where(
-                FeedConsumption.flock_id.in_(flock_ids),
-                FeedConsumption.organization_id == self.org_id,
-            )
-            .group_by(FeedConsumption.flock_id)
+            select(OrgEconomicsTotals)
+            .where(OrgEconomicsTotals.organization_id == self.org_id)
+            .execution_options(populate_existing=True)
         )
-        return {row.flock_id: row.total_kg for row in result}
+        return result.scalar_one_or_none()
 
-    async def _aggregate_vaccines(self, flock_ids: list[uuid.UUID]) -> dict:
-        """Costo de vacunas por lote."""
-        result = await self.db.execute(
-            select(
-                Vaccine.flock_id,
-                func.sum(Vaccine.cost).label("total_cost"),
-            )
-            .where(
-                Vaccine.flock_id.in_(flock_ids),
-                Vaccine.organization_id == self.org_id,
-                Vaccine.cost.isnot(None),
-            )
-            .group_by(Vaccine.flock_id)
-        )
-        return {row.flock_id: row.total_cost for row in result}
+    # ── Mantenimiento del resumen incremental ─────────────────────────
 
-    async def _aggregate_medications(self, flock_ids: list[uuid.UUID]) -> dict:
-        """Costo de medicamentos por lote."""
-        result = await self.db.execute(
-            select(
-                Medication.flock_id,
-                func.sum(Medication.cost).label("total_cost"),
-            )
-            .where(
-                Medication.flock_id.in_(flock_ids),
-                Medication.organization_id == self.org_id,
-                Medication.cost.isnot(None),
-            )
-            .group_by(Medication.flock_id)
-        )
-        return {row.flock_id: row.total_cost for row in result}
-
-    async def _aggregate_expenses(self, flock_ids: list[uuid.UUID]) -> dict:
-        """Gastos directos por lote."""
-        result = await self.db.execute(
-            select(
-                Expense.flock_id,
-                func.sum(Expense.amount).label("total_amount"),
-            )
-            .where(
-                Expense.flock_id.in_(flock_ids),
-                Expense.organization_id == self.org_id,
-                Expense.flock_id.isnot(None),
-            )
-            .group_by(Expense.flock_id)
-        )
-        return {row.flock_id: row.total_amount for row in result}
+    async def rebuild_economics_summary(self) -> dict:
+        """Recalcular el resumen desde cero; devuelve la deriva encontrada antes."""
+        drift = await economics_summary.verify(self.db, self.org_id)
+        stats = await economics_summary.rebuild(self.db, self.org_id)
+        await invalidate_tags(org_tag(self.org_id))
+        return {"rebuilt": True, "flocks": stats["flocks"], "drift": drift}
 
-    async def _aggregate_eggs(self, flock_ids: list[uuid.UUID]) -> dict:
-        """Total de huevos por lote."""
-        result = await self.db.execute(
-            select(
-                DailyProduction.flock_id,
-                func.sum(DailyProduction.total_eggs).label("total_eggs"),
-            )
-            .where(
-                DailyProduction.flock_id.in_(flock_ids),
-                DailyProduction.organization_id == self.org_id,
-            )
-            .group_by(DailyProduction.flock_id)
-        )
-        return {row.flock_id: row.total_eggs for row in result}
+    async def verify_economics_summary(self) -> dict:
+        """Comparar el resumen almacenado con un recálculo, sin escribir."""
+        drift = await economics_summary.verify(self.db, self.org_id)
+        return {"ok": not drift, "drift": drift}
 
     # ── Construcción de resultados ────────────────────────────────────
 
@@ -512,13 +512,14 @@ class CommunityService(BaseService):
 
         # Publish to Redis for WebSocket subscribers
         try:
+            from src.core.events import channel_for_chat
             from src.core.rate_limit import _redis
 
             if _redis:
                 import json
 
                 await _redis.publish(
-                    f"chat:{room_id}",
+                    channel_for_chat(room_id),
                     json.dumps(
                         {
                             "type": "chat_message",
@@ -1,11 +1,19 @@
 """EnvironmentService — Lecturas ambientales, IoT, clima."""
 
 import uuid
+from datetime import datetime
 
+from fastapi import HTTPException
+
+from src.core import iot_gateway, iot_timeseries
+from src.core.events import EventType, publish_event
 from src.models.environment import EnvironmentReading, IoTReading, WeatherCache
 from src.services.base import BaseService
 
 
+_STEP_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
 class EnvironmentService(BaseService):
     # ── Lecturas ambientales ─────────────────────────────────────────
 
@@ -42,15 +50,65 @@ class EnvironmentService(BaseService):
         return await self._get(IoTReading, item_id, error_msg="IoT reading not found")
 
     async def create_iot(self, data) -> IoTReading:
-        return await self._create(IoTReading, data)
+        obj = await self._create(IoTReading, data)
+        await iot_timeseries.add_to_rollups(self.db, self.org_id, [data.model_dump()])
+        return obj
 
     async def update_iot(self, item_id: uuid.UUID, data) -> IoTReading:
-        return await self._update(
+        obj = await self._get(IoTReading, item_id, error_msg="IoT reading not found")
+        before = (obj.sensor_type, obj.timestamp)
+        obj = await self._update(
             IoTReading, item_id, data, error_msg="IoT reading not found"
         )
+        await iot_timeseries.refresh_rollups(
+            self.db, self.org_id, [before, (obj.sensor_type, obj.timestamp)]
+        )
+        return obj
 
     async def delete_iot(self, item_id: uuid.UUID) -> None:
-        await self._delete(IoTReading, item_id, error_msg="IoT reading not found")
+        obj = await self._get(IoTReading, item_id, error_msg="IoT reading not found")
+        point = (obj.sensor_type, obj.timestamp)
+        await self.db.delete(obj)
+        await self.db.flush()
+        await iot_timeseries.refresh_rollups(self.db, self.org_id, [point])
+
+    async def ingest_iot(self, readings: list) -> int:
+        """Ingesta por lote: un INSERT multi-fila más los rollups por bucket."""
+        return await iot_timeseries.ingest(
+            self.db, self.org_id, [r.model_dump() for r in readings]
+        )
+
+    async def ingest_iot_frame(self, readings: list[dict]) -> dict:
+        """Ingesta de un frame decodificado del gateway.
+
+        Con el gateway activo el frame queda en el buffer y se escribe en el
+        próximo flush (``GatewayBusy`` si no cabe); sin él se escribe aquí.
+        """
+        if iot_gateway.running():
+            accepted = iot_gateway.offer(str(self.org_id), readings)
+            return {"accepted": accepted, "buffered": True}
+        accepted = await iot_timeseries.ingest(self.db, self.org_id, readings)
+        await publish_event(
+            EventType.IOT_READING,
+            org_id=str(self.org_id),
+            data={
+                "count": accepted,
+                "sensor_types": sorted({r["sensor_type"] for r in readings}),
+            },
+        )
+        return {"accepted": accepted, "buffered": False}
+
+    async def iot_series(
+        self, sensor_type: str, start: datetime, end: datetime, step: str
+    ) -> dict:
+        """Serie agregada de un sensor desde el rollup más grueso que sirva."""
+        step_seconds = int(step[:-1]) * _STEP_UNITS[step[-1]]
+        try:
+            return await iot_timeseries.query_series(
+                self.db, self.org_id, sensor_type, start, end, step_seconds
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
     # ── Clima ────────────────────────────────────────────────────────
 
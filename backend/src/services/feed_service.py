@@ -2,14 +2,18 @@
 
 import uuid
 
-from src.core.cache import invalidate_prefix
+from src.core import workflow_triggers
+from src.core.cache import entity_tag, invalidate_tags
+from src.core.economics_summary import EconomicsDelta
 from src.models.feed import FeedConsumption, FeedPurchase
 from src.services.base import BaseService
 
 
 class FeedService(BaseService):
-    async def _invalidate(self) -> None:
-        await invalidate_prefix(f"economics:{self.org_id}")
+    async def _invalidate(self, table: str) -> None:
+        await invalidate_tags(entity_tag(self.org_id, table))
+        # Stock changed: re-evaluate the organization's feed_stock_low rules
+        workflow_triggers.mark_after_commit(self.db, self.org_id, None, table)
 
     # ── Compras ──────────────────────────────────────────────────────
 
@@ -23,21 +27,26 @@ class FeedService(BaseService):
 
     async def create_purchase(self, data) -> FeedPurchase:
         item = await self._create(FeedPurchase, data)
-        await self._invalidate()
+        await EconomicsDelta(self.org_id).add(item).apply(self.db)
+        await self._invalidate("feed_purchases")
         return item
 
     async def update_purchase(self, item_id: uuid.UUID, data) -> FeedPurchase:
+        delta = EconomicsDelta(self.org_id).remove(await self.get_purchase(item_id))
         item = await self._update(
             FeedPurchase, item_id, data, error_msg="Feed purchase not found"
         )
-        await self._invalidate()
+        await delta.add(item).apply(self.db)
+        await self._invalidate("feed_purchases")
         return item
 
     async def delete_purchase(self, item_id: uuid.UUID) -> None:
+        delta = EconomicsDelta(self.org_id).remove(await self.get_purchase(item_id))
         await self._soft_delete(
             FeedPurchase, item_id, error_msg="Feed purchase not found"
         )
-        await self._invalidate()
+        await delta.apply(self.db)
+        await self._invalidate("feed_purchases")
 
     # ── Consumo ──────────────────────────────────────────────────────
 
@@ -51,18 +60,23 @@ class FeedService(BaseService):
 
     async def create_consumption(self, data) -> FeedConsumption:
         item = await self._create(FeedConsumption, data)
-        await self._invalidate()
+        await EconomicsDelta(self.org_id).add(item).apply(self.db)
+        await self._invalidate("feed_consumption")
         return item
 
     async def update_consumption(self, item_id: uuid.UUID, data) -> FeedConsumption:
+        delta = EconomicsDelta(self.org_id).remove(await self.get_consumption(item_id))
         item = await self._update(
             FeedConsumption, item_id, data, error_msg="Feed consumption not found"
         )
-        await self._invalidate()
+        await delta.add(item).apply(self.db)
+        await self._invalidate("feed_consumption")
         return item
 
     async def delete_consumption(self, item_id: uuid.UUID) -> None:
+        delta = EconomicsDelta(self.org_id).remove(await self.get_consumption(item_id))
         await self._delete(
             FeedConsumption, item_id, error_msg="Feed consumption not found"
         )
-        await self._invalidate()
+        await delta.apply(self.db)
+        await self._invalidate("feed_consumption")
@@ -6,7 +6,9 @@ Inherits BaseService for tenant-scoped CRUD.
 import uuid
 
 
-from src.core.cache import invalidate_prefix
+from src.core import workflow_triggers
+from src.core.cache import entity_tag, invalidate_tags
+from src.core.economics_summary import EconomicsDelta
 from src.models.finance import Expense, Income, Receivable
 from src.services.base import BaseService
 
@@ -24,17 +26,22 @@ class FinanceService(BaseService):
 
     async def create_income(self, data) -> Income:
         item = await self._create(Income, data)
-        await invalidate_prefix(f"economics:{self.org_id}")
+        await EconomicsDelta(self.org_id).add(item).apply(self.db)
+        await invalidate_tags(entity_tag(self.org_id, "incomes"))
         return item
 
     async def update_income(self, item_id: uuid.UUID, data) -> Income:
+        delta = EconomicsDelta(self.org_id).remove(await self.get_income(item_id))
         item = await self._update(Income, item_id, data, error_msg="Income not found")
-        await invalidate_prefix(f"economics:{self.org_id}")
+        await delta.add(item).apply(self.db)
+        await invalidate_tags(entity_tag(self.org_id, "incomes"))
         return item
 
     async def delete_income(self, item_id: uuid.UUID) -> None:
+        delta = EconomicsDelta(self.org_id).remove(await self.get_income(item_id))
         await self._delete(Income, item_id, error_msg="Income not found")
-        await invalidate_prefix(f"economics:{self.org_id}")
+        await delta.apply(self.db)
+        await invalidate_tags(entity_tag(self.org_id, "incomes"))
 
     # ── Expenses ──────────────────────────────────────────────────────
 
@@ -46,17 +53,22 @@ class FinanceService(BaseService):
 
     async def create_expense(self, data) -> Expense:
         item = await self._create(Expense, data)
-        await invalidate_prefix(f"economics:{self.org_id}")
+        await EconomicsDelta(self.org_id).add(item).apply(self.db)
+        await invalidate_tags(entity_tag(self.org_id, "expenses"))
         return item
 
     async def update_expense(self, item_id: uuid.UUID, data) -> Expense:
+        delta = EconomicsDelta(self.org_id).remove(await self.get_expense(item_id))
         item = await self._update(Expense, item_id, data, error_msg="Expense not found")
-        await invalidate_prefix(f"economics:{self.org_id}")
+        await delta.add(item).apply(self.db)
+        await invalidate_tags(entity_tag(self.org_id, "expenses"))
         return item
 
     async def delete_expense(self, item_id: uuid.UUID) -> None:
+        delta = EconomicsDelta(self.org_id).remove(await self.get_expense(item_id))
         await self._delete(Expense, item_id, error_msg="Expense not found")
-        await invalidate_prefix(f"economics:{self.org_id}")
+        await delta.apply(self.db)
+        await invalidate_tags(entity_tag(self.org_id, "expenses"))
 
     # ── Receivables ───────────────────────────────────────────────────
 
@@ -66,13 +78,21 @@ class FinanceService(BaseService):
     async def get_receivable(self, item_id: uuid.UUID):
         return await self._get(Receivable, item_id, error_msg="Receivable not found")
 
+    def _mark_receivables(self) -> None:
+        workflow_triggers.mark_after_commit(self.db, self.org_id, None, "receivables")
+
     async def create_receivable(self, data) -> Receivable:
-        return await self._create(Receivable, data)
+        item = await self._create(Receivable, data)
+        self._mark_receivables()
+        return item
 
     async def update_receivable(self, item_id: uuid.UUID, data) -> Receivable:
-        return await self._update(
+        item = await self._update(
             Receivable, item_id, data, error_msg="Receivable not found"
         )
+        self._mark_receivables()
+        return item
 
     async def delete_receivable(self, item_id: uuid.UUID) -> None:
         await self._delete(Receivable, item_id, error_msg="Receivable not found")
+        self._mark_receivables()
@@ -2,11 +2,22 @@
 
 import uuid
 
+from src.core import workflow_triggers
+from src.core.cache import entity_tag, flock_tag, invalidate_tags
 from src.models.flock import Flock
 from src.services.base import BaseService
 
 
 class FlockService(BaseService):
+    async def _invalidate(self, flock_id: uuid.UUID | None = None) -> None:
+        tags = [entity_tag(self.org_id, "flocks")]
+        if flock_id:
+            tags.append(flock_tag(flock_id))
+        await invalidate_tags(*tags)
+
+    async def _mark(self, flock: Flock) -> None:
+        await workflow_triggers.mark_records(self.db, self.org_id, "flocks", flock)
+
     async def list_flocks(self, *, page: int = 1, size: int = 50) -> list:
         return await self._list(Flock, page=page, size=size)
 
@@ -14,10 +25,19 @@ class FlockService(BaseService):
         return await self._get(Flock, flock_id, error_msg="Flock not found")
 
     async def create_flock(self, data) -> Flock:
-        return await self._create(Flock, data)
+        flock = await self._create(Flock, data)
+        await self._mark(flock)
+        await self._invalidate()
+        return flock
 
     async def update_flock(self, flock_id: uuid.UUID, data) -> Flock:
-        return await self._update(Flock, flock_id, data, error_msg="Flock not found")
+        await self._mark(await self.get_flock(flock_id))
+        flock = await self._update(Flock, flock_id, data, error_msg="Flock not found")
+        await self._mark(flock)
+        await self._invalidate(flock_id)
+        return flock
 
     async def delete_flock(self, flock_id: uuid.UUID) -> None:
-        return await self._delete(Flock, flock_id, error_msg="Flock not found")
+        await self._mark(await self.get_flock(flock_id))
+        await self._delete(Flock, flock_id, error_msg="Flock not found")
+        await self._invalidate(flock_id)
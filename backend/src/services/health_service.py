@@ -6,7 +6,9 @@ from datetime import datetime, timezone
 
 from sqlalchemy import select
 
-from src.core.cache import invalidate_prefix
+from src.core import workflow_triggers
+from src.core.cache import entity_tag, invalidate_tags
+from src.core.economics_summary import EconomicsDelta
 from src.models.farm import Farm
 from src.models.health import Medication, Outbreak, StressEvent, Vaccine
 from src.models.outbreak_alert import OutbreakAlert
@@ -14,8 +16,8 @@ from src.services.base import BaseService
 
 
 class HealthService(BaseService):
-    async def _invalidate(self) -> None:
-        await invalidate_prefix(f"economics:{self.org_id}")
+    async def _invalidate(self, table: str) -> None:
+        await invalidate_tags(entity_tag(self.org_id, table))
 
     # ── Vacunas ──────────────────────────────────────────────────────
 
@@ -27,17 +29,22 @@ class HealthService(BaseService):
 
     async def create_vaccine(self, data) -> Vaccine:
         item = await self._create(Vaccine, data)
-        await self._invalidate()
+        await EconomicsDelta(self.org_id).add(item).apply(self.db)
+        await self._invalidate("vaccines")
         return item
 
     async def update_vaccine(self, item_id: uuid.UUID, data) -> Vaccine:
+        delta = EconomicsDelta(self.org_id).remove(await self.get_vaccine(item_id))
         item = await self._update(Vaccine, item_id, data, error_msg="Vaccine not found")
-        await self._invalidate()
+        await delta.add(item).apply(self.db)
+        await self._invalidate("vaccines")
         return item
 
     async def delete_vaccine(self, item_id: uuid.UUID) -> None:
+        delta = EconomicsDelta(self.org_id).remove(await self.get_vaccine(item_id))
         await self._delete(Vaccine, item_id, error_msg="Vaccine not found")
-        await self._invalidate()
+        await delta.apply(self.db)
+        await self._invalidate("vaccines")
 
     # ── Medicamentos ─────────────────────────────────────────────────
 
@@ -49,19 +56,24 @@ class HealthService(BaseService):
 
     async def create_medication(self, data) -> Medication:
         item = await self._create(Medication, data)
-        await self._invalidate()
+        await EconomicsDelta(self.org_id).add(item).apply(self.db)
+        await self._invalidate("medications")
         return item
 
     async def update_medication(self, item_id: uuid.UUID, data) -> Medication:
+        delta = EconomicsDelta(self.org_id).remove(await self.get_medication(item_id))
         item = await self._update(
             Medication, item_id, data, error_msg="Medication not found"
         )
-        await self._invalidate()
+        await delta.add(item).apply(self.db)
+        await self._invalidate("medications")
         return item
 
     async def delete_medication(self, item_id: uuid.UUID) -> None:
+        delta = EconomicsDelta(self.org_id).remove(await self.get_medication(item_id))
         await self._delete(Medication, item_id, error_msg="Medication not found")
-        await self._invalidate()
+        await delta.apply(self.db)
+        await self._invalidate("medications")
 
     # ── Brotes ───────────────────────────────────────────────────────
 
@@ -71,15 +83,26 @@ class HealthService(BaseService):
     async def get_outbreak(self, item_id: uuid.UUID) -> Outbreak:
         return await self._get(Outbreak, item_id, error_msg="Outbreak not found")
 
+    async def _mark_outbreak(self, outbreak: Outbreak) -> None:
+        await workflow_triggers.mark_records(
+            self.db, self.org_id, "outbreaks", outbreak
+        )
+
     async def create_outbreak(self, data) -> Outbreak:
-        return await self._create(Outbreak, data)
+        item = await self._create(Outbreak, data)
+        await self._mark_outbreak(item)
+        return item
 
     async def update_outbreak(self, item_id: uuid.UUID, data) -> Outbreak:
-        return await self._update(
+        await self._mark_outbreak(await self.get_outbreak(item_id))
+        item = await self._update(
             Outbreak, item_id, data, error_msg="Outbreak not found"
         )
+        await self._mark_outbreak(item)
+        return item
 
     async def delete_outbreak(self, item_id: uuid.UUID) -> None:
+        await self._mark_outbreak(await self.get_outbreak(item_id))
         await self._delete(Outbreak, item_id, error_msg="Outbreak not found")
 
     # ── Eventos de estrés ────────────────────────────────────────────
@@ -2,14 +2,37 @@
 
 import uuid
 
-from src.core.cache import invalidate_prefix
+from src.core import workflow_triggers
+from src.core.cache import entity_tag, invalidate_tags
+from src.core.economics_summary import EconomicsDelta
+from src.core.events import EventType
+from src.core.webhook_dispatcher import enqueue_webhook_event
 from src.models.production import DailyProduction
 from src.services.base import BaseService
 
 
 class ProductionService(BaseService):
     async def _invalidate(self) -> None:
-        await invalidate_prefix(f"economics:{self.org_id}")
+        await invalidate_tags(entity_tag(self.org_id, "daily_production"))
+
+    async def _mark(self, *records: DailyProduction) -> None:
+        await workflow_triggers.mark_records(
+            self.db, self.org_id, "daily_production", *records
+        )
+
+    async def _notify(self, event_type: str, record: DailyProduction) -> None:
+        """Encola webhooks en la misma transacción que el cambio."""
+        await enqueue_webhook_event(
+            self.db,
+            self.org_id,
+            event_type,
+            {
+                "id": str(record.id),
+                "flock_id": str(record.flock_id),
+                "date": record.date.isoformat(),
+                "total_eggs": record.total_eggs,
+            },
+        )
 
     async def list_production(self, *, page: int = 1, size: int = 50) -> list:
         return await self._list(DailyProduction, page=page, size=size)
@@ -21,21 +44,34 @@ class ProductionService(BaseService):
 
     async def create_production(self, data) -> DailyProduction:
         record = await self._create(DailyProduction, data)
+        await EconomicsDelta(self.org_id).add(record).apply(self.db)
+        await self._notify(EventType.PRODUCTION_NEW, record)
+        await self._mark(record)
         await self._invalidate()
         return record
 
     async def update_production(self, record_id: uuid.UUID, data) -> DailyProduction:
+        before = await self.get_production(record_id)
+        await self._mark(before)
+        delta = EconomicsDelta(self.org_id).remove(before)
         record = await self._update(
             DailyProduction,
             record_id,
             data,
             error_msg="Production record not found",
         )
+        await delta.add(record).apply(self.db)
+        await self._notify(EventType.PRODUCTION_UPDATE, record)
+        await self._mark(record)
         await self._invalidate()
         return record
 
     async def delete_production(self, record_id: uuid.UUID) -> None:
+        record = await self.get_production(record_id)
+        await self._mark(record)
+        delta = EconomicsDelta(self.org_id).remove(record)
         await self._delete(
             DailyProduction, record_id, error_msg="Production record not found"
         )
+        await delta.apply(self.db)
         await self._invalidate()
@@ -1,13 +1,15 @@
 """ReportsService — Gestión de reportes programados y ejecuciones."""
 
 import uuid
+from pathlib import Path
 
+from fastapi import HTTPException
 from sqlalchemy import select, func
 
-from src.core.exceptions import ForbiddenError
+from src.core.exceptions import ConflictError, ForbiddenError, NotFoundError
 from src.core.plans import get_plan_limits
 from src.models.auth import User
-from src.models.report import ReportSchedule, ReportExecution
+from src.models.report import ExportJob, ReportSchedule, ReportExecution
 from src.services.base import BaseService
 
 
@@ -164,3 +166,47 @@ class ReportsService(BaseService):
         from src.core.report_generator import generate_adhoc_report
 
         return await generate_adhoc_report(self.db, data, user)
+
+    # ── Exportaciones columnares (Arrow / Parquet) ────────────────────
+
+    async def create_export(self, data) -> ExportJob:
+        """Registrar un trabajo de exportación; lo ejecuta el worker de reportes."""
+        if data.date_from and data.date_to and data.date_from > data.date_to:
+            raise HTTPException(
+                status_code=400, detail="date_from must not be after date_to"
+            )
+        job = ExportJob(
+            **data.model_dump(),
+            organization_id=self.org_id,
+            requested_by=self.user_id,
+        )
+        self.db.add(job)
+        await self.db.flush()
+        return job
+
+    async def list_exports(self, *, page: int = 1, size: int = 50) -> list:
+        """Listar trabajos de exportación de la organización."""
+        stmt = (
+            self._scoped(ExportJob)
+            .order_by(ExportJob.created_at.desc())
+            .offset((page - 1) * size)
+            .limit(size)
+        )
+        result = await self.db.execute(stmt)
+        return list(result.scalars().all())
+
+    async def get_export(self, job_id: uuid.UUID) -> ExportJob:
+        """Obtener un trabajo de exportación por ID."""
+        return await self._get(ExportJob, job_id, error_msg="Export job not found")
+
+    async def export_file(self, job_id: uuid.UUID) -> tuple[Path, str]:
+        """Ruta y nombre de descarga de una exportación completada."""
+        from src.core.columnar_export import storage_path
+
+        job = await self.get_export(job_id)
+        if job.status != "completed":
+            raise ConflictError(f"Export is {job.status}, not ready for download")
+        path = storage_path(job.storage_key)
+        if not path.exists():
+            raise NotFoundError("Export file expired or missing")
+        return path, f"{job.dataset}-{job.id}{path.suffix}"
@@ -5,7 +5,7 @@ from datetime import datetime, timedelta, timezone
 
 from sqlalchemy import select, func, and_, or_
 
-from src.core.email_archive import archive_ticket, archive_ticket_reply
+from src.core.email_archive import archive_later, archive_ticket, archive_ticket_reply
 from src.core.exceptions import ForbiddenError, NotFoundError
 from src.core.plans import get_plan_limits
 from src.models.support import (
@@ -225,7 +225,8 @@ class SupportService(BaseService):
         self.db.add(ticket)
         await self.db.flush()
 
-        archive_ticket(
+        archive_later(
+            archive_ticket,
             ticket_number=ticket.ticket_number,
             user_email=user_email,
             subject=subject,
@@ -316,7 +317,8 @@ class SupportService(BaseService):
         self.db.add(msg)
         await self.db.flush()
 
-        archive_ticket_reply(
+        archive_later(
+            archive_ticket_reply,
             ticket_number=ticket.ticket_number,
             from_email=user_email,
             message=message,
@@ -401,7 +403,8 @@ class SupportService(BaseService):
                 sla_deadline=sla_deadline,
             )
             self.db.add(ticket)
-            archive_ticket(
+            archive_later(
+                archive_ticket,
                 ticket_number=ticket_number,
                 user_email=user_email,
                 subject=t.subject,
@@ -493,7 +496,8 @@ class SupportService(BaseService):
         await self.db.flush()
 
         if not is_internal:
-            archive_ticket_reply(
+            archive_later(
+                archive_ticket_reply,
                 ticket_number=ticket.ticket_number,
                 from_email=user_email,
                 message=message,
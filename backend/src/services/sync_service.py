@@ -1,18 +1,23 @@
 """SyncService — Lógica de sincronización delta para PWA offline-first.
 
-Maneja el upsert de cambios del cliente y la obtención de cambios
-del servidor desde un timestamp dado.
+Maneja el upsert de cambios del cliente y la obtención paginada de cambios
+del servidor. Cada entidad avanza con su propio cursor keyset
+``(updated_at, id)``, de modo que un dispositivo que estuvo offline meses
+puede ponerse al día en varias páginas sin perder filas.
 """
 
-import asyncio
+import json
 import logging
 import uuid as _sync_uuid
-from datetime import datetime, timezone
-from typing import Any
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator
 
-from sqlalchemy import select
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy import select, tuple_
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 
+from src.core import economics_summary, iot_timeseries, workflow_triggers
+from src.core.audit import log_audit
+from src.core.bulk_upsert import bulk_upsert
 from src.services.base import BaseService
 from src.models import (
     Farm,
@@ -73,6 +78,34 @@ MODEL_MAP = {
 }
 
 
+# Presupuesto de filas por respuesta. Con ``cursors`` es el total de todas
+# las entidades; sin ellos (clientes legacy) se aplica a cada entidad.
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+# Tamaño de cada consulta keyset al transmitir NDJSON
+STREAM_CHUNK_SIZE = 200
+
+_CURSOR_SEP = "|"
+
+
+def encode_cursor(updated_at: datetime, record_id: Any) -> str:
+    """Serializa la posición keyset ``(updated_at, id)`` como cursor opaco."""
+    return f"{updated_at.isoformat()}{_CURSOR_SEP}{record_id}"
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, _sync_uuid.UUID | None]:
+    """Inverso de :func:`encode_cursor`.
+
+    Acepta también un timestamp ISO sin id (equivalente a ``last_synced_at``).
+
+    Raises:
+        ValueError: si el cursor no es válido.
+    """
+    ts_raw, _, id_raw = cursor.partition(_CURSOR_SEP)
+    ts = datetime.fromisoformat(ts_raw)
+    return ts, _sync_uuid.UUID(id_raw) if id_raw else None
+
+
 class SyncService(BaseService):
     """Servicio de sincronización delta entre cliente y servidor."""
 
@@ -80,17 +113,77 @@ class SyncService(BaseService):
         self,
         data: dict[str, list[dict[str, Any]]],
         last_synced_at: datetime | None,
+        cursors: dict[str, str] | None = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
     ) -> dict[str, Any]:
         """Ejecuta el ciclo completo de sincronización.
 
         Fase 1: Upsert de cambios del cliente (batch por entidad).
-        Fase 2: Retorna cambios del servidor desde ``last_synced_at``.
+        Fase 2: Retorna una página de cambios del servidor. Cada entidad
+        parte de ``cursors[entity]`` o, si no hay, de ``last_synced_at``.
+        Sin ``cursors`` el presupuesto es por entidad, así ninguna queda sin
+        leer y ``sync_cursor`` siempre avanza.
 
         Returns:
             Diccionario con synced, conflicts, server_changes, server_now,
-            sync_cursor y conflict_count.
+            cursors, has_more, sync_cursor y conflict_count.
         """
         server_now = datetime.now(timezone.utc)
+        push = await self.push_changes(data, last_synced_at)
+
+        # ── Fase 2: Cambios del servidor ──
+        positions = self._resolve_positions(last_synced_at, cursors)
+        budget = _clamp_page_size(page_size)
+        server_changes: dict[str, list[dict[str, Any]]] = {}
+        out_cursors: dict[str, str] = dict(cursors or {})
+        pending: set[str] = set()
+
+        for entity_key, model_cls in _syncable_models():
+            if not cursors:
+                budget = _clamp_page_size(page_size)
+            if budget <= 0:
+                pending.add(entity_key)
+                continue
+            rows, more = await self._fetch_page(
+                model_cls, positions[entity_key], budget
+            )
+            if rows:
+                server_changes[entity_key] = [_row_to_dict(r) for r in rows]
+                out_cursors[entity_key] = encode_cursor(
+                    rows[-1].updated_at, rows[-1].id
+                )
+                budget -= len(rows)
+            if more:
+                pending.add(entity_key)
+
+        logger.info(
+            "Sync complete: synced=%d conflicts=%d changes_returned=%d has_more=%s",
+            push["synced"],
+            len(push["conflicts"]),
+            sum(len(v) for v in server_changes.values()),
+            bool(pending),
+        )
+
+        legacy_cursor = self._compute_cursor(server_changes, pending)
+        return {
+            **push,
+            "server_changes": server_changes,
+            "server_now": server_now.isoformat(),
+            "cursors": out_cursors,
+            "has_more": bool(pending),
+            "sync_cursor": legacy_cursor.isoformat() if legacy_cursor else None,
+        }
+
+    async def push_changes(
+        self,
+        data: dict[str, list[dict[str, Any]]],
+        last_synced_at: datetime | None,
+    ) -> dict[str, Any]:
+        """Fase 1: aplica los cambios enviados por el cliente.
+
+        Returns:
+            Diccionario con synced, conflicts y conflict_count.
+        """
         synced = 0
         conflicts: list[str] = []
 
@@ -102,171 +195,268 @@ class SyncService(BaseService):
             last_synced_at,
         )
 
-        # ── Fase 1: Upsert de cambios del cliente ──
         for entity_key, records in data.items():
             upsert_result = await self._upsert_entity(entity_key, records)
             synced += upsert_result["synced"]
             conflicts.extend(upsert_result["conflicts"])
 
         await self.db.flush()
-
-        # ── Fase 2: Cambios del servidor ──
-        since = last_synced_at or datetime.min.replace(tzinfo=timezone.utc)
-        server_changes = await self._fetch_server_changes(since)
-
-        # Cursor: el updated_at más reciente de todos los cambios retornados
-        max_cursor = self._compute_cursor(server_changes)
-
-        logger.info(
-            "Sync complete: synced=%d conflicts=%d changes_returned=%d cursor=%s",
-            synced,
-            len(conflicts),
-            sum(len(v) for v in server_changes.values()),
-            max_cursor,
-        )
-
         return {
             "synced": synced,
             "conflicts": conflicts,
             "conflict_count": len(conflicts),
-            "server_changes": server_changes,
-            "server_now": server_now.isoformat(),
-            "sync_cursor": max_cursor.isoformat() if max_cursor else None,
         }
 
+    async def stream_changes(
+        self,
+        last_synced_at: datetime | None,
+        cursors: dict[str, str] | None = None,
+        page_size: int = MAX_PAGE_SIZE,
+    ) -> AsyncIterator[str]:
+        """Fase 2 en modo streaming: emite líneas NDJSON.
+
+        Cada entidad se recorre con consultas keyset de
+        ``STREAM_CHUNK_SIZE`` filas, así la memoria no depende del volumen
+        pendiente. Tipos de línea:
+
+        - ``{"type": "record", "entity", "data"}`` — una fila.
+        - ``{"type": "cursor", "entity", "cursor", "has_more"}`` — al cerrar
+          cada entidad con cambios.
+        - ``{"type": "end", "cursors", "has_more", "server_now"}`` — última.
+        """
+        server_now = datetime.now(timezone.utc)
+        positions = self._resolve_positions(last_synced_at, cursors)
+        budget = _clamp_page_size(page_size)
+        out_cursors: dict[str, str] = dict(cursors or {})
+        has_more = False
+
+        for entity_key, model_cls in _syncable_models():
+            if not cursors:
+                budget = _clamp_page_size(page_size)
+            if budget <= 0:
+                has_more = True
+                continue
+            position = positions[entity_key]
+            sent = 0
+            more = True
+            while more and budget > 0:
+                rows, more = await self._fetch_page(
+                    model_cls, position, min(STREAM_CHUNK_SIZE, budget)
+                )
+                for row in rows:
+                    yield ndjson_line(
+                        {
+                            "type": "record",
+                            "entity": entity_key,
+                            "data": _row_to_dict(row),
+                        }
+                    )
+                if rows:
+                    position = (rows[-1].updated_at, rows[-1].id)
+                    budget -= len(rows)
+                    sent += len(rows)
+            if sent:
+                out_cursors[entity_key] = encode_cursor(*position)
+                yield ndjson_line(
+                    {
+                        "type": "cursor",
+                        "entity": entity_key,
+                        "cursor": out_cursors[entity_key],
+                        "has_more": more,
+                    }
+                )
+            has_more = has_more or more
+
+        yield ndjson_line(
+            {
+                "type": "end",
+                "cursors": out_cursors,
+                "has_more": has_more,
+                "server_now": server_now.isoformat(),
+            }
+        )
+
     # ── Métodos internos ─────────────────────────────────────────────
 
     async def _upsert_entity(
         self, entity_key: str, records: list[dict[str, Any]]
     ) -> dict[str, Any]:
-        """Upsert de registros de una entidad específica."""
+        """Upsert set-based de registros de una entidad específica.
+
+        Un único ``INSERT ... ON CONFLICT (id) DO UPDATE`` por entidad dentro
+        de un SAVEPOINT: un error de integridad sólo descarta esa entidad,
+        no la sesión completa. Los ids que no vuelven en ``RETURNING``
+        perdieron el last-write-wins y se reportan como conflicto.
+        """
         result = {"synced": 0, "conflicts": []}
         model_cls = MODEL_MAP.get(entity_key)
         if not model_cls:
             result["conflicts"].append(f"Unknown entity: {entity_key}")
             logger.warning("Unknown sync entity: %s", entity_key)
             return result
+        if not records:
+            return result
 
-        valid_cols = {c.key for c in model_cls.__table__.columns}
-
-        updates_by_id: dict[str, dict[str, Any]] = {}
-        inserts: list[dict[str, Any]] = []
-
+        rows: list[dict[str, Any]] = []
         for record_data in records:
-            record_id = record_data.pop("id", None)
-            record_data["organization_id"] = self.org_id
-            filtered = {k: v for k, v in record_data.items() if k in valid_cols}
-
-            if record_id:
-                updates_by_id[str(record_id)] = {
-                    "_raw": filtered,
-                    "_client_updated": record_data.get("updated_at"),
-                }
-            else:
-                filtered.pop("id", None)
-                inserts.append(filtered)
-
-        # Batch fetch de registros existentes para actualización
-        if updates_by_id:
-            try:
-                id_uuids = [_sync_uuid.UUID(rid) for rid in updates_by_id.keys()]
-                fetch_filters = [
-                    model_cls.id.in_(id_uuids),
-                    model_cls.organization_id == self.org_id,
-                ]
-                if hasattr(model_cls, "deleted_at"):
-                    fetch_filters.append(model_cls.deleted_at.is_(None))
-                result_existing = await self.db.execute(
-                    select(model_cls).where(*fetch_filters)
+            raw_id = record_data.get("id")
+            if raw_id:
+                try:
+                    record_data["id"] = _sync_uuid.UUID(str(raw_id))
+                except ValueError:
+                    result["conflicts"].append(f"{entity_key}/{raw_id}: invalid id")
+                    continue
+            rows.append(record_data)
+
+        table = model_cls.__tablename__
+        try:
+            async with self.db.begin_nested():
+                ids = [r["id"] for r in rows if r.get("id")]
+                before = await economics_summary.load_rows(self.db, table, ids)
+                old_points = []
+                if table == "iot_readings" and ids:
+                    # Buckets de la posición anterior (el timestamp puede cambiar)
+                    old_points = (
+                        await self.db.execute(
+                            select(IoTReading.sensor_type, IoTReading.timestamp).where(
+                                IoTReading.id.in_(ids)
+                            )
+                        )
+                    ).all()
+                written = await bulk_upsert(
+                    self.db, model_cls, rows, org_id=self.org_id
                 )
-                existing_map = {
-                    str(obj.id): obj for obj in result_existing.scalars().all()
-                }
-
-                for rid, meta in updates_by_id.items():
-                    existing = existing_map.get(rid)
-                    if existing:
-                        client_updated = meta["_client_updated"]
-                        if client_updated and existing.updated_at:
-                            if isinstance(client_updated, str):
-                                client_updated = datetime.fromisoformat(client_updated)
-                            if client_updated <= existing.updated_at:
-                                result["conflicts"].append(
-                                    f"{entity_key}/{rid}: server is newer"
-                                )
-                                continue
-                        for k, v in meta["_raw"].items():
-                            if k not in ("id", "organization_id", "created_at"):
-                                setattr(existing, k, v)
-                        result["synced"] += 1
-                    else:
-                        data = meta["_raw"]
-                        data.pop("id", None)
-                        inserts.append(data)
-            except Exception as e:
-                result["conflicts"].append(f"{entity_key}: batch update error — {e}")
-                logger.error("Sync batch update error on %s: %s", entity_key, e)
-
-        # Inserts nuevos en batch
-        for ins_data in inserts:
-            try:
-                obj = model_cls(**ins_data)
-                self.db.add(obj)
-                result["synced"] += 1
-            except IntegrityError as e:
-                await self.db.rollback()
-                result["conflicts"].append(f"{entity_key}: FK violation — {e.orig}")
-                logger.error("Sync IntegrityError on %s: %s", entity_key, e.orig)
-            except Exception as e:
-                result["conflicts"].append(f"{entity_key}: {e}")
-                logger.error("Sync error on %s: %s", entity_key, e)
+                # Resumen económico: diff antes/después de las filas escritas
+                if written and table in economics_summary.SOURCES:
+                    after = await economics_summary.load_rows(self.db, table, written)
+                    written_before = [r for r in before if r.id in written]
+                    await (
+                        economics_summary.EconomicsDelta(self.org_id)
+                        .remove_all(written_before, table)
+                        .add_all(after, table)
+                        .apply(self.db)
+                    )
+                if written and table == "iot_readings":
+                    points = await self.db.execute(
+                        select(IoTReading.sensor_type, IoTReading.timestamp).where(
+                            IoTReading.id.in_(written)
+                        )
+                    )
+                    await iot_timeseries.refresh_rollups(
+                        self.db, self.org_id, [*old_points, *points.all()]
+                    )
+        except IntegrityError as e:
+            result["conflicts"].append(f"{entity_key}: FK violation — {e.orig}")
+            logger.error("Sync IntegrityError on %s: %s", entity_key, e.orig)
+            return result
+        except SQLAlchemyError as e:
+            # DataError, valores no enlazables...: el savepoint ya se revirtió
+            orig = getattr(e, "orig", None) or e
+            result["conflicts"].append(f"{entity_key}: database error — {orig}")
+            logger.error("Sync database error on %s: %s", entity_key, orig)
+            return result
+        except (ValueError, TypeError) as e:
+            result["conflicts"].append(f"{entity_key}: {e}")
+            logger.error("Sync error on %s: %s", entity_key, e)
+            return result
 
+        for row in rows:
+            rid = row.get("id")
+            if rid and rid not in written:
+                result["conflicts"].append(f"{entity_key}/{rid}: server is newer")
+        result["synced"] = len(written)
+
+        if written:
+            # Reglas de workflow afectadas por las filas escritas
+            await workflow_triggers.mark_rows(
+                self.db,
+                self.org_id,
+                table,
+                [r for r in rows if not r.get("id") or r["id"] in written],
+            )
+            # Un registro de auditoría por lote (el INSERT set-based no pasa
+            # por el after_flush del ORM)
+            await log_audit(
+                self.db,
+                user_id=str(self.user_id),
+                organization_id=str(self.org_id),
+                action="SYNC_UPSERT",
+                resource=table,
+                resource_id=f"batch:{len(written)}",
+                changes={"ids": sorted(str(i) for i in written)},
+            )
         return result
 
-    async def _fetch_server_changes(
-        self, since: datetime
-    ) -> dict[str, list[dict[str, Any]]]:
-        """Obtiene todos los registros modificados desde ``since``."""
-
-        async def _fetch_entity(
-            entity_key: str, model_cls: type
-        ) -> tuple[str, list[dict[str, Any]]]:
-            if not hasattr(model_cls, "updated_at") or not hasattr(
-                model_cls, "organization_id"
-            ):
-                return entity_key, []
-            filters = [
-                model_cls.organization_id == self.org_id,
-                model_cls.updated_at > since,
-            ]
-            if hasattr(model_cls, "deleted_at"):
-                filters.append(model_cls.deleted_at.is_(None))
-            stmt = (
-                select(model_cls)
-                .where(*filters)
-                .order_by(model_cls.updated_at)
-                .limit(500)
-            )
-            res = await self.db.execute(stmt)
-            rows = res.scalars().all()
-            return entity_key, [_row_to_dict(r) for r in rows]
+    def _resolve_positions(
+        self,
+        last_synced_at: datetime | None,
+        cursors: dict[str, str] | None,
+    ) -> dict[str, tuple[datetime, _sync_uuid.UUID | None]]:
+        """Posición keyset inicial de cada entidad.
+
+        Un cursor por entidad tiene prioridad; si falta o es inválido se usa
+        ``last_synced_at`` (o el inicio de los tiempos).
+        """
+        since = last_synced_at or datetime.min.replace(tzinfo=timezone.utc)
+        positions: dict[str, tuple[datetime, _sync_uuid.UUID | None]] = {}
+        for entity_key, _ in _syncable_models():
+            raw = (cursors or {}).get(entity_key)
+            if raw:
+                try:
+                    positions[entity_key] = decode_cursor(raw)
+                    continue
+                except ValueError:
+                    logger.warning("Invalid sync cursor for %s: %r", entity_key, raw)
+            positions[entity_key] = (since, None)
+        return positions
+
+    async def _fetch_page(
+        self,
+        model_cls: type,
+        position: tuple[datetime, _sync_uuid.UUID | None],
+        limit: int,
+    ) -> tuple[list[Any], bool]:
+        """Consulta keyset sobre ``(updated_at, id)`` posterior a ``position``.
 
-        results = await asyncio.gather(
-            *[_fetch_entity(k, m) for k, m in MODEL_MAP.items()]
+        Pide ``limit + 1`` filas para saber si quedan más sin un COUNT.
+
+        Returns:
+            Tupla (filas, has_more).
+        """
+        ts, last_id = position
+        if last_id is None:
+            after = model_cls.updated_at > ts
+        else:
+            after = tuple_(model_cls.updated_at, model_cls.id) > tuple_(ts, last_id)
+        filters = [model_cls.organization_id == self.org_id, after]
+        if hasattr(model_cls, "deleted_at"):
+            filters.append(model_cls.deleted_at.is_(None))
+        stmt = (
+            select(*model_cls.__table__.columns)
+            .where(*filters)
+            .order_by(model_cls.updated_at, model_cls.id)
+            .limit(limit + 1)
         )
-        server_changes: dict[str, list[dict[str, Any]]] = {}
-        for entity_key, rows in results:
-            if rows:
-                server_changes[entity_key] = rows
-        return server_changes
+        rows = (await self.db.execute(stmt)).all()
+        return rows[:limit], len(rows) > limit
 
     @staticmethod
     def _compute_cursor(
         server_changes: dict[str, list[dict[str, Any]]],
+        pending: set[str] | None = None,
     ) -> datetime | None:
-        """Calcula el cursor de sincronización (máximo updated_at)."""
+        """Cursor global para clientes que sólo envían ``last_synced_at``.
+
+        Con la página completa es el máximo ``updated_at`` retornado. Si
+        quedan entidades pendientes, es el menor ``updated_at`` alcanzado por
+        ellas menos un microsegundo: el cliente puede recibir duplicados
+        (idempotentes por id) pero nunca se salta filas. Las entidades que no
+        llegaron a leerse (sólo posible con ``cursors``) siguen su propio
+        cursor y no frenan el global.
+        """
         max_cursor: datetime | None = None
-        for entity_rows in server_changes.values():
+        floor: datetime | None = None
+        for entity_key, entity_rows in server_changes.items():
             for row_dict in entity_rows:
                 ts = row_dict.get("updated_at")
                 if ts:
@@ -274,17 +464,39 @@ class SyncService(BaseService):
                         ts = datetime.fromisoformat(ts)
                     if max_cursor is None or ts > max_cursor:
                         max_cursor = ts
+            if pending and entity_key in pending and entity_rows:
+                last = datetime.fromisoformat(entity_rows[-1]["updated_at"])
+                if floor is None or last < floor:
+                    floor = last
+        if floor is not None:
+            return floor - timedelta(microseconds=1)
         return max_cursor
 
 
-def _row_to_dict(obj: Any) -> dict[str, Any]:
-    """Convierte una instancia de modelo SQLAlchemy a dict JSON-safe."""
+def _syncable_models() -> list[tuple[str, type]]:
+    """Entidades de MODEL_MAP que admiten sync incremental."""
+    return [
+        (k, m)
+        for k, m in MODEL_MAP.items()
+        if hasattr(m, "updated_at") and hasattr(m, "organization_id")
+    ]
+
+
+def _clamp_page_size(page_size: int) -> int:
+    return max(1, min(page_size, MAX_PAGE_SIZE))
+
+
+def ndjson_line(obj: dict[str, Any]) -> str:
+    return json.dumps(obj, default=str, separators=(",", ":")) + "\n"
+
+
+def _row_to_dict(row: Any) -> dict[str, Any]:
+    """Convierte una fila (Row de columnas del modelo) a dict JSON-safe."""
     result = {}
-    for col in obj.__table__.columns:
-        val = getattr(obj, col.key, None)
+    for key, val in row._mapping.items():
         if isinstance(val, datetime):
             val = val.isoformat()
         elif hasattr(val, "hex"):  # UUID
             val = str(val)
-        result[col.key] = val
+        result[key] = val
     return result
@@ -10,16 +10,21 @@ import time
 import uuid
 from datetime import datetime, timezone
 
-from sqlalchemy import func, select, or_
+from sqlalchemy import false, func, insert, literal, select, or_, union, update
 from sqlalchemy.orm import selectinload
 
+from src.core.audit import log_audit
+from src.core.bulk_upsert import sql_uuid
 from src.core.exceptions import NotFoundError
+from src.core import lineage_closure
+from src.core.trace_graph import trace_closure
 from src.models.traceability import TraceabilityBatch, BatchStatus
 from src.models.trace_events import (
     TraceLocation,
     TraceEvent,
     TraceEventItem,
     BatchLineage,
+    BatchLineageClosure,
     TraceRecall,
     RecallBatch,
     RecallStatus,
@@ -37,6 +42,9 @@ from src.schemas.trace_events import (
 )
 from src.services.base import BaseService
 
+# Downstream hops followed when scoping a recall from its trigger batch
+RECALL_TRACE_DEPTH = 20
+
 
 # ── Pure helper (no DB) ───────────────────────────────────────────
 
@@ -224,6 +232,9 @@ class TraceEventsService(BaseService):
         obj = BatchLineage(**data.model_dump())
         self.db.add(obj)
         await self.db.flush()
+        await lineage_closure.add_edge(
+            self.db, self.org_id, data.parent_batch_id, data.child_batch_id
+        )
         return obj
 
     async def get_parent_batches(self, batch_id: uuid.UUID) -> list:
@@ -245,105 +256,32 @@ class TraceEventsService(BaseService):
     async def full_trace(
         self, batch_id: uuid.UUID, *, max_depth: int = 10
     ) -> FullTraceResponse:
+        """Backward + forward trace of a batch.
+
+        The whole lineage closure comes from one recursive query
+        (``src.core.trace_graph``) and the event timeline from one more, so
+        ``trace_time_ms`` does not grow with the number of visited nodes.
+        """
         start_time = time.monotonic()
 
-        # Get origin batch
-        result = await self.db.execute(
-            select(TraceabilityBatch)
-            .options(selectinload(TraceabilityBatch.farm))
-            .where(
-                TraceabilityBatch.id == batch_id,
-                TraceabilityBatch.organization_id == self.org_id,
-            )
+        closure = await trace_closure(
+            self.db, batch_id, org_id=self.org_id, max_depth=max_depth
         )
-        batch = result.scalar_one_or_none()
-        if not batch:
+        if closure.origin is None:
             raise NotFoundError("Batch not found")
 
-        origin_node = _batch_to_node(batch, depth=0)
-
-        backward_chain = await self._trace_backward(batch_id, max_depth)
-        forward_chain = await self._trace_forward(batch_id, max_depth)
-
-        all_batch_ids = (
-            {batch_id}
-            | {n.batch_id for n in backward_chain}
-            | {n.batch_id for n in forward_chain}
-        )
-        events = await self._get_events_for_batches(all_batch_ids)
+        events = await self._get_events_for_batches(closure.batch_ids)
 
         trace_time_ms = int((time.monotonic() - start_time) * 1000)
 
         return FullTraceResponse(
-            origin_batch=origin_node,
-            backward_chain=backward_chain,
-            forward_chain=forward_chain,
+            origin_batch=_batch_to_node(closure.origin, depth=0),
+            backward_chain=[_batch_to_node(b, depth=-d) for b, d in closure.backward],
+            forward_chain=[_batch_to_node(b, depth=d) for b, d in closure.forward],
             events=events,
             trace_time_ms=trace_time_ms,
         )
 
-    async def _trace_backward(
-        self, batch_id: uuid.UUID, max_depth: int
-    ) -> list[TraceChainNode]:
-        visited: set[uuid.UUID] = set()
-        result_nodes: list[TraceChainNode] = []
-
-        async def _recurse(current_id: uuid.UUID, depth: int):
-            if depth > max_depth or current_id in visited:
-                return
-            visited.add(current_id)
-
-            lineage_result = await self.db.execute(
-                select(BatchLineage)
-                .options(
-                    selectinload(BatchLineage.parent_batch).selectinload(
-                        TraceabilityBatch.farm
-                    )
-                )
-                .where(BatchLineage.child_batch_id == current_id)
-            )
-            lineages = lineage_result.scalars().all()
-
-            for lineage in lineages:
-                parent = lineage.parent_batch
-                if parent and parent.id not in visited:
-                    result_nodes.append(_batch_to_node(parent, depth=-depth))
-                    await _recurse(parent.id, depth + 1)
-
-        await _recurse(batch_id, 1)
-        return result_nodes
-
-    async def _trace_forward(
-        self, batch_id: uuid.UUID, max_depth: int
-    ) -> list[TraceChainNode]:
-        visited: set[uuid.UUID] = set()
-        result_nodes: list[TraceChainNode] = []
-
-        async def _recurse(current_id: uuid.UUID, depth: int):
-            if depth > max_depth or current_id in visited:
-                return
-            visited.add(current_id)
-
-            lineage_result = await self.db.execute(
-                select(BatchLineage)
-                .options(
-                    selectinload(BatchLineage.child_batch).selectinload(
-                        TraceabilityBatch.farm
-                    )
-                )
-                .where(BatchLineage.parent_batch_id == current_id)
-            )
-            lineages = lineage_result.scalars().all()
-
-            for lineage in lineages:
-                child = lineage.child_batch
-                if child and child.id not in visited:
-                    result_nodes.append(_batch_to_node(child, depth=depth))
-                    await _recurse(child.id, depth + 1)
-
-        await _recurse(batch_id, 1)
-        return result_nodes
-
     async def _get_events_for_batches(
         self, batch_ids: set[uuid.UUID]
     ) -> list[TraceChainEvent]:
@@ -412,53 +350,83 @@ class TraceEventsService(BaseService):
         self.db.add(recall)
         await self.db.flush()
 
-        # Find affected batches based on scope
-        affected_batches = await self._find_affected_batches(data)
-
-        # For each trigger batch, also trace forward to find downstream products
-        all_affected_ids = {b.id for b in affected_batches}
-        if data.trigger_batch_id:
-            forward = await self._trace_forward(data.trigger_batch_id, max_depth=20)
-            for node in forward:
-                if node.batch_id not in all_affected_ids:
-                    batch_result = await self.db.execute(
-                        select(TraceabilityBatch).where(
-                            TraceabilityBatch.id == node.batch_id
-                        )
-                    )
-                    batch = batch_result.scalar_one_or_none()
-                    if batch:
-                        affected_batches.append(batch)
-                        all_affected_ids.add(batch.id)
-
-        # Create recall-batch links and mark batches as recalled
-        total_units = 0
-        clients_set: set[uuid.UUID] = set()
-        for batch in affected_batches:
-            rb = RecallBatch(
-                recall_id=recall.id,
-                batch_id=batch.id,
-                client_id=batch.client_id,
-                units_in_batch=batch.quantity,
+        # Link every affected batch in one INSERT ... SELECT (no ORM objects,
+        # so no per-row after_flush audit entries)
+        affected = self._affected_batch_ids(data).subquery("affected")
+        rb = RecallBatch.__table__
+        tb = TraceabilityBatch.__table__
+        linked = await self.db.execute(
+            insert(rb)
+            .from_select(
+                [
+                    "id",
+                    "organization_id",
+                    "recall_id",
+                    "batch_id",
+                    "client_id",
+                    "units_in_batch",
+                    "notification_sent",
+                    "units_recovered",
+                ],
+                select(
+                    sql_uuid(self.db),
+                    tb.c.organization_id,
+                    literal(recall.id, rb.c.recall_id.type),
+                    tb.c.id,
+                    tb.c.client_id,
+                    tb.c.quantity,
+                    false(),
+                    literal(0),
+                ).where(tb.c.id.in_(select(affected.c.batch_id))),
             )
-            self.db.add(rb)
-            total_units += batch.quantity
-            batch.status = BatchStatus.RECALLED
-            if batch.client_id:
-                clients_set.add(batch.client_id)
-
-        recall.batches_affected = len(affected_batches)
-        recall.units_affected = total_units
-        recall.clients_notified = len(clients_set)
+            .returning(rb.c.batch_id)
+        )
+        batch_ids = sorted(str(b) for b in linked.scalars().all())
+
+        linked_ids = select(RecallBatch.batch_id).where(
+            RecallBatch.recall_id == recall.id
+        )
+        await self.db.execute(
+            update(TraceabilityBatch)
+            .where(TraceabilityBatch.id.in_(linked_ids))
+            .values(status=BatchStatus.RECALLED)
+            .execution_options(synchronize_session="fetch")
+        )
+
+        totals = (
+            await self.db.execute(
+                select(
+                    func.count(),
+                    func.coalesce(func.sum(RecallBatch.units_in_batch), 0),
+                    func.count(func.distinct(RecallBatch.client_id)),
+                ).where(RecallBatch.recall_id == recall.id)
+            )
+        ).one()
+        recall.batches_affected, recall.units_affected, recall.clients_notified = totals
         recall.trace_completed_at = datetime.now(timezone.utc)
 
+        if batch_ids:
+            # One audit record per recall instead of one per batch
+            await log_audit(
+                self.db,
+                user_id=str(self.user_id),
+                organization_id=str(self.org_id),
+                action="RECALL_MARK",
+                resource="recall_batches",
+                resource_id=str(recall.id),
+                changes={"batch_ids": batch_ids, "status": BatchStatus.RECALLED.value},
+            )
+
         await self.db.flush()
         return recall
 
-    async def _find_affected_batches(
-        self, data: RecallCreate
-    ) -> list[TraceabilityBatch]:
-        stmt = select(TraceabilityBatch).where(
+    def _affected_batch_ids(self, data: RecallCreate):
+        """Select of ``batch_id`` hit by the recall scope plus its downstream.
+
+        Downstream products of the trigger batch come from the maintained
+        lineage closure (one indexed lookup, no traversal).
+        """
+        stmt = select(TraceabilityBatch.id.label("batch_id")).where(
             TraceabilityBatch.organization_id == self.org_id,
             TraceabilityBatch.status != BatchStatus.RECALLED,
         )
@@ -475,8 +443,21 @@ class TraceEventsService(BaseService):
             if data.date_to:
                 stmt = stmt.where(TraceabilityBatch.date <= data.date_to)
 
-        result = await self.db.execute(stmt)
-        return list(result.scalars().all())
+        if not data.trigger_batch_id:
+            return stmt
+        downstream = (
+            select(BatchLineageClosure.descendant_id.label("batch_id"))
+            .join(
+                TraceabilityBatch,
+                TraceabilityBatch.id == BatchLineageClosure.descendant_id,
+            )
+            .where(
+                BatchLineageClosure.ancestor_id == data.trigger_batch_id,
+                BatchLineageClosure.depth <= RECALL_TRACE_DEPTH,
+                TraceabilityBatch.organization_id == self.org_id,
+            )
+        )
+        return union(stmt, downstream)
 
     async def list_recalls(
         self,
@@ -5,7 +5,7 @@ import uuid
 
 from sqlalchemy import func, select
 
-from src.models.webhook import Webhook, WebhookDelivery
+from src.models.webhook import Webhook, WebhookDelivery, WebhookOutbox
 from src.services.base import BaseService
 
 
@@ -111,6 +111,22 @@ class WebhookService(BaseService):
         """Obtiene un webhook para enviar un evento de prueba."""
         return await self._get_webhook(webhook_id)
 
+    async def queue_test_event(self, webhook_id: uuid.UUID) -> None:
+        """Encola un evento de prueba en el outbox (entrega por el dispatcher)."""
+        webhook = await self._get_webhook(webhook_id)
+        self.db.add(
+            WebhookOutbox(
+                organization_id=self.org_id,
+                webhook_id=webhook.id,
+                event_type="webhook.test",
+                payload={
+                    "message": "This is a test event from EGGlogU",
+                    "webhook_id": str(webhook.id),
+                },
+            )
+        )
+        await self.db.flush()
+
     async def list_deliveries(
         self, webhook_id: uuid.UUID, *, page: int = 1, size: int = 20
     ) -> dict:
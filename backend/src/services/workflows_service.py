@@ -94,20 +94,19 @@ class WorkflowsService(BaseService):
             WorkflowRule.is_active == True,  # noqa: E712
         )
         result = await self.db.execute(stmt)
-        rules = result.scalars().all()
-
-        from src.core.workflow_evaluator import evaluate_rule
-
-        results = []
-        for rule in rules:
-            eval_result = await evaluate_rule(self.db, rule, dry_run=False)
-            results.append(
-                {
-                    "rule_id": str(rule.id),
-                    "name": rule.name,
-                    "triggered": eval_result["matched"],
-                }
-            )
+        rules = list(result.scalars().all())
+
+        from src.core.workflow_evaluator import evaluate_rules
+
+        evaluated = await evaluate_rules(self.db, rules, dry_run=False)
+        results = [
+            {
+                "rule_id": str(rule.id),
+                "name": rule.name,
+                "triggered": eval_result["matched"],
+            }
+            for rule, eval_result in zip(rules, evaluated)
+        ]
         return {"evaluated": len(results), "results": results}
 
     # ── Ejecuciones ───────────────────────────────────────────────────
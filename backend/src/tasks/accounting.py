@@ -0,0 +1,81 @@
+"""Accounting background tasks — period snapshot freeze and verification."""
+
+import logging
+import time
+
+from src.worker import app
+
+logger = logging.getLogger("egglogu.tasks.accounting")
+
+
+@app.task(bind=True, max_retries=1, default_retry_delay=300)
+def freeze_ledger_snapshots(self, verify_only: bool = False):
+    """Freeze closed periods and verify snapshot + delta against a full scan.
+
+    Daily via Celery Beat. Closed or locked periods without a snapshot
+    (closed before snapshots existed) are frozen. Orgs whose statements
+    disagree with a full ledger scan are logged and, unless ``verify_only``,
+    every snapshotted period is frozen again from the journal lines.
+    """
+    try:
+        import asyncio
+        from datetime import date
+        from sqlalchemy import select
+        from src.core import ledger_snapshots
+        from src.database import async_session, set_tenant_context
+        from src.models.accounting import FiscalPeriod, PeriodStatus
+        from src.models.auth import Organization
+
+        async def _run():
+            async with async_session() as db:
+                org_ids = (await db.execute(select(Organization.id))).scalars().all()
+            report = {"orgs": len(org_ids), "frozen": 0, "drifted": 0, "refrozen": 0}
+            for org_id in org_ids:
+                async with async_session() as db:
+                    await set_tenant_context(db, str(org_id))
+                    periods = (
+                        (
+                            await db.execute(
+                                select(FiscalPeriod).where(
+                                    FiscalPeriod.organization_id == org_id,
+                                    FiscalPeriod.status.in_(
+                                        [PeriodStatus.CLOSED, PeriodStatus.LOCKED]
+                                    ),
+                                )
+                            )
+                        )
+                        .scalars()
+                        .all()
+                    )
+                    if not verify_only:
+                        for period in periods:
+                            if period.snapshot_at is None:
+                                await ledger_snapshots.freeze(db, org_id, period)
+                                report["frozen"] += 1
+
+                    result = await ledger_snapshots.verify(db, org_id, date.today())
+                    if not result["ok"]:
+                        report["drifted"] += 1
+                        logger.warning(
+                            "Ledger snapshot drift for org %s: %d accounts (e.g. %s)",
+                            org_id,
+                            len(result["mismatches"]),
+                            result["mismatches"][0],
+                        )
+                        if not verify_only:
+                            for period in periods:
+                                if period.snapshot_at is not None:
+                                    await ledger_snapshots.freeze(db, org_id, period)
+                                    report["refrozen"] += 1
+                    await db.commit()
+            return report
+
+        start = time.perf_counter()
+        report = asyncio.run(_run())
+        report["elapsed_ms"] = round((time.perf_counter() - start) * 1000)
+        logger.info("Ledger snapshot check complete: %s", report)
+        return report
+
+    except Exception as exc:
+        logger.error("Ledger snapshot check failed: %s", exc)
+        raise self.retry(exc=exc)
@@ -96,3 +96,80 @@ def refresh_single_view(view_name: str):
     except Exception as e:
         logger.error("On-demand refresh failed for %s: %s", view_name, e)
         return {"error": str(e)[:500]}
+
+
+@app.task(bind=True, max_retries=1, default_retry_delay=300)
+def rebuild_economics_summaries(self, verify_only: bool = False):
+    """Verify (and repair) the incremental economics summaries of every org.
+
+    Nightly via Celery Beat. Orgs whose stored summary drifted from the
+    source tables are logged and, unless ``verify_only``, rebuilt.
+    """
+    try:
+        import asyncio
+        from sqlalchemy import select
+        from src.core import economics_summary
+        from src.database import async_session, set_tenant_context
+        from src.models.auth import Organization
+
+        async def _run():
+            async with async_session() as db:
+                org_ids = (await db.execute(select(Organization.id))).scalars().all()
+            report = {"orgs": len(org_ids), "drifted": 0, "rebuilt": 0}
+            for org_id in org_ids:
+                async with async_session() as db:
+                    await set_tenant_context(db, str(org_id))
+                    drift = await economics_summary.verify(db, org_id)
+                    if not drift:
+                        continue
+                    report["drifted"] += 1
+                    logger.warning(
+                        "Economics summary drift for org %s: %d cells (e.g. %s)",
+                        org_id,
+                        len(drift),
+                        drift[0],
+                    )
+                    if not verify_only:
+                        await economics_summary.rebuild(db, org_id)
+                        await db.commit()
+                        report["rebuilt"] += 1
+            return report
+
+        start = time.perf_counter()
+        report = asyncio.run(_run())
+        report["elapsed_ms"] = round((time.perf_counter() - start) * 1000)
+        logger.info("Economics summary check complete: %s", report)
+        return report
+
+    except Exception as exc:
+        logger.error("Economics summary check failed: %s", exc)
+        raise self.retry(exc=exc)
+
+
+@app.task(bind=True, max_retries=2, default_retry_delay=60)
+def refresh_platform_stats(self):
+    """Snapshot the superadmin platform KPIs (every 15 min via Celery Beat).
+
+    The superadmin dashboard reads the latest snapshot instead of scanning
+    every tenant's tables on each load.
+    """
+    try:
+        import asyncio
+        from src.core import platform_metrics
+        from src.database import async_session
+
+        async def _run():
+            async with async_session() as db:
+                snapshot = await platform_metrics.refresh(db)
+                await db.commit()
+                return snapshot.computed_at.isoformat()
+
+        start = time.perf_counter()
+        computed_at = asyncio.run(_run())
+        elapsed = round((time.perf_counter() - start) * 1000)
+        logger.info("Platform stats snapshot at %s (%dms)", computed_at, elapsed)
+        return {"computed_at": computed_at, "elapsed_ms": elapsed}
+
+    except Exception as exc:
+        logger.error("Platform stats snapshot failed: %s", exc)
+        raise self.retry(exc=exc)
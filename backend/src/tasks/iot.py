@@ -0,0 +1,34 @@
+"""IoT time-series maintenance tasks."""
+
+import logging
+
+from src.worker import app
+
+logger = logging.getLogger("egglogu.tasks.iot")
+
+
+@app.task(bind=True, max_retries=1, default_retry_delay=300)
+def ensure_iot_partitions(self):
+    """Create the upcoming monthly partitions of ``iot_readings``.
+
+    Daily via Celery Beat, so a month's partition always exists well before
+    its first reading (anything outside lands in the default partition).
+    """
+    try:
+        import asyncio
+        from src.core.iot_timeseries import ensure_partitions
+        from src.database import async_session
+
+        async def _run():
+            async with async_session() as db:
+                created = await ensure_partitions(db)
+                await db.commit()
+                return created
+
+        created = asyncio.run(_run())
+        if created:
+            logger.info("Created IoT partitions: %s", ", ".join(created))
+        return created
+    except Exception as exc:
+        logger.error("IoT partition maintenance failed: %s", exc)
+        raise self.retry(exc=exc)
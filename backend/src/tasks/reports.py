@@ -71,3 +71,96 @@ def generate_daily_kpi_snapshot(org_id: str):
         asyncio.run(_snapshot())
     except Exception as e:
         logger.error("KPI snapshot failed for org=%s: %s", org_id, e)
+
+
+@app.task(bind=True, max_retries=1, default_retry_delay=300)
+def run_export_job(self, job_id: str):
+    """Write a columnar (Arrow IPC / Parquet) export and mark it downloadable."""
+    logger.info("Running export job=%s", job_id)
+    try:
+        import asyncio
+        import uuid
+        from datetime import datetime, timezone
+        from sqlalchemy import select
+        from src.core.columnar_export import EXPORT_TTL, write_export
+        from src.database import async_session, set_tenant_context
+        from src.models.report import ExportJob
+
+        async def _run():
+            async with async_session() as db:
+                job = (
+                    await db.execute(
+                        select(ExportJob).where(ExportJob.id == uuid.UUID(job_id))
+                    )
+                ).scalar_one_or_none()
+                if job is None or job.status not in ("pending", "failed"):
+                    logger.warning("Export job %s not runnable", job_id)
+                    return
+                org_id = str(job.organization_id)
+                job.status = "running"
+                job.error = None
+                await db.commit()
+
+                # SET LOCAL: the tenant context lasts until the next commit
+                await set_tenant_context(db, org_id)
+                try:
+                    rows, size = await write_export(db, job)
+                except Exception as e:
+                    await db.rollback()
+                    await set_tenant_context(db, org_id)
+                    job.status = "failed"
+                    job.error = str(e)[:500]
+                    await db.commit()
+                    raise
+                now = datetime.now(timezone.utc)
+                job.status = "completed"
+                job.row_count = rows
+                job.size_bytes = size
+                job.completed_at = now
+                job.expires_at = now + EXPORT_TTL
+                await db.commit()
+                logger.info(
+                    "Export job %s completed: %d rows, %d bytes", job_id, rows, size
+                )
+
+        asyncio.run(_run())
+    except Exception as exc:
+        logger.error("Export task failed for job=%s: %s", job_id, exc)
+        raise self.retry(exc=exc)
+
+
+@app.task
+def purge_expired_exports():
+    """Delete export files past their expiry and mark the jobs expired."""
+    try:
+        import asyncio
+        from datetime import datetime, timezone
+        from sqlalchemy import select
+        from src.core.columnar_export import remove_export
+        from src.database import async_session
+        from src.models.report import ExportJob
+
+        async def _purge():
+            async with async_session() as db:
+                jobs = (
+                    (
+                        await db.execute(
+                            select(ExportJob).where(
+                                ExportJob.status == "completed",
+                                ExportJob.expires_at < datetime.now(timezone.utc),
+                            )
+                        )
+                    )
+                    .scalars()
+                    .all()
+                )
+                for job in jobs:
+                    remove_export(job.storage_key)
+                    job.status = "expired"
+                await db.commit()
+                return len(jobs)
+
+        purged = asyncio.run(_purge())
+        logger.info("Purged %d expired exports", purged)
+    except Exception as e:
+        logger.error("Export purge failed: %s", e)
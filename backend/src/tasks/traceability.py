@@ -0,0 +1,63 @@
+"""Traceability background tasks — lineage closure backfill and checks."""
+
+import logging
+import time
+
+from src.worker import app
+
+logger = logging.getLogger("egglogu.tasks.traceability")
+
+
+@app.task(bind=True, max_retries=1, default_retry_delay=300)
+def backfill_lineage_closure(self, org_id: str | None = None, check_only: bool = False):
+    """Check (and rebuild) ``batch_lineage_closure`` against the raw edges.
+
+    Runs for one org or all of them. Orgs whose closure disagrees with
+    ``batch_lineage`` are logged and, unless ``check_only``, rebuilt.
+    """
+    try:
+        import asyncio
+        import uuid
+        from sqlalchemy import select
+        from src.core import lineage_closure
+        from src.database import async_session, set_tenant_context
+        from src.models.auth import Organization
+
+        async def _run():
+            if org_id:
+                org_ids = [uuid.UUID(org_id)]
+            else:
+                async with async_session() as db:
+                    org_ids = (
+                        (await db.execute(select(Organization.id))).scalars().all()
+                    )
+            report = {"orgs": len(org_ids), "inconsistent": 0, "rebuilt_rows": 0}
+            for oid in org_ids:
+                async with async_session() as db:
+                    await set_tenant_context(db, str(oid))
+                    result = await lineage_closure.check(db, oid)
+                    if result["ok"]:
+                        continue
+                    report["inconsistent"] += 1
+                    logger.warning(
+                        "Lineage closure mismatch for org %s: missing=%d extra=%d "
+                        "wrong_depth=%d",
+                        oid,
+                        result["missing"],
+                        result["extra"],
+                        result["wrong_depth"],
+                    )
+                    if not check_only:
+                        report["rebuilt_rows"] += await lineage_closure.rebuild(db, oid)
+                        await db.commit()
+            return report
+
+        start = time.perf_counter()
+        report = asyncio.run(_run())
+        report["elapsed_ms"] = round((time.perf_counter() - start) * 1000)
+        logger.info("Lineage closure check complete: %s", report)
+        return report
+
+    except Exception as exc:
+        logger.error("Lineage closure check failed: %s", exc)
+        raise self.retry(exc=exc)
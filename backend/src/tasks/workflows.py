@@ -0,0 +1,51 @@
+"""Workflow background tasks — sweep of time-driven rule types."""
+
+import logging
+import time
+
+from src.worker import app
+
+logger = logging.getLogger("egglogu.tasks.workflows")
+
+
+@app.task(bind=True, max_retries=1, default_retry_delay=300)
+def sweep_time_rules(self):
+    """Evaluate the rule types that can match without any write.
+
+    Writes re-evaluate their own rules (``src.core.workflow_triggers``);
+    receivables going overdue or feed stock running down only happen with
+    the passage of time, so ``TIME_RULE_TYPES`` are swept hourly via Celery
+    Beat, one organization per transaction.
+    """
+    try:
+        import asyncio
+        from sqlalchemy import select
+        from src.core.workflow_evaluator import evaluate_active_rules
+        from src.core.workflow_triggers import TIME_RULE_TYPES
+        from src.database import async_session, set_tenant_context
+        from src.models.auth import Organization
+
+        async def _run():
+            async with async_session() as db:
+                org_ids = (await db.execute(select(Organization.id))).scalars().all()
+            report = {"orgs": len(org_ids), "evaluated": 0, "triggered": 0}
+            for org_id in org_ids:
+                async with async_session() as db:
+                    await set_tenant_context(db, str(org_id))
+                    result = await evaluate_active_rules(
+                        db, org_id, rule_types=TIME_RULE_TYPES
+                    )
+                    await db.commit()
+                report["evaluated"] += result["evaluated"]
+                report["triggered"] += result["triggered"]
+            return report
+
+        start = time.perf_counter()
+        report = asyncio.run(_run())
+        report["elapsed_ms"] = round((time.perf_counter() - start) * 1000)
+        logger.info("Time-driven workflow sweep complete: %s", report)
+        return report
+
+    except Exception as exc:
+        logger.error("Time-driven workflow sweep failed: %s", exc)
+        raise self.retry(exc=exc)
@@ -41,6 +41,10 @@ app.conf.update(
         "src.tasks.sync.*": {"queue": "default"},
         "src.tasks.billing.*": {"queue": "default"},
         "src.tasks.analytics.*": {"queue": "analytics"},
+        "src.tasks.traceability.*": {"queue": "default"},
+        "src.tasks.accounting.*": {"queue": "default"},
+        "src.tasks.iot.*": {"queue": "default"},
+        "src.tasks.workflows.*": {"queue": "default"},
     },
     # Beat schedule (periodic tasks)
     beat_schedule={
@@ -48,10 +52,42 @@ app.conf.update(
             "task": "src.tasks.analytics.refresh_materialized_views",
             "schedule": crontab(minute="*/15"),  # Every 15 minutes
         },
+        "refresh-platform-stats": {
+            "task": "src.tasks.analytics.refresh_platform_stats",
+            "schedule": crontab(minute="*/15"),  # Every 15 minutes
+        },
+        "sweep-time-workflow-rules": {
+            "task": "src.tasks.workflows.sweep_time_rules",
+            "schedule": crontab(minute="5"),  # Hourly
+        },
         "refresh-weather-cache": {
             "task": "src.tasks.sync.refresh_weather_cache",
             "schedule": crontab(minute="0", hour="*/6"),  # Every 6 hours
         },
+        "drain-webhook-outbox": {
+            "task": "src.tasks.webhooks.drain_webhook_outbox",
+            "schedule": 10.0,  # Every 10 seconds
+        },
+        "verify-economics-summaries": {
+            "task": "src.tasks.analytics.rebuild_economics_summaries",
+            "schedule": crontab(minute="30", hour="3"),  # Daily at 3:30 AM
+        },
+        "verify-ledger-snapshots": {
+            "task": "src.tasks.accounting.freeze_ledger_snapshots",
+            "schedule": crontab(minute="45", hour="3"),  # Daily at 3:45 AM
+        },
+        "purge-expired-exports": {
+            "task": "src.tasks.reports.purge_expired_exports",
+            "schedule": crontab(minute="15", hour="4"),  # Daily at 4:15 AM
+        },
+        "ensure-iot-partitions": {
+            "task": "src.tasks.iot.ensure_iot_partitions",
+            "schedule": crontab(minute="20", hour="4"),  # Daily at 4:20 AM
+        },
+        "check-lineage-closure": {
+            "task": "src.tasks.traceability.backfill_lineage_closure",
+            "schedule": crontab(minute="0", hour="4", day_of_week="sun"),  # Weekly
+        },
         "cleanup-expired-sessions": {
             "task": "src.tasks.sync.cleanup_expired_sessions",
             "schedule": crontab(minute="0", hour="3"),  # Daily at 3 AM
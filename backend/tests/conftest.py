@@ -101,6 +101,8 @@ async def client(db_session: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
 
     from contextlib import ExitStack
 
+    from src.core.rate_limit import RateLimitResult
+
     with ExitStack() as stack:
         # Rate limiting — always allow
         stack.enter_context(
@@ -110,6 +112,13 @@ async def client(db_session: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
                 return_value=True,
             )
         )
+        stack.enter_context(
+            patch(
+                "src.core.rate_limit.check_limits",
+                new_callable=AsyncMock,
+                return_value=RateLimitResult(True, 120, 60, 119, 1),
+            )
+        )
         # Token blacklist — never blacklisted
         stack.enter_context(
             patch(
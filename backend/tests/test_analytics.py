@@ -14,6 +14,8 @@ import pytest
 from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.core.security import create_access_token, hash_password
+from src.models.auth import Role, User
 from src.models.farm import Farm
 from src.models.flock import Flock
 
@@ -51,6 +53,34 @@ class TestEconomics:
         assert resp.status_code in (401, 403)
 
 
+    async def test_summary_maintenance_is_owner_only(
+        self, client: AsyncClient, db_session: AsyncSession, authenticated_user
+    ):
+        manager = User(
+            email="manager@test.com",
+            hashed_password=hash_password("TestPassword123"),
+            full_name="Manager",
+            role=Role.manager,
+            organization_id=authenticated_user["org"].id,
+            is_active=True,
+            email_verified=True,
+        )
+        db_session.add(manager)
+        await db_session.flush()
+        token = create_access_token(manager.id, manager.organization_id, "manager")
+        headers = {"Authorization": f"Bearer {token}"}
+
+        assert (await client.get(f"{PREFIX}/economics", headers=headers)).status_code == 200
+        resp = await client.post(f"{PREFIX}/economics/rebuild", headers=headers)
+        assert resp.status_code == 403
+        resp = await client.get(f"{PREFIX}/economics/verify", headers=headers)
+        assert resp.status_code == 403
+
+        owner = authenticated_user["headers"]
+        resp = await client.post(f"{PREFIX}/economics/rebuild", headers=owner)
+        assert resp.status_code == 200
+
+
 @pytest.mark.asyncio
 class TestAnalyticsAuth:
     """Verify that analytics endpoints require authentication."""
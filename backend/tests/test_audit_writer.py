@@ -0,0 +1,140 @@
+"""Tests for the batched audit pipeline in src.core.audit.
+
+Changes are captured in the flush, queued on commit, and written by
+``flush_audit_queue`` onto a hash chain whose head lives in the database.
+"""
+
+import uuid
+from contextlib import asynccontextmanager
+from datetime import date
+
+import pytest
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from src.core import audit
+from src.core.audit import (
+    append_chain,
+    flush_audit_queue,
+    pending_audit,
+    verify_audit_chain,
+)
+from src.models.audit import AuditChainHead, AuditLog
+from src.models.production import DailyProduction
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture(autouse=True)
+def _audit_listeners():
+    audit._queue.clear()
+    handlers = [
+        ("after_flush", audit._after_flush_handler),
+        ("after_commit", audit._after_commit_handler),
+        ("after_rollback", audit._after_rollback_handler),
+    ]
+    for name, fn in handlers:
+        event.listen(Session, name, fn)
+    yield
+    for name, fn in handlers:
+        event.remove(Session, name, fn)
+    audit._queue.clear()
+
+
+def _factory(db_session):
+    @asynccontextmanager
+    async def _session():
+        yield db_session
+
+    return _session
+
+
+def _production(org_id, flock_id, day: int, eggs: int) -> DailyProduction:
+    return DailyProduction(
+        organization_id=org_id,
+        flock_id=flock_id,
+        date=date(2025, 10, day),
+        total_eggs=eggs,
+    )
+
+
+async def test_flush_captures_and_commit_queues(
+    db_session, authenticated_user, sample_flock
+):
+    org_id = authenticated_user["org"].id
+    await db_session.commit()
+    audit._queue.clear()
+
+    db_session.add(_production(org_id, sample_flock.id, 1, 4000))
+    await db_session.flush()
+
+    pending = pending_audit(db_session)
+    assert [(e["action"], e["table_name"]) for e in pending] == [
+        ("CREATE", "daily_production")
+    ]
+    # Nothing is written inside the request transaction
+    assert (await db_session.execute(select(AuditLog))).scalars().all() == []
+
+    await db_session.commit()
+    assert pending_audit(db_session) == []
+    assert len(audit._queue) == 1
+
+    assert await flush_audit_queue(_factory(db_session)) == 1
+    row = (await db_session.execute(select(AuditLog))).scalar_one()
+    assert row.chain_seq == 1
+    assert row.organization_id == str(org_id)
+    assert (await verify_audit_chain(db_session, str(org_id)))["valid"] is True
+
+
+async def test_rollback_drops_captured_changes(
+    db_session, authenticated_user, sample_flock
+):
+    await db_session.commit()
+    audit._queue.clear()
+
+    db_session.add(_production(authenticated_user["org"].id, sample_flock.id, 2, 10))
+    await db_session.flush()
+    assert pending_audit(db_session)
+
+    await db_session.rollback()
+    assert pending_audit(db_session) == []
+    assert len(audit._queue) == 0
+
+
+async def test_chain_continues_from_head_and_legacy_entries(db_session):
+    org_id = str(uuid.uuid4())
+    legacy = AuditLog(
+        user_id="system",
+        organization_id=org_id,
+        action="CREATE",
+        resource="flocks",
+        resource_id="1",
+        table_name="flocks",
+        record_id="1",
+        hash="a" * 64,
+        prev_hash=audit._GENESIS_HASH,
+    )
+    db_session.add(legacy)
+    await db_session.flush()
+
+    entries = [
+        audit._snapshot("UPDATE", "flocks", "1", org_id, {"n": i}, {"n": i + 1})
+        for i in range(3)
+    ]
+    await append_chain(db_session, org_id, entries[:2])
+    await append_chain(db_session, org_id, entries[2:])
+
+    rows = (
+        await db_session.execute(
+            select(AuditLog)
+            .where(AuditLog.chain_seq.is_not(None))
+            .order_by(AuditLog.chain_seq)
+        )
+    ).scalars().all()
+    assert [r.chain_seq for r in rows] == [1, 2, 3]
+    assert rows[0].prev_hash == "a" * 64
+    assert [r.prev_hash for r in rows[1:]] == [r.hash for r in rows[:-1]]
+
+    head = await db_session.get(AuditChainHead, org_id)
+    assert (head.last_hash, head.last_seq) == (rows[-1].hash, 3)
+    assert (await verify_audit_chain(db_session, org_id))["valid"] is True
@@ -0,0 +1,184 @@
+"""Tests for the two-tier cache (in-process LRU + Redis) in src.core.cache.
+
+Redis is disabled in the test environment, so these exercise the local tier,
+single-flight coalescing and probabilistic early refresh; a minimal fake
+covers the commands tag invalidation sends to Redis.
+"""
+
+import asyncio
+import time
+import uuid
+
+import pytest
+
+from src.core import cache
+from src.core.cache import (
+    cache_stats,
+    entity_tag,
+    flock_tag,
+    get_cached,
+    get_or_compute,
+    invalidate_prefix,
+    invalidate_tags,
+    org_tag,
+    set_cached,
+)
+
+
+@pytest.fixture(autouse=True)
+def _clean_local_cache():
+    cache._local.clear()
+    yield
+    cache._local.clear()
+
+
+@pytest.mark.asyncio
+class TestLocalTier:
+    async def test_set_then_get_is_json_normalized(self):
+        await set_cached("t:a", {"n": 1, "when": time.gmtime(0)[:3]})
+        assert await get_cached("t:a") == {"n": 1, "when": [1970, 1, 1]}
+
+    async def test_invalidate_prefix_evicts_local(self):
+        await set_cached("economics:org1:all", {"x": 1})
+        await set_cached("economics:org2:all", {"x": 2})
+        await invalidate_prefix("economics:org1")
+        assert await get_cached("economics:org1:all") is None
+        assert await get_cached("economics:org2:all") == {"x": 2}
+
+    async def test_lru_is_bounded(self, monkeypatch):
+        monkeypatch.setattr(cache._local, "max_entries", 3)
+        for i in range(5):
+            await set_cached(f"t:{i}", i)
+        assert len(cache._local) == 3
+        assert await get_cached("t:0") is None
+        assert await get_cached("t:4") == 4
+
+
+@pytest.mark.asyncio
+class TestStampedeProtection:
+    async def test_single_flight_computes_once(self):
+        calls = 0
+
+        async def compute():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return {"value": 42}
+
+        results = await asyncio.gather(
+            *[get_or_compute("t:sf", compute) for _ in range(20)]
+        )
+        assert calls == 1
+        assert all(r == {"value": 42} for r in results)
+
+    async def test_failure_propagates_and_is_not_cached(self):
+        async def boom():
+            raise RuntimeError("db down")
+
+        with pytest.raises(RuntimeError):
+            await get_or_compute("t:fail", boom)
+        assert await get_cached("t:fail") is None
+
+    async def test_early_refresh_near_expiry(self):
+        now = time.time()
+        fresh = cache._Entry({}, now + 300, 0.5, now + 30)
+        stale_soon = cache._Entry({}, now, 5.0, now + 30)
+        assert not cache._should_refresh_early(fresh)
+        assert cache._should_refresh_early(stale_soon)
+
+
+@pytest.mark.asyncio
+class TestTagInvalidation:
+    async def test_invalidate_tags_evicts_only_tagged(self):
+        await set_cached("economics:o1:all", 1, tags=[entity_tag("o1", "incomes")])
+        await set_cached("economics:o1:f1", 2, tags=[flock_tag("f1")])
+        await set_cached("economics:o2:all", 3, tags=[entity_tag("o2", "incomes")])
+        await invalidate_tags(entity_tag("o1", "incomes"))
+        assert await get_cached("economics:o1:all") is None
+        assert await get_cached("economics:o1:f1") == 2
+        assert await get_cached("economics:o2:all") == 3
+
+    async def test_get_or_compute_registers_tags(self):
+        async def compute():
+            return {"v": 1}
+
+        await get_or_compute("t:tagged", compute, tags=[org_tag("o1")])
+        await invalidate_tags(org_tag("o1"))
+        assert await get_cached("t:tagged") is None
+
+    async def test_stats_count_hits_and_misses_per_family(self):
+        tag = entity_tag(uuid.uuid4(), "expenses")
+        family = "org:*:entity:expenses"
+        before = cache_stats()["tags"].get(family, {"hits": 0, "misses": 0})
+
+        async def compute():
+            return 1
+
+        await get_or_compute("t:stats", compute, tags=[tag])
+        await get_or_compute("t:stats", compute, tags=[tag])
+        after = cache_stats()["tags"][family]
+        assert after["misses"] == before["misses"] + 1
+        assert after["hits"] == before["hits"] + 1
+
+
+class FakeRedis:
+    """Just the commands the tag invalidation path issues."""
+
+    def __init__(self):
+        self.data: dict[str, object] = {}
+        self.commands: list[tuple] = []
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def publish(self, channel, message):
+        self.commands.append(("publish", channel))
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.queued: list[tuple] = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        return lambda *args, **kw: self.queued.append((name, *args))
+
+    async def execute(self):
+        data, results = self.redis.data, []
+        for name, *args in self.queued:
+            self.redis.commands.append((name, *args))
+            if name == "smembers":
+                results.append(set(data.get(args[0], set())))
+            elif name == "delete":
+                results.append(int(data.pop(args[0], None) is not None))
+            elif name == "srem":
+                data[args[0]] = data.get(args[0], set()) - set(args[1:])
+                results.append(len(args) - 1)
+        return results
+
+
+@pytest.mark.asyncio
+async def test_invalidate_tags_issues_only_keyed_commands(monkeypatch):
+    fake = FakeRedis()
+    fake.data = {
+        "cachetag:org:1": {"cache:a", "cache:b"},
+        "cachetag:flock:2": {"cache:b"},
+        "cache:a": "1",
+        "cache:b": "2",
+        "cache:c": "3",
+    }
+    monkeypatch.setattr("src.core.rate_limit._redis", fake)
+
+    await invalidate_tags("org:1", "flock:2")
+
+    assert fake.data["cache:c"] == "3"
+    assert "cache:a" not in fake.data and "cache:b" not in fake.data
+    assert fake.data["cachetag:org:1"] == set()
+    # no script reads keys it was not passed
+    assert {c[0] for c in fake.commands} == {"smembers", "delete", "srem", "publish"}
@@ -0,0 +1,173 @@
+"""Tests for bulk CRM health scoring and retention rules in src.core.crm.
+
+Every organization is scored from one grouped query per signal; retention
+rules filter the score table, which is kept as ``OrgHealthScore`` history.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import event, select
+
+from src.core.crm import HealthTable, compute_health_score, evaluate_retention_rules
+from src.models.auth import Organization
+from src.models.crm import (
+    OrgHealthScore,
+    RetentionAction,
+    RetentionEvent,
+    RetentionRule,
+    RetentionTrigger,
+)
+from src.models.subscription import PlanTier, Subscription, SubscriptionStatus
+from src.models.support import SupportTicket, TicketStatus
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def count_queries(db_session):
+    seen: list[str] = []
+
+    def record(conn, cursor, statement, params, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            seen.append(statement)
+
+    engine = db_session.bind.sync_engine
+    event.listen(engine, "before_cursor_execute", record)
+    yield seen
+    event.remove(engine, "before_cursor_execute", record)
+
+
+async def _org(db, name: str, status=None, trial_days: int | None = None):
+    org = Organization(name=name, slug=name.lower())
+    db.add(org)
+    await db.flush()
+    if status is not None:
+        db.add(
+            Subscription(
+                organization_id=org.id,
+                plan=PlanTier.pro,
+                status=status,
+                is_trial=trial_days is not None,
+                trial_end=(
+                    datetime.now(timezone.utc) + timedelta(days=trial_days, hours=12)
+                    if trial_days is not None
+                    else None
+                ),
+                months_subscribed=3,
+            )
+        )
+        await db.flush()
+    return org
+
+
+async def test_health_score_breakdown(db_session, authenticated_user, sample_flock):
+    user, org = authenticated_user["user"], authenticated_user["org"]
+    for n, status in enumerate([TicketStatus.open, TicketStatus.resolved]):
+        db_session.add(
+            SupportTicket(
+                organization_id=org.id,
+                user_id=user.id,
+                ticket_number=f"TK-{n}",
+                subject="s",
+                description="d",
+                status=status,
+            )
+        )
+    await db_session.flush()
+
+    health = await compute_health_score(org.id, db_session)
+    assert health["breakdown"] == {
+        "login_recency": 25,
+        "production_activity": 0,
+        "payment_health": 25,
+        "engagement_depth": 8,  # one farm + one flock
+        "ticket_burden": 7,  # one open ticket
+    }
+    assert (health["score"], health["risk"]) == (65, "medium")
+
+    empty = await _org(db_session, "Nueva")
+    assert await compute_health_score(empty.id, db_session) == {
+        "score": 10,
+        "risk": "critical",
+        "breakdown": {
+            "login_recency": 0,
+            "production_activity": 0,
+            "payment_health": 0,
+            "engagement_depth": 0,
+            "ticket_burden": 10,
+        },
+        "last_activity": None,
+    }
+
+
+async def test_query_count_does_not_grow_with_orgs(
+    db_session, authenticated_user, count_queries
+):
+    await HealthTable.load(db_session)
+    single = len(count_queries)
+    for i in range(10):
+        await _org(db_session, f"Org{i}", SubscriptionStatus.active)
+    count_queries.clear()
+
+    table = await HealthTable.load(db_session)
+    assert len(table) == 11
+    assert len(count_queries) == single == 7
+    # enterprise x 1 month, then pro x 3 months
+    assert sorted(table.ltv(i) for i in range(len(table))) == [99] + [147] * 10
+
+
+async def test_rules_filter_the_table_and_insert_events_in_bulk(
+    db_session, authenticated_user
+):
+    at_risk = await _org(
+        db_session, "Morosa", SubscriptionStatus.past_due, trial_days=3
+    )
+    db_session.add_all(
+        [
+            RetentionRule(
+                name="churn",
+                trigger_type=RetentionTrigger.churn_risk,
+                conditions={"health_below": 40},
+                action_type=RetentionAction.flag_for_review,
+            ),
+            RetentionRule(
+                name="dunning",
+                trigger_type=RetentionTrigger.payment_failed,
+                action_type=RetentionAction.send_email,
+            ),
+            RetentionRule(
+                name="trial",
+                trigger_type=RetentionTrigger.trial_ending,
+                conditions={"days_before": 5},
+                action_type=RetentionAction.send_email,
+            ),
+            RetentionRule(
+                name="manual",
+                trigger_type=RetentionTrigger.downgrade_request,
+                action_type=RetentionAction.apply_discount,
+            ),
+        ]
+    )
+    await db_session.flush()
+
+    triggered = await evaluate_retention_rules(db_session)
+    assert [(t["organization_name"], t["rule"]) for t in triggered] == [
+        ("Morosa", "churn"),
+        ("Morosa", "dunning"),
+        ("Morosa", "trial"),
+    ]
+    assert triggered[0]["health_score"] == 15
+
+    events = (await db_session.execute(select(RetentionEvent))).scalars().all()
+    assert {e.organization_id for e in events} == {at_risk.id}
+    assert sorted(e.trigger_type.value for e in events) == [
+        "churn_risk",
+        "payment_failed",
+        "trial_ending",
+    ]
+    history = (await db_session.execute(select(OrgHealthScore))).scalars().all()
+    assert {h.organization_id: h.risk for h in history} == {
+        authenticated_user["org"].id: "medium",
+        at_risk.id: "critical",
+    }
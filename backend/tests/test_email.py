@@ -0,0 +1,126 @@
+"""Tests for the outbound email pipeline in src.core.email.
+
+A mock transport stands in for the Resend API: shared client, batch sends,
+retries with backoff, the background send queue and off-loop archival.
+"""
+
+import asyncio
+import json
+
+import httpx
+import pytest
+import pytest_asyncio
+
+from src.config import settings
+from src.core import email, email_archive
+
+pytestmark = pytest.mark.asyncio
+
+
+class FakeResend:
+    def __init__(self):
+        self.requests: list[httpx.Request] = []
+        self.responses: list[httpx.Response] = []  # scripted, then 200
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        return self.responses.pop(0) if self.responses else httpx.Response(200)
+
+
+@pytest_asyncio.fixture
+async def resend(monkeypatch, tmp_path):
+    """Route the shared client to a scripted fake Resend API."""
+    fake = FakeResend()
+    monkeypatch.setattr(settings, "RESEND_API_KEY", "re_test")
+    monkeypatch.setattr(settings, "CORREOS_DIR", str(tmp_path))
+    monkeypatch.setattr(email, "RETRY_BASE_DELAY", 0)
+    monkeypatch.setattr(email, "_client", None)
+    monkeypatch.setattr(
+        email,
+        "_new_client",
+        lambda: httpx.AsyncClient(
+            base_url=email.RESEND_URL, transport=httpx.MockTransport(fake)
+        ),
+    )
+    email_archive._ready_dirs.clear()
+    yield fake
+    await email.stop_email_sender()
+
+
+async def test_report_recipients_go_out_in_one_batch_call(resend, tmp_path):
+    sent = await email.send_bulk(
+        ["a@x.com", " b@x.com", "", "a@x.com", "c@x.com"],
+        "EGGlogU Report",
+        "<p>Hola</p>",
+        tipo="reporte",
+    )
+    assert sent == ["a@x.com", "b@x.com", "c@x.com"]
+    assert [r.url.path for r in resend.requests] == ["/emails/batch"]
+    body = json.loads(resend.requests[0].content)
+    assert [m["to"] for m in body] == [["a@x.com"], ["b@x.com"], ["c@x.com"]]
+    assert resend.requests[0].headers["authorization"] == "Bearer re_test"
+
+    email_archive.flush_archive()
+    archived = sorted(p.name for p in (tmp_path / "reporte").iterdir())
+    assert len(archived) == 3 and archived[0].endswith("a_x.com.txt")
+
+
+async def test_transient_errors_are_retried_and_rejections_are_not(resend):
+    resend.responses += [
+        httpx.Response(503),
+        httpx.Response(429, headers={"retry-after": "0"}),
+    ]
+    before = dict(email.email_stats())
+    await email._send_email("ok@x.com", "Hola", "<p>hola</p>")
+    assert len(resend.requests) == 3
+    stats = email.email_stats()
+    assert stats["retries"] - before["retries"] == 2
+    assert stats["sent"] - before["sent"] == 1
+
+    resend.requests.clear()
+    resend.responses.append(httpx.Response(422, json={"message": "invalid"}))
+    await email._send_email("bad", "Hola", "<p>hola</p>")
+    assert len(resend.requests) == 1
+    assert email.email_stats()["failed"] - before["failed"] == 1
+
+
+async def test_rejected_batch_falls_back_to_one_call_per_message(resend):
+    resend.responses += [
+        httpx.Response(422, json={"message": "invalid `to` field"}),
+        httpx.Response(200),
+        httpx.Response(422, json={"message": "invalid `to` field"}),
+        httpx.Response(200),
+    ]
+    before = dict(email.email_stats())
+    await email.send_bulk(["a@x.com", "not-an-address", "c@x.com"], "R", "<p>r</p>")
+
+    assert [r.url.path for r in resend.requests] == ["/emails/batch"] + ["/emails"] * 3
+    stats = email.email_stats()
+    assert stats["batch_fallbacks"] - before["batch_fallbacks"] == 1
+    assert stats["sent"] - before["sent"] == 2
+    assert stats["failed"] - before["failed"] == 1
+
+
+async def test_queued_sends_return_before_delivery(resend, monkeypatch):
+    release = asyncio.Event()
+    original = email._send_messages
+
+    async def slow(messages):
+        await release.wait()
+        await original(messages)
+
+    monkeypatch.setattr(email, "_send_messages", slow)
+    email.start_email_sender()
+    queued = email.email_stats()["queued"]
+
+    await asyncio.wait_for(
+        email.send_bulk([f"u{i}@x.com" for i in range(20)], "Report", "<p>r</p>"),
+        0.5,
+    )
+    assert resend.requests == []  # a worker holds the batch
+    assert email.email_stats()["queued"] - queued == 20
+
+    release.set()
+    await email.stop_email_sender()
+    assert [r.url.path for r in resend.requests] == ["/emails/batch"]
+    assert len(json.loads(resend.requests[0].content)) == 20
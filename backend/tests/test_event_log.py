@@ -0,0 +1,144 @@
+"""Tests for the event log and WebSocket resume (last_event_id).
+
+Replay is exercised against the Lua publish script when fakeredis (with
+Lua support) is installed; the endpoint and hub tests stub the log.
+"""
+
+import asyncio
+import json
+
+import pytest
+from fastapi import FastAPI
+from starlette.testclient import TestClient
+
+from src.api import websocket as ws_api
+from src.core import events, rate_limit, ws_hub
+from src.core.events import EventType
+from src.core.security import create_access_token
+
+USER_ID = "00000000-0000-0000-0000-000000000001"
+
+
+class FakeSocket:
+    def __init__(self):
+        self.sent: list[str] = []
+
+    async def send_text(self, text: str):
+        self.sent.append(text)
+
+
+def _frame(event_id: str, n: int) -> str:
+    return json.dumps({"id": event_id, "type": "production.new", "data": {"n": n}})
+
+
+@pytest.mark.asyncio
+async def test_subscriber_skips_frames_the_replay_covered():
+    socket = FakeSocket()
+    sub = ws_hub.Subscriber(socket)
+    sub.skip_through("1700-1")
+    chat = json.dumps({"type": "chat_message"})
+    for raw in (_frame("1700-0", 1), chat, _frame("1700-1", 2), _frame("1701-0", 3)):
+        sub.offer(raw)
+    sub.offer(_frame("1700-0", 4))  # skipping ended at the first newer frame
+
+    runner = asyncio.create_task(sub.run())
+    for _ in range(100):
+        if len(socket.sent) == 3:
+            break
+        await asyncio.sleep(0.01)
+    runner.cancel()
+    await asyncio.gather(runner, return_exceptions=True)
+
+    assert socket.sent == [chat, _frame("1701-0", 3), _frame("1700-0", 4)]
+
+
+def test_batch_frame_carries_its_newest_event_id():
+    batch = ws_hub._Batch()
+    for event_id, value in (("5-0", 1), ("5-1", 2), ("6-0", 3)):
+        event = {
+            "id": event_id,
+            "type": EventType.IOT_READING,
+            "data": {"sensor_type": "temp", "value": value},
+        }
+        batch.add(event, json.dumps(event))
+    batch.add(
+        {"id": "7-0", "type": EventType.IOT_READING, "data": {"sensor_type": "co2"}},
+        "",
+    )
+
+    frame = json.loads(batch.frame())
+    assert frame["id"] == "7-0"
+    assert [e["id"] for e in frame["events"]] == ["6-0", "7-0"]
+    assert frame["events"][0]["data"]["value"] == 3
+
+
+@pytest.fixture
+def ws_client(monkeypatch):
+    monkeypatch.setattr(rate_limit, "_redis", None)
+    monkeypatch.setattr(ws_hub, "_hub", ws_hub._Hub())
+    app = FastAPI()
+    app.include_router(ws_api.router)
+    return TestClient(app)
+
+
+def test_reconnect_replays_the_gap_before_live(ws_client, monkeypatch):
+    calls = []
+
+    async def fake_replay(log_key, last_event_id):
+        calls.append((log_key, last_event_id))
+        return [_frame("1700-3", 1), _frame("1700-4", 2)], True
+
+    monkeypatch.setattr(events, "replay", fake_replay)
+    token = create_access_token(USER_ID, None, "owner")
+    url = f"/ws/dashboard/f1?token={token}&last_event_id=1700-2"
+
+    with ws_client.websocket_connect(url) as ws:
+        assert ws.receive_json()["type"] == "connected"
+        assert ws.receive_text() == _frame("1700-3", 1)
+        assert ws.receive_text() == _frame("1700-4", 2)
+    assert calls == [(events.log_for_farm("f1"), "1700-2")]
+
+
+def test_trimmed_gap_asks_the_client_to_resync(ws_client, monkeypatch):
+    async def fake_replay(log_key, last_event_id):
+        return [], False
+
+    monkeypatch.setattr(events, "replay", fake_replay)
+    token = create_access_token(USER_ID, "o1", "owner")
+
+    with ws_client.websocket_connect(f"/ws/org/o1?token={token}&last_event_id=1-0") as ws:
+        assert ws.receive_json()["type"] == "connected"
+        resync = ws.receive_json()
+        assert resync["type"] == "resync" and resync["last_event_id"] == "1-0"
+
+
+@pytest.mark.asyncio
+async def test_published_events_replay_from_the_log(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setattr(rate_limit, "_redis", redis)
+    monkeypatch.setattr(events, "_script", None)
+    monkeypatch.setattr(events, "FARM_LOG_MAXLEN", 3)
+
+    pubsub = redis.pubsub()
+    await pubsub.subscribe(events.channel_for_farm("f1"))
+    for n in range(5):
+        await events.publish_event(EventType.PRODUCTION_NEW, "f1", "o1", {"n": n})
+    live = []
+    while (msg := await pubsub.get_message(ignore_subscribe_messages=True, timeout=0.1)):
+        live.append(json.loads(msg["data"]))
+    assert [e["data"]["n"] for e in live] == [0, 1, 2, 3, 4]
+
+    log = events.log_for_farm("f1")
+    await redis.xtrim(log, maxlen=3)  # approximate trimming may keep more
+    frames, complete = await events.replay(log, live[2]["id"])
+    assert complete
+    assert [json.loads(f) for f in frames] == live[3:]
+
+    frames, complete = await events.replay(log, live[0]["id"])
+    assert not complete and frames == []  # trimmed past the client's position
+
+    org_frames, _ = await events.replay(events.log_for_org("o1"), "0-0")
+    assert org_frames == []
+    assert not (await events.replay(log, "not-an-id"))[1]
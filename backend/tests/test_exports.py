@@ -0,0 +1,176 @@
+"""Tests for columnar exports in src.core.columnar_export and /reports/exports.
+
+Batch streaming and the job endpoints run everywhere; writing the actual
+Arrow / Parquet files is skipped when pyarrow is not installed.
+"""
+
+import uuid
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+from src.core.columnar_export import DATASETS, iter_column_batches, write_export
+from src.models.environment import IoTReading
+from src.models.production import DailyProduction, EggType
+from src.models.report import ExportJob
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+async def production_rows(db_session, authenticated_user, sample_flock):
+    org_id = authenticated_user["org"].id
+    start = date(2026, 3, 1)
+    for i in range(5):
+        db_session.add(
+            DailyProduction(
+                organization_id=org_id,
+                flock_id=sample_flock.id,
+                date=start + timedelta(days=i),
+                total_eggs=1000 + i,
+                egg_type=EggType.organic if i % 2 else None,
+            )
+        )
+    db_session.add(
+        DailyProduction(
+            organization_id=org_id,
+            flock_id=sample_flock.id,
+            date=date(2026, 4, 1),
+            total_eggs=1,
+        )
+    )
+    await db_session.flush()
+    return org_id
+
+
+async def _collect(db_session, dataset, org_id, date_from, date_to, chunk_rows):
+    return [
+        chunk
+        async for chunk in iter_column_batches(
+            db_session, DATASETS[dataset], org_id, date_from, date_to, chunk_rows
+        )
+    ]
+
+
+async def test_batches_are_chunked_filtered_and_plain_values(
+    db_session, production_rows
+):
+    chunks = await _collect(
+        db_session,
+        "daily_production",
+        production_rows,
+        date(2026, 3, 1),
+        date(2026, 3, 31),
+        chunk_rows=2,
+    )
+
+    assert [len(c["id"]) for c in chunks] == [2, 2, 1]
+    eggs = [n for c in chunks for n in c["total_eggs"]]
+    assert eggs == [1000, 1001, 1002, 1003, 1004]
+    first = chunks[0]
+    assert isinstance(first["id"][0], str)
+    assert first["egg_type"] == [None, EggType.organic.value]
+    assert "deleted_at" not in first
+
+    other_org = await _collect(
+        db_session, "daily_production", uuid.uuid4(), None, None, chunk_rows=2
+    )
+    assert other_org == []
+
+
+async def test_timestamp_datasets_include_whole_end_day(
+    db_session, authenticated_user
+):
+    org_id = authenticated_user["org"].id
+    for ts in [
+        datetime(2026, 3, 1, 0, 0, tzinfo=timezone.utc),
+        datetime(2026, 3, 2, 23, 59, tzinfo=timezone.utc),
+        datetime(2026, 3, 3, 0, 0, tzinfo=timezone.utc),
+    ]:
+        db_session.add(
+            IoTReading(
+                organization_id=org_id,
+                timestamp=ts,
+                sensor_type="temperature",
+                value=21.5,
+                unit="C",
+            )
+        )
+    await db_session.flush()
+
+    chunks = await _collect(
+        db_session, "iot_readings", org_id, date(2026, 3, 1), date(2026, 3, 2), 100
+    )
+    assert len(chunks) == 1 and len(chunks[0]["id"]) == 2
+
+
+@pytest.mark.parametrize("fmt", ["arrow", "parquet"])
+async def test_write_export_round_trips(
+    db_session, production_rows, authenticated_user, tmp_path, monkeypatch, fmt
+):
+    pa = pytest.importorskip("pyarrow")
+    from src.config import settings
+
+    monkeypatch.setattr(settings, "EXPORTS_DIR", str(tmp_path))
+    job = ExportJob(
+        organization_id=production_rows,
+        requested_by=authenticated_user["user"].id,
+        dataset="daily_production",
+        format=fmt,
+        date_from=date(2026, 3, 1),
+        date_to=date(2026, 3, 31),
+    )
+    db_session.add(job)
+    await db_session.flush()
+
+    rows, size = await write_export(db_session, job)
+
+    path = tmp_path / job.storage_key
+    assert rows == 5 and size == path.stat().st_size
+    assert not list(tmp_path.rglob("*.part"))
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        table = pq.read_table(path)
+    else:
+        table = pa.ipc.open_file(str(path)).read_all()
+    assert table.num_rows == 5
+    assert table.column("total_eggs").to_pylist()[0] == 1000
+    assert table.schema.field("date").type == pa.date32()
+
+
+async def test_export_endpoints(client, authenticated_user, monkeypatch):
+    from src.tasks.reports import run_export_job
+
+    queued = []
+    monkeypatch.setattr(run_export_job, "delay", queued.append)
+    headers = authenticated_user["headers"]
+
+    resp = await client.post(
+        "/api/v1/reports/exports",
+        json={"dataset": "iot_readings", "format": "arrow"},
+        headers=headers,
+    )
+    assert resp.status_code == 202
+    job = resp.json()
+    assert job["status"] == "pending"
+    assert queued == [job["id"]]
+
+    resp = await client.get(
+        f"/api/v1/reports/exports/{job['id']}/download", headers=headers
+    )
+    assert resp.status_code == 409
+
+    resp = await client.get("/api/v1/reports/exports", headers=headers)
+    assert [j["id"] for j in resp.json()] == [job["id"]]
+
+    resp = await client.post(
+        "/api/v1/reports/exports",
+        json={
+            "dataset": "income",
+            "date_from": "2026-03-02",
+            "date_to": "2026-03-01",
+        },
+        headers=headers,
+    )
+    assert resp.status_code == 400
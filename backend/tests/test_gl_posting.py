@@ -0,0 +1,172 @@
+"""Tests for GL posting in src.core.gl_posting.
+
+Covers gapless numbering, the set-based balance upsert, the cached chart of
+accounts and the bulk ``post_many`` path.
+"""
+
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import select
+
+from src.core.gl_posting import (
+    GLPostingService,
+    PostingRequest,
+    allocate_entry_numbers,
+)
+from src.models.accounting import (
+    Account,
+    AccountBalance,
+    AccountSubType,
+    AccountType,
+    FiscalPeriod,
+    JournalEntry,
+    JournalEntrySource,
+    NormalBalance,
+    PeriodStatus,
+)
+from src.schemas.accounting import AccountCreate
+from src.services.accounting_service import AccountingService
+
+pytestmark = pytest.mark.asyncio
+
+D = Decimal
+
+
+@pytest.fixture
+async def ledger(db_session, authenticated_user):
+    """Org with the seeded CoA and an open March 2026 period."""
+    user = authenticated_user["user"]
+    accounting = AccountingService(db_session, user.organization_id, user.id)
+    await accounting.seed_coa()
+    period = FiscalPeriod(
+        organization_id=user.organization_id,
+        name="2026-03",
+        start_date=date(2026, 3, 1),
+        end_date=date(2026, 3, 31),
+    )
+    db_session.add(period)
+    await db_session.flush()
+    return accounting, GLPostingService(db_session, user.organization_id, user.id), period
+
+
+async def _balances(db_session, period_id) -> dict[str, tuple]:
+    result = await db_session.execute(
+        select(
+            Account.code,
+            AccountBalance.debit_total,
+            AccountBalance.credit_total,
+            AccountBalance.balance,
+        )
+        .join(Account, Account.id == AccountBalance.account_id)
+        .where(AccountBalance.period_id == period_id)
+    )
+    return {code: (d, c, b) for code, d, c, b in result.all()}
+
+
+async def test_postings_number_gaplessly_and_accumulate_balances(db_session, ledger):
+    accounting, gl, period = ledger
+
+    income = await gl.post_income(uuid.uuid4(), date(2026, 3, 5), D("100.00"))
+    expense = await gl.post_expense(uuid.uuid4(), date(2026, 3, 6), D("30.00"), "feed")
+    await gl.post_income(uuid.uuid4(), date(2026, 3, 7), D("50.00"))
+    # Outside any open period: posted, but no balance rows
+    await gl.post_income(uuid.uuid4(), date(2026, 5, 1), D("999.00"))
+
+    assert (income.entry_number, expense.entry_number) == ("JE-000001", "JE-000002")
+    assert await accounting._next_entry_number() == "JE-000005"
+
+    assert await _balances(db_session, period.id) == {
+        "1000": (D("150.00"), D("30.00"), D("120.00")),
+        "4000": (D("0.00"), D("150.00"), D("150.00")),
+        "6000": (D("30.00"), D("0.00"), D("30.00")),
+    }
+
+
+async def test_counter_seeds_from_existing_entries(db_session, authenticated_user):
+    org_id = authenticated_user["org"].id
+    db_session.add(
+        JournalEntry(
+            organization_id=org_id,
+            entry_number="JE-000041",
+            date=date(2026, 1, 1),
+            description="Legacy",
+        )
+    )
+    await db_session.flush()
+
+    assert await allocate_entry_numbers(db_session, org_id, 2) == [
+        "JE-000042",
+        "JE-000043",
+    ]
+
+
+async def test_post_many_skips_unknown_accounts_and_coa_edits_invalidate(
+    db_session, ledger
+):
+    accounting, gl, period = ledger
+    requests = [
+        PostingRequest(
+            date(2026, 3, 2),
+            "Backfill 1",
+            JournalEntrySource.MANUAL,
+            uuid.uuid4(),
+            [("1000", D("5.00"), D("0.00")), ("4000", D("0.00"), D("5.00"))],
+        ),
+        PostingRequest(
+            date(2026, 3, 3),
+            "Unknown account",
+            JournalEntrySource.MANUAL,
+            uuid.uuid4(),
+            [("7777", D("10.00"), D("0.00")), ("1000", D("0.00"), D("10.00"))],
+        ),
+    ]
+
+    posted = await gl.post_many(requests)
+    assert posted[0].entry_number == "JE-000001"
+    assert posted[1] is None
+
+    # New account must be visible to the next posting (cache invalidated)
+    await accounting.create_account(
+        AccountCreate(
+            code="7777",
+            name="Misc",
+            account_type=AccountType.EXPENSE,
+            sub_type=AccountSubType.OTHER_EXPENSE,
+            normal_balance=NormalBalance.DEBIT,
+        )
+    )
+    posted = await gl.post_many(requests[1:])
+    assert posted[0].entry_number == "JE-000002"
+    assert (await _balances(db_session, period.id))["1000"] == (
+        D("5.00"),
+        D("10.00"),
+        D("-5.00"),
+    )
+
+
+async def test_entries_dated_in_a_closed_period_move_to_the_next_open_day(
+    db_session, ledger
+):
+    _, gl, march = ledger
+    for month in (1, 2):
+        db_session.add(
+            FiscalPeriod(
+                organization_id=march.organization_id,
+                name=f"2026-0{month}",
+                start_date=date(2026, month, 1),
+                end_date=date(2026, month, 28 if month == 2 else 31),
+                status=PeriodStatus.CLOSED,
+                snapshot_at=datetime(2026, 3, 1),
+            )
+        )
+    await db_session.flush()
+
+    late = await gl.post_income(uuid.uuid4(), date(2026, 1, 20), D("8.00"))
+    on_time = await gl.post_income(uuid.uuid4(), date(2026, 3, 5), D("2.00"))
+    assert (late.date, late.period_id) == (date(2026, 3, 1), march.id)
+    assert late.memo == "Originally dated 2026-01-20 (closed period)"
+    assert (on_time.date, on_time.memo) == (date(2026, 3, 5), None)
+    assert (await _balances(db_session, march.id))["4000"][1] == D("10.00")
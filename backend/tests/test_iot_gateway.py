@@ -0,0 +1,236 @@
+"""Tests for the buffered IoT ingest gateway in src.core.iot_gateway.
+
+Covers frame decoding, the HTTP ingest endpoint (inline and buffered),
+backpressure, one event per organization per flush and the ingest socket's
+authentication.
+"""
+
+import gzip
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import func, select
+
+from src import database
+from src.api import websocket
+from src.core import auth_security, iot_gateway
+from src.core.security import create_access_token, create_refresh_token
+from src.models.environment import IoTReading, IoTRollup
+
+pytestmark = pytest.mark.asyncio
+
+API = "/api/v1"
+T0 = datetime(2026, 3, 1, 10, 0, tzinfo=timezone.utc)
+
+
+def _ndjson(n: int, sensor: str = "temperature") -> bytes:
+    return b"\n".join(
+        json.dumps(
+            {
+                "timestamp": (T0 + timedelta(seconds=5 * i)).isoformat(),
+                "sensor_type": sensor,
+                "value": 20 + i,
+                "unit": "C",
+            }
+        ).encode()
+        for i in range(n)
+    )
+
+
+@pytest.fixture(autouse=True)
+def empty_buffer():
+    iot_gateway._queue.clear()
+    iot_gateway._per_org.clear()
+    yield
+    iot_gateway._queue.clear()
+    iot_gateway._per_org.clear()
+
+
+@pytest.fixture
+def published(monkeypatch):
+    events = []
+
+    async def _publish(event_type, farm_id=None, org_id=None, data=None):
+        events.append((event_type, org_id, data))
+
+    monkeypatch.setattr(iot_gateway, "publish_event", _publish)
+    return events
+
+
+class _TestSessions:
+    """Session factory handing out the test session without closing it."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def __call__(self):
+        return self
+
+    async def __aenter__(self):
+        return self.db
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+async def test_decode_frame_formats_and_errors(monkeypatch):
+    readings = iot_gateway.decode_frame(
+        gzip.compress(_ndjson(3)), "gzip", "application/x-ndjson"
+    )
+    assert [r["value"] for r in readings] == [20.0, 21.0, 22.0]
+    assert readings[0]["timestamp"] == T0
+
+    array = json.dumps([json.loads(line) for line in _ndjson(2).splitlines()])
+    assert len(iot_gateway.decode_frame(array.encode(), None, "application/json")) == 2
+
+    with pytest.raises(iot_gateway.UnsupportedFrame):
+        iot_gateway.decode_frame(b"x", "br", "application/x-ndjson")
+    with pytest.raises(iot_gateway.FrameError, match="reading 0"):
+        iot_gateway.decode_frame(b'{"sensor_type": "t"}', None, None)
+
+    monkeypatch.setattr(iot_gateway, "MAX_FRAME_BYTES", 100)
+    with pytest.raises(iot_gateway.FrameError, match="uncompressed"):
+        iot_gateway.decode_frame(gzip.compress(b" " * 10_000), "gzip", None)
+
+
+async def test_msgpack_zstd_frame():
+    msgpack = pytest.importorskip("msgpack")
+    zstandard = pytest.importorskip("zstandard")
+    records = [json.loads(line) for line in _ndjson(4).splitlines()]
+    body = zstandard.ZstdCompressor().compress(
+        b"".join(msgpack.packb(r) for r in records)
+    )
+    assert len(iot_gateway.decode_frame(body, "zstd", "application/msgpack")) == 4
+
+
+async def test_http_ingest_writes_inline_without_gateway(
+    client, db_session, authenticated_user, published
+):
+    headers = {
+        **authenticated_user["headers"],
+        "Content-Encoding": "gzip",
+        "Content-Type": "application/x-ndjson",
+    }
+    resp = await client.post(
+        f"{API}/iot-readings/ingest", content=gzip.compress(_ndjson(3)), headers=headers
+    )
+    assert resp.status_code == 202, resp.text
+    assert resp.json() == {"accepted": 3, "buffered": False}
+    count = await db_session.scalar(select(func.count()).select_from(IoTReading))
+    assert count == 3
+
+    resp = await client.post(
+        f"{API}/iot-readings/ingest",
+        content=b"not json",
+        headers={
+            **authenticated_user["headers"],
+            "Content-Type": "application/x-ndjson",
+        },
+    )
+    assert resp.status_code == 400
+    resp = await client.post(
+        f"{API}/iot-readings/ingest",
+        content=_ndjson(1),
+        headers={**authenticated_user["headers"], "Content-Type": "text/csv"},
+    )
+    assert resp.status_code == 415
+
+
+async def test_buffered_ingest_backpressure_and_one_event_per_flush(
+    client, db_session, authenticated_user, published, monkeypatch
+):
+    org_id = str(authenticated_user["org"].id)
+    monkeypatch.setattr(iot_gateway, "running", lambda: True)
+    monkeypatch.setattr(iot_gateway, "MAX_BUFFERED_PER_ORG", 5)
+    headers = {**authenticated_user["headers"], "Content-Type": "application/x-ndjson"}
+
+    resp = await client.post(
+        f"{API}/iot-readings/ingest", content=_ndjson(4), headers=headers
+    )
+    assert resp.json() == {"accepted": 4, "buffered": True}
+
+    resp = await client.post(
+        f"{API}/iot-readings/ingest", content=_ndjson(2), headers=headers
+    )
+    assert resp.status_code == 429
+    assert int(resp.headers["Retry-After"]) >= 1
+
+    monkeypatch.setattr(iot_gateway, "MAX_BUFFERED_PER_ORG", 100)
+    monkeypatch.setattr(iot_gateway, "MAX_BUFFERED", 5)
+    with pytest.raises(iot_gateway.GatewayBusy) as busy:
+        iot_gateway.offer("other-org", [{}] * 2)
+    assert busy.value.status_code == 503
+
+    written = await iot_gateway.flush_ingest_buffer(_TestSessions(db_session))
+    assert written == 4
+    assert iot_gateway.ingest_gateway_stats()["buffered"] == 0
+    assert [(t, o, d["count"]) for t, o, d in published] == [("iot.reading", org_id, 4)]
+    rollup = await db_session.scalar(
+        select(IoTRollup.sample_count).where(IoTRollup.bucket_seconds == 3600)
+    )
+    assert rollup == 4
+
+
+async def test_failing_org_goes_to_the_tail_and_is_dropped_after_max_attempts(
+    db_session, authenticated_user, published, monkeypatch
+):
+    good = str(authenticated_user["org"].id)
+    bad = "00000000-0000-0000-0000-000000000000"
+    reading = iot_gateway.decode_frame(_ndjson(1), None, None)[0]
+    iot_gateway.offer(bad, [reading, reading])
+    iot_gateway.offer(good, [reading])
+    real_write = iot_gateway._write
+
+    async def write(factory, org_id, readings):
+        if org_id == bad:
+            raise RuntimeError("poisoned batch")
+        await real_write(factory, org_id, readings)
+
+    monkeypatch.setattr(iot_gateway, "_write", write)
+    monkeypatch.setattr(iot_gateway, "FLUSH_SIZE", 2)
+    sessions = _TestSessions(db_session)
+
+    # The failed batch is re-queued behind the good org, not in front of it
+    assert await iot_gateway.flush_ingest_buffer(sessions) == 0
+    assert await iot_gateway.flush_ingest_buffer(sessions) == 1
+    assert [(o, n) for o, _, n in iot_gateway._queue] == [(bad, 1), (bad, 2)]
+
+    dropped_before = iot_gateway.ingest_gateway_stats()["dropped"]
+    for _ in range(iot_gateway.MAX_WRITE_ATTEMPTS):
+        await iot_gateway.flush_ingest_buffer(sessions)
+    stats = iot_gateway.ingest_gateway_stats()
+    assert stats["buffered"] == 0 and stats["orgs_buffered"] == 0
+    assert stats["dropped"] - dropped_before == 2
+
+
+async def test_ingest_socket_auth_matches_http_auth(
+    db_session, authenticated_user, monkeypatch
+):
+    user, org = authenticated_user["user"], authenticated_user["org"]
+    monkeypatch.setattr(database, "async_session", _TestSessions(db_session))
+    revoked: set[str] = set()
+
+    async def _blacklisted(jti):
+        return jti in revoked
+
+    monkeypatch.setattr(auth_security, "is_token_blacklisted", _blacklisted)
+
+    auth = await websocket._authenticate_ws(
+        create_access_token(user.id, org.id, user.role.value, jti="live")
+    )
+    assert auth is not None
+    assert auth[0].organization_id == org.id
+    assert auth[1] > datetime.now(timezone.utc).timestamp()
+
+    refresh, _ = create_refresh_token(user.id)
+    assert await websocket._authenticate_ws(refresh) is None
+
+    revoked.add("logged-out")
+    logged_out = create_access_token(user.id, org.id, user.role.value, jti="logged-out")
+    assert await websocket._authenticate_ws(logged_out) is None
+
+    user.is_active = False
+    await db_session.flush()
+    inactive = create_access_token(user.id, org.id, user.role.value, jti="inactive")
+    assert await websocket._authenticate_ws(inactive) is None
@@ -0,0 +1,258 @@
+"""Tests for the IoT time-series path in src.core.iot_timeseries.
+
+Covers batch ingest with incremental rollups, rollup refresh on edits and
+deletes, and range queries served from the coarsest usable rollup.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import select, update
+
+from src.core import iot_timeseries
+from src.models.environment import IoTReading, IoTRollup
+
+pytestmark = pytest.mark.asyncio
+
+API = "/api/v1"
+T0 = datetime(2026, 3, 1, 10, 0, tzinfo=timezone.utc)
+
+
+def _reading(offset_s: int, value: float, sensor: str = "temperature") -> dict:
+    return {
+        "timestamp": (T0 + timedelta(seconds=offset_s)).isoformat(),
+        "sensor_type": sensor,
+        "value": value,
+        "unit": "C",
+    }
+
+
+async def _rollups(db_session, seconds: int) -> list[tuple]:
+    result = await db_session.execute(
+        select(
+            IoTRollup.bucket_start,
+            IoTRollup.sample_count,
+            IoTRollup.value_sum,
+            IoTRollup.value_min,
+            IoTRollup.value_max,
+        )
+        .where(IoTRollup.sensor_type == "temperature", IoTRollup.bucket_seconds == seconds)
+        .order_by(IoTRollup.bucket_start)
+    )
+    return [(iot_timeseries.as_utc(b), *rest) for b, *rest in result.all()]
+
+
+async def test_batch_ingest_rolls_up_every_resolution(
+    client, db_session, authenticated_user
+):
+    headers = authenticated_user["headers"]
+    batch = [_reading(0, 20.0), _reading(30, 22.0), _reading(90, 30.0)]
+    resp = await client.post(
+        f"{API}/iot-readings/batch", json={"readings": batch}, headers=headers
+    )
+    assert resp.status_code == 201
+    assert resp.json() == {"inserted": 3}
+
+    # Second batch lands in existing buckets: counts add, min/max widen
+    resp = await client.post(
+        f"{API}/iot-readings/batch",
+        json={"readings": [_reading(45, 10.0), _reading(60, 25.0, sensor="humidity")]},
+        headers=headers,
+    )
+    assert resp.json() == {"inserted": 2}
+
+    assert await _rollups(db_session, 60) == [
+        (T0, 3, 52.0, 10.0, 22.0),
+        (T0 + timedelta(minutes=1), 1, 30.0, 30.0, 30.0),
+    ]
+    assert await _rollups(db_session, 3600) == [(T0, 4, 82.0, 10.0, 30.0)]
+    day = T0.replace(hour=0)
+    assert await _rollups(db_session, 86400) == [(day, 4, 82.0, 10.0, 30.0)]
+
+
+async def test_series_uses_coarsest_rollup_for_step(client, authenticated_user):
+    headers = authenticated_user["headers"]
+    batch = [_reading(i * 600, float(i)) for i in range(12)]  # 2 hours, 10 min apart
+    await client.post(
+        f"{API}/iot-readings/batch", json={"readings": batch}, headers=headers
+    )
+
+    async def series(step: str) -> dict:
+        resp = await client.get(
+            f"{API}/iot-readings/series",
+            params={
+                "sensor_type": "temperature",
+                "start": T0.isoformat(),
+                "end": (T0 + timedelta(hours=2)).isoformat(),
+                "step": step,
+            },
+            headers=headers,
+        )
+        assert resp.status_code == 200, resp.text
+        return resp.json()
+
+    hourly = await series("1h")
+    assert hourly["source"] == "1h"
+    assert [(p["count"], p["mean"], p["min"], p["max"]) for p in hourly["points"]] == [
+        (6, 2.5, 0.0, 5.0),
+        (6, 8.5, 6.0, 11.0),
+    ]
+
+    thirty = await series("30m")
+    assert thirty["source"] == "1m"
+    assert [p["count"] for p in thirty["points"]] == [3, 3, 3, 3]
+
+    raw = await series("90s")
+    assert raw["source"] == "raw"
+    assert len(raw["points"]) == 12
+
+    resp = await client.get(
+        f"{API}/iot-readings/series",
+        params={
+            "sensor_type": "temperature",
+            "start": T0.isoformat(),
+            "end": (T0 + timedelta(days=30)).isoformat(),
+            "step": "1s",
+        },
+        headers=headers,
+    )
+    assert resp.status_code == 400
+
+
+async def test_update_and_delete_refresh_rollups(
+    client, db_session, authenticated_user
+):
+    headers = authenticated_user["headers"]
+    ids = []
+    for reading in [_reading(0, 20.0), _reading(10, 40.0)]:
+        resp = await client.post(f"{API}/iot-readings", json=reading, headers=headers)
+        assert resp.status_code == 201
+        ids.append(resp.json()["id"])
+    assert await _rollups(db_session, 60) == [(T0, 2, 60.0, 20.0, 40.0)]
+
+    resp = await client.put(
+        f"{API}/iot-readings/{ids[1]}", json={"value": 25.0}, headers=headers
+    )
+    assert resp.status_code == 200
+    assert await _rollups(db_session, 60) == [(T0, 2, 45.0, 20.0, 25.0)]
+
+    resp = await client.delete(f"{API}/iot-readings/{ids[0]}", headers=headers)
+    assert resp.status_code == 204
+    assert await _rollups(db_session, 3600) == [(T0, 1, 25.0, 25.0, 25.0)]
+
+    resp = await client.delete(f"{API}/iot-readings/{ids[1]}", headers=headers)
+    assert await _rollups(db_session, 86400) == []
+
+
+async def test_sync_edit_moving_a_reading_keeps_one_row(
+    client, db_session, authenticated_user
+):
+    headers = authenticated_user["headers"]
+    resp = await client.post(f"{API}/iot-readings", json=_reading(0, 20.0), headers=headers)
+    reading_id = resp.json()["id"]
+    moved = T0 + timedelta(days=40)
+
+    resp = await client.post(
+        f"{API}/sync",
+        json={
+            "data": {
+                "iot_readings": [
+                    {
+                        "id": reading_id,
+                        "timestamp": moved.isoformat(),
+                        "sensor_type": "temperature",
+                        "value": 21.0,
+                        "unit": "C",
+                        "updated_at": "2030-01-01T00:00:00+00:00",
+                    }
+                ]
+            }
+        },
+        headers=headers,
+    )
+    assert resp.json()["synced"] == 1
+    rows = (await db_session.execute(select(IoTReading))).scalars().all()
+    assert len(rows) == 1
+    assert iot_timeseries.as_utc(rows[0].timestamp) == moved
+    # Old bucket dropped, new one holds the moved point
+    assert await _rollups(db_session, 86400) == [
+        (moved.replace(hour=0), 1, 21.0, 21.0, 21.0)
+    ]
+
+    # A stale edit of the old position loses instead of duplicating the id
+    resp = await client.post(
+        f"{API}/sync",
+        json={
+            "data": {
+                "iot_readings": [
+                    {
+                        "id": reading_id,
+                        **_reading(0, 99.0),
+                        "updated_at": "2029-01-01T00:00:00+00:00",
+                    }
+                ]
+            }
+        },
+        headers=headers,
+    )
+    assert resp.json()["synced"] == 0
+    assert len((await db_session.execute(select(IoTReading))).scalars().all()) == 1
+
+
+async def test_refresh_only_rebuilds_buckets_holding_points(
+    client, db_session, authenticated_user
+):
+    headers = authenticated_user["headers"]
+    batch = [_reading(0, 1.0), _reading(3600, 2.0), _reading(7200, 3.0)]
+    await client.post(
+        f"{API}/iot-readings/batch", json={"readings": batch}, headers=headers
+    )
+    # Mark every hourly bucket; only those holding a point get recomputed
+    await db_session.execute(
+        update(IoTRollup)
+        .where(IoTRollup.bucket_seconds == 3600)
+        .values(sample_count=99)
+    )
+    await iot_timeseries.refresh_rollups(
+        db_session,
+        authenticated_user["org"].id,
+        [("temperature", T0), ("temperature", T0 + timedelta(hours=2))],
+    )
+    assert [row[1] for row in await _rollups(db_session, 3600)] == [1, 99, 1]
+
+
+class _PartitionDB:
+    """Stands in for a PostgreSQL session: ``iot_readings_default`` holds a
+    stray row for every month and no monthly partition exists yet."""
+
+    def __init__(self):
+        self.statements: list[str] = []
+
+    def get_bind(self):
+        class _Bind:
+            class dialect:
+                name = "postgresql"
+
+        return _Bind
+
+    async def execute(self, stmt, params=None):
+        sql = str(stmt)
+        self.statements.append(sql)
+
+        class _Result:
+            @staticmethod
+            def scalar():
+                return True if "EXISTS" in sql else None
+
+        return _Result
+
+
+async def test_ensure_partitions_moves_stray_default_rows_first():
+    db = _PartitionDB()
+    created = await iot_timeseries.ensure_partitions(db, months_ahead=0)
+    assert len(created) == 1
+    ddl = [s for s in db.statements if not s.startswith("SELECT")]
+    assert ddl[0].startswith(f"CREATE TABLE {created[0]} (LIKE iot_readings")
+    assert "DELETE FROM iot_readings_default" in ddl[1]
+    assert ddl[2].startswith(f"ALTER TABLE iot_readings ATTACH PARTITION {created[0]}")
+    assert not any("PARTITION OF" in s for s in ddl)
@@ -0,0 +1,224 @@
+"""Tests for the superadmin platform metrics snapshot in src.core.platform_metrics.
+
+KPIs come from a single aggregate SELECT, the inventory overview from a
+fixed number of grouped queries, and the endpoints serve the latest
+snapshot unless ``?fresh=1`` is passed.
+"""
+
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, select
+
+from src.api.deps import SUPERUSER_EMAIL
+from src.core import platform_metrics
+from src.core.security import create_access_token, hash_password
+from src.models.analytics import PlatformStatsSnapshot
+from src.models.auth import Organization, Role, User
+from src.models.inventory import EggStock, StockMovement, StockMovementType
+from src.models.subscription import PlanTier, Subscription, SubscriptionStatus
+from src.models.support import SupportTicket, TicketStatus
+
+pytestmark = pytest.mark.asyncio
+
+API = "/api/v1"
+
+
+@pytest.fixture
+def count_queries(db_session):
+    seen: list[str] = []
+
+    def record(conn, cursor, statement, params, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            seen.append(statement)
+
+    engine = db_session.bind.sync_engine
+    event.listen(engine, "before_cursor_execute", record)
+    yield seen
+    event.remove(engine, "before_cursor_execute", record)
+
+
+@pytest_asyncio.fixture
+async def superadmin_headers(db_session, authenticated_user):
+    admin = User(
+        email=SUPERUSER_EMAIL,
+        hashed_password=hash_password("TestPassword123"),
+        full_name="Root",
+        role=Role.superadmin,
+        organization_id=authenticated_user["org"].id,
+        is_active=True,
+        email_verified=True,
+    )
+    db_session.add(admin)
+    await db_session.flush()
+    token = create_access_token(admin.id, admin.organization_id, admin.role.value)
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def _seed(db, authenticated_user):
+    """A second (pro) tenant, egg stock, movements and a few tickets."""
+    org, user = authenticated_user["org"], authenticated_user["user"]
+    other = Organization(name="Granja Sur", slug="granja-sur")
+    db.add(other)
+    await db.flush()
+    db.add(
+        Subscription(
+            organization_id=other.id,
+            plan=PlanTier.pro,
+            status=SubscriptionStatus.active,
+        )
+    )
+    for org_id, size, egg_type, qty in [
+        (org.id, "L", "white", 100),
+        (org.id, "L", "brown", 50),
+        (org.id, "M", None, 30),
+        (other.id, "XL", "white", 7),
+    ]:
+        db.add(
+            EggStock(
+                organization_id=org_id,
+                date=date(2026, 3, 1),
+                egg_size=size,
+                egg_type=egg_type,
+                quantity=qty,
+            )
+        )
+    db.add(
+        StockMovement(
+            organization_id=org.id,
+            movement_type=StockMovementType.production_in,
+            quantity=10,
+            date=date(2026, 3, 2),
+        )
+    )
+    for n, (category, priority, status) in enumerate(
+        [
+            ("bug", "critical", TicketStatus.open),
+            ("bug", "low", TicketStatus.waiting_user),
+            ("feature_request", "critical", TicketStatus.closed),
+        ]
+    ):
+        db.add(
+            SupportTicket(
+                organization_id=org.id,
+                user_id=user.id,
+                ticket_number=f"TK-{n}",
+                subject="s",
+                description="d",
+                category=category,
+                priority=priority,
+                status=status,
+            )
+        )
+    await db.flush()
+    return org, other
+
+
+async def test_stats_come_from_one_select(
+    db_session, authenticated_user, count_queries
+):
+    await _seed(db_session, authenticated_user)
+    count_queries.clear()
+
+    stats = await platform_metrics.compute_stats(db_session)
+    assert len(count_queries) == 1
+    assert {k: stats[k] for k in stats if not k.startswith("avg")} == {
+        "total_organizations": 2,
+        "active_organizations": 2,
+        "total_users": 1,
+        "active_users": 1,
+        "total_farms": 0,
+        "total_flocks": 0,
+        "total_eggs_in_stock": 187,
+        "open_tickets": 2,
+        "resolved_tickets_30d": 0,
+        "total_tickets": 3,
+        "bug_tickets": 2,
+        "feature_requests": 1,
+        "critical_tickets": 1,
+        "mrr_estimated": 148.0,
+        "plan_distribution": {"pro": 1, "enterprise": 1},
+        "new_orgs_30d": 2,
+        "new_users_30d": 1,
+        "ticket_response_avg_hours": None,
+        "sla_compliance_pct": None,
+    }
+
+
+async def test_inventory_queries_do_not_grow_with_tenants(
+    db_session, authenticated_user, count_queries
+):
+    org, other = await _seed(db_session, authenticated_user)
+    for i in range(5):
+        db_session.add(Organization(name=f"Vacía {i}", slug=f"vacia-{i}"))
+    await db_session.flush()
+    count_queries.clear()
+
+    inventory = await platform_metrics.compute_inventory(db_session)
+    assert len(count_queries) == 3
+    by_org = {row["organization_id"]: row for row in inventory}
+    assert len(by_org) == 7
+    assert by_org[str(org.id)] == {
+        "organization_id": str(org.id),
+        "organization_name": "Test Org",
+        "total_stock": 180,
+        "stock_by_size": {"L": 150, "M": 30},
+        "stock_by_type": {"white": 100, "brown": 50},
+        "last_movement_date": "2026-03-02",
+    }
+    assert by_org[str(other.id)]["last_movement_date"] is None
+
+
+async def test_endpoints_read_the_snapshot_unless_fresh(
+    client, db_session, authenticated_user, superadmin_headers
+):
+    resp = await client.get(
+        f"{API}/superadmin/platform-stats", headers=superadmin_headers
+    )
+    assert resp.status_code == 200
+    assert resp.json()["total_organizations"] == 1
+    first = resp.json()["computed_at"]
+
+    await _seed(db_session, authenticated_user)
+    resp = await client.get(
+        f"{API}/superadmin/platform-stats", headers=superadmin_headers
+    )
+    assert resp.json()["total_organizations"] == 1  # still the stored snapshot
+    assert resp.json()["computed_at"] == first
+    inventory = await client.get(
+        f"{API}/superadmin/inventory/overview", headers=superadmin_headers
+    )
+    assert [row["total_stock"] for row in inventory.json()] == [0]
+
+    resp = await client.get(
+        f"{API}/superadmin/platform-stats?fresh=1", headers=superadmin_headers
+    )
+    assert resp.json()["total_organizations"] == 2
+    inventory = await client.get(
+        f"{API}/superadmin/inventory/overview?fresh=1", headers=superadmin_headers
+    )
+    assert sorted(row["total_stock"] for row in inventory.json()) == [7, 180]
+
+    # A stale snapshot is recomputed on read, and old ones are pruned
+    stale = (await db_session.execute(select(PlatformStatsSnapshot))).scalar_one()
+    stale.computed_at = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(
+        days=30
+    )
+    await db_session.flush()
+    resp = await client.get(
+        f"{API}/superadmin/platform-stats", headers=superadmin_headers
+    )
+    assert resp.json()["total_organizations"] == 2
+    snapshots = (
+        (await db_session.execute(select(PlatformStatsSnapshot))).scalars().all()
+    )
+    assert len(snapshots) == 1 and snapshots[0] is not stale
+
+
+async def test_superadmin_only(client, authenticated_user):
+    resp = await client.get(
+        f"{API}/superadmin/platform-stats?fresh=1",
+        headers=authenticated_user["headers"],
+    )
+    assert resp.status_code == 403
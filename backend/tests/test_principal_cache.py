@@ -0,0 +1,147 @@
+"""Tests for the authenticated-principal cache in src.core.principal.
+
+Warm requests authenticate without touching ``users`` or ``subscriptions``;
+committed user changes and subscription changes drop the cached snapshot.
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from src.api.deps import invalidate_subscription_cache
+from src.core import principal
+from src.models.subscription import PlanTier, Subscription
+
+pytestmark = pytest.mark.asyncio
+
+API = "/api/v1"
+
+
+@pytest.fixture(autouse=True)
+def _principal_listeners():
+    handlers = [
+        ("after_flush", principal._after_flush_handler),
+        ("after_commit", principal._after_commit_handler),
+        ("after_rollback", principal._after_rollback_handler),
+    ]
+    for name, fn in handlers:
+        event.listen(Session, name, fn)
+    yield
+    for name, fn in handlers:
+        event.remove(Session, name, fn)
+
+
+async def _settled():
+    """Wait for invalidations scheduled by after-commit hooks."""
+    await asyncio.gather(*principal._tasks)
+
+
+@pytest.fixture
+def auth_queries(db_session):
+    """Statements that read ``users`` or ``subscriptions``, as they run."""
+    seen: list[str] = []
+
+    def record(conn, cursor, statement, params, context, executemany):
+        sql = statement.lower()
+        if "from users" in sql or "from subscriptions" in sql:
+            seen.append(statement)
+
+    engine = db_session.bind.sync_engine
+    event.listen(engine, "before_cursor_execute", record)
+    yield seen
+    event.remove(engine, "before_cursor_execute", record)
+
+
+async def test_warm_requests_skip_user_and_plan_lookup(
+    client, authenticated_user, auth_queries
+):
+    headers = authenticated_user["headers"]
+
+    resp = await client.get(f"{API}/cost-centers", headers=headers)
+    assert resp.status_code == 200
+    assert len(auth_queries) == 2  # user + subscription, once
+
+    for _ in range(3):
+        resp = await client.get(f"{API}/cost-centers", headers=headers)
+        assert resp.status_code == 200
+        resp = await client.get(f"{API}/farms", headers=headers)
+        assert resp.status_code == 200
+    assert len(auth_queries) == 2
+
+
+async def test_password_change_and_deactivation_invalidate(
+    client, db_session, authenticated_user, auth_queries
+):
+    headers = authenticated_user["headers"]
+    user = authenticated_user["user"]
+    await client.get(f"{API}/farms", headers=headers)
+
+    resp = await client.post(
+        f"{API}/auth/change-password",
+        json={"current_password": "TestPassword123", "new_password": "N3w-Passphrase!x"},
+        headers=headers,
+    )
+    assert resp.status_code == 200, resp.text
+    await _settled()
+    before = len(auth_queries)
+    await client.get(f"{API}/farms", headers=headers)
+    assert len(auth_queries) > before  # snapshot rebuilt
+
+    # Flushed but uncommitted (then rolled back): the snapshot stays
+    user.is_active = False
+    await db_session.flush()
+    assert principal._PENDING_KEY in db_session.info
+    await db_session.rollback()
+    assert principal._PENDING_KEY not in db_session.info
+    resp = await client.get(f"{API}/farms", headers=headers)
+    assert resp.status_code == 200
+
+    # Any committed change to the row drops it, whoever made it
+    user.is_active = False
+    await db_session.commit()
+    await _settled()
+    resp = await client.get(f"{API}/farms", headers=headers)
+    assert resp.status_code == 401
+
+
+async def test_subscription_change_refreshes_plan(
+    client, db_session, authenticated_user
+):
+    headers = authenticated_user["headers"]
+    org_id = authenticated_user["org"].id
+    assert (await client.get(f"{API}/cost-centers", headers=headers)).status_code == 200
+
+    sub = (
+        await db_session.execute(
+            select(Subscription).where(Subscription.organization_id == org_id)
+        )
+    ).scalar_one()
+    sub.plan = PlanTier.hobby
+    await db_session.commit()
+    await invalidate_subscription_cache(org_id)
+
+    resp = await client.get(f"{API}/cost-centers", headers=headers)
+    assert resp.status_code == 403
+
+
+async def test_cached_trial_plan_ends_with_trial(
+    client, db_session, authenticated_user
+):
+    headers = authenticated_user["headers"]
+    org_id = authenticated_user["org"].id
+    sub = (
+        await db_session.execute(
+            select(Subscription).where(Subscription.organization_id == org_id)
+        )
+    ).scalar_one()
+    sub.trial_end = datetime.now(timezone.utc) + timedelta(milliseconds=300)
+    await db_session.commit()
+    assert (await client.get(f"{API}/cost-centers", headers=headers)).status_code == 200
+
+    # No invalidation: the snapshot expires with the trial it was built from
+    await asyncio.sleep(0.35)
+    resp = await client.get(f"{API}/cost-centers", headers=headers)
+    assert resp.status_code == 403
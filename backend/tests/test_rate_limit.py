@@ -0,0 +1,127 @@
+"""Tests for the token-bucket rate limiter in src.core.rate_limit.
+
+The in-process pre-limiter and the middleware run everywhere; the Lua
+script runs when fakeredis (with Lua support) is installed.
+"""
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from src.core import rate_limit
+from src.core.rate_limit import Limit, check_limits
+from src.core.security import create_access_token
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture(autouse=True)
+def _fresh_limiter(monkeypatch):
+    rate_limit._local.clear()
+    monkeypatch.setattr(rate_limit, "_redis", None)
+    yield
+    rate_limit._local.clear()
+
+
+async def test_bucket_allows_burst_then_refuses_with_retry_after():
+    limit = Limit("ip:1.2.3.4", 3, 60)
+    results = [await check_limits([limit]) for _ in range(4)]
+
+    assert [r.allowed for r in results] == [True, True, True, False]
+    assert [r.remaining for r in results[:3]] == [2, 1, 0]
+    refused = results[-1]
+    assert 1 <= refused.retry_after <= 20  # one token every 20s
+    headers = refused.headers()
+    assert headers["RateLimit-Limit"] == "3"
+    assert headers["RateLimit-Remaining"] == "0"
+    assert headers["RateLimit-Policy"] == "3;w=60"
+    assert headers["Retry-After"] == str(refused.retry_after)
+
+
+async def test_multiple_limits_are_all_or_nothing():
+    ip = Limit("ip:5.6.7.8", 10, 60)
+    user = Limit("user:u1", 1, 60)
+
+    assert (await check_limits([ip, user])).allowed
+    refused = await check_limits([ip, user])
+    assert not refused.allowed
+    assert refused.limit == 1  # reported bucket is the one that refused
+
+    # The refused request charged nothing: 9 IP tokens are left
+    assert (await check_limits([ip])).remaining == 8
+
+
+async def test_redis_refusal_is_remembered_locally(monkeypatch):
+    calls = []
+
+    class FakeScript:
+        registered_client = None
+
+        async def __call__(self, keys, args):
+            calls.append(keys)
+            if len(keys) == 1:
+                return [0, 99, 600, 0]
+            # the user bucket ran out, retry in 15s; the IP bucket did not
+            return [15_000, 50, 30_000, 0, 0, 15_000, 15_000]
+
+    monkeypatch.setattr(rate_limit, "_redis", object())
+    monkeypatch.setattr(rate_limit, "_gcra_script", lambda: FakeScript())
+    ip, user = Limit("global:9.9.9.9", 100, 60), Limit("user:u9", 10, 60)
+
+    first = await check_limits([ip, user])
+    assert not first.allowed and first.retry_after == 15
+    second = await check_limits([ip, user])
+    assert not second.allowed
+    assert len(calls) == 1  # second refusal never reached Redis
+    # Others behind the same IP are not refused locally
+    assert (await check_limits([ip])).allowed
+    assert len(calls) == 2
+
+
+async def test_lua_script_matches_local_algorithm(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    monkeypatch.setattr(
+        rate_limit, "_redis", fakeredis.FakeAsyncRedis(decode_responses=True)
+    )
+    monkeypatch.setattr(rate_limit, "_script", None)
+    ip, user = Limit("ip:lua", 5, 60), Limit("user:lua", 2, 60)
+
+    results = [await check_limits([ip, user]) for _ in range(3)]
+    assert [r.allowed for r in results] == [True, True, False]
+    assert results[1].remaining == 0
+    rate_limit._local.clear()
+    # Redis still holds the state: the local pre-limiter alone would allow
+    assert not (await check_limits([ip, user])).allowed
+    assert (await check_limits([ip])).remaining == 2
+
+
+async def test_middleware_limits_per_ip_and_user(monkeypatch):
+    from src.main import GlobalRateLimitMiddleware
+
+    monkeypatch.setattr(GlobalRateLimitMiddleware, "MAX_REQUESTS", 5)
+    monkeypatch.setattr(GlobalRateLimitMiddleware, "USER_MAX_REQUESTS", 2)
+    inner = FastAPI()
+
+    @inner.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    app = GlobalRateLimitMiddleware(inner)
+    token = create_access_token("00000000-0000-0000-0000-000000000001", None, "owner")
+    auth = {"Authorization": f"Bearer {token}"}
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://testserver"
+    ) as client:
+        resp = await client.get("/ping", headers=auth)
+        assert resp.status_code == 200
+        assert resp.headers["ratelimit-remaining"] == "1"  # user bucket is tighter
+        assert (await client.get("/ping", headers=auth)).status_code == 200
+        resp = await client.get("/ping", headers=auth)
+        assert resp.status_code == 429
+        assert int(resp.headers["retry-after"]) > 0
+
+        # Anonymous requests from the same IP still have IP budget left
+        resp = await client.get("/ping")
+        assert resp.status_code == 200
+        assert resp.headers["ratelimit-remaining"] == "2"
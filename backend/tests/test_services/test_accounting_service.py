@@ -0,0 +1,156 @@
+"""Tests para AccountingService — Estados financieros sobre snapshots de período."""
+
+import uuid
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from src.core import ledger_snapshots
+from src.core.gl_posting import GLPostingService
+from src.models.accounting import (
+    FiscalPeriod,
+    JournalEntry,
+    JournalEntryLine,
+    JournalEntryStatus,
+    PeriodStatus,
+)
+from src.schemas.accounting import (
+    FiscalPeriodUpdate,
+    JournalEntryCreate,
+    JournalEntryLineCreate,
+)
+from src.services.accounting_service import AccountingService
+
+pytestmark = pytest.mark.asyncio
+
+D = Decimal
+
+
+@pytest.fixture
+async def ledger(db_session, authenticated_user):
+    """CoA sembrado, marzo 2026 con movimientos y abril sin período."""
+    user = authenticated_user["user"]
+    svc = AccountingService(db_session, user.organization_id, user.id)
+    gl = GLPostingService(db_session, user.organization_id, user.id)
+    await svc.seed_coa()
+    march = FiscalPeriod(
+        organization_id=user.organization_id,
+        name="2026-03",
+        start_date=date(2026, 3, 1),
+        end_date=date(2026, 3, 31),
+    )
+    db_session.add(march)
+    await db_session.flush()
+
+    await gl.post_income(uuid.uuid4(), date(2026, 3, 5), D("100.00"))
+    await gl.post_expense(uuid.uuid4(), date(2026, 3, 9), D("40.00"), "feed")
+    await gl.post_income(uuid.uuid4(), date(2026, 4, 2), D("25.00"))
+    return svc, march
+
+
+def _statements(balance_sheet, income_statement) -> tuple:
+    return (
+        [(r.account_code, r.balance) for r in balance_sheet.assets.accounts],
+        [(r.account_code, r.balance) for r in balance_sheet.equity.accounts],
+        balance_sheet.total_assets,
+        income_statement.net_income,
+    )
+
+
+async def test_statements_match_before_and_after_close(db_session, ledger):
+    svc, march = ledger
+    as_of = date(2026, 4, 30)
+
+    async def snapshot():
+        return _statements(
+            await svc.get_balance_sheet(as_of_date=as_of),
+            await svc.get_income_statement(
+                period_start=date(2026, 3, 1), period_end=as_of
+            ),
+        )
+
+    before = await snapshot()
+    trial_before = await svc.get_trial_balance(as_of_date=as_of)
+
+    await svc.update_period(march.id, FiscalPeriodUpdate(status=PeriodStatus.CLOSED))
+    assert march.snapshot_at is not None
+
+    assert await snapshot() == before
+    assert before[2] == D("85.00")  # caja: 100 - 40 + 25
+    assert before[3] == D("85.00")
+    trial_after = await svc.get_trial_balance(as_of_date=as_of)
+    assert trial_after.rows == trial_before.rows
+    assert (await svc.verify_ledger_snapshots(as_of))["ok"] is True
+
+
+async def test_verify_detects_backdated_lines_and_refreeze_repairs(
+    db_session, ledger, authenticated_user
+):
+    svc, march = ledger
+    await svc.update_period(march.id, FiscalPeriodUpdate(status=PeriodStatus.CLOSED))
+    coa = {a.code: a.id for a in await svc.list_accounts()}
+
+    # Los asientos manuales no pueden entrar en un período congelado
+    draft = await svc.create_journal_entry(
+        JournalEntryCreate(
+            date=date(2026, 3, 20),
+            description="Ajuste",
+            lines=[
+                JournalEntryLineCreate(account_id=coa["1000"], debit=D("10.00")),
+                JournalEntryLineCreate(account_id=coa["4000"], credit=D("10.00")),
+            ],
+        )
+    )
+    with pytest.raises(HTTPException):
+        await svc.post_journal_entry(draft.id)
+
+    # Línea escrita por fuera del servicio dentro de marzo
+    org_id = authenticated_user["org"].id
+    entry = JournalEntry(
+        organization_id=org_id,
+        entry_number="JE-900000",
+        date=date(2026, 3, 15),
+        description="Importado",
+        status=JournalEntryStatus.POSTED,
+        total_debit=D("5.00"),
+        total_credit=D("5.00"),
+    )
+    db_session.add(entry)
+    await db_session.flush()
+    for code, debit, credit in [("1000", "5.00", "0.00"), ("4000", "0.00", "5.00")]:
+        db_session.add(
+            JournalEntryLine(
+                organization_id=org_id,
+                journal_entry_id=entry.id,
+                account_id=coa[code],
+                debit=D(debit),
+                credit=D(credit),
+            )
+        )
+    await db_session.flush()
+
+    report = await svc.verify_ledger_snapshots(date(2026, 4, 30))
+    assert report["ok"] is False
+    assert {m["code"] for m in report["mismatches"]} == {"1000", "4000"}
+
+    await ledger_snapshots.freeze(db_session, org_id, march)
+    assert (await svc.verify_ledger_snapshots(date(2026, 4, 30)))["ok"] is True
+
+
+async def test_reverse_rejected_inside_closed_period(db_session, ledger):
+    svc, march = ledger
+    await svc.update_period(march.id, FiscalPeriodUpdate(status=PeriodStatus.CLOSED))
+    entry = (
+        await db_session.execute(
+            select(JournalEntry).where(JournalEntry.date == date(2026, 3, 5))
+        )
+    ).scalar_one()
+
+    with pytest.raises(HTTPException) as exc:
+        await svc.reverse_journal_entry(entry.id)
+    assert exc.value.status_code == 400
+    assert entry.status == JournalEntryStatus.POSTED
+    assert (await svc.verify_ledger_snapshots(date(2026, 4, 30)))["ok"] is True
@@ -0,0 +1,129 @@
+"""Tests para AnalyticsService — Resumen económico incremental."""
+
+from datetime import date
+
+import pytest
+from sqlalchemy import update
+
+from src.models.analytics import FlockEconomicsSummary
+from src.models.production import DailyProduction
+from src.schemas.feed import FeedConsumptionCreate, FeedPurchaseCreate
+from src.schemas.health import VaccineCreate, VaccineUpdate
+from src.schemas.production import DailyProductionCreate, DailyProductionUpdate
+from src.services.analytics_service import AnalyticsService
+from src.services.feed_service import FeedService
+from src.services.health_service import HealthService
+from src.services.production_service import ProductionService
+
+pytestmark = pytest.mark.asyncio
+
+
+def _svc(cls, db_session, authenticated_user):
+    user = authenticated_user["user"]
+    return cls(db_session, user.organization_id, user.id)
+
+
+async def test_write_paths_keep_summary_in_sync(
+    db_session, authenticated_user, sample_flock
+):
+    production = _svc(ProductionService, db_session, authenticated_user)
+    health = _svc(HealthService, db_session, authenticated_user)
+    feed = _svc(FeedService, db_session, authenticated_user)
+    analytics = _svc(AnalyticsService, db_session, authenticated_user)
+
+    # Primera lectura construye el resumen (organización sin datos)
+    await analytics._compute_economics(None)
+
+    day1 = await production.create_production(
+        DailyProductionCreate(flock_id=sample_flock.id, date=date(2025, 7, 1), total_eggs=4000)
+    )
+    day2 = await production.create_production(
+        DailyProductionCreate(flock_id=sample_flock.id, date=date(2025, 7, 2), total_eggs=4100)
+    )
+    await production.update_production(day1.id, DailyProductionUpdate(total_eggs=4200))
+    await production.delete_production(day2.id)
+
+    vaccine = await health.create_vaccine(
+        VaccineCreate(
+            flock_id=sample_flock.id, date=date(2025, 7, 1), name="Newcastle", cost=100.0
+        )
+    )
+    await health.update_vaccine(vaccine.id, VaccineUpdate(cost=150.0))
+
+    purchase = await feed.create_purchase(
+        FeedPurchaseCreate(
+            date=date(2025, 7, 1), kg=1000.0, price_per_kg=0.5, total_cost=500.0
+        )
+    )
+    await feed.create_purchase(
+        FeedPurchaseCreate(
+            date=date(2025, 7, 2), kg=1000.0, price_per_kg=0.4, total_cost=400.0
+        )
+    )
+    await feed.delete_purchase(purchase.id)
+    await feed.create_consumption(
+        FeedConsumptionCreate(flock_id=sample_flock.id, date=date(2025, 7, 1), feed_kg=300.0)
+    )
+
+    assert (await analytics.verify_economics_summary()) == {"ok": True, "drift": []}
+
+    data = await analytics._compute_economics(sample_flock.id)
+    flock = data["flocks"][0]
+    assert flock["total_eggs"] == 4200
+    assert flock["costs"]["health"] == 150.0
+    # 300 kg al precio promedio vigente (400 / 1000)
+    assert flock["costs"]["feed"] == 120.0
+    assert flock["data_completeness"]["has_direct_expenses"] is False
+
+
+async def test_first_read_rebuilds_from_source_tables(
+    db_session, authenticated_user, sample_flock
+):
+    # Filas escritas fuera de los servicios (p. ej. antes de la migración)
+    for day, eggs in [(1, 3000), (2, 3500)]:
+        db_session.add(
+            DailyProduction(
+                organization_id=authenticated_user["org"].id,
+                flock_id=sample_flock.id,
+                date=date(2025, 8, day),
+                total_eggs=eggs,
+            )
+        )
+    await db_session.flush()
+
+    analytics = _svc(AnalyticsService, db_session, authenticated_user)
+    data = await analytics._compute_economics(None)
+
+    assert data["flocks"][0]["total_eggs"] == 6500
+    assert data["org_summary"]["total_revenue"] is None
+
+
+async def test_verify_reports_drift_and_rebuild_repairs_it(
+    db_session, authenticated_user, sample_flock
+):
+    production = _svc(ProductionService, db_session, authenticated_user)
+    analytics = _svc(AnalyticsService, db_session, authenticated_user)
+    await production.create_production(
+        DailyProductionCreate(flock_id=sample_flock.id, date=date(2025, 9, 1), total_eggs=4000)
+    )
+    await analytics.rebuild_economics_summary()
+
+    await db_session.execute(
+        update(FlockEconomicsSummary)
+        .where(FlockEconomicsSummary.flock_id == sample_flock.id)
+        .values(total_eggs=1)
+    )
+    report = await analytics.verify_economics_summary()
+    assert report["ok"] is False
+    assert report["drift"] == [
+        {
+            "flock_id": str(sample_flock.id),
+            "column": "total_eggs",
+            "stored": 1,
+            "expected": 4000,
+        }
+    ]
+
+    rebuilt = await analytics.rebuild_economics_summary()
+    assert rebuilt["flocks"] == 1
+    assert (await analytics.verify_economics_summary())["ok"] is True
@@ -17,7 +17,7 @@ from src.services.feed_service import FeedService
 pytestmark = pytest.mark.asyncio
 
 
-@patch("src.services.feed_service.invalidate_prefix", new_callable=AsyncMock)
+@patch("src.services.feed_service.invalidate_tags", new_callable=AsyncMock)
 async def test_create_purchase(mock_cache, db_session, authenticated_user):
     user = authenticated_user["user"]
     svc = FeedService(db_session, user.organization_id, user.id)
@@ -36,7 +36,7 @@ async def test_create_purchase(mock_cache, db_session, authenticated_user):
     mock_cache.assert_called_once()
 
 
-@patch("src.services.feed_service.invalidate_prefix", new_callable=AsyncMock)
+@patch("src.services.feed_service.invalidate_tags", new_callable=AsyncMock)
 async def test_list_purchases(mock_cache, db_session, authenticated_user):
     user = authenticated_user["user"]
     svc = FeedService(db_session, user.organization_id, user.id)
@@ -52,7 +52,7 @@ async def test_list_purchases(mock_cache, db_session, authenticated_user):
     assert len(purchases) == 2
 
 
-@patch("src.services.feed_service.invalidate_prefix", new_callable=AsyncMock)
+@patch("src.services.feed_service.invalidate_tags", new_callable=AsyncMock)
 async def test_soft_delete_purchase(mock_cache, db_session, authenticated_user):
     user = authenticated_user["user"]
     svc = FeedService(db_session, user.organization_id, user.id)
@@ -66,7 +66,7 @@ async def test_soft_delete_purchase(mock_cache, db_session, authenticated_user):
     assert len(purchases) == 0
 
 
-@patch("src.services.feed_service.invalidate_prefix", new_callable=AsyncMock)
+@patch("src.services.feed_service.invalidate_tags", new_callable=AsyncMock)
 async def test_create_consumption(mock_cache, db_session, authenticated_user, sample_flock):
     user = authenticated_user["user"]
     svc = FeedService(db_session, user.organization_id, user.id)
@@ -82,7 +82,7 @@ async def test_create_consumption(mock_cache, db_session, authenticated_user, sa
     assert consumption.organization_id == user.organization_id
 
 
-@patch("src.services.feed_service.invalidate_prefix", new_callable=AsyncMock)
+@patch("src.services.feed_service.invalidate_tags", new_callable=AsyncMock)
 async def test_update_consumption(mock_cache, db_session, authenticated_user, sample_flock):
     user = authenticated_user["user"]
     svc = FeedService(db_session, user.organization_id, user.id)
@@ -18,7 +18,7 @@ from src.services.health_service import HealthService
 pytestmark = pytest.mark.asyncio
 
 
-@patch("src.services.health_service.invalidate_prefix", new_callable=AsyncMock)
+@patch("src.services.health_service.invalidate_tags", new_callable=AsyncMock)
 async def test_create_vaccine(mock_cache, db_session, authenticated_user, sample_flock):
     user = authenticated_user["user"]
     svc = HealthService(db_session, user.organization_id, user.id)
@@ -37,7 +37,7 @@ async def test_create_vaccine(mock_cache, db_session, authenticated_user, sample
     mock_cache.assert_called_once()
 
 
-@patch("src.services.health_service.invalidate_prefix", new_callable=AsyncMock)
+@patch("src.services.health_service.invalidate_tags", new_callable=AsyncMock)
 async def test_list_vaccines(mock_cache, db_session, authenticated_user, sample_flock):
     user = authenticated_user["user"]
     svc = HealthService(db_session, user.organization_id, user.id)
@@ -53,7 +53,7 @@ async def test_list_vaccines(mock_cache, db_session, authenticated_user, sample_
     assert len(vaccines) == 2
 
 
-@patch("src.services.health_service.invalidate_prefix", new_callable=AsyncMock)
+@patch("src.services.health_service.invalidate_tags", new_callable=AsyncMock)
 async def test_update_vaccine(mock_cache, db_session, authenticated_user, sample_flock):
     user = authenticated_user["user"]
     svc = HealthService(db_session, user.organization_id, user.id)
@@ -66,7 +66,7 @@ async def test_update_vaccine(mock_cache, db_session, authenticated_user, sample
     assert updated.name == "Gumboro D78"
 
 
-@patch("src.services.health_service.invalidate_prefix", new_callable=AsyncMock)
+@patch("src.services.health_service.invalidate_tags", new_callable=AsyncMock)
 async def test_create_medication(mock_cache, db_session, authenticated_user, sample_flock):
     user = authenticated_user["user"]
     svc = HealthService(db_session, user.organization_id, user.id)
@@ -12,7 +12,7 @@ from src.services.production_service import ProductionService
 pytestmark = pytest.mark.asyncio
 
 
-@patch("src.services.production_service.invalidate_prefix", new_callable=AsyncMock)
+@patch("src.services.production_service.invalidate_tags", new_callable=AsyncMock)
 async def test_create_production(mock_cache, db_session, authenticated_user, sample_flock):
     user = authenticated_user["user"]
     svc = ProductionService(db_session, user.organization_id, user.id)
@@ -34,7 +34,7 @@ async def test_create_production(mock_cache, db_session, authenticated_user, sam
     mock_cache.assert_called_once()
 
 
-@patch("src.services.production_service.invalidate_prefix", new_callable=AsyncMock)
+@patch("src.services.production_service.invalidate_tags", new_callable=AsyncMock)
 async def test_list_production(mock_cache, db_session, authenticated_user, sample_flock):
     user = authenticated_user["user"]
     svc = ProductionService(db_session, user.organization_id, user.id)
@@ -50,7 +50,7 @@ async def test_list_production(mock_cache, db_session, authenticated_user, sampl
     assert len(records) == 3
 
 
-@patch("src.services.production_service.invalidate_prefix", new_callable=AsyncMock)
+@patch("src.services.production_service.invalidate_tags", new_callable=AsyncMock)
 async def test_update_production(mock_cache, db_session, authenticated_user, sample_flock):
     user = authenticated_user["user"]
     svc = ProductionService(db_session, user.organization_id, user.id)
@@ -66,7 +66,7 @@ async def test_update_production(mock_cache, db_session, authenticated_user, sam
     assert mock_cache.call_count == 2  # create + update
 
 
-@patch("src.services.production_service.invalidate_prefix", new_callable=AsyncMock)
+@patch("src.services.production_service.invalidate_tags", new_callable=AsyncMock)
 async def test_delete_production(mock_cache, db_session, authenticated_user, sample_flock):
     user = authenticated_user["user"]
     svc = ProductionService(db_session, user.organization_id, user.id)
@@ -0,0 +1,203 @@
+"""Tests para TraceEventsService — Trazabilidad por CTE recursivo."""
+
+import uuid
+from datetime import date
+
+import pytest
+from sqlalchemy import select
+
+from src.core import lineage_closure
+from src.models.audit import AuditLog
+from src.models.trace_events import BatchLineage, BatchLineageClosure, RecallBatch
+from src.models.traceability import BatchStatus, ProductCategory, TraceabilityBatch
+from src.schemas.trace_events import BatchLineageCreate, RecallCreate
+from src.services.trace_events_service import TraceEventsService
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+async def make_graph(db_session, authenticated_user):
+    """Crea lotes por código y aristas padre → hijo; devuelve {código: lote}."""
+    org_id = authenticated_user["org"].id
+    user = authenticated_user["user"]
+    svc = TraceEventsService(db_session, user.organization_id, user.id)
+
+    async def _make(codes: str, edges: list[tuple[str, str]]):
+        batches = {}
+        for code in codes:
+            batch = TraceabilityBatch(
+                organization_id=org_id,
+                batch_code=f"{code}-{uuid.uuid4().hex[:8]}",
+                date=date(2026, 3, 1),
+                product_category=ProductCategory.EGGS,
+                quantity=100,
+            )
+            db_session.add(batch)
+            batches[code] = batch
+        await db_session.flush()
+        for parent, child in edges:
+            await svc.create_lineage(
+                BatchLineageCreate(
+                    parent_batch_id=batches[parent].id,
+                    child_batch_id=batches[child].id,
+                )
+            )
+        return batches
+
+    return _make
+
+
+def _depths(chain, batches) -> dict[str, int]:
+    by_id = {b.id: code for code, b in batches.items()}
+    return {by_id[n.batch_id]: n.depth for n in chain}
+
+
+async def test_full_trace_diamond_with_cycle(db_session, authenticated_user, make_graph):
+    # A → B, A → C, B → D, C → D, D → E, E → B (ciclo B → D → E → B)
+    batches = await make_graph(
+        "ABCDE",
+        [("A", "B"), ("A", "C"), ("B", "D"), ("C", "D"), ("D", "E"), ("E", "B")],
+    )
+    user = authenticated_user["user"]
+    svc = TraceEventsService(db_session, user.organization_id, user.id)
+
+    trace = await svc.full_trace(batches["D"].id, max_depth=10)
+
+    assert trace.origin_batch.batch_id == batches["D"].id
+    assert _depths(trace.backward_chain, batches) == {"B": -1, "C": -1, "A": -2, "E": -2}
+    assert _depths(trace.forward_chain, batches) == {"E": 1, "B": 2}
+
+
+async def test_full_trace_respects_max_depth(db_session, authenticated_user, make_graph):
+    batches = await make_graph("ABCDE", [("A", "B"), ("B", "C"), ("C", "D"), ("D", "E")])
+    user = authenticated_user["user"]
+    svc = TraceEventsService(db_session, user.organization_id, user.id)
+
+    trace = await svc.full_trace(batches["A"].id, max_depth=2)
+
+    assert _depths(trace.forward_chain, batches) == {"B": 1, "C": 2}
+    assert trace.backward_chain == []
+
+
+async def test_recall_scopes_downstream_batches(db_session, authenticated_user, make_graph):
+    batches = await make_graph("ABCD", [("A", "B"), ("B", "C"), ("D", "A")])
+    user = authenticated_user["user"]
+    svc = TraceEventsService(db_session, user.organization_id, user.id)
+
+    recall = await svc.create_recall(
+        RecallCreate(
+            scope="batch",
+            reason="Salmonella",
+            severity="class_i",
+            trigger_batch_id=batches["A"].id,
+        )
+    )
+
+    assert recall.batches_affected == 3
+    assert recall.units_affected == 300
+    assert {c for c, b in batches.items() if b.status == BatchStatus.RECALLED} == {
+        "A",
+        "B",
+        "C",
+    }
+
+
+async def test_recall_marks_in_bulk_with_one_audit_record(
+    db_session, authenticated_user, make_graph
+):
+    batches = await make_graph("ABC", [("A", "B"), ("A", "C")])
+    batches["C"].quantity = 40
+    await db_session.flush()
+    user = authenticated_user["user"]
+    svc = TraceEventsService(db_session, user.organization_id, user.id)
+
+    recall = await svc.create_recall(
+        RecallCreate(
+            scope="batch",
+            reason="Aflatoxinas",
+            severity="class_ii",
+            trigger_batch_id=batches["A"].id,
+        )
+    )
+
+    links = (
+        await db_session.execute(
+            select(RecallBatch.batch_id, RecallBatch.units_in_batch).where(
+                RecallBatch.recall_id == recall.id
+            )
+        )
+    ).all()
+    assert {b: u for b, u in links} == {
+        batches["A"].id: 100,
+        batches["B"].id: 100,
+        batches["C"].id: 40,
+    }
+    assert (recall.batches_affected, recall.units_affected) == (3, 240)
+
+    audit = (
+        await db_session.execute(
+            select(AuditLog).where(
+                AuditLog.table_name.in_(["recall_batches", "traceability_batches"])
+            )
+        )
+    ).scalars().all()
+    assert len(audit) == 1
+    assert audit[0].action == "RECALL_MARK"
+    assert audit[0].record_id == str(recall.id)
+    assert sorted(audit[0].new_values["batch_ids"]) == sorted(
+        str(b.id) for b in batches.values()
+    )
+
+
+async def test_lineage_closure_tracks_edges_and_cycles(
+    db_session, authenticated_user, make_graph
+):
+    batches = await make_graph(
+        "ABCD", [("A", "B"), ("B", "C"), ("A", "C"), ("C", "D"), ("D", "B")]
+    )
+    org_id = authenticated_user["org"].id
+
+    rows = (
+        await db_session.execute(
+            select(
+                BatchLineageClosure.ancestor_id,
+                BatchLineageClosure.descendant_id,
+                BatchLineageClosure.depth,
+            )
+        )
+    ).all()
+    by_id = {b.id: code for code, b in batches.items()}
+    closure = {(by_id[a], by_id[d]): depth for a, d, depth in rows}
+    assert closure == {
+        ("A", "B"): 1,
+        ("A", "C"): 1,
+        ("A", "D"): 2,
+        ("B", "C"): 1,
+        ("B", "D"): 2,
+        ("C", "D"): 1,
+        ("C", "B"): 2,
+        ("D", "B"): 1,
+        ("D", "C"): 2,
+    }
+    assert (await lineage_closure.check(db_session, org_id))["ok"] is True
+
+
+async def test_lineage_closure_check_and_rebuild(
+    db_session, authenticated_user, make_graph
+):
+    batches = await make_graph("ABC", [("A", "B")])
+    org_id = authenticated_user["org"].id
+    # Arista escrita sin pasar por el servicio (datos previos a la migración)
+    db_session.add(
+        BatchLineage(parent_batch_id=batches["B"].id, child_batch_id=batches["C"].id)
+    )
+    await db_session.flush()
+
+    report = await lineage_closure.check(db_session, org_id)
+    assert report["ok"] is False
+    assert report["missing"] == 2  # B → C y A → C
+    assert report["extra"] == 0
+
+    assert await lineage_closure.rebuild(db_session, org_id) == 3
+    assert (await lineage_closure.check(db_session, org_id))["ok"] is True
@@ -1,8 +1,17 @@
 """Tests for the sync module."""
 
+import json
+import uuid
+from datetime import datetime, timezone
+from unittest.mock import patch
+
 import pytest
 from httpx import AsyncClient
 
+from src.models.farm import Farm
+from src.models.flock import Flock
+from tests.conftest import TestSessionLocal
+
 PREFIX = "/api/v1/sync"
 
 
@@ -49,3 +58,256 @@ class TestSync:
         assert response.status_code == 200
         data = response.json()
         assert data["synced"] == 1
+
+    async def test_sync_paginates_with_entity_cursors(
+        self, client: AsyncClient, authenticated_user, db_session
+    ):
+        headers = authenticated_user["headers"]
+        org_id = authenticated_user["org"].id
+        same_ts = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        for i in range(5):
+            db_session.add(
+                Farm(name=f"Farm {i}", organization_id=org_id, updated_at=same_ts)
+            )
+        await db_session.flush()
+
+        seen: set[str] = set()
+        cursors: dict = {}
+        for _ in range(5):
+            response = await client.post(
+                PREFIX,
+                json={"data": {}, "cursors": cursors, "page_size": 2},
+                headers=headers,
+            )
+            assert response.status_code == 200
+            data = response.json()
+            rows = data["server_changes"].get("farms", [])
+            assert len(rows) <= 2
+            seen.update(r["id"] for r in rows)
+            cursors = data["cursors"]
+            if not data["has_more"]:
+                break
+
+        assert not data["has_more"]
+        assert len(seen) == 5
+
+    async def test_sync_legacy_cursor_reaches_every_entity(
+        self, client: AsyncClient, authenticated_user, db_session
+    ):
+        headers = authenticated_user["headers"]
+        org_id = authenticated_user["org"].id
+        farms = [
+            Farm(
+                name=f"Farm {i}",
+                organization_id=org_id,
+                updated_at=datetime(2026, 1, 1 + i, tzinfo=timezone.utc),
+            )
+            for i in range(3)
+        ]
+        db_session.add_all(farms)
+        await db_session.flush()
+        flock = Flock(
+            farm_id=farms[0].id,
+            organization_id=org_id,
+            name="Older Flock",
+            initial_count=100,
+            current_count=100,
+            start_date=datetime(2025, 6, 1).date(),
+            updated_at=datetime(2025, 6, 1, tzinfo=timezone.utc),
+        )
+        db_session.add(flock)
+        await db_session.flush()
+
+        # Without cursors every entity gets its own page, so the later
+        # entities are read even when an earlier one fills the page.
+        since = "2020-01-01T00:00:00+00:00"
+        response = await client.post(
+            PREFIX,
+            json={"data": {}, "last_synced_at": since, "page_size": 2},
+            headers=headers,
+        )
+        data = response.json()
+        assert data["has_more"] is True
+        assert len(data["server_changes"]["farms"]) == 2
+        assert [r["id"] for r in data["server_changes"]["flocks"]] == [str(flock.id)]
+
+        seen: set[str] = set()
+        for _ in range(5):
+            for rows in data["server_changes"].values():
+                seen.update(r["id"] for r in rows)
+            if not data["has_more"]:
+                break
+            assert data["sync_cursor"] > since
+            since = data["sync_cursor"]
+            response = await client.post(
+                PREFIX,
+                json={"data": {}, "last_synced_at": since, "page_size": 2},
+                headers=headers,
+            )
+            data = response.json()
+
+        assert not data["has_more"]
+        assert seen >= {str(f.id) for f in farms} | {str(flock.id)}
+
+    async def test_sync_stream_ndjson(
+        self, client: AsyncClient, authenticated_user, db_session
+    ):
+        headers = {**authenticated_user["headers"], "Accept": "application/x-ndjson"}
+        org_id = authenticated_user["org"].id
+        for i in range(3):
+            db_session.add(
+                Farm(
+                    name=f"Stream Farm {i}",
+                    organization_id=org_id,
+                    updated_at=datetime(2026, 1, 1 + i, tzinfo=timezone.utc),
+                )
+            )
+        await db_session.flush()
+
+        with patch("src.api.sync.async_session", TestSessionLocal):
+            response = await client.post(PREFIX, json={"data": {}}, headers=headers)
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert lines[0]["type"] == "push"
+        records = [ln for ln in lines if ln["type"] == "record"]
+        assert {r["data"]["name"] for r in records} == {
+            "Stream Farm 0",
+            "Stream Farm 1",
+            "Stream Farm 2",
+        }
+        end = lines[-1]
+        assert end["type"] == "end"
+        assert end["has_more"] is False
+        assert "farms" in end["cursors"]
+
+    async def test_sync_upsert_last_write_wins(
+        self, client: AsyncClient, authenticated_user
+    ):
+        headers = authenticated_user["headers"]
+        farm_id = str(uuid.uuid4())
+        create = {
+            "data": {
+                "farms": [
+                    {
+                        "id": farm_id,
+                        "name": "Offline Farm",
+                        "updated_at": "2026-02-01T00:00:00+00:00",
+                    }
+                ]
+            }
+        }
+        response = await client.post(PREFIX, json=create, headers=headers)
+        assert response.json()["synced"] == 1
+
+        newer = {
+            "data": {
+                "farms": [
+                    {
+                        "id": farm_id,
+                        "name": "Renamed Farm",
+                        "updated_at": "2026-03-01T00:00:00+00:00",
+                    }
+                ]
+            }
+        }
+        response = await client.post(PREFIX, json=newer, headers=headers)
+        data = response.json()
+        assert data["synced"] == 1
+        assert data["conflicts"] == []
+
+        stale = {
+            "data": {
+                "farms": [
+                    {
+                        "id": farm_id,
+                        "name": "Stale Farm",
+                        "updated_at": "2026-01-01T00:00:00+00:00",
+                    }
+                ]
+            }
+        }
+        response = await client.post(PREFIX, json=stale, headers=headers)
+        data = response.json()
+        assert data["synced"] == 0
+        assert any("server is newer" in c for c in data["conflicts"])
+        farms = data["server_changes"]["farms"]
+        assert [f["name"] for f in farms if f["id"] == farm_id] == ["Renamed Farm"]
+
+    async def test_sync_bulk_insert_many_rows(
+        self, client: AsyncClient, authenticated_user, sample_flock
+    ):
+        headers = authenticated_user["headers"]
+        rows = [
+            {
+                "flock_id": str(sample_flock.id),
+                "date": f"2026-01-{day:02d}",
+                "total_eggs": 4000 + day,
+            }
+            for day in range(1, 29)
+        ]
+        response = await client.post(
+            PREFIX, json={"data": {"production": rows}}, headers=headers
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["synced"] == 28
+        assert data["conflicts"] == []
+
+    async def test_sync_integrity_error_isolated_to_entity(
+        self, client: AsyncClient, authenticated_user
+    ):
+        headers = authenticated_user["headers"]
+        payload = {
+            "data": {
+                "production": [
+                    {"flock_id": str(uuid.uuid4()), "total_eggs": 10}  # no date
+                ],
+                "farms": [{"name": "Survivor Farm"}],
+            }
+        }
+        response = await client.post(PREFIX, json=payload, headers=headers)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["synced"] == 1
+        assert any(c.startswith("production:") for c in data["conflicts"])
+
+    async def test_sync_database_error_isolated_to_entity(
+        self, client: AsyncClient, authenticated_user
+    ):
+        headers = authenticated_user["headers"]
+        payload = {"data": {"farms": [{"name": {"not": "a string"}}]}}  # unbindable
+        response = await client.post(PREFIX, json=payload, headers=headers)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["synced"] == 0
+        assert any(c.startswith("farms: database error") for c in data["conflicts"])
+
+        ok = await client.post(
+            PREFIX, json={"data": {"farms": [{"name": "After Error"}]}}, headers=headers
+        )
+        assert ok.json()["synced"] == 1
+
+    async def test_sync_upsert_keeps_economics_summary_in_sync(
+        self, client: AsyncClient, authenticated_user, sample_flock
+    ):
+        headers = authenticated_user["headers"]
+        record_id = str(uuid.uuid4())
+
+        def payload(eggs: int, updated_at: str) -> dict:
+            row = {
+                "id": record_id,
+                "flock_id": str(sample_flock.id),
+                "date": "2026-04-01",
+                "total_eggs": eggs,
+                "updated_at": updated_at,
+            }
+            return {"data": {"production": [row]}}
+
+        await client.post(PREFIX, json=payload(4000, "2026-04-01T00:00:00+00:00"), headers=headers)
+        await client.post(PREFIX, json=payload(4300, "2026-04-02T00:00:00+00:00"), headers=headers)
+
+        response = await client.get("/api/v1/analytics/economics/verify", headers=headers)
+        assert response.status_code == 200
+        assert response.json() == {"ok": True, "drift": []}
@@ -1,9 +1,22 @@
 """Tests for /api/v1/webhooks endpoints."""
 
+import asyncio
 import uuid
 
+import httpx
 import pytest
 from httpx import AsyncClient
+from sqlalchemy import select
+
+from src.core import webhook_dispatcher
+from src.core.webhook_dispatcher import (
+    BREAKER_FAILURE_THRESHOLD,
+    CircuitBreaker,
+    WebhookDispatcher,
+    enqueue_webhook_event,
+    sign_payload,
+)
+from src.models.webhook import Webhook, WebhookDelivery, WebhookOutbox
 
 
 PREFIX = "/api/v1/webhooks"
@@ -84,3 +97,150 @@ class TestWebhookDeliveries:
         fake_id = str(uuid.uuid4())
         resp = await client.get(f"{PREFIX}/{fake_id}/deliveries", headers=authenticated_user["headers"])
         assert resp.status_code == 404
+
+
+@pytest.mark.asyncio
+class TestWebhookOutbox:
+    async def _make_webhook(
+        self, db_session, org_id, events, url="https://receiver.example.com/hook"
+    ):
+        webhook = Webhook(
+            name="Outbox WH",
+            url=url,
+            secret="s3cret",
+            events=events,
+            organization_id=org_id,
+        )
+        db_session.add(webhook)
+        await db_session.flush()
+        return webhook
+
+    async def test_production_create_writes_outbox(
+        self, client: AsyncClient, authenticated_user, sample_flock, db_session
+    ):
+        await self._make_webhook(
+            db_session, authenticated_user["org"].id, ["production.new"]
+        )
+        resp = await client.post(
+            "/api/v1/production",
+            json={"flock_id": str(sample_flock.id), "date": "2026-01-05", "total_eggs": 4200},
+            headers=authenticated_user["headers"],
+        )
+        assert resp.status_code == 201
+
+        rows = (await db_session.execute(select(WebhookOutbox))).scalars().all()
+        assert len(rows) == 1
+        assert rows[0].event_type == "production.new"
+        assert rows[0].payload["total_eggs"] == 4200
+        assert rows[0].status == "pending"
+
+    async def test_dispatcher_delivers_and_backs_off(
+        self, authenticated_user, db_session
+    ):
+        org_id = authenticated_user["org"].id
+        webhook = await self._make_webhook(db_session, org_id, ["*"])
+        await enqueue_webhook_event(db_session, org_id, "health.alert", {"n": 1})
+        await enqueue_webhook_event(db_session, org_id, "health.alert", {"n": 2})
+        await db_session.commit()
+
+        seen = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            body = request.content.decode()
+            assert request.headers["X-EGGlogU-Signature"] == (
+                f"sha256={sign_payload('s3cret', body)}"
+            )
+            seen.append(body)
+            return httpx.Response(200 if '"n":1' in body else 500)
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as http:
+            processed = await WebhookDispatcher(http).drain_once(db_session)
+
+        assert processed == 2
+        assert len(seen) == 2
+        rows = {
+            r.payload["n"]: r
+            for r in (await db_session.execute(select(WebhookOutbox))).scalars().all()
+        }
+        assert rows[1].status == "delivered"
+        assert rows[2].status == "pending"
+        assert rows[2].attempts == 1
+        assert rows[2].next_attempt_at.replace(tzinfo=None) > rows[1].delivered_at.replace(
+            tzinfo=None
+        )
+        deliveries = (await db_session.execute(select(WebhookDelivery))).scalars().all()
+        assert len(deliveries) == 2
+        await db_session.refresh(webhook)
+        assert webhook.total_deliveries == 2
+        assert webhook.total_failures == 1
+
+    async def test_circuit_breaker_opens(self):
+        breaker = CircuitBreaker()
+        for _ in range(BREAKER_FAILURE_THRESHOLD):
+            assert breaker.allow()
+            breaker.record(False)
+        assert not breaker.allow()
+
+    async def test_breaker_trips_mid_batch_and_persists_across_runs(
+        self, authenticated_user, db_session
+    ):
+        org_id = authenticated_user["org"].id
+        await self._make_webhook(
+            db_session, org_id, ["*"], url="https://down.example.com/hook"
+        )
+        for n in range(20):
+            await enqueue_webhook_event(db_session, org_id, "health.alert", {"n": n})
+        await db_session.commit()
+        webhook_dispatcher._breakers.clear()
+
+        calls = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            calls.append(request)
+            return httpx.Response(503)
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as http:
+            assert await WebhookDispatcher(http).drain_once(db_session) == 20
+        # at most one in-flight slot per failure before the breaker opened
+        assert BREAKER_FAILURE_THRESHOLD <= len(calls) < 20
+        parked = (
+            await db_session.execute(
+                select(WebhookOutbox).where(WebhookOutbox.attempts == 0)
+            )
+        ).scalars().all()
+        assert len(parked) == 20 - len(calls)
+
+        # A new run (new dispatcher) still sees the open breaker
+        for row in parked:
+            row.next_attempt_at = row.created_at
+        await db_session.commit()
+        before = len(calls)
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as http:
+            assert await WebhookDispatcher(http).drain_once(db_session) == len(parked)
+        assert len(calls) == before
+        webhook_dispatcher._breakers.clear()
+
+    async def test_request_deadline_keeps_batch_within_lease(
+        self, authenticated_user, db_session, monkeypatch
+    ):
+        org_id = authenticated_user["org"].id
+        await self._make_webhook(
+            db_session, org_id, ["*"], url="https://slow.example.com/hook"
+        )
+        await enqueue_webhook_event(db_session, org_id, "health.alert", {"n": 1})
+        await db_session.commit()
+        webhook_dispatcher._breakers.clear()
+        monkeypatch.setattr(webhook_dispatcher, "REQUEST_TIMEOUT_SECONDS", 0.05)
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            await asyncio.sleep(5)
+            return httpx.Response(200)
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as http:
+            assert await WebhookDispatcher(http).drain_once(db_session) == 1
+
+        row = (await db_session.execute(select(WebhookOutbox))).scalar_one()
+        assert row.status == "pending"
+        assert row.attempts == 1
+        assert "timed out" in row.last_error
+        webhook_dispatcher._breakers.clear()
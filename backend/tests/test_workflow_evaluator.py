@@ -0,0 +1,202 @@
+"""Tests for the batched workflow rule evaluator in src.core.workflow_evaluator.
+
+Every rule type is checked against seeded data, and a batch over several
+farms costs the same handful of grouped queries however many rules it has.
+"""
+
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import event, select
+
+from src.core.workflow_evaluator import evaluate_active_rules, evaluate_rule, evaluate_rules
+from src.models.client import Client
+from src.models.farm import Farm
+from src.models.feed import FeedConsumption, FeedPurchase
+from src.models.finance import Receivable
+from src.models.flock import Flock
+from src.models.health import Outbreak
+from src.models.production import DailyProduction
+from src.models.workflow import WorkflowExecution, WorkflowRule, WorkflowTrigger
+
+pytestmark = pytest.mark.asyncio
+
+TODAY = date.today()
+
+
+@pytest.fixture
+def count_queries(db_session):
+    seen: list[str] = []
+
+    def record(conn, cursor, statement, params, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            seen.append(statement)
+
+    engine = db_session.bind.sync_engine
+    event.listen(engine, "before_cursor_execute", record)
+    yield seen
+    event.remove(engine, "before_cursor_execute", record)
+
+
+async def _farm(db, user, name: str, hen_days: list[float], deaths: int = 0):
+    """A farm with one 1000-hen flock and one production record per day,
+    ``hen_days[0]`` being today."""
+    org_id = user.organization_id
+    farm = Farm(name=name, organization_id=org_id)
+    db.add(farm)
+    await db.flush()
+    flock = Flock(
+        name=f"{name} A",
+        organization_id=org_id,
+        farm_id=farm.id,
+        initial_count=1000,
+        current_count=1000,
+        start_date=date(2025, 1, 1),
+    )
+    db.add(flock)
+    await db.flush()
+    for days_ago, pct in enumerate(hen_days):
+        db.add(
+            DailyProduction(
+                organization_id=org_id,
+                flock_id=flock.id,
+                date=TODAY - timedelta(days=days_ago),
+                total_eggs=int(pct * 10),
+                deaths=deaths if days_ago == 0 else 0,
+            )
+        )
+    await db.flush()
+    return farm, flock
+
+
+def _rule(user, farm, conditions: dict, **kwargs) -> WorkflowRule:
+    return WorkflowRule(
+        organization_id=user.organization_id,
+        farm_id=farm.id,
+        created_by=user.id,
+        name=conditions["type"],
+        trigger_type=WorkflowTrigger.threshold,
+        conditions=conditions,
+        actions={"notify": True},
+        **kwargs,
+    )
+
+
+async def test_each_condition_type_against_its_frame(db_session, authenticated_user):
+    user = authenticated_user["user"]
+    org_id = user.organization_id
+    sick, sick_flock = await _farm(
+        db_session, user, "Sick", [60, 90, 90, 90, 90], deaths=12
+    )
+    healthy, _ = await _farm(db_session, user, "Healthy", [90, 91, 89, 90, 90])
+    db_session.add(
+        Outbreak(
+            organization_id=org_id, flock_id=sick_flock.id, date=TODAY, disease="IB"
+        )
+    )
+    client = Client(organization_id=org_id, name="Mercado")
+    db_session.add(client)
+    await db_session.flush()
+    db_session.add(
+        Receivable(
+            organization_id=org_id,
+            client_id=client.id,
+            date=TODAY - timedelta(days=40),
+            amount=100,
+            due_date=TODAY - timedelta(days=10),
+        )
+    )
+    db_session.add(
+        FeedPurchase(
+            organization_id=org_id, date=TODAY, kg=500, price_per_kg=1, total_cost=500
+        )
+    )
+    for days_ago in range(5):
+        db_session.add(
+            FeedConsumption(
+                organization_id=org_id,
+                flock_id=sick_flock.id,
+                date=TODAY - timedelta(days=days_ago),
+                feed_kg=50,
+            )
+        )
+    await db_session.flush()
+
+    rules = []
+    for farm in (sick, healthy):
+        rules += [
+            _rule(user, farm, {"type": "mortality_spike", "threshold": 10}),
+            _rule(user, farm, {"type": "production_drop", "drop_pct": 20}),
+            _rule(user, farm, {"type": "outbreak_active"}),
+            _rule(user, farm, {"type": "below_target", "consecutive_days": 2}),
+        ]
+    rules += [
+        _rule(user, sick, {"type": "feed_stock_low", "days_remaining": 4}),
+        _rule(user, sick, {"type": "payment_overdue", "days_overdue": 30}),
+        _rule(user, sick, {"type": "payment_overdue", "days_overdue": 7}),
+        _rule(user, sick, {"type": "temperature_thi"}),
+    ]
+
+    results = await evaluate_rules(db_session, rules, dry_run=True)
+    assert [r["matched"] for r in results] == [
+        True, True, True, False,  # sick: 12 deaths, -33%, outbreak, 60/90
+        False, False, False, False,  # healthy
+        False, False, True, False,  # 5 days of stock, overdue 10 days
+    ]  # fmt: skip
+    assert results[0]["value"] == 12
+    assert results[1]["drop_pct"] == 33.33
+    assert results[8]["days_remaining"] == 5.0
+    assert "error" in results[-1]
+
+    # Single-rule evaluation is the same batch of one
+    for rule, expected in zip(rules, results):
+        assert await evaluate_rule(db_session, rule, dry_run=True) == expected
+
+
+async def test_query_count_does_not_grow_with_rules(
+    db_session, authenticated_user, count_queries
+):
+    user = authenticated_user["user"]
+    farms = [
+        (await _farm(db_session, user, f"F{i}", [70, 90, 90], deaths=i))[0]
+        for i in range(4)
+    ]
+    one = [_rule(user, farms[0], {"type": "mortality_spike", "threshold": 1})]
+    many = [
+        _rule(user, farm, {"type": "mortality_spike", "threshold": t})
+        for farm in farms
+        for t in (1, 2, 3)
+    ]
+
+    await evaluate_rules(db_session, one, dry_run=True)
+    single = len(count_queries)
+    count_queries.clear()
+    results = await evaluate_rules(db_session, many, dry_run=True)
+    assert len(count_queries) == single == 1
+    assert [r["matched"] for r in results] == [
+        False, False, False,
+        True, False, False,
+        True, True, False,
+        True, True, True,
+    ]  # fmt: skip
+
+
+async def test_triggered_rules_log_executions_and_cool_down(
+    db_session, authenticated_user
+):
+    user = authenticated_user["user"]
+    farm, _ = await _farm(db_session, user, "Spike", [90], deaths=20)
+    for _ in range(2):
+        db_session.add(_rule(user, farm, {"type": "mortality_spike", "threshold": 5}))
+    await db_session.flush()
+
+    summary = await evaluate_active_rules(db_session, user.organization_id)
+    assert summary == {"evaluated": 2, "farms": 1, "triggered": 2}
+    executions = (
+        (await db_session.execute(select(WorkflowExecution))).scalars().all()
+    )
+    assert len(executions) == 2
+    assert executions[0].conditions_matched["value"] == 20
+
+    again = await evaluate_active_rules(db_session, user.organization_id)
+    assert again["triggered"] == 0  # both rules are in cooldown
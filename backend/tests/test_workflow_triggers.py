@@ -0,0 +1,197 @@
+"""Tests for event-driven workflow evaluation in src.core.workflow_triggers.
+
+Sync upserts and published events mark (org, farm, rule type) as dirty once
+the write commits; a flush evaluates only the matching active rules.
+"""
+
+import asyncio
+
+import pytest
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from src.core import events, workflow_triggers
+from src.core.events import EventType
+from src.core.workflow_evaluator import evaluate_active_rules
+from src.models.workflow import WorkflowExecution, WorkflowRule, WorkflowTrigger
+
+pytestmark = pytest.mark.asyncio
+
+API = "/api/v1"
+
+
+class _TestSessions:
+    """Session factory handing out the test session without closing it."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def __call__(self):
+        return self
+
+    async def __aenter__(self):
+        return self.db
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+@pytest.fixture
+def triggers(monkeypatch):
+    """Accept marks as if the background task were running."""
+    handlers = [
+        ("after_commit", workflow_triggers._after_commit_handler),
+        ("after_rollback", workflow_triggers._after_rollback_handler),
+    ]
+    for name, fn in handlers:
+        event.listen(Session, name, fn)
+    workflow_triggers._dirty.clear()
+    monkeypatch.setattr(workflow_triggers, "_task", object())
+    monkeypatch.setattr(workflow_triggers, "_wakeup", asyncio.Event())
+    yield workflow_triggers._dirty
+    workflow_triggers._dirty.clear()
+    for name, fn in handlers:
+        event.remove(Session, name, fn)
+
+
+def _rule(user, farm_id, conditions: dict) -> WorkflowRule:
+    return WorkflowRule(
+        organization_id=user.organization_id,
+        farm_id=farm_id,
+        created_by=user.id,
+        name=conditions["type"],
+        trigger_type=WorkflowTrigger.data_change,
+        conditions=conditions,
+        actions={"notify": True},
+    )
+
+
+async def test_sync_upsert_marks_and_flush_evaluates_only_those_rules(
+    client, db_session, authenticated_user, sample_flock, triggers
+):
+    user = authenticated_user["user"]
+    org, farm = str(user.organization_id), str(sample_flock.farm_id)
+    spike = _rule(user, sample_flock.farm_id, {"type": "mortality_spike", "threshold": 5})
+    outbreak = _rule(user, sample_flock.farm_id, {"type": "outbreak_active"})
+    db_session.add_all([spike, outbreak])
+    await db_session.flush()
+
+    resp = await client.post(
+        f"{API}/sync",
+        json={
+            "data": {
+                "production": [
+                    {"flock_id": str(sample_flock.id), "date": "2026-03-01", "deaths": 9}
+                ]
+            }
+        },
+        headers=authenticated_user["headers"],
+    )
+    assert resp.status_code == 200
+    assert triggers == {
+        (org, farm, "mortality_spike"),
+        (org, farm, "production_drop"),
+        (org, farm, "below_target"),
+    }
+    assert workflow_triggers._wakeup.is_set()
+
+    assert await workflow_triggers.flush_dirty(_TestSessions(db_session)) == 3
+    assert not triggers
+    executions = (await db_session.execute(select(WorkflowExecution))).scalars().all()
+    assert [e.rule_id for e in executions] == [spike.id]  # outbreak rule untouched
+
+
+async def test_published_events_mark_org_wide_rules(triggers):
+    events.add_listener(workflow_triggers.on_event)
+    try:
+        await events.publish_event(EventType.FEED_PURCHASE, "farm-1", "org-1")
+        await events.publish_event(EventType.IOT_READING, "farm-1", "org-1")
+        for _ in range(3):
+            await events.publish_event(EventType.PRODUCTION_NEW, "farm-2", "org-1")
+    finally:
+        events.remove_listener(workflow_triggers.on_event)
+
+    assert triggers == {
+        ("org-1", None, "feed_stock_low"),
+        ("org-1", "farm-2", "mortality_spike"),
+        ("org-1", "farm-2", "production_drop"),
+        ("org-1", "farm-2", "below_target"),
+    }
+    assert workflow_triggers.workflow_trigger_stats()["dirty"] == 4
+
+
+async def test_marks_are_ignored_when_not_running():
+    workflow_triggers.mark("org-1", "farm-1", "daily_production")
+    assert not workflow_triggers.running()
+    assert not workflow_triggers._dirty
+
+
+async def test_rest_writes_mark_their_rules(
+    client, authenticated_user, sample_flock, triggers
+):
+    headers = authenticated_user["headers"]
+    org, farm = str(authenticated_user["org"].id), str(sample_flock.farm_id)
+    resp = await client.post(
+        f"{API}/production",
+        json={"flock_id": str(sample_flock.id), "date": "2026-03-01", "total_eggs": 9},
+        headers=headers,
+    )
+    assert resp.status_code == 201
+    resp = await client.post(
+        f"{API}/feed/purchases",
+        json={"date": "2026-03-01", "kg": 100, "price_per_kg": 1, "total_cost": 100},
+        headers=headers,
+    )
+    assert resp.status_code == 201
+    assert triggers == {
+        (org, farm, "mortality_spike"),
+        (org, farm, "production_drop"),
+        (org, farm, "below_target"),
+        (org, None, "feed_stock_low"),
+    }
+
+
+async def test_service_marks_wait_for_commit_and_drop_on_rollback(
+    db_session, authenticated_user, sample_flock, triggers
+):
+    org = authenticated_user["org"].id
+    await workflow_triggers.mark_records(db_session, org, "flocks", sample_flock)
+    assert not triggers  # not committed yet
+    await db_session.rollback()
+    await db_session.commit()
+    assert not triggers
+
+    workflow_triggers.mark_after_commit(db_session, org, None, "receivables")
+    await db_session.commit()
+    assert triggers == {(str(org), None, "payment_overdue")}
+
+
+async def test_failed_flush_requeues_and_wakes_the_task(triggers, monkeypatch):
+    async def _fail(session_factory, org_id, keys):
+        raise RuntimeError("db down")
+
+    monkeypatch.setattr(workflow_triggers, "_evaluate_org", _fail)
+    workflow_triggers.mark("org-1", None, "receivables")
+    workflow_triggers._wakeup.clear()
+
+    assert await workflow_triggers.flush_dirty() == 1
+    assert triggers == {("org-1", None, "payment_overdue")}
+    assert workflow_triggers._wakeup.is_set()
+
+
+async def test_time_sweep_evaluates_only_time_driven_rules(
+    db_session, authenticated_user, sample_flock
+):
+    user = authenticated_user["user"]
+    db_session.add_all(
+        [
+            _rule(user, sample_flock.farm_id, {"type": "payment_overdue"}),
+            _rule(user, sample_flock.farm_id, {"type": "feed_stock_low"}),
+            _rule(user, sample_flock.farm_id, {"type": "mortality_spike"}),
+        ]
+    )
+    await db_session.flush()
+    summary = await evaluate_active_rules(
+        db_session, user.organization_id, rule_types=workflow_triggers.TIME_RULE_TYPES
+    )
+    assert summary["evaluated"] == 2
@@ -0,0 +1,235 @@
+"""Tests for the WebSocket fan-out hub in src.core.ws_hub.
+
+A fake Redis Pub/Sub stands in for Redis: one connection per worker,
+reference-counted channel subscriptions, single-serialization fan-out,
+bounded per-socket queues and per-type event coalescing.
+"""
+
+import asyncio
+import json
+
+import pytest
+import pytest_asyncio
+
+from src.core import rate_limit, ws_hub
+from src.core.events import EventType
+
+pytestmark = pytest.mark.asyncio
+
+
+class FakePubSub:
+    def __init__(self):
+        self.channels: set[str] = set()
+        self.calls: list[tuple[str, tuple]] = []
+        self.inbox: asyncio.Queue = asyncio.Queue()
+
+    @property
+    def subscribed(self) -> bool:
+        return bool(self.channels)
+
+    async def subscribe(self, *channels):
+        self.calls.append(("subscribe", channels))
+        self.channels.update(channels)
+
+    async def unsubscribe(self, *channels):
+        self.calls.append(("unsubscribe", channels))
+        self.channels.difference_update(channels)
+
+    async def get_message(self, ignore_subscribe_messages=True, timeout=1.0):
+        try:
+            return await asyncio.wait_for(self.inbox.get(), 0.05)
+        except asyncio.TimeoutError:
+            return None
+
+    async def aclose(self):
+        pass
+
+
+class FakeRedis:
+    def __init__(self):
+        self.pubsubs: list[FakePubSub] = []
+
+    def pubsub(self):
+        self.pubsubs.append(FakePubSub())
+        return self.pubsubs[-1]
+
+
+class FakeSocket:
+    def __init__(self):
+        self.sent: list[str] = []
+
+    async def send_text(self, text: str):
+        self.sent.append(text)
+
+
+@pytest_asyncio.fixture
+async def redis(monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(rate_limit, "_redis", fake)
+    monkeypatch.setattr(ws_hub, "_hub", ws_hub._Hub())
+    yield fake
+    await ws_hub.stop_ws_hub()
+
+
+async def _settle(condition, timeout=1.0):
+    for _ in range(int(timeout / 0.01)):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("condition not reached")
+
+
+async def _cancel(*tasks):
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def test_one_connection_with_refcounted_channels(redis):
+    a, b, c = (ws_hub.Subscriber(FakeSocket()) for _ in range(3))
+    await ws_hub.subscribe("events:farm:1", a)
+    await ws_hub.subscribe("events:farm:1", b)
+    await ws_hub.subscribe("events:org:9", c)
+
+    assert len(redis.pubsubs) == 1
+    pubsub = redis.pubsubs[0]
+    assert pubsub.calls == [
+        ("subscribe", ("events:farm:1",)),
+        ("subscribe", ("events:org:9",)),
+    ]
+
+    await ws_hub.unsubscribe("events:farm:1", a)
+    assert pubsub.channels == {"events:farm:1", "events:org:9"}
+    await ws_hub.unsubscribe("events:farm:1", b)
+    assert pubsub.channels == {"events:org:9"}
+    assert ws_hub.ws_hub_stats()["sockets"] == 1
+
+    await ws_hub.unsubscribe("events:org:9", c)
+
+
+async def test_messages_fan_out_as_published_text(redis):
+    sockets = [FakeSocket(), FakeSocket()]
+    subs = [ws_hub.Subscriber(s) for s in sockets]
+    runners = [asyncio.create_task(s.run()) for s in subs]
+    for sub in subs:
+        await ws_hub.subscribe("events:farm:1", sub)
+
+    raw = json.dumps({"type": "chat_message", "data": {"content": "hola"}})
+    await redis.pubsubs[0].inbox.put(
+        {"type": "message", "channel": "events:farm:1", "data": raw}
+    )
+    await _settle(lambda: all(s.sent for s in sockets))
+    assert [s.sent for s in sockets] == [[raw], [raw]]
+
+    await _cancel(*runners)
+    for sub in subs:
+        await ws_hub.unsubscribe("events:farm:1", sub)
+
+
+async def test_slow_consumer_drops_oldest_and_is_told():
+    socket = FakeSocket()
+    sub = ws_hub.Subscriber(socket, max_queue=3)
+    for i in range(5):
+        sub.offer(json.dumps({"n": i}))
+
+    runner = asyncio.create_task(sub.run())
+    await _settle(lambda: len(socket.sent) == 4)
+    await _cancel(runner)
+
+    notice = json.loads(socket.sent[0])
+    assert notice["type"] == "overflow" and notice["dropped"] == 2
+    assert [json.loads(m)["n"] for m in socket.sent[1:]] == [2, 3, 4]
+
+
+async def test_without_redis_sockets_only_get_heartbeats(monkeypatch):
+    monkeypatch.setattr(rate_limit, "_redis", None)
+    monkeypatch.setattr(ws_hub, "_hub", ws_hub._Hub())
+    monkeypatch.setattr(ws_hub, "HEARTBEAT_INTERVAL", 0.05)
+    socket = FakeSocket()
+    sub = ws_hub.Subscriber(socket)
+    await ws_hub.subscribe("events:org:1", sub)
+
+    runner = asyncio.create_task(sub.run())
+    await _settle(lambda: socket.sent)
+    await _cancel(runner)
+    assert json.loads(socket.sent[0])["type"] == "heartbeat"
+    await ws_hub.unsubscribe("events:org:1", sub)
+
+
+def _event(event_type: str, **data) -> str:
+    return json.dumps(
+        {"type": event_type, "farm_id": "f1", "org_id": "o1", "data": data}
+    )
+
+
+async def test_bursts_are_coalesced_per_entity_and_alerts_skip_the_window(
+    redis, monkeypatch
+):
+    monkeypatch.setitem(ws_hub.COALESCE_WINDOWS, EventType.IOT_READING, 0.05)
+    socket = FakeSocket()
+    sub = ws_hub.Subscriber(socket)
+    await ws_hub.subscribe("events:farm:f1", sub)
+    runner = asyncio.create_task(sub.run())
+
+    hub = ws_hub._hub
+    for value in range(5):
+        hub.dispatch("events:farm:f1", _event("iot.reading", sensor_type="temp", value=value))
+    hub.dispatch("events:farm:f1", _event("iot.reading", sensor_type="humidity", value=60))
+    alert = _event("health.alert", id="a1", severity="high")
+    hub.dispatch("events:farm:f1", alert)
+
+    await _settle(lambda: len(socket.sent) == 2)
+    await _cancel(runner)
+    assert socket.sent[0] == alert  # not held back by the pending batch
+
+    batch = json.loads(socket.sent[1])
+    assert batch["type"] == "batch"
+    assert [(e["data"], e["coalesced"]) for e in batch["events"]] == [
+        ({"sensor_type": "temp", "value": 4}, 5),
+        ({"sensor_type": "humidity", "value": 60}, 1),
+    ]
+    await ws_hub.unsubscribe("events:farm:f1", sub)
+
+
+async def test_events_without_an_entity_are_batched_but_not_merged(
+    redis, monkeypatch
+):
+    monkeypatch.setitem(ws_hub.COALESCE_WINDOWS, EventType.IOT_READING, 0.05)
+    socket = FakeSocket()
+    sub = ws_hub.Subscriber(socket)
+    await ws_hub.subscribe("events:farm:f1", sub)
+    runner = asyncio.create_task(sub.run())
+
+    # Gateway flush summaries: no id / sensor_type, counts must not be lost
+    for count, sensors in [(40, ["temp"]), (7, ["humidity"])]:
+        ws_hub._hub.dispatch(
+            "events:farm:f1", _event("iot.reading", count=count, sensor_types=sensors)
+        )
+
+    await _settle(lambda: len(socket.sent) == 1)
+    await _cancel(runner)
+    batch = json.loads(socket.sent[0])
+    assert [(e["data"], e["coalesced"]) for e in batch["events"]] == [
+        ({"count": 40, "sensor_types": ["temp"]}, 1),
+        ({"count": 7, "sensor_types": ["humidity"]}, 1),
+    ]
+    await ws_hub.unsubscribe("events:farm:f1", sub)
+
+
+async def test_lone_event_in_window_is_sent_as_published(redis, monkeypatch):
+    monkeypatch.setitem(ws_hub.COALESCE_WINDOWS, EventType.PRODUCTION_NEW, 0.01)
+    monkeypatch.setitem(ws_hub.COALESCE_WINDOWS, EventType.OUTBREAK_ALERT, 5.0)
+    socket = FakeSocket()
+    sub = ws_hub.Subscriber(socket)
+    await ws_hub.subscribe("events:farm:f1", sub)
+    runner = asyncio.create_task(sub.run())
+
+    raw = _event("production.new", id="p1", total_eggs=900)
+    ws_hub._hub.dispatch("events:farm:f1", raw)
+    outbreak = _event("outbreak.alert", alert_id="x")
+    ws_hub._hub.dispatch("events:farm:f1", outbreak)  # alerts never wait
+
+    await _settle(lambda: len(socket.sent) == 2)
+    await _cancel(runner)
+    assert socket.sent == [outbreak, raw]
+    await ws_hub.unsubscribe("events:farm:f1", sub)
@@ -24,6 +24,30 @@ let _pinLockCountdownTimer = null;
 // ─── Sync state ───
 let _lastSyncTime = localStorage.getItem(Store.scopedKey('egglogu_last_sync')) || null;
 let _isSyncing = false;
+// Pages pulled per sync call; a larger backlog resumes from the saved cursors
+const MAX_SYNC_PAGES = 50;
+
+function _loadSyncCursors() {
+  try { return JSON.parse(localStorage.getItem(Store.scopedKey('egglogu_sync_cursors')) || '{}'); } catch (e) { return {}; }
+}
+
+// The server pages its changes per entity: merge every page, following
+// `cursors` while `has_more`, and only then advance the last sync time.
+async function _pullServerChanges(D, resp) {
+  const syncedAt = resp.server_now || new Date().toISOString();
+  let page = resp;
+  for (let n = 1; page.has_more; n++) {
+    if (n >= MAX_SYNC_PAGES) {
+      safeSetItem(Store.scopedKey('egglogu_sync_cursors'), JSON.stringify(page.cursors || {}));
+      return;
+    }
+    page = await apiService.syncToServer({ last_synced_at: _lastSyncTime, data: {}, cursors: page.cursors || {} });
+    if (page.server_changes) _mergeServerChanges(D, page.server_changes);
+  }
+  localStorage.removeItem(Store.scopedKey('egglogu_sync_cursors'));
+  _lastSyncTime = syncedAt;
+  safeSetItem(Store.scopedKey('egglogu_last_sync'), _lastSyncTime);
+}
 
 const ENTITY_MAP = {
   farms: D => ([D.farm]),
@@ -231,14 +255,13 @@ async function loadFromServer() {
   if (!apiService.isLoggedIn() || !navigator.onLine) return;
   try {
     const [syncResp, billing] = await Promise.all([
-      apiService.syncToServer({ last_synced_at: _lastSyncTime, data: {} }).catch(() => null),
+      apiService.syncToServer({ last_synced_at: _lastSyncTime, data: {}, cursors: _loadSyncCursors() }).catch(() => null),
       apiService.getBillingStatus().catch(() => null),
     ]);
     const D = Store.get();
-    if (syncResp && syncResp.server_changes) _mergeServerChanges(D, syncResp.server_changes);
-    if (syncResp && syncResp.server_now) {
-      _lastSyncTime = syncResp.server_now;
-      safeSetItem(Store.scopedKey('egglogu_last_sync'), _lastSyncTime);
+    if (syncResp && syncResp.server_changes) {
+      _mergeServerChanges(D, syncResp.server_changes);
+      await _pullServerChanges(D, syncResp).catch(e => console.warn('[Sync] Paging stopped:', e.message));
     }
     if (billing) {
       D.settings.plan = D.settings.plan || {};
@@ -292,14 +315,13 @@ async function syncToServer() {
       }
     }
     if (deltaCount === 0) { _isSyncing = false; return; }
-    const resp = await apiService.syncToServer({ last_synced_at: _lastSyncTime, data: delta });
+    const resp = await apiService.syncToServer({ last_synced_at: _lastSyncTime, data: delta, cursors: _loadSyncCursors() });
     if (resp && resp.conflicts && resp.conflicts.length) {
       const n = resp.conflict_count || resp.conflicts.length;
       Bus.emit('toast', { msg: t('sync_conflicts').replace('{n}', n), type: 'error' });
     }
     if (resp && resp.server_changes) _mergeServerChanges(D, resp.server_changes);
-    _lastSyncTime = resp && resp.server_now ? resp.server_now : new Date().toISOString();
-    safeSetItem(Store.scopedKey('egglogu_last_sync'), _lastSyncTime);
+    if (resp) await _pullServerChanges(D, resp);
     _saveSyncSnapshot(D);
     Store.save(D, 'sync');
   } catch (e) {